@@ -3,9 +3,15 @@ import os
 from dotenv import load_dotenv
 # Load env from server/.env (the file is alongside this app.py)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+# SOCKETIO_ASYNC_MODE=eventlet monkey-patches the standard library; this has to
+# run before anything imports socket / threading users (services/async_mode.py)
+from services import async_mode
+async_mode.patch()
+# PDF extraction workers are forked while this process is still single-threaded
+# (threading mode only; services/extraction.py)
+from services import extraction
+extraction.start_pool()
 from auth import firebase_config
-# import eventlet
-# eventlet.monkey_patch()
 from flask import Flask, send_from_directory, render_template_string
 from flask_cors import CORS
 from flask_socketio import SocketIO
@@ -15,18 +21,23 @@ import time
 from routes.note_routes import note_bp
 from routes.ux_report_routes import ux_bp
 from events.board_events import register_socket_events
+from services import socket_queue
+from services import uploads
 
 
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+# uploads spooled (and capped) while the multipart body is parsed; MAX_CONTENT_LENGTH
+uploads.configure(app)
 
 socketio = SocketIO(
     app,
-    async_mode="threading",
+    async_mode=async_mode.MODE,
     cors_allowed_origins="*",
     ping_timeout=60,
     ping_interval=25,
+    **socket_queue.socketio_options(),
 )
 
 app.register_blueprint(note_bp)
@@ -81,6 +92,16 @@ def _keepalive_loop(interval_minutes: int):
 if os.getenv("WARMUP_ON_START", "1") == "1":
     threading.Thread(target=_warmup_once, daemon=True).start()
 
+# Mongo indexes for note lookups (by id / boardId); built off the request path
+from services import indexes as mongo_indexes
+if mongo_indexes.ENSURE_ON_START:
+    mongo_indexes.ensure_indexes_async()
+
+# Firebase public keys re-fetched in the background (TOKEN_KEYS_REFRESH) so token
+# verification never waits on a key download
+from auth import firebase_verify
+firebase_verify.key_refresher.start()
+
 if os.getenv("HF_KEEPALIVE_MINUTES"):
     try:
         minutes = int(os.getenv("HF_KEEPALIVE_MINUTES"))
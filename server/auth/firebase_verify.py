@@ -4,6 +4,9 @@ from firebase_admin import credentials
 import os, json
 from dotenv import load_dotenv
 from auth import firebase_config
+from services import metrics
+from services.async_mode import offload
+from services.token_cache import TokenCache, KeyRefresher
 
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'server', '.env'))
@@ -15,9 +18,37 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
     print("✅ Firebase initialized with:", cred_dict.get("project_id"))
     
+# decoded claims per token until its exp (see services/token_cache.py); the
+# lambda keeps firebase_auth.verify_id_token looked up at call time. The
+# signature check is CPU work: off the event loop under eventlet
+token_cache = TokenCache(lambda token: offload(firebase_auth.verify_id_token, token),
+                         definitive=(ValueError, firebase_auth.InvalidIdTokenError))
+
+
+def _fetch_keys():
+    # warm the HTTP cache verify_id_token reads Google's public keys from. That
+    # cache lives on the SDK's private verifier session, so this is best-effort:
+    # if a firebase-admin release moves those internals, verification still works
+    # (fetching keys itself on a miss) and the refresher stops
+    try:
+        from firebase_admin import _token_gen
+        client = firebase_auth._get_client(firebase_admin.get_app())
+        fetch = client._token_verifier.request
+        cert_uri = _token_gen.ID_TOKEN_CERT_URI
+    except (ImportError, AttributeError) as e:
+        print("❌ Firebase key pre-warm unavailable in this firebase-admin:", e)
+        key_refresher.stop()
+        return
+    fetch(cert_uri, headers={"Cache-Control": "no-cache"})
+
+
+key_refresher = KeyRefresher(_fetch_keys)
+metrics.register("token_cache", lambda: {**token_cache.snapshot(), "keys": key_refresher.snapshot()})
+
+
 def verify_firebase_token(token):
     try:
-        return firebase_auth.verify_id_token(token)
+        return token_cache.verify(token)
     except Exception as e:
         print("❌ Firebase token error:", e)
         return None
@@ -1,31 +1,47 @@
 from flask import request
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from firebase_admin import auth as fb_auth
-from services.note_service import create_note, update_note, delete_note, get_notes_by_board
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
+from services.note_service import (create_note, update_note, delete_note, get_notes_by_board, get_board_changes,
+                                  get_notes_in_bbox, bulk_notes, split_moves)
 from auth.firebase_verify import verify_firebase_token
+from services.move_buffer import get_buffer
+from services.socket_sessions import sessions
+# socket presence per board (optional if only Firestore presence is used); changes
+# reach the room as one coalesced broadcast per PRESENCE_DEBOUNCE_MS
+from services.presence import presence, feed as presence_feed
+from services.snapshot_stream import streams as snapshot_streams, order_for_viewport, chunk_size
+from services.spatial import get_registry as get_viewports
 
-# Optional: socket presence (can be removed if only Firestore presence is used)
-online_users = {}
-sid_to_uid = {}
-latest_sid_by_uid = {}              # { uid: sid }
+# move_note positions are persisted write-behind (None: synchronous update_note)
+move_buffer = get_buffer()
+# sockets that subscribed a viewport only get creates/moves inside it
+viewports = get_viewports()
 
-def _broadcast_user_list(board_id):
-    users = online_users.get(board_id, {})
-    payload = {
-        "boardId": board_id,
-        "users": [
-            {"uid": uid, "name": u["name"], "email": u["email"]}
-            for uid, u in users.items()
-        ],
-    }
-    emit("user_list", payload, room=board_id)
-    emit("online_users", payload["users"], room=board_id)
+
+def _verify(token):
+    # cached per token until its exp (auth/firebase_verify.py)
+    return verify_firebase_token(token) if token else None
+
+
+def _send_user_list(board_id):
+    # to the requesting socket only, from the cached member list
+    users = presence_feed.users(board_id)
+    emit("user_list", {"boardId": board_id, "users": users})
+    emit("online_users", users)
 
 
 # -------------------------
 # Join/Leave Board
 # -------------------------
 def register_socket_events(socketio):
+    presence_feed.attach(socketio)
+
+    @socketio.on("connect")
+    def connect(auth=None):
+        # io(url, { auth: { token } }) authenticates the socket up front; a
+        # missing or bad token only means join_board has to carry one
+        if isinstance(auth, dict):
+            sessions.bind(request.sid, _verify(auth.get("token")))
+
     @socketio.on("join_board")
     def join_board(data):
         token = data.get("token")
@@ -33,152 +49,268 @@ def register_socket_events(socketio):
         if not board_id:
             emit("join_denied", {"reason": "Missing boardId"})
             return
-        try:
-            decoded = fb_auth.verify_id_token(token)
-        except Exception:
-            decoded = None
+        if token:
+            decoded = _verify(token)
+            if decoded and not sessions.bind(request.sid, decoded):
+                emit("join_denied", {"reason": "Token belongs to another user"})
+                return
+        else:
+            decoded = sessions.get(request.sid)     # authenticated on connect
         if not decoded:
             emit("join_denied", {"reason": "Invalid or missing token"})
             return
 
-        # Count users who were already on this board before we add the new joiner
-        pre_count = len(online_users.get(board_id, {}))
-
         uid   = decoded["uid"]
         name  = decoded.get("name") or decoded.get("displayName") or "User"
         email = decoded.get("email") or ""
         sid   = request.sid
-        latest_sid_by_uid[uid] = sid
 
         join_room(board_id)
-        sid_to_uid[sid] = uid
-
-        board_users = online_users.setdefault(board_id, {})
-        user_entry = board_users.setdefault(uid, {"name": name, "email": email, "sockets": set()})
-        user_entry["sockets"].add(sid)
+        # users who were already on this board before the new joiner
+        pre_count, came_online = presence.join(sid, board_id, uid, name, email)
 
         print(f"✅ Auto join: {name} ({uid}) AUTO joined room {board_id} ")
-        emit("join_granted", {"boardId": board_id}, room=sid)
-        # Send full note snapshot to the newly joined client so everyone sees the same board
+        emit("join_granted", {"boardId": board_id, "exp": sessions.expires(sid)}, room=sid)
+        # Send full note snapshot to the newly joined client so everyone sees the same board;
+        # a rejoining client that sends `since` (its last seen revision) gets only the changes,
+        # and one that asks for a stream (or sends its viewport) gets the snapshot in acked chunks
+        since = data.get("since")
+        stream = bool(data.get("stream")) or data.get("viewport") is not None
         try:
-            notes = get_notes_by_board(board_id)
+            if move_buffer is not None:
+                move_buffer.flush_board(board_id)   # snapshot must include buffered moves
+            if since is None and not stream:
+                payload = {"notes": get_notes_by_board(board_id)}
+            else:
+                payload = get_board_changes(board_id, since if isinstance(since, int) else None)
         except Exception:
-            notes = []
-        emit("load_existing_notes", {"boardId": board_id, "notes": notes}, room=sid)
+            payload = {"notes": []}
+        if stream and payload.get("full", True):
+            notes = order_for_viewport(payload["notes"], data.get("viewport"))
+            for msg in snapshot_streams.start(sid, board_id, notes, chunk_size(data.get("chunkSize")),
+                                              rev=payload.get("rev")):
+                emit("notes_chunk", msg, room=sid)
+        else:
+            emit("load_existing_notes", {"boardId": board_id, **payload}, room=sid)
 
         # Demo-only: if there are already users on this board, ask the new joiner to show a brief waiting overlay
         if pre_count > 0:
             print(f"🕒 demo_wait -> only SID {sid} (others online: {pre_count})")
             emit("demo_wait", {"ms": 3500}, room=sid)
 
-        emit("user_joined", {"uid": uid, "name": name, "email": email}, room=board_id, include_self=False)
-        _broadcast_user_list(board_id)
+        if came_online:
+            presence_feed.changed(board_id, joined=[{"uid": uid, "name": name, "email": email}])
+        _send_user_list(board_id)
+
+    @socketio.on("refresh_token")
+    def refresh_token(data):
+        # { token } -> extends the session before the bound ID token expires
+        data = data if isinstance(data, dict) else {}
+        decoded = _verify(data.get("token"))
+        if not decoded:
+            emit("Unauthorized", {"message": "Invalid or missing token"})
+            return
+        if not sessions.bind(request.sid, decoded):
+            emit("Unauthorized", {"message": "Token belongs to another user"})
+            return
+        emit("token_refreshed", {"exp": sessions.expires(request.sid)})
+
+    @socketio.on("notes_chunk_ack")
+    def notes_chunk_ack(data):
+        data = data if isinstance(data, dict) else {}
+        for msg in snapshot_streams.ack(request.sid, data.get("boardId"), data.get("seq")):
+            emit("notes_chunk", msg)
+
+    @socketio.on("subscribe_viewport")
+    def subscribe_viewport(data):
+        # { boardId, viewport: {x, y, w, h} } -> only creates/moves near it from now on,
+        # plus the notes already inside; viewport null goes back to the whole board
+        data = data if isinstance(data, dict) else {}
+        board_id = data.get("boardId")
+        sid = request.sid
+        if not board_id or board_id not in rooms():
+            emit("viewport_denied", {"boardId": board_id, "reason": "Join the board first"})
+            return
+        bbox = viewports.subscribe(sid, board_id, data.get("viewport"))
+        if bbox is None:
+            emit("viewport_notes", {"boardId": board_id, "viewport": None, "notes": None})
+            return
+        try:
+            if move_buffer is not None:
+                move_buffer.flush_board(board_id)   # positions must include buffered moves
+            notes = get_notes_in_bbox(board_id, bbox)
+        except Exception:
+            notes = []
+        emit("viewport_notes", {"boardId": board_id, "viewport": list(bbox), "notes": notes})
 
     @socketio.on("get_online_users")
     def get_online_users(data):
-        board_id = data.get("boardId")
-        users = online_users.get(board_id, {})
-        emit("online_users", [
-            {"uid": uid, "name": u["name"], "email": u["email"]}
-            for uid, u in users.items()
-        ])
-        emit("user_list", {
-            "boardId": board_id,
-            "users": [
-                {"uid": uid, "name": u["name"], "email": u["email"]}
-                for uid, u in users.items()
-            ],
-        })
+        _send_user_list(data.get("boardId"))
 
 
     @socketio.on("leave_board")
     def leave_board(data):
         board_id = data.get("boardId")
         sid = request.sid
+        if move_buffer is not None:
+            move_buffer.flush_sid(sid)
+        snapshot_streams.drop(sid)
+        viewports.drop(sid)
         leave_room(board_id)
-        left_uid = sid_to_uid.get(sid)
-        sid_to_uid.pop(sid, None)
-
-        if board_id in online_users:
-            for uid in list(online_users[board_id].keys()):
-                online_users[board_id][uid]["sockets"].discard(sid)
-                if not online_users[board_id][uid]["sockets"]:
-                    del online_users[board_id][uid]
-            if left_uid:
-                emit("user_left", {"uid": left_uid}, room=board_id, include_self=False)
-            _broadcast_user_list(board_id)
+
+        _, gone = presence.leave(sid, board_id)
+        presence_feed.changed(board_id, left=gone)
         print(f"🚪 Socket {sid} left board {board_id}")
 
     @socketio.on("disconnect")
     def disconnect(*args):
         sid = request.sid
-        uid = sid_to_uid.pop(sid, None)
+        if move_buffer is not None:
+            move_buffer.flush_sid(sid)
+        snapshot_streams.drop(sid)
+        viewports.drop(sid)
+        sessions.drop(sid)
         print(f"🔌 Socket {sid} disconnected")
-        # remove from online_users
-        for board_id in list(online_users.keys()):
-            removed = []
-            for u in list(online_users[board_id].keys()):
-                online_users[board_id][u]["sockets"].discard(sid)
-                if not online_users[board_id][u]["sockets"]:
-                    del online_users[board_id][u]
-                    removed.append(u)
-            for u in removed:
-                emit("user_left", {"uid": u}, room=board_id, include_self=False)
-        _broadcast_user_list(board_id)
+        # only the boards this socket was on
+        for board_id, gone in presence.disconnect(sid).items():
+            presence_feed.changed(board_id, left=gone)
 
     # -------------------------
     # Note Events
+    # Authorized by the session bound in connect / join_board (one dict
+    # lookup); the token an event carries is only verified when that
+    # session is missing or expired.
     # -------------------------
+    def _session(data):
+        sid = request.sid
+        claims = sessions.get(sid)
+        if claims is None and isinstance(data, dict) and data.get("token"):
+            claims = sessions.bind(sid, _verify(data.get("token")))
+        if claims is None:
+            emit("Unauthorized", {"message": "Invalid or missing token"})
+        return claims
+
+    def _joined(board_id):
+        if not board_id or board_id not in rooms():
+            emit("Unauthorized", {"message": "Join the board first"})
+            return False
+        return True
+
     @socketio.on("create_note")
     def handle_create_note(data):
-        token = data.get("token")
-        decoded = verify_firebase_token(token)
-        if not decoded:
-            emit("Unauthorized", {"message": "Invalid or missing token"})
+        if not _session(data) or not _joined(data.get("boardId")):
             return
+        data.pop("token", None)                 # never echoed to the room
 
         create_note(data)
         data.pop("_id", None)
         print(f"📝 Broadcasting new note to room {data['boardId']}")
-        emit("new_note", data, room=data["boardId"])
+        viewports.broadcast(emit, "new_note", data["boardId"], [data], lambda notes: data, moved=False)
 
     @socketio.on("edit_note")
     def handle_edit_note(data):
-        token = data.get("token")
-        decoded = verify_firebase_token(token)
-        if not decoded:
-            emit("Unauthorized", {"message": "Invalid or missing token"})
+        if not _session(data) or not _joined(data.get("boardId")):
             return
+        data.pop("token", None)                 # never echoed to the room
 
+        if move_buffer is not None:
+            move_buffer.discard(data["id"])     # the edit carries its own x/y
         update_note(data["id"], {
             "text": data["text"],
             "x": data["x"],
             "y": data["y"],
             "user": data["user"]
-        })
+        }, board_id=data.get("boardId"))
         print(f"✏️ Broadcasting edited note {data['id']} to room {data['boardId']}")
         emit("note_edited", data, room=data["boardId"])
 
     @socketio.on("move_note")
     def handle_move_note(data):
-        token = data.get("token")
-        decoded = verify_firebase_token(token)
-        if not decoded:
-            emit("Unauthorized", {"message": "Invalid or missing token"})
+        if not _session(data) or not _joined(data.get("boardId")):
             return
+        data.pop("token", None)                 # never echoed to the room
 
-        update_note(data["id"], {"x": data["x"], "y": data["y"]})
+        if move_buffer is not None:
+            move_buffer.put(data["id"], data["x"], data["y"], board_id=data.get("boardId"), sid=request.sid)
+        else:
+            update_note(data["id"], {"x": data["x"], "y": data["y"]}, board_id=data.get("boardId"))
         print(f"📍 Broadcasting moved note {data['id']} to room {data['boardId']}")
-        emit("note_moved", data, room=data["boardId"])
+        viewports.broadcast(emit, "note_moved", data["boardId"], [data], lambda notes: data)
 
     @socketio.on("delete_note")
     def handle_delete_note(data):
-        token = data.get("token")
-        decoded = verify_firebase_token(token)
-        if not decoded:
-            emit("Unauthorized", {"message": "Invalid or missing token"})
+        if not _session(data) or not _joined(data.get("boardId")):
             return
+        data.pop("token", None)                 # never echoed to the room
 
-        delete_note(data["id"])
+        if move_buffer is not None:
+            move_buffer.discard(data["id"])
+        delete_note(data["id"], board_id=data.get("boardId"))
         print(f"🗑 Broadcasting deleted note {data['id']} to room {data['boardId']}")
-        emit("note_deleted", {"id": data["id"]}, room=data["boardId"])
\ No newline at end of file
+        viewports.forget(data["boardId"], [data["id"]])
+        emit("note_deleted", {"id": data["id"]}, room=data["boardId"])
+
+    # -------------------------
+    # Batched Note Events
+    # One session check, one bulk_write and one broadcast per batch; invalid
+    # items are reported back to the sender in notes_batch_result.
+    # -------------------------
+    def _batch_auth(event, data):
+        if not isinstance(data, dict) or not _session(data):
+            return None
+        board_id = data.get("boardId")
+        if not board_id:
+            _batch_result(event, None, 0, [{"op": None, "index": None, "id": None, "error": "Missing boardId"}])
+            return None
+        return board_id if _joined(board_id) else None
+
+    def _batch_result(event, board_id, applied, errors):
+        emit("notes_batch_result", {"event": event, "boardId": board_id, "applied": applied, "errors": errors})
+
+    @socketio.on("create_notes")
+    def handle_create_notes(data):
+        board_id = _batch_auth("create_notes", data)
+        if not board_id:
+            return
+        result = bulk_notes(creates=data.get("notes") or [], board_id=board_id)
+        if result["created"]:
+            print(f"📝 Broadcasting {len(result['created'])} new notes to room {board_id}")
+            viewports.broadcast(emit, "notes_created", board_id, result["created"],
+                                lambda notes: {"boardId": board_id, "notes": notes}, moved=False)
+        _batch_result("create_notes", board_id, len(result["created"]), result["errors"])
+
+    @socketio.on("move_notes")
+    def handle_move_notes(data):
+        board_id = _batch_auth("move_notes", data)
+        if not board_id:
+            return
+        if move_buffer is not None:
+            valid, errors = split_moves(data.get("moves") or [])
+            moved = [m for _, m in valid]
+            for m in moved:
+                move_buffer.put(m["id"], m["x"], m["y"], board_id=board_id, sid=request.sid)
+        else:
+            result = bulk_notes(moves=data.get("moves") or [], board_id=board_id)
+            moved, errors = result["moved"], result["errors"]
+        if moved:
+            print(f"📍 Broadcasting {len(moved)} moved notes to room {board_id}")
+            viewports.broadcast(emit, "notes_moved", board_id, moved,
+                                lambda moves: {"boardId": board_id, "moves": moves})
+        _batch_result("move_notes", board_id, len(moved), errors)
+
+    @socketio.on("delete_notes")
+    def handle_delete_notes(data):
+        board_id = _batch_auth("delete_notes", data)
+        if not board_id:
+            return
+        ids = data.get("ids") or []
+        if move_buffer is not None:
+            for note_id in ids:
+                if isinstance(note_id, str):
+                    move_buffer.discard(note_id)
+        result = bulk_notes(deletes=ids, board_id=board_id)
+        if result["deleted"]:
+            print(f"🗑 Broadcasting {len(result['deleted'])} deleted notes to room {board_id}")
+            viewports.forget(board_id, result["deleted"])
+            emit("notes_deleted", {"boardId": board_id, "ids": result["deleted"]}, room=board_id)
+        _batch_result("delete_notes", board_id, len(result["deleted"]), result["errors"])
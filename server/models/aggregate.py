@@ -0,0 +1,241 @@
+# server/models/aggregate.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .base import CATEGORIES, CATEGORY_HINTS, UXReport, sort_categories
+
+# ---------------------------------------------------------------------
+# Per-item results -> UXReport.
+#
+# A model's classify_items() produces one dict per feedback item:
+#   text            original item
+#   critique        True when the item is a critique/suggestion
+#   critique_text   focused problem clause (critiques only)
+#   categories      critique categories kept for the item
+#   praise          praise clause (positives only)
+#   delight_text    key used to file the praise under a delight theme
+#   delight         top-1 delight labels (positives), [] when unconfident,
+#                   None when the item was past DELIGHT_MAX_ITEMS
+#
+# ReportAggregator folds those into bounded, mergeable aggregates, so the
+# same per-item results can produce a combined report, per-file reports
+# or chunk partials without repeating inference.
+# ---------------------------------------------------------------------
+ItemResult = Dict[str, Any]
+
+UI_EXAMPLES = 6              # examples per category card / highlights in the report
+SUMMARY_INPUT_CHARS = 4000   # text per category handed to the summarizer
+
+
+def empty_report() -> UXReport:
+    return {
+        "top_insight": "No strong themes detected.",
+        "pie_data": [],
+        "insights": {},
+        "positive_highlights": [],
+        "delight_distribution": [{"name": c, "value": 0} for c in CATEGORIES],
+    }
+
+
+def _hint_category(text: str) -> str:
+    low = text.lower()
+    for cat, rx in CATEGORY_HINTS.items():
+        try:
+            if rx.search(low):
+                return cat
+        except Exception:
+            pass
+    return "Feedback"
+
+
+class ReportAggregator:
+    """
+    Mergeable partial report. Memory per category is bounded (UI examples +
+    summary input); delight theme lists are bounded by `max_theme_examples`
+    (None keeps them all, as the single-pass report always did).
+    """
+
+    def __init__(self, max_theme_examples: Optional[int] = None):
+        self.max_theme_examples = max_theme_examples
+        self.items = 0
+        # critiques: exact-unique texts until the summary input is full (and >= UI_EXAMPLES),
+        # plus the first case-insensitively unique examples for the cards
+        self.summary_texts: Dict[str, List[str]] = {c: [] for c in CATEGORIES}
+        self.summary_chars: Dict[str, int] = {c: 0 for c in CATEGORIES}
+        self.examples: Dict[str, List[str]] = {c: [] for c in CATEGORIES}
+        # positives
+        self.first_positive: Optional[str] = None
+        self.highlights: List[str] = []
+        self.delight_counts: Dict[str, int] = {c: 0 for c in CATEGORIES}
+        self.delight_by_theme: Dict[str, List[str]] = {}
+        # unconfident positives wait until settle(): they only count when no
+        # confident item already filed the same praise text
+        self.pending: List[Tuple[str, str]] = []   # (theme text, text the keyword hint runs on)
+
+    # ---- folding ----
+    def add(self, r: ItemResult) -> None:
+        self.items += 1
+        if r.get("critique"):
+            text = r.get("critique_text") or r.get("text") or ""
+            for cat in r.get("categories") or ():
+                self._add_critique(cat, text)
+            return
+
+        if self.first_positive is None:
+            self.first_positive = r.get("text")
+        labels = r.get("delight")
+        if labels is None:                       # past DELIGHT_MAX_ITEMS
+            return
+        if len(self.highlights) < UI_EXAMPLES:
+            self.highlights.append(r.get("praise") or "")
+        key = r.get("delight_text") or r.get("praise") or ""
+        if labels:
+            for lab in labels:
+                self.delight_counts[lab] += 1
+                arr = self.delight_by_theme.setdefault(lab, [])
+                if key not in arr:
+                    self._append_theme(arr, key)
+        else:
+            self.pending.append((key, r.get("praise") or key))
+
+    def extend(self, results: Iterable[ItemResult]) -> "ReportAggregator":
+        for r in results:
+            self.add(r)
+        return self
+
+    def _add_critique(self, cat: str, text: str) -> None:
+        self._add_summary_text(cat, text)
+        self._add_example(cat, text)
+
+    def _add_summary_text(self, cat: str, text: str) -> None:
+        texts = self.summary_texts[cat]
+        if text not in texts and (self.summary_chars[cat] < SUMMARY_INPUT_CHARS or len(texts) < UI_EXAMPLES):
+            texts.append(text)
+            self.summary_chars[cat] += len(text) + 1
+
+    def _add_example(self, cat: str, text: str) -> None:
+        examples = self.examples[cat]
+        key = text.strip().lower()
+        if key and len(examples) < UI_EXAMPLES and all(e.strip().lower() != key for e in examples):
+            examples.append(text)
+
+    def _append_theme(self, arr: List[str], text: str) -> None:
+        if self.max_theme_examples is None or len(arr) < self.max_theme_examples:
+            arr.append(text)
+
+    def settle(self) -> "ReportAggregator":
+        """File pending unconfident positives by keyword hint (or 'Feedback')."""
+        for key, hint_text in self.pending:
+            if any(key in arr for arr in self.delight_by_theme.values()):
+                continue
+            cat = _hint_category(hint_text)
+            self._append_theme(self.delight_by_theme.setdefault(cat, []), key)
+            self.delight_counts[cat] += 1
+        self.pending = []
+        return self
+
+    def merge(self, other: "ReportAggregator") -> "ReportAggregator":
+        """Fold `other` (a later part of the item stream) into this aggregate."""
+        self.items += other.items
+        for cat in CATEGORIES:
+            for text in other.summary_texts[cat]:
+                self._add_summary_text(cat, text)
+            for text in other.examples[cat]:
+                self._add_example(cat, text)
+        if self.first_positive is None:
+            self.first_positive = other.first_positive
+        self.highlights.extend(other.highlights[: max(0, UI_EXAMPLES - len(self.highlights))])
+        for cat, n in other.delight_counts.items():
+            self.delight_counts[cat] = self.delight_counts.get(cat, 0) + n
+        for cat, arr in other.delight_by_theme.items():
+            mine = self.delight_by_theme.setdefault(cat, [])
+            for text in arr:
+                if text not in mine:
+                    self._append_theme(mine, text)
+        self.pending.extend(other.pending)
+        return self
+
+    # ---- checkpoints ----
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "max_theme_examples": self.max_theme_examples,
+            "items": self.items,
+            "summary_texts": self.summary_texts,
+            "summary_chars": self.summary_chars,
+            "examples": self.examples,
+            "first_positive": self.first_positive,
+            "highlights": self.highlights,
+            "delight_counts": self.delight_counts,
+            "delight_by_theme": self.delight_by_theme,
+            "pending": self.pending,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ReportAggregator":
+        agg = cls(d.get("max_theme_examples"))
+        agg.items = int(d.get("items", 0))
+        for cat in CATEGORIES:
+            agg.summary_texts[cat] = list(d.get("summary_texts", {}).get(cat, []))
+            agg.summary_chars[cat] = int(d.get("summary_chars", {}).get(cat, 0))
+            agg.examples[cat] = list(d.get("examples", {}).get(cat, []))
+            agg.delight_counts[cat] = int(d.get("delight_counts", {}).get(cat, 0))
+        agg.first_positive = d.get("first_positive")
+        agg.highlights = list(d.get("highlights", []))
+        agg.delight_by_theme = {k: list(v) for k, v in (d.get("delight_by_theme") or {}).items()}
+        agg.pending = [(k, h) for k, h in d.get("pending", [])]
+        return agg
+
+    # ---- report ----
+    def to_report(self, summarize: Optional[Callable[[str], str]] = None) -> UXReport:
+        """
+        Final UXReport. `summarize(text)` writes the per-category summaries
+        (top insight); without it, or when it fails, the first examples are joined.
+        """
+        if not self.items:
+            return empty_report()
+        self.settle()
+
+        category_summaries: Dict[str, str] = {}
+        for cat in CATEGORIES:
+            texts = self.summary_texts[cat]
+            if not texts:
+                continue
+            fallback = "; ".join(texts[:UI_EXAMPLES])
+            if summarize is None:
+                category_summaries[cat] = fallback
+                continue
+            try:
+                category_summaries[cat] = summarize(" ".join(texts)[:SUMMARY_INPUT_CHARS]) or fallback
+            except Exception:
+                category_summaries[cat] = fallback
+
+        category_counts = {cat: len(self.examples[cat]) for cat in CATEGORIES}
+        insights: Dict[str, List[str]] = {}
+        for cat in CATEGORIES:
+            if category_counts[cat] > 0:
+                insights[cat] = list(self.examples[cat])
+        if insights:
+            insights = {k: insights[k] for k in sort_categories(list(insights.keys()))}
+
+        pie_order = sort_categories([c for c in CATEGORIES if category_counts[c] > 0])
+        top_insight = (
+            max(category_summaries.items(), key=lambda kv: len(kv[1]))[1]
+            if category_summaries
+            else (self.first_positive or "No strong themes detected.")
+        )
+        return {
+            "top_insight": top_insight,
+            "pie_data": [{"name": c, "value": category_counts[c]} for c in pie_order],
+            "insights": insights,
+            "positive_highlights": list(self.highlights),
+            "delight_distribution": [{"name": c, "value": int(self.delight_counts[c])} for c in CATEGORIES],
+            "delight_by_theme": {k: list(v) for k, v in self.delight_by_theme.items()},
+        }
+
+
+def build_report(results: Iterable[ItemResult], summarize: Optional[Callable[[str], str]] = None,
+                 max_theme_examples: Optional[int] = None) -> UXReport:
+    return ReportAggregator(max_theme_examples).extend(results).to_report(summarize)
+
+
+__all__ = ["ItemResult", "ReportAggregator", "build_report", "empty_report", "UI_EXAMPLES"]
@@ -5,6 +5,16 @@ CATEGORIES = ["Usability","Performance","Visual Design","Feedback","Navigation",
 PREF_ORDER = ["Performance","Responsiveness","Navigation","Usability","Visual Design","Feedback"]
 PREF_RANK = {lab: i for i, lab in enumerate(PREF_ORDER)}
 
+# Descriptive phrasing per category (used as zero-shot candidates and as embedding seeds)
+CATEGORY_DESCRIPTIONS = {
+    "Usability":      "Usability issues (confusing UX, hard to use, form friction, task flow confusion, input errors, discoverability)",
+    "Performance":    "Performance problems (slow overall, laggy scrolling, crashes, memory, battery drain, layout shift/CLS)",
+    "Visual Design":  "Visual design feedback (colors, typography, spacing, contrast, alignment, icon style, visual aesthetics)",
+    "Navigation":     "Navigation & information architecture (menus, wayfinding, breadcrumbs, findability, back-button behavior, routing, deep linking)",
+    "Responsiveness": "Responsiveness & input delay (slow reaction to taps/clicks, delayed transitions, jank, UI feels unresponsive)",
+    "Feedback":       "General feedback or opinions not tied to a specific UX issue (praise, pricing notes, broad sentiment, non-actionable comments)",
+}
+
 # --- Centralized, regex-based hints for each category ---
 # base.py (suggested refinements)
 CATEGORY_HINTS = {
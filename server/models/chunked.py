@@ -0,0 +1,129 @@
+# server/models/chunked.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .aggregate import ItemResult, ReportAggregator, UXReport
+
+# ---------------------------------------------------------------------
+# Chunked map-reduce analysis for corpora too large for one pass.
+#
+#   map:    model.classify_items(chunk)      (CHUNK_SIZE items at a time)
+#   reduce: ReportAggregator per chunk, merged into the running aggregate
+#   final:  aggregate.to_report(summarizer)  (same UXReport shape)
+#
+# Memory stays O(chunk): category examples, summary input and delight
+# theme lists are bounded; only the running aggregate is kept between
+# chunks. After every chunk the aggregate can be written to a checkpoint,
+# and a restarted job replays the (same, ordered) item stream, skipping the
+# chunks already folded in.
+#
+#   ANALYZE_CHUNK_SIZE=200        items per model call sequence
+#   ANALYZE_THEME_EXAMPLES=50     cap per delight_by_theme list in chunked reports
+# ---------------------------------------------------------------------
+CHUNK_SIZE = int(os.getenv("ANALYZE_CHUNK_SIZE", "200"))
+THEME_EXAMPLES = int(os.getenv("ANALYZE_THEME_EXAMPLES", "50"))
+
+
+def iter_chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class FileCheckpoint:
+    """One JSON file per job: {job, fingerprint, chunks, items, partial}. Writes are atomic."""
+
+    def __init__(self, directory: str, job_id: str):
+        self.directory = directory
+        self.job_id = job_id
+        safe = hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:32]
+        self.path = os.path.join(directory, f"analyze-{safe}.json")
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return state if state.get("job") == self.job_id else None
+
+    def save(self, state: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({**state, "job": self.job_id}, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def clear(self) -> None:
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _fingerprint(model: Any, chunk_size: int) -> str:
+    # a checkpoint is only reusable with the same model settings and chunking
+    from services.report_cache import model_fingerprint
+    return json.dumps({"model": model_fingerprint(model), "chunk": chunk_size}, sort_keys=True)
+
+
+def analyze_in_chunks(model: Any, items: Iterable[str], *,
+                      chunk_size: Optional[int] = None,
+                      checkpoint: Optional[FileCheckpoint] = None,
+                      max_theme_examples: Optional[int] = THEME_EXAMPLES,
+                      on_chunk: Optional[Callable[[List[str], List[ItemResult]], None]] = None) -> UXReport:
+    """
+    UXReport for an arbitrarily long item stream, `chunk_size` items at a time.
+    `model` must provide classify_items() and build_report()/_summarize (HFZeroShotModel
+    and subclasses); other models get a single analyze_feedback_items() call.
+    With `checkpoint`, the partial aggregate is saved after each chunk and a
+    rerun over the same stream resumes after the last saved chunk.
+    `on_chunk(chunk, results)` sees each chunk's per-item results (side tallies).
+    """
+    size = max(1, chunk_size or CHUNK_SIZE)
+    if not callable(getattr(model, "classify_items", None)):
+        return model.analyze_feedback_items(list(items))
+
+    fingerprint = _fingerprint(model, size)
+    agg = ReportAggregator(max_theme_examples)
+    done = 0
+    if checkpoint is not None:
+        state = checkpoint.load()
+        if state and state.get("fingerprint") == fingerprint:
+            agg = ReportAggregator.from_dict(state["partial"])
+            done = int(state.get("chunks", 0))
+
+    for idx, chunk in enumerate(iter_chunks(items, size)):
+        if idx < done:
+            continue                                  # folded in before the restart
+        results = model.classify_items(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk, results)
+        part = ReportAggregator(max_theme_examples).extend(results)
+        agg.merge(part).settle()
+        if checkpoint is not None:
+            checkpoint.save({"fingerprint": fingerprint, "chunks": idx + 1, "partial": agg.to_dict()})
+
+    summarize = getattr(model, "_summarize", None)
+    report = agg.to_report(summarize if callable(summarize) else None)
+    if checkpoint is not None:
+        checkpoint.clear()
+    return report
+
+
+__all__ = ["CHUNK_SIZE", "FileCheckpoint", "analyze_in_chunks", "iter_chunks"]
@@ -0,0 +1,245 @@
+# server/models/embed_centroid.py
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import csv, os, re
+import numpy as np
+
+from .base import CATEGORIES, CATEGORY_DESCRIPTIONS
+from .hf_zero_shot import HFZeroShotModel
+
+# ---------------------------------------------------------------------
+# Embedding-centroid classifier (UX_MODEL=embed)
+#
+# Every distinct text is embedded once with a small local sentence-embedding
+# model; category scores are cosine similarities against per-category
+# centroids (seed CSV examples + CATEGORY_DESCRIPTIONS), computed as one
+# (items x dim) @ (dim x labels) matrix multiply per batch. The pipelines
+# below mimic the zero-shot/sentiment/summarizer pipelines so the
+# HFZeroShotModel report logic (gating, heuristics, delight) is reused as-is.
+# ---------------------------------------------------------------------
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_SEED_CSV = os.getenv(
+    "EMBED_SEED_CSV",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ux_labeled.csv"),
+)
+# cosine -> probability calibration (multi-label: sigmoid, single-label: softmax)
+EMBED_SIM_CENTER = float(os.getenv("EMBED_SIM_CENTER", "0.30"))
+EMBED_TEMPERATURE = float(os.getenv("EMBED_TEMPERATURE", "0.05"))
+
+# Polarity anchors for the local "sentiment" pass
+POSITIVE_ANCHORS = (
+    "I love this, it works great.",
+    "The design is clean and easy to use.",
+    "Everything is fast and intuitive.",
+    "Really nice experience, well done.",
+)
+NEGATIVE_ANCHORS = (
+    "This is frustrating and hard to use.",
+    "It is slow, confusing and keeps breaking.",
+    "I could not find what I needed.",
+    "The layout is broken and the buttons do not respond.",
+)
+
+TEXT_COLUMNS = ("text", "feedback", "comment", "review", "utterance", "message")
+LABEL_COLUMNS = ("label", "category", "class", "topic")
+
+
+class _SentenceEncoder:
+    """Lazy sentence-transformers wrapper returning L2-normalized float32 rows."""
+
+    def __init__(self, model_name: str = EMBED_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+
+    def encode(self, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer  # optional dependency
+            except Exception as e:
+                raise RuntimeError(
+                    "UX_MODEL=embed requires `sentence-transformers` (pip install sentence-transformers)."
+                ) from e
+            self._model = SentenceTransformer(self.model_name)
+        vecs = self._model.encode(list(texts), batch_size=batch_size, normalize_embeddings=True)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    z = x - x.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def load_seed_examples(path: str = EMBED_SEED_CSV) -> List[Tuple[str, str]]:
+    """(text, label) rows from the labeled CSV; silently empty when the file is missing."""
+    if not path or not os.path.exists(path):
+        return []
+    rows: List[Tuple[str, str]] = []
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        rd = csv.DictReader(f)
+        headers = rd.fieldnames or []
+        text_col = next((h for h in headers if h.strip().lower() in TEXT_COLUMNS), None)
+        label_col = next((h for h in headers if h.strip().lower() in LABEL_COLUMNS), None)
+        if not text_col or not label_col:
+            return []
+        for row in rd:
+            t = (row.get(text_col) or "").strip()
+            y = (row.get(label_col) or "").strip()
+            if t and y in CATEGORIES:
+                rows.append((t, y))
+    return rows
+
+
+class _EmbeddingIndex:
+    """Text -> vector cache plus the category / polarity centroid matrices."""
+
+    def __init__(self, encoder, seed_examples: Optional[List[Tuple[str, str]]] = None,
+                 batch_size: int = 64, cache_size: int = 20_000):
+        self.encoder = encoder
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: Dict[str, np.ndarray] = {}
+        self._seeds = seed_examples
+        self._centroids: Optional[np.ndarray] = None   # (len(CATEGORIES), dim)
+        self._polarity: Optional[np.ndarray] = None    # (2, dim) -> [POSITIVE, NEGATIVE]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed only the texts not seen before; return rows in input order."""
+        found: Dict[str, np.ndarray] = {}
+        for t in texts:
+            v = self._cache.get(t)
+            if v is not None:
+                found[t] = v
+        missing = [t for t in dict.fromkeys(texts) if t not in found]
+        if missing:
+            vecs = _normalize_rows(self.encoder.encode(missing, batch_size=self.batch_size))
+            if len(self._cache) + len(missing) > self.cache_size:
+                self._cache.clear()
+            for t, v in zip(missing, vecs):
+                found[t] = v
+                self._cache[t] = v
+        return np.stack([found[t] for t in texts])
+
+    def _mean_rows(self, groups: List[List[str]]) -> np.ndarray:
+        flat = [t for g in groups for t in g]
+        vecs = _normalize_rows(self.encoder.encode(flat, batch_size=self.batch_size))
+        out, i = [], 0
+        for g in groups:
+            out.append(vecs[i:i + len(g)].mean(axis=0))
+            i += len(g)
+        return _normalize_rows(np.stack(out))
+
+    @property
+    def centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            seeds = self._seeds if self._seeds is not None else load_seed_examples()
+            groups = [[CATEGORY_DESCRIPTIONS[c]] + [t for t, y in seeds if y == c] for c in CATEGORIES]
+            self._centroids = self._mean_rows(groups)
+        return self._centroids
+
+    @property
+    def polarity(self) -> np.ndarray:
+        if self._polarity is None:
+            self._polarity = self._mean_rows([list(POSITIVE_ANCHORS), list(NEGATIVE_ANCHORS)])
+        return self._polarity
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class _EmbeddingZeroShotPipeline:
+    def __init__(self, index: _EmbeddingIndex):
+        self.index = index
+
+    def __call__(self, sequences, *, candidate_labels, multi_label=True,
+                 batch_size=None, truncation=True, hypothesis_template=None):
+        single = not isinstance(sequences, (list, tuple))
+        seqs = [sequences] if single else list(sequences)
+        if not seqs:
+            return []
+        labels = [lab for lab in candidate_labels if lab in CATEGORIES]
+        cols = [CATEGORIES.index(lab) for lab in labels]
+        sims = self.index.embed(seqs) @ self.index.centroids[cols].T      # one matmul per batch
+        if multi_label:
+            probs = _sigmoid((sims - EMBED_SIM_CENTER) / EMBED_TEMPERATURE)
+        else:
+            probs = _softmax(sims / EMBED_TEMPERATURE)
+        out = []
+        for row in probs:
+            order = np.argsort(-row)
+            out.append({"labels": [labels[j] for j in order], "scores": [float(row[j]) for j in order]})
+        return out[0] if single else out
+
+
+class _EmbeddingSentimentPipeline:
+    def __init__(self, index: _EmbeddingIndex):
+        self.index = index
+
+    def __call__(self, sequences, batch_size=None, truncation=True):
+        single = not isinstance(sequences, (list, tuple))
+        seqs = [sequences] if single else list(sequences)
+        if not seqs:
+            return []
+        probs = _softmax((self.index.embed(seqs) @ self.index.polarity.T) / EMBED_TEMPERATURE)
+        out = []
+        for p_pos, p_neg in probs:
+            if p_pos >= p_neg:
+                out.append({"label": "POSITIVE", "score": float(p_pos)})
+            else:
+                out.append({"label": "NEGATIVE", "score": float(p_neg)})
+        return out[0] if single else out
+
+
+class _ExtractiveSummarizerPipeline:
+    """No generative model locally: keep the leading sentences up to ~max_length words."""
+
+    def __call__(self, text, max_length=60, min_length=20, do_sample=False):
+        words: List[str] = []
+        for sent in re.split(r"(?<=[.!?])\s+", (text or "").strip()):
+            if words and len(words) + len(sent.split()) > max_length:
+                break
+            words.extend(sent.split())
+        return [{"summary_text": " ".join(words[:max_length])}]
+
+
+class EmbeddingCentroidModel(HFZeroShotModel):
+    name = "embed"
+    # own pipeline slots (do not inherit the remote ones from HFZeroShotModel)
+    _classifier = None
+    _sentiment = None
+    _summarizer = None
+    _encoder = None
+    _index: Optional[_EmbeddingIndex] = None
+
+    # local matmuls are cheap: large fixed batches, no Space round-trips to tune
+    EMBED_BATCH = int(os.getenv("EMBED_BATCH", "256"))
+
+    @classmethod
+    def _get_pipes(cls):
+        if cls._index is None:
+            if cls._encoder is None:
+                cls._encoder = _SentenceEncoder()
+            cls._index = _EmbeddingIndex(cls._encoder, batch_size=min(cls.EMBED_BATCH, 128))
+        if cls._classifier is None:
+            cls._classifier = _EmbeddingZeroShotPipeline(cls._index)
+        if cls._sentiment is None:
+            cls._sentiment = _EmbeddingSentimentPipeline(cls._index)
+        if cls._summarizer is None:
+            cls._summarizer = _ExtractiveSummarizerPipeline()
+        return cls._classifier, cls._sentiment, cls._summarizer
+
+    def _run_batched(self, endpoint, items, cap, call):
+        results: List[Dict[str, Any]] = []
+        for _, chunk in self._batch(items, size=self.EMBED_BATCH):
+            results.extend(call(chunk, self.EMBED_BATCH))
+        return results
@@ -1,6 +1,9 @@
-from typing import List, Dict, Any, cast, Iterable, Tuple
-import re,os
+from typing import List, Dict, Any, cast, Iterable, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+import re,os,time
 from .base import UXModel, CATEGORIES, passes_category_gate, sort_categories,PREF_RANK, CATEGORY_HINTS
+from .aggregate import ItemResult, build_report
+from services.batch_tuner import get_controller
 
 # ---- Small adapters that mimic transformers pipelines but call HF API ----
 class _RemoteZeroShotPipeline:
@@ -50,9 +53,11 @@ class HFZeroShotModel(UXModel):
     DELIGHT_TOP1_THRESHOLD = 0.35     
     DELIGHT_MAX_ITEMS = int(os.getenv("DELIGHT_MAX_ITEMS", "1000")) 
 
-        # ---- Batch sizes (configurable via environment) ----
+        # ---- Batch size / concurrency caps (adaptive below these, see services/batch_tuner) ----
     BATCH_SA = int(os.getenv("BATCH_SA", "32"))   # Sentiment Analysis
     BATCH_ZSC = int(os.getenv("BATCH_ZSC", "8"))  # Zero-Shot Classification
+    BATCH_DELIGHT = int(os.getenv("BATCH_DELIGHT", "8"))  # Top-1 ZSC on positives
+    HF_CONCURRENCY = int(os.getenv("HF_CONCURRENCY", "4"))  # parallel Space calls per endpoint
     ZSC_HYPOTHESIS = os.getenv("ZSC_HYPOTHESIS", "This text is about {}.")
 
     @classmethod
@@ -166,27 +171,71 @@ class HFZeroShotModel(UXModel):
         for i in range(0, n, size):
             yield i, iterable[i:i + size]  
 
-    def analyze_feedback_items(self, feedback_list: List[str]) -> Dict[str, Any]:
-        classifier, sentiment_analyzer, summarizer = self._get_pipes()
+    @staticmethod
+    def _is_timeout(exc: BaseException) -> bool:
+        return isinstance(exc, TimeoutError) or "timed out" in str(exc).lower()
+
+    def _run_batched(self, endpoint: str, items: List[str], cap: int,
+                     call: Callable[[List[str], int], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Run `call(chunk, batch_size)` over `items` using the batch size and
+        concurrency chosen by the endpoint's adaptive controller.
+        Results keep input order; every call's latency/errors feed the controller.
+        """
+        ctrl = get_controller(endpoint, max_batch=cap, max_concurrency=self.HF_CONCURRENCY)
+
+        def timed(chunk: List[str], size: int) -> List[Dict[str, Any]]:
+            t0 = time.perf_counter()
+            try:
+                out = call(chunk, size)
+            except Exception as e:
+                ctrl.record(len(chunk), time.perf_counter() - t0, error=True, timeout=self._is_timeout(e))
+                raise
+            ctrl.record(len(chunk), time.perf_counter() - t0)
+            return out
+
+        results: List[Dict[str, Any]] = []
+        pool = ThreadPoolExecutor(max_workers=ctrl.max_concurrency) if ctrl.max_concurrency > 1 else None
+        try:
+            pos = 0
+            while pos < len(items):
+                size, conc = ctrl.settings()
+                wave: List[List[str]] = []
+                while len(wave) < conc and pos < len(items):
+                    wave.append(items[pos:pos + size])
+                    pos += size
+                if pool is None or len(wave) == 1:
+                    outs = [timed(chunk, size) for chunk in wave]
+                else:
+                    futs = [pool.submit(timed, chunk, size) for chunk in wave]
+                    outs = [f.result() for f in futs]
+                for out in outs:
+                    results.extend(out)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+        return results
+
+    def classify_items(self, feedback_list: List[str]) -> List[ItemResult]:
+        """
+        Run the model passes (sentiment, critique ZSC, delight ZSC) and return
+        one result per non-empty item, in input order (see models/aggregate).
+        Reports are built from these without further inference.
+        """
+        classifier, sentiment_analyzer, _ = self._get_pipes()
 
         # --- filter empties early
         items: List[str] = [s for s in feedback_list if s and s.strip()]
         if not items:
-            return {
-                "top_insight": "No strong themes detected.",
-                "pie_data": [],
-                "insights": {},
-                "positive_highlights": [],
-                "delight_distribution": [{"name": c, "value": 0} for c in CATEGORIES],
-            }
+            return []
 
         # --- 1) Batch sentiment pass
         # HF pipelines support list input + batch_size
         
-        sa_results: List[Dict[str, Any]] = []
-        for _, chunk in self._batch(items, size=self.BATCH_SA):
-            sa = cast(List[Dict[str, Any]], sentiment_analyzer(chunk, batch_size=self.BATCH_SA, truncation=True))
-            sa_results.extend(sa)
+        sa_results: List[Dict[str, Any]] = self._run_batched(
+            "sa", items, self.BATCH_SA,
+            lambda chunk, size: cast(List[Dict[str, Any]], sentiment_analyzer(chunk, batch_size=size, truncation=True)),
+        )
 
         is_critique_mask: List[bool] = []
         for text, sa in zip(items, sa_results):
@@ -200,32 +249,33 @@ class HFZeroShotModel(UXModel):
             neg_prob = 1.0 - pos_prob
             is_critique_mask.append(True if suggestive else (neg_prob >= self.CRITIQUE_NEG_PROB))
 
+        results: List[ItemResult] = [{"text": t, "critique": c} for t, c in zip(items, is_critique_mask)]
+
         # --- 2) Build critique set (with clause focusing)
+        critique_results = [r for r in results if r["critique"]]
         critiques: List[str] = []
-        for text, is_crit in zip(items, is_critique_mask):
-            if is_crit:
-                critiques.append(self._strip_mixed_clause(text))
-                
+        for r in critique_results:
+            r["critique_text"] = self._strip_mixed_clause(r["text"])
+            critiques.append(r["critique_text"])
 
         # --- 3) Multi-label ZSC on critiques (batched)
-        category_feedbacks: Dict[str, List[str]] = {cat: [] for cat in CATEGORIES}
         if critiques:
-            zsc_outputs: List[Dict[str, Any]] = []
-            for _, chunk in self._batch(critiques, size=self.BATCH_ZSC):
-                out = cast(
+            zsc_outputs: List[Dict[str, Any]] = self._run_batched(
+                "zsc", critiques, self.BATCH_ZSC,
+                lambda chunk, size: cast(
                     List[Dict[str, Any]],
                     classifier(
                         chunk,
                         candidate_labels=CATEGORIES,
                         multi_label=True,
-                        batch_size=self.BATCH_ZSC,
+                        batch_size=size,
                         truncation=True,
                         hypothesis_template=self.ZSC_HYPOTHESIS,
                     ),
-                )
-                zsc_outputs.extend(out)
+                ),
+            )
 
-            for crit_text, z in zip(critiques, zsc_outputs):
+            for r, crit_text, z in zip(critique_results, critiques, zsc_outputs):
                 labels = z.get("labels", []) or []
                 scores = [float(s) for s in (z.get("scores", []) or [])]
                 sorted_idx = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
@@ -259,40 +309,38 @@ class HFZeroShotModel(UXModel):
                         kept.append(("Responsiveness", 0.51))
                 if not kept:
                     kept = [("Feedback", 0.51)]
-                seen_labs = set()
+                cats: List[str] = []
                 for lab, _ in kept:
-                    if lab in CATEGORIES and lab not in seen_labs:
-                        seen_labs.add(lab)
-                        if crit_text not in category_feedbacks[lab]:
-                            category_feedbacks[lab].append(crit_text)
+                    if lab in CATEGORIES and lab not in cats:
+                        cats.append(lab)
+                r["categories"] = cats
 
         # --- 4) Delight: top-1 label on positives (batched, optional cap)
-        positives: List[str] = [t for t, is_crit in zip(items, is_critique_mask) if not is_crit]
-        praise_only: List[str] = [self._extract_praise_clause(t) for t in positives]
-        positive_comments = praise_only[: self.DELIGHT_MAX_ITEMS]# cap to protect worst-case 
-        positive_highlights = praise_only[:6]
-
-        delight_counts: Dict[str, int] = {cat: 0 for cat in CATEGORIES}
-        delight_by_theme: Dict[str, List[str]] = {}
+        positive_results = [r for r in results if not r["critique"]]
+        for r in positive_results:
+            r["praise"] = self._extract_praise_clause(r["text"])
+            r["delight"] = None                       # past the cap unless classified below
+        capped = positive_results[: self.DELIGHT_MAX_ITEMS]  # cap to protect worst-case
+        positive_comments: List[str] = [r["praise"] for r in capped]
 
         if positive_comments:
-            zsc_pos_outputs: List[Dict[str, Any]] = []
-            for _, chunk in self._batch(positive_comments, size=8):
-                out = cast(
+            zsc_pos_outputs: List[Dict[str, Any]] = self._run_batched(
+                "zsc_delight", positive_comments, self.BATCH_DELIGHT,
+                lambda chunk, size: cast(
                     List[Dict[str, Any]],
                     classifier(
                         chunk,
                         candidate_labels=CATEGORIES,
                         multi_label=False,
-                        batch_size=8,
+                        batch_size=size,
                         truncation=True,
                         hypothesis_template=self.ZSC_HYPOTHESIS,
                     ),
-                )
-                zsc_pos_outputs.extend(out)
+                ),
+            )
 
             # Map each positive comment to its top-1 label when confident enough
-            for text, z in zip(positive_comments, zsc_pos_outputs):
+            for r, text, z in zip(capped, positive_comments, zsc_pos_outputs):
                 labels = list(z.get("labels", []) or [])
                 scores = [float(s) for s in (z.get("scores", []) or [])]
 
@@ -317,105 +365,27 @@ class HFZeroShotModel(UXModel):
                     if re.search(r"\b(modern|clean|beautiful|visual|design|color)\b", lower):
                         kept.append(("Visual Design", 0.51))
 
-                praise_text = self._extract_praise_clause(text)
-                seen: set[str] = set()
-
+                r["delight_text"] = self._extract_praise_clause(text)
+                delight: List[str] = []
                 for lab, _ in kept:
-                    if lab in CATEGORIES and lab not in seen:
-                        seen.add(lab)
-                        delight_counts[lab] += 1
-                        arr = delight_by_theme.setdefault(lab, [])
-                        if praise_text not in arr:
-                            arr.append(praise_text)
-
-        for text in positive_comments:
-            praise_text = self._extract_praise_clause(text)
-            already = any(praise_text in arr for arr in delight_by_theme.values())
-            if already:
-                continue
-            low= text.lower()
-            placed = False
-            for cat, rx in CATEGORY_HINTS.items():
-                try:
-                    if rx.search(low):
-                        delight_by_theme.setdefault(cat, []).append(praise_text)
-                        delight_counts[cat] += 1
-                        placed = True
-                        break
-                except Exception:
-                    pass
-            if placed:
-                continue
+                    if lab in CATEGORIES and lab not in delight:
+                        delight.append(lab)
+                # [] -> filed later by keyword hint (or "Feedback") unless the same praise is already filed
+                r["delight"] = delight
 
-            delight_by_theme.setdefault("Feedback", []).append(praise_text)
-            delight_counts["Feedback"] += 1
+        return results
 
-        delight_distribution = [{"name": cat, "value": int(delight_counts[cat])} for cat in CATEGORIES]
+    def _summarize(self, text: str) -> str:
+        _, _, summarizer = self._get_pipes()
+        s = cast(List[Dict[str, Any]], summarizer(text, max_length=60, min_length=20, do_sample=False))
+        return str(s[0].get("summary_text", "")).strip()
 
-        # --- 5) Summaries for categories with issues (unchanged logic)
-        category_summaries: Dict[str, str] = {}
-        for cat, texts in category_feedbacks.items():
-            if not texts:
-                continue
-            combined = " ".join(texts)[:4000]
-            try:
-                s = cast(
-                    List[Dict[str, Any]],
-                    summarizer(combined, max_length=60, min_length=20, do_sample=False),
-                )
-                summary = str(s[0].get("summary_text", "")).strip()
-                category_summaries[cat] = summary or "; ".join(texts[:6])
-            except Exception:
-                category_summaries[cat] = "; ".join(texts[:6])
-
-        # --- 6) De‑dupe feedbacks per category and compute counts
-        for cat in CATEGORIES:
-            seen: set[str] = set()
-            deduped: List[str] = []
-            for s in category_feedbacks.get(cat, []):
-                key = s.strip().lower()
-                if key and key not in seen:
-                    seen.add(key)
-                    deduped.append(s)
-                if len(deduped) >= 6:  # keep UI cap
-                    break
-            category_feedbacks[cat] = deduped
-
-        # counts used by both insights and pie
-        category_counts: Dict[str, int] = {cat: len(category_feedbacks.get(cat, [])) for cat in CATEGORIES}
-
-        # --- 7) Build insights (with summary fallback), ordered
-        insights: Dict[str, List[str]] = {}
-        for cat in CATEGORIES:
-            if category_counts.get(cat, 0) > 0:
-                insights[cat] = category_feedbacks[cat] or [category_summaries.get(cat, "No significant issues mentioned.")]
-        if insights:
-            ordered_keys = sort_categories(list(insights.keys()))
-            insights = {k: insights[k] for k in ordered_keys}
+    def build_report(self, results: Iterable[ItemResult], *, summarize: bool = True) -> Dict[str, Any]:
+        """UXReport from classify_items() results; summarize=False skips the summarizer (joined examples instead)."""
+        return build_report(results, self._summarize if summarize else None)
 
-        # --- 8) Pie data from counts (keeps pie in sync with card counts)
-        nonzero = [c for c in CATEGORIES if category_counts[c] > 0]
-        pie_order = sort_categories(nonzero)
-        pie_data = [{"name": c, "value": category_counts[c]} for c in pie_order]
-
-        # --- 9) Top insight
-        top_insight = (
-            max(category_summaries.items(), key=lambda kv: len(kv[1]))[1]
-            if category_summaries
-            else (positives[0] if positives else "No strong themes detected.")
-        )
-
-        # --- 10) Respect DELIGHT_MAX_ITEMS for positives (already enforced above)
-        positive_highlights = positive_comments[:6]
-
-        return {
-            "top_insight": top_insight,
-            "pie_data": pie_data,
-            "insights": insights,
-            "positive_highlights": positive_highlights,
-            "delight_distribution": delight_distribution,
-            "delight_by_theme": delight_by_theme,
-        }
+    def analyze_feedback_items(self, feedback_list: List[str]) -> Dict[str, Any]:
+        return self.build_report(self.classify_items(feedback_list))
 
     def _analyze_heuristics_only(self, items: List[str]) -> Dict[str, Any]:
         # Determine critiques using negation-aware keywords
@@ -11,6 +11,7 @@ def get_active_model() -> UXModel:
       UX_MODEL=dummy  -> DummyModel (no ML)
       UX_MODEL=local  -> HFZeroShotModel (local pipelines; requires transformers)
       UX_MODEL=hf     -> HFZeroShotModel (remote via SPACE_URL / serverless; no transformers import)
+      UX_MODEL=embed  -> EmbeddingCentroidModel (local sentence embeddings + category centroids)
     """
     mode = (os.getenv("UX_MODEL") or "hf").lower()
 
@@ -18,6 +19,10 @@ def get_active_model() -> UXModel:
         from .dummy import DummyModel     # lazy import
         return DummyModel()
 
+    if mode == "embed":
+        from .embed_centroid import EmbeddingCentroidModel  # lazy import (numpy / sentence-transformers)
+        return EmbeddingCentroidModel()
+
     if mode == "local":
         # Local pipelines: allow hf_zero_shot to import transformers
         os.environ.setdefault("USE_LOCAL_MODELS", "1")
@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify,g,current_app
-from services.note_service import get_notes_by_board
+import os
+from services.note_service import get_notes_by_board, get_notes_page, get_notes_in_bbox, get_board_changes, bulk_notes
+from services.spatial import get_registry as get_viewports, parse_bbox
+from services.move_buffer import get_buffer
 from db import notes_collection
 from auth.auth_decorator import authenticate_request
 from pymongo import MongoClient
@@ -7,6 +10,12 @@ from pymongo import MongoClient
 
 note_bp = Blueprint("note_bp", __name__)
 
+# operations accepted by one POST /api/notes/bulk
+NOTES_BULK_MAX = int(os.getenv("NOTES_BULK_MAX", "5000"))
+# GET /api/notes?limit= / ?after= pages (default and largest page size)
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", "500"))
+NOTES_PAGE_MAX = int(os.getenv("NOTES_PAGE_MAX", "2000"))
+
 @note_bp.route("/", methods=["GET"])
 def home():
     return jsonify({"message": "Hello from Flask backend!"})
@@ -18,16 +27,112 @@ def get_notes():
     if not board_id:
         return jsonify({"error": "boardId required"}), 400
     
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "since must be an integer revision"}), 400
+
+    bbox = request.args.get("bbox")
+    if bbox is not None:
+        if since is not None or "after" in request.args or "limit" in request.args:
+            return jsonify({"error": "bbox cannot be combined with since/after/limit"}), 400
+        try:
+            bbox = parse_bbox(bbox)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    after = request.args.get("after")
+    limit = request.args.get("limit")
+    paged = after is not None or limit is not None
+    if paged:
+        if since is not None:
+            return jsonify({"error": "since cannot be combined with after/limit"}), 400
+        try:
+            limit = int(limit) if limit is not None else NOTES_PAGE_SIZE
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        if not 1 <= limit <= NOTES_PAGE_MAX:
+            return jsonify({"error": f"limit must be between 1 and {NOTES_PAGE_MAX}"}), 400
+
     user_email = g.user.get("email")
     current_app.logger.debug("User email: %s", user_email)
 
     try:
+        move_buffer = get_buffer()
+        if move_buffer is not None:
+            move_buffer.flush_board(board_id)   # include moves still in the write-behind buffer
+        if since is not None:
+            # delta sync: {rev, full, notes, deleted}
+            return jsonify(get_board_changes(board_id, since)), 200
+        if paged:
+            # cursor pages ordered by id: {rev, notes, next}
+            return jsonify(get_notes_page(board_id, after or None, limit)), 200
+        if bbox is not None:
+            return jsonify(get_notes_in_bbox(board_id, bbox)), 200
         return jsonify(get_notes_by_board(board_id)), 200
     except Exception as e:
         current_app.logger.exception("Failed to fetch notes: %s", e)
         return jsonify({"error": "Failed to fetch notes"}), 500
 
     
+@note_bp.route("/api/notes/bulk", methods=["POST"])
+@authenticate_request
+def bulk_notes_route():
+    """
+    { boardId, create: [note], move: [{id, x, y}], delete: [id] } -> one bulk_write.
+    Returns { created, moved, deleted, errors: [{op, index, id, error}] } and
+    broadcasts notes_created / notes_moved / notes_deleted to the board room.
+    """
+    body = request.get_json(silent=True) or {}
+    board_id = body.get("boardId")
+    if not board_id:
+        return jsonify({"error": "boardId required"}), 400
+    groups = {key: body.get(key) or [] for key in ("create", "move", "delete")}
+    if not all(isinstance(v, list) for v in groups.values()):
+        return jsonify({"error": "create, move and delete must be arrays"}), 400
+    total = sum(len(v) for v in groups.values())
+    if not total:
+        return jsonify({"error": "no operations"}), 400
+    if total > NOTES_BULK_MAX:
+        return jsonify({"error": f"at most {NOTES_BULK_MAX} operations per request"}), 400
+
+    try:
+        move_buffer = get_buffer()
+        if move_buffer is not None:
+            # a buffered drag position must not land after these writes
+            for item in groups["move"] + groups["delete"]:
+                note_id = item.get("id") if isinstance(item, dict) else item
+                if isinstance(note_id, str):
+                    move_buffer.discard(note_id)
+        result = bulk_notes(creates=groups["create"], moves=groups["move"], deletes=groups["delete"],
+                            board_id=board_id)
+    except Exception as e:
+        current_app.logger.exception("Bulk note write failed: %s", e)
+        return jsonify({"error": "Failed to apply notes"}), 500
+
+    socketio = current_app.extensions.get("socketio")
+    if socketio is not None:
+        viewports = get_viewports()        # subscribers of a viewport only get what they can see
+        if result["created"]:
+            viewports.broadcast(socketio.emit, "notes_created", board_id, result["created"],
+                                lambda notes: {"boardId": board_id, "notes": notes}, moved=False)
+        if result["moved"]:
+            viewports.broadcast(socketio.emit, "notes_moved", board_id, result["moved"],
+                                lambda moves: {"boardId": board_id, "moves": moves})
+        if result["deleted"]:
+            viewports.forget(board_id, result["deleted"])
+            socketio.emit("notes_deleted", {"boardId": board_id, "ids": result["deleted"]}, to=board_id)
+
+    return jsonify({
+        "created": len(result["created"]),
+        "moved": len(result["moved"]),
+        "deleted": len(result["deleted"]),
+        "errors": result["errors"],
+    }), 200
+
+    
 @note_bp.route("/api/notes/cleanup", methods=["POST"])
 @authenticate_request
 def cleanup_notes_without_boardId():
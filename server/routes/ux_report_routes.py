@@ -1,14 +1,55 @@
 # server/routes/ux_report_routes.py
 from __future__ import annotations
+import os
+from contextlib import ExitStack
 from flask import Blueprint, request, jsonify,current_app
 from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import RequestEntityTooLarge 
-from services.ux_report_service import analyze_text_blob, analyze_uploaded_file
+from services.ux_report_service import analyze_text_blob, analyze_uploaded_file, analyze_batch, analyze_table
 from auth.auth_decorator import authenticate_request
+from services import metrics
+from services import report_cache
+from services import uploads
+from services import tabular
 import requests
 
 ux_bp = Blueprint("ux_report", __name__)
 
+_TRUTHY = {"1", "true", "yes", "on"}
+_SUPPORTED_EXT = (".pdf", ".docx", ".txt") + tabular.TABLE_EXT
+_SUPPORTED_MSG = "Only .pdf, .docx, .txt, .csv or .jsonl are supported."
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+
+
+def _wants_refresh(json_body) -> bool:
+    """?refresh=1, form/json 'refresh', or 'Cache-Control: no-cache' forces a recompute."""
+    flag = request.args.get("refresh") or request.form.get("refresh")
+    if flag is None and isinstance(json_body, dict):
+        flag = json_body.get("refresh")
+    if isinstance(flag, bool):
+        return flag
+    if flag is not None and str(flag).strip().lower() in _TRUTHY:
+        return True
+    return "no-cache" in (request.headers.get("Cache-Control") or "").lower()
+
+
+def _column_args(json_body) -> dict:
+    """answer_column / segment_column / respondent_column from query, form or json."""
+    out = {}
+    for key in ("answer_column", "segment_column", "respondent_column"):
+        val = request.args.get(key) or request.form.get(key)
+        if val is None and isinstance(json_body, dict):
+            val = json_body.get(key)
+        if isinstance(val, str) and val.strip():
+            out[key] = val.strip()
+    return out
+
+
+def _report_response(result, scope):
+    resp = jsonify(result)
+    resp.headers["X-Report-Cache"] = scope.status or report_cache.MISS
+    return resp, 200
+
 
 @ux_bp.get("/health")
 def health(): return "ok", 200
@@ -18,6 +59,11 @@ def ready():
     # Optionally check that the active model is loaded
     return "ready", 200
 
+@ux_bp.get("/metrics")
+def metrics_snapshot():
+    # In-process counters/settings (adaptive batching, caches, ...)
+    return jsonify(metrics.snapshot()), 200
+
 @ux_bp.route("/api/ux/analyze", methods=["OPTIONS"], strict_slashes=False)
 def analyze_options():
     return "", 200
@@ -27,15 +73,21 @@ def analyze_options():
 def analyze():
     """
     Accepts:
-      - multipart/form-data with 'file' (.pdf)
+      - multipart/form-data with 'file' (.pdf/.docx/.txt, or a .csv/.jsonl survey export)
       - form-data with 'text'
       - application/json with {"text": "..."} or {"text_inputs": ["...", "..."]}
+    Optional: ?refresh=1 (or 'refresh' in form/json) bypasses the report cache.
+    CSV/JSONL: 'answer_column', 'segment_column', 'respondent_column' (query or form)
+    pick the columns; otherwise they are detected from the headers.
     Returns JSON:
       { top_insight, pie_data, insights, positive_highlights, delight_distribution }
+      (+ { table, segments } for CSV/JSONL)
+    plus an X-Report-Cache header (HIT, HIT-DB, MISS or BYPASS).
     """
     try:
         # 1) Safely parse JSON (if Content-Type is application/json)
         json_body = request.get_json(silent=True) if request.is_json else None  # CHANGED
+        refresh = _wants_refresh(json_body)
 
         # 2) File path (takes precedence if present)
         if "file" in request.files:  # CHANGED (indentation + guard)
@@ -44,16 +96,22 @@ def analyze():
                 return jsonify({"error": "invalid_file", "message": "No file provided."}), 400
 
             fname = uploaded.filename.lower()  # ADD
-            if not (fname.endswith(".pdf") or fname.endswith(".docx") or fname.endswith(".txt")):  # ADD
-                return jsonify({"error": "unsupported_type",
-                                "message": "Only .pdf, .docx, or .txt are supported."}), 400
-
-            raw = uploaded.read()  # bytes
-            if not raw:  # ADD
-                return jsonify({"error": "empty_file", "message": "Uploaded file is empty."}), 400
-
-            result = analyze_uploaded_file(raw, uploaded.filename or "upload")
-            return jsonify(result), 200
+            if not fname.endswith(_SUPPORTED_EXT):  # ADD
+                return jsonify({"error": "unsupported_type", "message": _SUPPORTED_MSG}), 400
+
+            # a temp file (UPLOAD_MAX_BYTES enforced as it arrives), adopted from the parser, not read()
+            with uploads.spool_upload(uploaded.stream, uploaded.filename) as spooled:
+                if not spooled.size:
+                    return jsonify({"error": "empty_file", "message": "Uploaded file is empty."}), 400
+
+                with report_cache.request_scope(bypass=refresh) as scope:
+                    if tabular.is_table(fname):
+                        result = analyze_table(spooled.path, uploaded.filename, content_hash=spooled.sha256,
+                                               **_column_args(json_body))
+                    else:
+                        result = analyze_uploaded_file(spooled.path, uploaded.filename or "upload",
+                                                       content_hash=spooled.sha256)
+            return _report_response(result, scope)
 
         # 3) Text path (form or JSON)
         # 3a) single text in form field
@@ -67,8 +125,9 @@ def analyze():
                 text = "\n".join([s for s in text_inputs if isinstance(s, str) and s.strip()])
 
         if text and isinstance(text, str) and text.strip():  # CHANGED (validation)
-            result = analyze_text_blob(text.strip())
-            return jsonify(result), 200
+            with report_cache.request_scope(bypass=refresh) as scope:
+                result = analyze_text_blob(text.strip())
+            return _report_response(result, scope)
 
         # 4) Nothing provided
         return jsonify({"error": "invalid_request",
@@ -77,14 +136,11 @@ def analyze():
     except RequestEntityTooLarge:  # ADD (nice 413 for big uploads)
         return jsonify({"error": "file_too_large", "message": "Uploaded file exceeds size limit."}), 413
 
+    except tabular.ColumnNotFound as e:
+        return jsonify({"error": "invalid_column", "message": str(e), "headers": e.headers}), 400
+
     except requests.HTTPError as e:  # ADD (surface Space/HTTP errors as 502)
-        status = getattr(e.response, "status_code", 502)
-        try:
-            details = e.response.json()
-        except Exception:
-            details = {"status": status, "text": (e.response.text[:500] if getattr(e, "response", None) else str(e))}
-        current_app.logger.exception("Space call failed")  # logs traceback
-        return jsonify({"error": "space_call_failed", "upstream_status": status, "details": details}), 502
+        return _space_http_error(e)
 
     except requests.RequestException as e:  # network/timeout -> 502
         current_app.logger.exception("Space network error")
@@ -97,4 +153,79 @@ def analyze():
         return jsonify({"error": "internal_error", "message": str(e)}), 500
 
 
+def _space_http_error(e: requests.HTTPError):
+    status = getattr(e.response, "status_code", 502)
+    try:
+        details = e.response.json()
+    except Exception:
+        details = {"status": status, "text": (e.response.text[:500] if getattr(e, "response", None) else str(e))}
+    current_app.logger.exception("Space call failed")  # logs traceback
+    return jsonify({"error": "space_call_failed", "upstream_status": status, "details": details}), 502
+
+
+@ux_bp.route("/api/ux/analyze/batch", methods=["OPTIONS"], strict_slashes=False)
+def analyze_batch_options():
+    return "", 200
+
+@ux_bp.route("/api/ux/analyze/batch", methods=["POST"], strict_slashes=False)
+@authenticate_request
+def analyze_batch_route():
+    """
+    Accepts:
+      - multipart/form-data with any number of 'files' (or 'file') parts (.pdf/.docx/.txt/.csv/.jsonl)
+        and optional repeated 'text' fields
+      - application/json with {"text_inputs": ["...", ...]} (or "texts" / "text")
+    Optional: ?refresh=1 bypasses the report cache.
+    Returns JSON:
+      { report, sources: [{name, type, items, report}], items, duplicates, truncated, errors }
+    `report` is the combined UXReport; each source's report comes from the same
+    model pass. X-Report-Cache header as for /api/ux/analyze.
+    """
+    try:
+        json_body = request.get_json(silent=True) if request.is_json else None
+        refresh = _wants_refresh(json_body)
+
+        uploads_in = [f for f in request.files.getlist("files") + request.files.getlist("file") if f and f.filename]
+        if len(uploads_in) > BATCH_MAX_FILES:
+            return jsonify({"error": "too_many_files",
+                            "message": f"At most {BATCH_MAX_FILES} files per batch."}), 400
+        bad = [f.filename for f in uploads_in if not f.filename.lower().endswith(_SUPPORTED_EXT)]
+        if bad:
+            return jsonify({"error": "unsupported_type", "message": _SUPPORTED_MSG, "files": bad}), 400
+
+        texts = request.form.getlist("text") + request.form.getlist("texts")
+        if isinstance(json_body, dict):
+            for key in ("text_inputs", "texts", "text"):
+                val = json_body.get(key)
+                if isinstance(val, str):
+                    texts.append(val)
+                elif isinstance(val, list):
+                    texts.extend(v for v in val if isinstance(v, str))
+        texts = [t.strip() for t in texts if t and t.strip()]
+
+        if not uploads_in and not texts:
+            return jsonify({"error": "invalid_request",
+                            "message": "Provide one or more files (.pdf/.docx/.txt) and/or 'text' inputs."}), 400
+
+        with ExitStack() as stack:
+            files = []
+            for f in uploads_in:
+                spooled = stack.enter_context(uploads.spool_upload(f.stream, f.filename))
+                files.append((spooled.path, f.filename, spooled.sha256))
+            with report_cache.request_scope(bypass=refresh) as scope:
+                result = analyze_batch(files, texts)
+        return _report_response(result, scope)
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": "file_too_large", "message": "Uploaded file exceeds size limit."}), 413
 
+    except requests.HTTPError as e:
+        return _space_http_error(e)
+
+    except requests.RequestException as e:
+        current_app.logger.exception("Space network error")
+        return jsonify({"error": "space_call_failed", "details": str(e)}), 502
+
+    except Exception as e:
+        current_app.logger.exception("Batch analyze failed")
+        return jsonify({"error": "internal_error", "message": str(e)}), 500
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+# green clients: hundreds of Socket.IO clients in one benchmark process
+import eventlet
+eventlet.monkey_patch()
+
+import argparse, os, socket, statistics, subprocess, sys, time
+
+# allow `python scripts/bench_async_mode.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import socketio
+from engineio import payload
+
+# a client that falls behind gets many packets per poll (presence broadcasts of
+# hundreds of joins); python-engineio's client refuses payloads over 16 packets
+payload.Payload.max_decode_packets = 100_000
+
+# ---- The server under test: real board handlers, fake `db` / Firebase, a slow Mongo write ----
+SERVER = r"""
+import sys
+mode, port, db_ms = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+from services import async_mode
+async_mode.patch(mode)
+
+import time, types
+sys.modules["db"] = types.ModuleType("db")
+sys.modules["db"].notes_collection = None
+verify = types.ModuleType("auth.firebase_verify")
+verify.verify_firebase_token = lambda token: {"uid": token, "name": token} if token else None
+sys.modules["auth.firebase_verify"] = verify
+
+from flask import Flask
+from flask_socketio import SocketIO
+from events import board_events as be
+
+be.print = lambda *a, **k: None
+be.move_buffer = None
+be.update_note = lambda *a, **k: time.sleep(db_ms / 1000.0)     # a pymongo round trip
+app = Flask(__name__)
+sio = SocketIO(app, async_mode=mode, ping_timeout=60, ping_interval=25)
+be.register_socket_events(sio)
+extra = {"allow_unsafe_werkzeug": True} if mode == "threading" else {"log_output": False}
+sio.run(app, host="127.0.0.1", port=port, **extra)
+"""
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(mode: str, args):
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "-c", SERVER, mode, str(port), str(args.db_ms)], cwd=ROOT,
+                            env={**os.environ, "PRESENCE_DEBOUNCE_MS": "200"},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            eventlet.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def proc_status(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Threads", "VmRSS"):
+                out[key] = int(value.split()[0])
+    return out
+
+# ---- N polling clients join one board; a separate sender moves notes, everyone times the echo --
+def run(mode: str, n: int, args) -> dict:
+    proc, port = start_server(mode, args)
+    url = f"http://127.0.0.1:{port}"
+    latencies, clients, dropped = [], [], []
+    sender = socketio.Client(reconnection=False)
+    try:
+        sender.connect(url, transports=["polling"], wait_timeout=args.timeout)
+        sender.call("join_board", {"boardId": "b1", "token": "sender"}, timeout=args.timeout)
+
+        def connect(i):
+            c = socketio.Client(reconnection=False)
+            c.on("note_moved", lambda data: latencies.append(time.time() - data["sentAt"]))
+            c.on("disconnect", lambda *a: dropped.append(i))
+            try:
+                c.connect(url, transports=["polling"], wait_timeout=args.timeout)
+                c.call("join_board", {"boardId": "b1", "token": f"u{i}"}, timeout=args.timeout)
+                clients.append(c)
+            except Exception:
+                if c.connected:
+                    c.disconnect()
+
+        t0 = time.perf_counter()
+        pool = eventlet.GreenPool(args.concurrency)
+        for i in range(n):
+            pool.spawn_n(connect, i)
+        pool.waitall()
+        connect_s = time.perf_counter() - t0
+        eventlet.sleep(1.0)                          # presence broadcasts settle
+        status = proc_status(proc.pid)
+
+        for r in range(args.rounds):
+            sender.emit("move_note", {"id": f"n{r}", "boardId": "b1", "x": r, "y": r, "sentAt": time.time()})
+            eventlet.sleep(args.interval_ms / 1000.0)
+        expected = len(clients) * args.rounds
+        deadline = time.time() + args.timeout
+        while len(latencies) < expected and time.time() < deadline:
+            eventlet.sleep(0.05)
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float("nan")
+        return {"connected": len(clients) - len(dropped), "connect_s": connect_s, "threads": status.get("Threads", 0),
+                "rss_mb": status.get("VmRSS", 0) / 1024, "delivered": len(latencies) / max(1, expected),
+                "p50_ms": pick(0.5), "p99_ms": pick(0.99), "max_ms": latencies[-1] * 1000 if latencies else float("nan")}
+    finally:
+        for c in clients + [sender]:
+            try:
+                c.disconnect()
+            except Exception:
+                pass
+        proc.kill()
+        proc.wait()
+
+def main():
+    p = argparse.ArgumentParser(description="Load test the Socket.IO server in threading vs eventlet mode: connected clients, server threads/memory and broadcast latency.")
+    p.add_argument("--clients", default="100,300,600", help="Comma-separated client counts.")
+    p.add_argument("--modes", default="threading,eventlet")
+    p.add_argument("--rounds", type=int, default=20, help="move_note broadcasts per run.")
+    p.add_argument("--interval-ms", type=float, default=100.0, help="Gap between broadcasts.")
+    p.add_argument("--db-ms", type=float, default=5.0, help="Simulated Mongo write per move.")
+    p.add_argument("--concurrency", type=int, default=100, help="Clients connecting at once.")
+    p.add_argument("--timeout", type=float, default=30.0)
+    args = p.parse_args()
+
+    print(f"{'mode':<10} {'clients':>7} {'connected':>9} {'connect_s':>9} {'threads':>7} {'rss_mb':>7} "
+          f"{'delivered':>9} {'p50_ms':>8} {'p99_ms':>8} {'max_ms':>8}")
+    for n in (int(x) for x in args.clients.split(",")):
+        for mode in args.modes.split(","):
+            r = run(mode, n, args)
+            print(f"{mode:<10} {n:>7} {r['connected']:>9} {r['connect_s']:>9.2f} {r['threads']:>7} {r['rss_mb']:>7.1f} "
+                  f"{r['delivered']:>9.3f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}", flush=True)
+
+if __name__ == "__main__":
+    main()
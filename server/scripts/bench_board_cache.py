@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse, os, statistics, sys, threading, time, types
+
+# allow `python scripts/bench_board_cache.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# note_service imports `db`; the benchmark swaps in a simulated collection
+sys.modules.setdefault("db", types.ModuleType("db")).notes_collection = None
+from services import note_service
+from services.board_cache import BoardCache
+
+# ---- Simulated Mongo: a board query costs one round trip + per-note transfer --------
+class BoardCollection:
+    def __init__(self, notes: int, rtt_ms: float, per_note_us: float):
+        self.docs = [{"id": f"n{i}", "boardId": "b1", "text": f"note {i} " * 8, "x": i, "y": i,
+                      "type": "note", "rev": i, "user": {"uid": "u1", "name": "Ann"}} for i in range(notes)]
+        self.cost = rtt_ms / 1000.0 + notes * per_note_us / 1e6
+        self.lock = threading.Lock()
+        self.queries = 0
+
+    def find(self, flt, projection=None):
+        time.sleep(self.cost)
+        with self.lock:
+            self.queries += 1
+        return [dict(d) for d in self.docs]
+
+# ---- Join storm: N users read the same board at once, then again on rejoin ----------
+def run(mode: str, args) -> dict:
+    coll = BoardCollection(args.notes, args.rtt_ms, args.per_note_us)
+    note_service.notes_collection = coll
+    note_service.board_cache = BoardCache(note_service._load_notes, max_bytes=64 << 20 if mode == "cache" else 0)
+    latencies: list = []
+    lock = threading.Lock()
+
+    def join() -> None:
+        for _ in range(args.rejoins + 1):
+            t0 = time.perf_counter()
+            note_service.get_notes_by_board("b1")
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=join) for _ in range(args.users)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    secs = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "queries": coll.queries,
+        "secs": secs,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "cache": note_service.board_cache.snapshot(),
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark board snapshot reads (join_board / GET /api/notes) with and without the board cache.")
+    p.add_argument("--users", type=int, default=40, help="Users joining the same board at once.")
+    p.add_argument("--rejoins", type=int, default=2, help="Extra reads per user (reconnects, reloads).")
+    p.add_argument("--notes", type=int, default=300, help="Notes on the board.")
+    p.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated Mongo round trip.")
+    p.add_argument("--per-note-us", type=float, default=20.0, help="Simulated transfer/decode cost per note.")
+    args = p.parse_args()
+
+    print(f"{'mode':<9} {'reads':>6} {'queries':>8} {'s':>7} {'p50_ms':>8} {'p99_ms':>8} {'cache_kb':>9}")
+    for mode in ("no-cache", "cache"):
+        r = run(mode, args)
+        print(f"{mode:<9} {r['reads']:>6} {r['queries']:>8} {r['secs']:>7.3f} {r['p50_ms']:>8.3f} "
+              f"{r['p99_ms']:>8.3f} {r['cache']['bytes'] / 1024:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse, collections, contextlib, io, os, sys, threading, time, types
+
+# allow `python scripts/bench_bulk_notes.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# board_events imports `db` and Firebase verification; the benchmark swaps both out
+sys.modules.setdefault("db", types.ModuleType("db")).notes_collection = None
+_verify = types.ModuleType("auth.firebase_verify")
+_verify.verify_firebase_token = lambda token: {"uid": token, "name": token}
+sys.modules["auth.firebase_verify"] = _verify
+
+from flask import Flask
+from flask_socketio import SocketIO
+from events import board_events as be
+from services import note_service
+
+# ---- Simulated Mongo + token check: fixed cost per call --------------------------------
+class RoundTripCollection:
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000.0
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.revs = 0
+        self.database = collections.defaultdict(lambda: self)   # revisions + tombstones live here too
+
+    def _call(self):
+        time.sleep(self.rtt)
+        with self.lock:
+            self.round_trips += 1
+
+    def insert_one(self, doc): self._call()
+    def update_one(self, flt, doc):
+        self._call()
+        return types.SimpleNamespace(matched_count=1)
+    def delete_one(self, flt):
+        self._call()
+        return types.SimpleNamespace(deleted_count=1)
+    def insert_many(self, docs): self._call()
+    def count_documents(self, flt):
+        self._call()
+        return 0
+
+    def find_one_and_update(self, flt, doc, **kw):
+        self._call()
+        self.revs += 1
+        return {"rev": self.revs}
+
+    def bulk_write(self, ops, ordered=True):
+        self._call()
+        return types.SimpleNamespace(modified_count=len(ops))
+
+class Counter:
+    def __init__(self, verify_ms: float):
+        self.cost = verify_ms / 1000.0
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        time.sleep(self.cost)
+        return {"uid": token, "name": token}
+
+# ---- Workloads ---------------------------------------------------------------------------
+def note(i: int) -> dict:
+    return {"id": f"n{i}", "text": f"note {i}", "x": i, "y": i, "user": {"uid": "u1"}, "boardId": "b1"}
+
+def singles(op: str, n: int):
+    if op == "create":
+        return [("create_note", {**note(i), "token": "t"}) for i in range(n)]
+    if op == "move":
+        return [("move_note", {"id": f"n{i}", "x": i, "y": -i, "boardId": "b1", "token": "t"}) for i in range(n)]
+    return [("delete_note", {"id": f"n{i}", "boardId": "b1", "token": "t"}) for i in range(n)]
+
+def batch(op: str, n: int):
+    if op == "create":
+        return [("create_notes", {"boardId": "b1", "token": "t", "notes": [note(i) for i in range(n)]})]
+    if op == "move":
+        return [("move_notes", {"boardId": "b1", "token": "t",
+                                "moves": [{"id": f"n{i}", "x": i, "y": -i} for i in range(n)]})]
+    return [("delete_notes", {"boardId": "b1", "token": "t", "ids": [f"n{i}" for i in range(n)]})]
+
+def run(events, args) -> dict:
+    coll = RoundTripCollection(args.rtt_ms)
+    verify = Counter(args.verify_ms)
+    note_service.notes_collection = coll
+    be.move_buffer = None                  # compare direct writes on both sides
+
+    app = Flask(__name__)
+    sio = SocketIO(app, async_mode="threading")
+    be.register_socket_events(sio)
+    be.verify_firebase_token = verify
+    sender = sio.test_client(app, flask_test_client=app.test_client())
+    watcher = sio.test_client(app, flask_test_client=app.test_client())
+    sender.emit("join_board", {"boardId": "b1", "token": "u1"})
+    watcher.emit("join_board", {"boardId": "b1", "token": "u2"})
+    sender.get_received(); watcher.get_received()
+    coll.round_trips = verify.calls = 0
+
+    t0 = time.perf_counter()
+    for name, payload in events:
+        sender.emit(name, payload)
+    secs = time.perf_counter() - t0
+    broadcasts = len(watcher.get_received())
+    sender.disconnect(); watcher.disconnect()
+    return {"secs": secs, "verifications": verify.calls, "mongo_calls": coll.round_trips, "broadcasts": broadcasts}
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark N single note events vs one batched event over Socket.IO.")
+    p.add_argument("--notes", type=int, default=1000)
+    p.add_argument("--ops", default="create,move,delete", help="Comma-separated: create,move,delete.")
+    p.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated Mongo round trip.")
+    p.add_argument("--verify-ms", type=float, default=0.2, help="Simulated token verification cost.")
+    args = p.parse_args()
+
+    print(f"{'op':<7} {'mode':<7} {'notes':>6} {'s':>8} {'verify':>7} {'mongo':>6} {'bcasts':>7}")
+    for op in [o.strip() for o in args.ops.split(",") if o.strip()]:
+        for mode, events in (("single", singles(op, args.notes)), ("batch", batch(op, args.notes))):
+            with contextlib.redirect_stdout(io.StringIO()):   # handlers print per event
+                r = run(events, args)
+            print(f"{op:<7} {mode:<7} {args.notes:>6} {r['secs']:>8.3f} {r['verifications']:>7} "
+                  f"{r['mongo_calls']:>6} {r['broadcasts']:>7}")
+
+if __name__ == "__main__":
+    main()
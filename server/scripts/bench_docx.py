@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse, io, os, resource, subprocess, sys, tempfile, time, zipfile
+
+# allow `python scripts/bench_docx.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services import extraction
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/></Relationships>'
+)
+
+# ---- Implementations -------------------------------------------------------------
+def python_docx(path: str) -> list:
+    """Previous path: whole file in memory, full python-docx tree, joined text."""
+    from docx import Document
+    with open(path, "rb") as f:
+        doc = Document(io.BytesIO(f.read()))
+    text = "\n".join(p.text for p in doc.paragraphs).strip()
+    return list(extraction.iter_answers_from_text(text))
+
+def streaming(path: str) -> list:
+    return list(extraction.iter_answers(extraction.iter_document_lines(path, "bench.docx")))
+
+IMPLS = {"python-docx": python_docx, "streaming": streaming}
+
+# ---- Synthetic transcript -----------------------------------------------------------
+def write_docx(path: str, paragraphs: int) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", CONTENT_TYPES)
+        z.writestr("_rels/.rels", RELS)
+        with z.open("word/document.xml", "w") as out:
+            out.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      f'<w:document xmlns:w="{W_NS}"><w:body>'.encode())
+            for i in range(paragraphs):
+                text = (f"Q: Question {i} about the product?" if i % 2 == 0 else
+                        f"A: Participant {i} said the dashboard was slow to load and the labels were confusing.")
+                out.write(f'<w:p><w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'.encode())
+            out.write(b"</w:body></w:document>")
+
+# ---- Child process: one implementation, fresh peak RSS ------------------------------
+def run_child(impl: str, path: str) -> None:
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    n = len(IMPLS[impl](path))
+    secs = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KB on Linux
+    print(f"{secs} {peak / 1024} {(peak - base) / 1024} {n}")
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark DOCX answer extraction: streaming iterparse vs python-docx.")
+    p.add_argument("--paragraphs", default="20000,100000", help="Comma-separated paragraph counts.")
+    p.add_argument("--child", nargs=2, metavar=("IMPL", "PATH"), help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f"{'impl':<12} {'paras':>8} {'docxMB':>7} {'items':>7} {'s':>8} {'peakRSS_MB':>11} {'+RSS_MB':>8}")
+    for count in [int(x) for x in args.paragraphs.split(",") if x.strip()]:
+        fd, path = tempfile.mkstemp(suffix=".docx")
+        os.close(fd)
+        try:
+            write_docx(path, count)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            for impl in IMPLS:
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", impl, path],
+                                     capture_output=True, text=True, check=True).stdout.split()
+                secs, peak, delta, n = float(out[0]), float(out[1]), float(out[2]), int(out[3])
+                print(f"{impl:<12} {count:>8} {size_mb:>7.2f} {n:>7} {secs:>8.3f} {peak:>11.1f} {delta:>8.1f}")
+        finally:
+            os.unlink(path)
+
+if __name__ == "__main__":
+    main()
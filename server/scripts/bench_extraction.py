@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse, io, os, re, sys, time, tracemalloc
+from typing import Callable, List
+
+# allow `python scripts/bench_extraction.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services import extraction, extraction_cache, uploads
+
+# ---- Legacy implementations (before the shared engine), for comparison -------
+_LEGACY_ANSWER_LINE_RE = re.compile(r"(?m)^\s*A:\s*(.+)\s*$")
+_LEGACY_PATTERNS = (
+    re.compile(r"(?ms)^A:\s*(.+?)(?=\nQ:|\Z)"),
+    re.compile(r"(?ms)^(?:Answer|Ans)\s*:\s*(.+?)(?=\nQ:|\Z)", re.IGNORECASE),
+)
+
+def legacy_service(text: str) -> List[str]:
+    items = [re.sub(r"\s+", " ", m.group(1).strip()) for m in _LEGACY_ANSWER_LINE_RE.finditer(text)]
+    seen, out = set(), []
+    for s in items:
+        if s and s.lower() not in seen:
+            seen.add(s.lower())
+            out.append(s)
+    return out[:500]
+
+def _legacy_clean(s: str) -> str:
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    s = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", s)
+    s = s.replace("\n", " ")
+    s = re.sub(r"\s+", " ", s)
+    return s.strip(" \t\"“”'’")
+
+def legacy_preprocess(text: str) -> List[str]:
+    found = [_legacy_clean(m.group(1)) for rx in _LEGACY_PATTERNS for m in rx.finditer(text)]
+    overall_rx = re.compile(r"(?mi)^\s*(?:But\s+overall|Overall|On the positive side)\s*[:,]\s*(.+?)\s*$")
+    found += [_legacy_clean(m.group(1)) for m in overall_rx.finditer(text)]
+    seen, out = set(), []
+    for s in found:
+        if s and s.lower() not in seen:
+            seen.add(s.lower())
+            out.append(s)
+    return out
+
+def engine(text: str) -> List[str]:
+    return list(extraction.iter_answers_from_text(text))
+
+def engine_capped(text: str) -> List[str]:
+    return list(extraction.iter_answers_from_text(text, limit=500))
+
+# ---- Synthetic transcript ------------------------------------------------------
+def make_transcript(megabytes: float) -> str:
+    parts, size, i = [], 0, 0
+    target = int(megabytes * 1024 * 1024)
+    while size < target:
+        block = (
+            f"Q: Question {i} about the product?\n"
+            f"A: Participant {i} said the dash-\nboard was slow to load and the menu labels were confusing\n"
+            f"when switching between projects (session {i}).\n"
+        )
+        parts.append(block)
+        size += len(block)
+        i += 1
+    return "".join(parts)
+
+def make_pdf(pages: int, answers_per_page: int = 20) -> bytes:
+    """Synthetic text PDF (Helvetica, one Q/A pair per line)."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        lines = " ".join(
+            f"0 -14 Td (A: Participant {p}-{i} said the dashboard was slow to load) Tj"
+            for i in range(answers_per_page))
+        stream = f"BT /F1 10 Tf 40 780 Td {lines} ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def bench_repeat_uploads(pages: int, repeats: int) -> None:
+    """Upload path: spool+hash, then extraction (miss) or extraction-cache hit."""
+    data = make_pdf(pages)
+    extraction_cache.clear()
+    print(f"\nrepeat uploads: {pages}-page PDF, {len(data) / 1024:.0f} KB")
+    print(f"{'upload':<8} {'hash_s':>8} {'extract_s':>10} {'total_s':>8} {'items':>6}")
+    for n in range(repeats):
+        t0 = time.perf_counter()
+        with uploads.spool_upload(io.BytesIO(data), "bench.pdf") as spooled:
+            t1 = time.perf_counter()
+            items = extraction_cache.cached_answers(
+                spooled.sha256, "bench.pdf", 500,
+                lambda: list(extraction.iter_answers(extraction.iter_document_lines(spooled.path, "bench.pdf"),
+                                                     limit=500)))
+            t2 = time.perf_counter()
+        print(f"{n + 1:<8} {t1 - t0:>8.4f} {t2 - t1:>10.4f} {t2 - t0:>8.4f} {len(items):>6}")
+
+def measure(fn: Callable[[str], List[str]], text: str) -> tuple[float, float, int]:
+    # time without tracing (tracemalloc slows allocation-heavy code), then peak memory
+    t0 = time.perf_counter()
+    out = fn(text)
+    secs = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, peak / (1024 * 1024), len(out)
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark answer extraction: time and peak memory per MB of input.")
+    p.add_argument("--sizes", default="1,5,20", help="Comma-separated input sizes in MB.")
+    p.add_argument("--pdf-pages", type=int, default=0,
+                   help="Also time repeated uploads of a synthetic PDF with this many pages (extraction cache).")
+    p.add_argument("--repeats", type=int, default=3, help="Uploads of the same PDF for --pdf-pages.")
+    args = p.parse_args()
+
+    impls = [
+        ("legacy_service", legacy_service),
+        ("legacy_preprocess", legacy_preprocess),
+        ("engine", engine),
+        ("engine_capped500", engine_capped),
+    ]
+    print(f"{'impl':<18} {'MB':>5} {'items':>8} {'s':>8} {'s/MB':>8} {'peakMB':>8} {'peakMB/MB':>10}")
+    for mb in [float(x) for x in args.sizes.split(",") if x.strip()]:
+        text = make_transcript(mb)
+        real_mb = len(text) / (1024 * 1024)
+        for name, fn in impls:
+            secs, peak, n = measure(fn, text)
+            print(f"{name:<18} {real_mb:>5.1f} {n:>8} {secs:>8.3f} {secs / real_mb:>8.3f} {peak:>8.1f} {peak / real_mb:>10.2f}")
+
+    if args.pdf_pages:
+        bench_repeat_uploads(args.pdf_pages, args.repeats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import argparse, collections, os, statistics, sys, threading, time, types
+
+# allow `python scripts/bench_moves.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# note_service imports `db`; the benchmark swaps in a simulated collection
+sys.modules.setdefault("db", types.ModuleType("db")).notes_collection = None
+from services import note_service
+from services.move_buffer import MoveBuffer
+
+# ---- Simulated Mongo: every call is one round trip of --rtt-ms ----------------------
+class RoundTripCollection:
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000.0
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        self.updates = 0
+        self.revs = 0
+        self.database = collections.defaultdict(lambda: self)   # board_revisions lives here too
+
+    def _call(self, n_updates: int) -> None:
+        time.sleep(self.rtt)
+        with self.lock:
+            self.round_trips += 1
+            self.updates += n_updates
+
+    def update_one(self, flt, doc):
+        self._call(1)
+        return types.SimpleNamespace(matched_count=1)
+
+    def find(self, flt, projection=None):
+        self._call(0)
+        return [{"id": nid, "boardId": f"b{int(nid[1:]) % 4}"} for nid in flt["id"]["$in"]]
+
+    def find_one_and_update(self, flt, doc, **kw):
+        self._call(0)
+        with self.lock:
+            self.revs += 1
+            return {"rev": self.revs}
+
+    def bulk_write(self, ops, ordered=True):
+        self._call(len(ops))
+        return types.SimpleNamespace(modified_count=len(ops))
+
+# ---- Drag load: one thread per user, each dragging its own note -----------------------
+def drag(handler, users: int, rate: float, seconds: float) -> list:
+    latencies: list = []
+    lock = threading.Lock()
+
+    def user(u: int) -> None:
+        mine, period = [], 1.0 / rate
+        t_end = time.perf_counter() + seconds
+        i = 0
+        while time.perf_counter() < t_end:
+            t0 = time.perf_counter()
+            handler(f"n{u}", i, i, f"b{u % 4}", f"sid{u}")
+            dt = time.perf_counter() - t0
+            mine.append(dt)
+            i += 1
+            time.sleep(max(0.0, period - dt))
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(users)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return latencies
+
+def run(mode: str, args) -> dict:
+    coll = RoundTripCollection(args.rtt_ms)
+    note_service.notes_collection = coll
+    if mode == "sync":
+        handler = lambda nid, x, y, board, sid: note_service.update_note(nid, {"x": x, "y": y}, board_id=board)
+        lat = drag(handler, args.users, args.rate, args.seconds)
+    else:
+        buf = MoveBuffer(note_service.bulk_move_notes, flush_ms=args.flush_ms, max_pending=args.flush_max)
+        handler = lambda nid, x, y, board, sid: buf.put(nid, x, y, board_id=board, sid=sid)
+        lat = drag(handler, args.users, args.rate, args.seconds)
+        buf.close()
+    lat.sort()
+    return {
+        "events": len(lat),
+        "round_trips": coll.round_trips,
+        "updates": coll.updates,
+        "p50_ms": statistics.median(lat) * 1000,
+        "p99_ms": lat[int(len(lat) * 0.99) - 1] * 1000,
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark move_note persistence: synchronous update_one vs write-behind buffer.")
+    p.add_argument("--users", type=int, default=20, help="Concurrent users, each dragging one note.")
+    p.add_argument("--rate", type=float, default=30.0, help="move_note events per second per user.")
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated Mongo round trip per write call.")
+    p.add_argument("--flush-ms", type=int, default=250)
+    p.add_argument("--flush-max", type=int, default=200)
+    args = p.parse_args()
+
+    print(f"{'mode':<13} {'events':>7} {'mongo_calls':>11} {'updates':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    for mode in ("sync", "write-behind"):
+        r = run(mode, args)
+        print(f"{mode:<13} {r['events']:>7} {r['round_trips']:>11} {r['updates']:>8} "
+              f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
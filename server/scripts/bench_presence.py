@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import argparse, json, os, random, statistics, sys, threading, time
+
+# allow `python scripts/bench_presence.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services.presence import PresenceFeed, PresenceStore
+
+# ---- The previous board_events bookkeeping: disconnect scans every board and user --------
+class ScanPresence:
+    def __init__(self):
+        self.online_users = {}
+        self.lock = threading.Lock()
+
+    def join(self, sid, board_id, uid, name="", email=""):
+        with self.lock:
+            users = self.online_users.setdefault(board_id, {})
+            users.setdefault(uid, {"name": name, "email": email, "sockets": set()})["sockets"].add(sid)
+
+    def disconnect(self, sid):
+        with self.lock:
+            out = {}
+            for board_id in list(self.online_users.keys()):
+                removed = []
+                for u in list(self.online_users[board_id].keys()):
+                    self.online_users[board_id][u]["sockets"].discard(sid)
+                    if not self.online_users[board_id][u]["sockets"]:
+                        del self.online_users[board_id][u]
+                        removed.append(u)
+                if removed:
+                    out[board_id] = removed
+            return out
+
+# ---- Load: S sockets on R boards each out of B, then every socket disconnects -------------
+def run(store, args) -> dict:
+    rnd = random.Random(11)
+    sockets = [(f"s{i}", f"u{rnd.randrange(args.sockets // 2)}", rnd.sample(range(args.boards), args.rooms))
+               for i in range(args.sockets)]
+    for sid, uid, boards in sockets:
+        for b in boards:
+            store.join(sid, f"b{b}", uid)
+    rnd.shuffle(sockets)
+    chunks = [sockets[i::args.threads] for i in range(args.threads)]
+    times, lock = [], threading.Lock()
+
+    def worker(chunk):
+        mine = []
+        for sid, _, _ in chunk:
+            t0 = time.perf_counter()
+            store.disconnect(sid)
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            times.extend(mine)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    secs = time.perf_counter() - t0
+    times.sort()
+    return {"secs": secs, "p50_us": statistics.median(times) * 1e6, "p99_us": times[int(len(times) * 0.99) - 1] * 1e6}
+
+# ---- Class join: n users join one board within --burst-ms ----------------------------------
+class Room:
+    """Counts what an emit to the room would deliver (members at emit time, JSON bytes)."""
+    def __init__(self, store: PresenceStore):
+        self.store = store
+        self.lock = threading.Lock()
+        self.messages = self.bytes = 0
+        self.tasks = []
+
+    def emit(self, event, payload, room=None, skip_self=False):
+        n = len(self.store.uids(room)) - (1 if skip_self else 0)
+        size = len(json.dumps([event, payload]))
+        with self.lock:
+            self.messages += n
+            self.bytes += n * size
+
+    def direct(self, event, payload):
+        with self.lock:
+            self.messages += 1
+            self.bytes += len(json.dumps([event, payload]))
+
+    def start_background_task(self, fn, *args):
+        t = threading.Thread(target=fn, args=args)
+        t.start()
+        self.tasks.append(t)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+def class_join(mode: str, args) -> dict:
+    store = PresenceStore()
+    room = Room(store)
+    feed = PresenceFeed(store, window_ms=args.window_ms)
+    feed.attach(room)
+    t0 = time.perf_counter()
+    for i in range(args.class_size):
+        user = {"uid": f"u{i}", "name": f"Student {i}", "email": f"s{i}@school.example"}
+        store.join(f"s{i}", "b1", user["uid"], user["name"], user["email"])
+        if mode == "per-join":           # user_joined to the others, then the full list pair to everyone
+            room.emit("user_joined", user, room="b1", skip_self=True)
+            users = store.users("b1")
+            room.emit("user_list", {"boardId": "b1", "users": users}, room="b1")
+            room.emit("online_users", users, room="b1")
+        else:                            # the joiner gets the list itself, the room one delta per window
+            feed.changed("b1", joined=[user])
+            users = feed.users("b1")
+            room.direct("user_list", {"boardId": "b1", "users": users})
+            room.direct("online_users", users)
+        time.sleep(args.burst_ms / 1000.0 / args.class_size)
+    for t in room.tasks: t.join()
+    return {"messages": room.messages, "kb": room.bytes / 1024, "secs": time.perf_counter() - t0}
+
+def main():
+    p = argparse.ArgumentParser(description="Load test socket presence: mass disconnects across thousands of boards, and presence traffic of a class joining at once.")
+    p.add_argument("--sockets", type=int, default=5000)
+    p.add_argument("--boards", type=int, default=2000)
+    p.add_argument("--rooms", type=int, default=2, help="Boards each socket joined.")
+    p.add_argument("--threads", type=int, default=8, help="Concurrent handler threads (threading async mode).")
+    p.add_argument("--class-size", type=int, default=200, help="Users joining one board at once.")
+    p.add_argument("--burst-ms", type=float, default=1000.0, help="Time the class joins over.")
+    p.add_argument("--window-ms", type=int, default=200, help="PRESENCE_DEBOUNCE_MS for the coalesced mode.")
+    args = p.parse_args()
+
+    print(f"{'presence':<8} {'sockets':>8} {'boards':>7} {'s':>8} {'p50_us':>9} {'p99_us':>9}")
+    for name, store in (("scan", ScanPresence()), ("indexed", PresenceStore())):
+        r = run(store, args)
+        print(f"{name:<8} {args.sockets:>8} {args.boards:>7} {r['secs']:>8.3f} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f}")
+
+    print(f"\n{'broadcast':<10} {'joins':>6} {'messages':>9} {'kb':>9}")
+    for mode in ("per-join", "coalesced"):
+        r = class_join(mode, args)
+        print(f"{mode:<10} {args.class_size:>6} {r['messages']:>9} {r['kb']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse, contextlib, io, json, os, random, sys, time, types
+
+# allow `python scripts/bench_snapshot_stream.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# board_events imports `db` and Firebase verification; the benchmark swaps both out
+sys.modules.setdefault("db", types.ModuleType("db")).notes_collection = None
+_verify = types.ModuleType("auth.firebase_verify")
+_verify.verify_firebase_token = lambda token: {"uid": token, "name": token}
+sys.modules["auth.firebase_verify"] = _verify
+
+from flask import Flask
+from flask_socketio import SocketIO
+from events import board_events as be
+
+# ---- Board: N notes scattered over a large canvas ------------------------------------
+def board(n: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    return [{"id": f"n{i:05d}", "boardId": "b1", "text": f"note {i} " * 6, "x": rnd.uniform(0, 20000),
+             "y": rnd.uniform(0, 20000), "type": "note", "rev": i, "user": {"uid": "u1", "name": "Ann"}}
+            for i in range(n)]
+
+def run(mode: str, notes: list, args) -> dict:
+    be.get_notes_by_board = lambda board_id: notes
+    be.get_board_changes = lambda board_id, since=None: {"rev": len(notes), "full": True, "notes": notes, "deleted": []}
+    be.move_buffer = None
+    app = Flask(__name__)
+    sio = SocketIO(app, async_mode="threading")
+    be.register_socket_events(sio)
+    be.verify_firebase_token = _verify.verify_firebase_token
+    client = sio.test_client(app, flask_test_client=app.test_client())
+
+    join = {"boardId": "b1", "token": "u1"}
+    if mode == "stream":
+        join.update(chunkSize=args.chunk, viewport={"x": 9000, "y": 9000, "w": 2000, "h": 1200})
+    t0 = time.perf_counter()
+    client.emit("join_board", join)
+    handler_s = time.perf_counter() - t0
+    evs = [e for e in client.get_received() if e["name"] in ("load_existing_notes", "notes_chunk")]
+    first = evs[0]["args"][0]
+    total, messages = sum(len(e["args"][0]["notes"]) for e in evs), len(evs)
+    while mode == "stream" and not evs[-1]["args"][0]["done"]:
+        client.emit("notes_chunk_ack", {"boardId": "b1", "seq": evs[-1]["args"][0]["seq"]})
+        evs = [e for e in client.get_received() if e["name"] == "notes_chunk"]
+        total += sum(len(e["args"][0]["notes"]) for e in evs)
+        messages += len(evs)
+    total_s = time.perf_counter() - t0
+    client.disconnect()
+    return {"join_ms": handler_s * 1000, "first_kb": len(json.dumps(first)) / 1024,
+            "messages": messages, "notes": total, "total_ms": total_s * 1000}
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark join_board: one load_existing_notes vs acked notes_chunk stream.")
+    p.add_argument("--notes", type=int, default=5000)
+    p.add_argument("--chunk", type=int, default=200)
+    args = p.parse_args()
+
+    notes = board(args.notes)
+    print(f"{'mode':<7} {'notes':>6} {'join_ms':>8} {'first_kb':>9} {'messages':>9} {'total_ms':>9}")
+    for mode in ("single", "stream"):
+        with contextlib.redirect_stdout(io.StringIO()):   # handlers print per event
+            r = run(mode, notes, args)
+        print(f"{mode:<7} {r['notes']:>6} {r['join_ms']:>8.2f} {r['first_kb']:>9.1f} {r['messages']:>9} {r['total_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
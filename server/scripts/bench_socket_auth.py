@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse, contextlib, io, os, statistics, sys, time, types
+
+# allow `python scripts/bench_socket_auth.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# board_events imports `db` and Firebase verification; the benchmark swaps both out
+sys.modules.setdefault("db", types.ModuleType("db")).notes_collection = None
+_verify = types.ModuleType("auth.firebase_verify")
+_verify.verify_firebase_token = lambda token: {"uid": token, "name": token}
+sys.modules["auth.firebase_verify"] = _verify
+
+from flask import Flask
+from flask_socketio import SocketIO
+from events import board_events as be
+from services.move_buffer import MoveBuffer
+from services.socket_sessions import SocketSessions
+from services.spatial import ViewportRegistry
+
+# ---- Simulated token verification: CPU-bound signature check, holds the GIL ---------------
+class Verifier:
+    def __init__(self, cost_us: float):
+        self.cost = cost_us / 1e6
+        self.calls = 0
+
+    def __call__(self, token):
+        self.calls += 1
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        return {"uid": token, "name": token}          # no `exp`: the session TTL applies
+
+# ---- One client moving notes on a joined board --------------------------------------------
+def run(mode: str, args) -> dict:
+    verifier = Verifier(args.verify_us)
+    be.verify_firebase_token = verifier
+    # per-event: sessions expire immediately, so every event re-verifies its token
+    # (what every note handler did before sessions)
+    be.sessions = SocketSessions(ttl=-1 if mode == "per-event" else 3600)
+    be.move_buffer = MoveBuffer(lambda positions: None, flush_ms=60_000)
+    be.viewports = ViewportRegistry()
+    app = Flask(__name__)
+    sio = SocketIO(app, async_mode="threading")
+    be.register_socket_events(sio)
+    client = sio.test_client(app, flask_test_client=app.test_client())
+    client.emit("join_board", {"boardId": "b1", "token": "u1"})
+    client.get_received()
+    verifier.calls = 0
+
+    times = []
+    for i in range(args.events):
+        t0 = time.perf_counter()
+        client.emit("move_note", {"id": f"n{i % 50}", "boardId": "b1", "x": i, "y": i, "token": "u1"})
+        times.append(time.perf_counter() - t0)
+    client.get_received()
+    client.disconnect()
+    times.sort()
+    return {"verifications": verifier.calls, "p50_us": statistics.median(times) * 1e6,
+            "p99_us": times[int(len(times) * 0.99) - 1] * 1e6, "total_ms": sum(times) * 1000}
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark move_note handler latency: token verified per event vs per-socket session.")
+    p.add_argument("--events", type=int, default=5000)
+    p.add_argument("--verify-us", type=float, default=300.0, help="Simulated verify_id_token CPU cost.")
+    args = p.parse_args()
+
+    print(f"{'auth':<10} {'events':>7} {'verify':>7} {'p50_us':>8} {'p99_us':>8} {'total_ms':>9}")
+    for mode in ("per-event", "session"):
+        with contextlib.redirect_stdout(io.StringIO()):   # handlers print per event
+            r = run(mode, args)
+        print(f"{mode:<10} {args.events:>7} {r['verifications']:>7} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} "
+              f"{r['total_ms']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
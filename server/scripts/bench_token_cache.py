@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import argparse, os, random, statistics, sys, threading, time
+
+# allow `python scripts/bench_token_cache.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services.token_cache import KeyRefresher, TokenCache
+
+# ---- Simulated verify_id_token: CPU-bound signature check + public keys with a max-age ----
+class Keys:
+    """Google's key set as the HTTP cache sees it: a request after max-age downloads it inline."""
+    def __init__(self, max_age_s: float, fetch_ms: float):
+        self.max_age = max_age_s
+        self.fetch = fetch_ms / 1000.0
+        self.expires = 0.0
+        self.lock = threading.Lock()
+        self.downloads = 0
+
+    def download(self) -> None:
+        time.sleep(self.fetch)
+        with self.lock:
+            self.downloads += 1
+            self.expires = time.monotonic() + self.max_age
+
+    def ensure(self) -> None:
+        with self.lock:
+            fresh = self.expires > time.monotonic()
+        if not fresh:
+            self.download()
+
+class Verifier:
+    def __init__(self, keys: Keys, cost_us: float):
+        self.keys = keys
+        self.cost = cost_us / 1e6
+        self.calls = 0
+
+    def __call__(self, token: str) -> dict:
+        self.calls += 1
+        self.keys.ensure()
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        return {"uid": token, "exp": time.time() + 3600}
+
+# ---- Polling clients: every user re-sends the same token on each request ----------------------
+def run(mode: str, args) -> dict:
+    keys = Keys(args.key_max_age, args.fetch_ms)
+    keys.download()
+    verify = Verifier(keys, args.verify_us)
+    cache = TokenCache(verify, size=0 if mode == "none" else 10000)
+    refresher = KeyRefresher(keys.download, interval=args.key_max_age / 2)
+    if mode == "cache+refresh":
+        refresher.start()
+    rnd = random.Random(5)
+    tokens = [f"user{rnd.randrange(args.users)}" for _ in range(args.requests)]
+    times = []
+    t_end = time.monotonic()
+    for token in tokens:
+        t0 = time.perf_counter()
+        cache.verify(token)
+        times.append(time.perf_counter() - t0)
+        # spread the requests over --seconds so the key set expires in between
+        t_end += args.seconds / args.requests
+        time.sleep(max(0.0, t_end - time.monotonic()))
+    refresher.stop()
+    times.sort()
+    return {"verify": verify.calls, "downloads": keys.downloads - 1, "p50_us": statistics.median(times) * 1e6,
+            "p99_us": times[int(len(times) * 0.99) - 1] * 1e6, "max_ms": times[-1] * 1000,
+            "hit_rate": cache.snapshot()["hit_rate"] or 0.0}
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark request authentication with and without the verified-token cache.")
+    p.add_argument("--users", type=int, default=200)
+    p.add_argument("--requests", type=int, default=4000)
+    p.add_argument("--seconds", type=float, default=4.0, help="Wall time the requests are spread over.")
+    p.add_argument("--verify-us", type=float, default=300.0, help="Simulated signature check CPU cost.")
+    p.add_argument("--key-max-age", type=float, default=1.0, help="Seconds the public key set stays cached.")
+    p.add_argument("--fetch-ms", type=float, default=80.0, help="Simulated public key download.")
+    args = p.parse_args()
+
+    print(f"{'mode':<14} {'requests':>8} {'verify':>7} {'key_dl':>7} {'hit_rate':>9} {'p50_us':>8} {'p99_us':>8} {'max_ms':>7}")
+    for mode in ("none", "cache", "cache+refresh"):
+        r = run(mode, args)
+        print(f"{mode:<14} {args.requests:>8} {r['verify']:>7} {r['downloads']:>7} {r['hit_rate']:>9.3f} "
+              f"{r['p50_us']:>8.1f} {r['p99_us']:>8.1f} {r['max_ms']:>7.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse, os, random, statistics, sys, time
+
+# allow `python scripts/bench_viewports.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from services.board_cache import BoardCache
+from services.spatial import ViewportRegistry, contains
+
+# ---- A huge canvas: notes scattered, users looking at different regions ----------------
+def board(n: int, size: float, rnd: random.Random) -> list:
+    return [{"id": f"n{i:05d}", "boardId": "b1", "text": f"note {i}", "x": rnd.uniform(0, size),
+             "y": rnd.uniform(0, size)} for i in range(n)]
+
+class Deliveries:
+    """Counts messages a Socket.IO room emit would send (room size minus skipped sids)."""
+    def __init__(self, room_size: int):
+        self.room_size = room_size
+        self.messages = 0
+        self.notes = 0
+
+    def __call__(self, event, payload, room=None, skip_sid=None):
+        n = len(payload["moves"]) if isinstance(payload, dict) and "moves" in payload else 1
+        if room == "b1":
+            k = self.room_size - len(skip_sid or [])
+        else:
+            k = 1
+        self.messages += k
+        self.notes += k * n
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark viewport-filtered broadcasts and bbox queries on a large canvas.")
+    p.add_argument("--notes", type=int, default=20000)
+    p.add_argument("--canvas", type=float, default=50000.0, help="Canvas width/height in canvas units.")
+    p.add_argument("--users", type=int, default=40)
+    p.add_argument("--moves", type=int, default=5000)
+    p.add_argument("--queries", type=int, default=200)
+    args = p.parse_args()
+    rnd = random.Random(3)
+
+    notes = board(args.notes, args.canvas, rnd)
+    viewports = [{"x": rnd.uniform(0, args.canvas - 1920), "y": rnd.uniform(0, args.canvas - 1080),
+                  "w": 1920, "h": 1080} for _ in range(args.users)]
+    initial = {n["id"]: (n["x"], n["y"]) for n in notes}      # what the board cache holds at the start
+    moves = []
+    for _ in range(args.moves):
+        n = rnd.choice(notes)
+        n["x"] = min(args.canvas, max(0.0, n["x"] + rnd.uniform(-50, 50)))
+        moves.append({"id": n["id"], "x": n["x"], "y": n["y"]})
+
+    print(f"{'broadcast':<10} {'messages':>9} {'per_move':>9} {'ms':>8}")
+    for mode in ("room", "viewport"):
+        reg = ViewportRegistry(locate=lambda board_id, ids: {i: initial[i] for i in ids if i in initial})
+        if mode == "viewport":
+            for i, vp in enumerate(viewports):
+                reg.subscribe(f"s{i}", "b1", vp)
+        sink = Deliveries(args.users)
+        t0 = time.perf_counter()
+        for m in moves:
+            reg.broadcast(sink, "note_moved", "b1", [m], lambda ns: ns[0])
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{mode:<10} {sink.messages:>9} {sink.messages / len(moves):>9.2f} {ms:>8.1f}")
+
+    cache = BoardCache(lambda board_id: notes, max_bytes=1 << 30)
+    cache.get("b1")
+    boxes = []
+    for vp in (rnd.choice(viewports) for _ in range(args.queries)):
+        boxes.append((vp["x"], vp["y"], vp["x"] + vp["w"], vp["y"] + vp["h"]))
+    print(f"\n{'bbox query':<10} {'avg_hits':>9} {'p50_ms':>9}")
+    for mode in ("scan", "grid"):
+        times, hits = [], []
+        for box in boxes:
+            t0 = time.perf_counter()
+            if mode == "scan":
+                found = [n for n in cache.get("b1") if contains(box, n["x"], n["y"])]
+            else:
+                found = cache.query_bbox("b1", box)
+            times.append(time.perf_counter() - t0)
+            hits.append(len(found))
+        print(f"{mode:<10} {statistics.mean(hits):>9.1f} {statistics.median(times) * 1000:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,22 @@
 from __future__ import annotations
 
-import argparse, csv, os,re
+import argparse, csv, os,re,sys,time
 from collections import Counter
 from typing import Any, Dict, List, Optional, Tuple
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
 
+# allow `python scripts/evaluate_model.py` from server/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models.base import CATEGORY_DESCRIPTIONS
+
 # Canonical labels (must match your taxonomy)
 CANON_LABELS = ["Usability","Performance","Visual Design","Feedback","Navigation","Responsiveness"]
 
 # Descriptive candidates (work better for zero-shot)
-CANDIDATE_MAP = {
-    "Usability":      "Usability issues (confusing UX, hard to use, form friction, task flow confusion, input errors, discoverability)",
-    "Performance":    "Performance problems (slow overall, laggy scrolling, crashes, memory, battery drain, layout shift/CLS)",
-    "Visual Design":  "Visual design feedback (colors, typography, spacing, contrast, alignment, icon style, visual aesthetics)",
-    "Navigation":     "Navigation & information architecture (menus, wayfinding, breadcrumbs, findability, back-button behavior, routing, deep linking)",
-    "Responsiveness": "Responsiveness & input delay (slow reaction to taps/clicks, delayed transitions, jank, UI feels unresponsive)",
-    "Feedback":       "General feedback or opinions not tied to a specific UX issue (praise, pricing notes, broad sentiment, non-actionable comments)",
-}
+CANDIDATE_MAP = dict(CATEGORY_DESCRIPTIONS)
 CANDIDATES = list(CANDIDATE_MAP.values())
 REV_MAP = {desc: canon for canon, desc in CANDIDATE_MAP.items()}
 
@@ -150,15 +150,62 @@ def predict_per_item_direct(texts: List[str]) -> List[str]:
 
     return [p or "Feedback" for p in preds]
 
+# ---- Prediction via the deployed models (classify_items) ---------------------
+def _item_label(result: Dict[str, Any]) -> str:
+    """Top-1 label of one classify_items() result: first critique category, else first delight."""
+    labels = result.get("categories") or result.get("delight") or []
+    return labels[0] if labels else "Feedback"
+
+def predict_per_item_model(model: Any, texts: List[str]) -> List[str]:
+    return [_item_label(r) for r in model.classify_items(texts)]
+
+def predict_per_item_embed(texts: List[str], golds: List[str], folds: int = 5) -> List[str]:
+    """
+    EmbeddingCentroidModel.classify_items() (the UX_MODEL=embed path), scored
+    k-fold: the CSV is also the centroid seed set, so each fold is classified
+    with centroids seeded from the other folds only.
+    """
+    from models.embed_centroid import EmbeddingCentroidModel, _EmbeddingIndex, _SentenceEncoder
+
+    cls = EmbeddingCentroidModel
+    saved = (cls._encoder, cls._index, cls._classifier, cls._sentiment)
+    cls._encoder = cls._encoder or _SentenceEncoder()
+    preds: List[str] = [""] * len(texts)
+    try:
+        for k in range(max(2, folds)):
+            held = [i for i in range(len(texts)) if i % max(2, folds) == k]
+            if not held:
+                continue
+            seeds = [(t, g) for i, (t, g) in enumerate(zip(texts, golds)) if i % max(2, folds) != k]
+            cls._index = _EmbeddingIndex(cls._encoder, seed_examples=seeds)
+            cls._classifier = cls._sentiment = None
+            for i, y in zip(held, predict_per_item_model(cls(), [texts[i] for i in held])):
+                preds[i] = y
+    finally:
+        cls._encoder, cls._index, cls._classifier, cls._sentiment = saved
+    return preds
+
 # ---- CLI + evaluation --------------------------------------------------------
 def parse_args() -> argparse.Namespace:
-    p = argparse.ArgumentParser(description="Evaluate zero-shot UX categorization via your HF Space (hf-direct).")
+    p = argparse.ArgumentParser(description="Evaluate UX categorization: raw Space zero-shot (hf-direct), the deployed HF Space model (hf), local embedding centroids (embed), or hf vs embed (compare).")
     p.add_argument("--data", required=True, help="Path to CSV with text + label columns.")
-    p.add_argument("--model", default="hf-direct", choices=["hf-direct"])
+    p.add_argument("--model", default="hf-direct", choices=["hf-direct", "hf", "embed", "compare"])
+    p.add_argument("--folds", type=int, default=5, help="Cross-validation folds for embed (seeds come from the CSV).")
     p.add_argument("--limit", type=int, default=None)
     p.add_argument("--debug", action="store_true")
     return p.parse_args()
 
+def _timed_predict(model: str, texts: List[str], golds: List[str], folds: int = 5) -> Tuple[List[str], float]:
+    t0 = time.perf_counter()
+    if model == "embed":
+        preds = predict_per_item_embed(texts, golds, folds)
+    elif model == "hf":
+        from models.hf_zero_shot import HFZeroShotModel
+        preds = predict_per_item_model(HFZeroShotModel(), texts)
+    else:
+        preds = predict_per_item_direct(texts)
+    return preds, time.perf_counter() - t0
+
 def main():
     args = parse_args()
     texts, golds_raw, info = read_labeled_csv(args.data, limit=args.limit)
@@ -168,7 +215,16 @@ def main():
     golds = [g.strip() for g in golds_raw]
     print("Gold label distribution:", Counter(golds))
 
-    preds = predict_per_item_direct(texts)
+    if args.model == "compare":
+        print("\nmodel        accuracy  macro-F1  seconds   items/s")
+        for name in ("hf", "embed"):
+            preds, secs = _timed_predict(name, texts, golds, args.folds)
+            f1 = f1_score(golds, preds, average='macro', labels=CANON_LABELS, zero_division=0)
+            print(f"{name:<12} {accuracy_score(golds, preds):>8.3f}  {f1:>8.3f}  {secs:>7.2f}  {len(texts) / max(secs, 1e-9):>8.1f}")
+        return
+
+    preds, secs = _timed_predict(args.model, texts, golds, args.folds)
+    print(f"Prediction time: {secs:.2f}s ({len(texts) / max(secs, 1e-9):.1f} items/s)")
 
     if args.debug:
         print("\nDEBUG: first 5 preds vs golds")
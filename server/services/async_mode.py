@@ -0,0 +1,80 @@
+# server/services/async_mode.py
+from __future__ import annotations
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, TypeVar
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Server concurrency model.
+#
+# threading (default): Werkzeug's threaded server, one OS thread per open
+# connection / long-poll. Simple, but a few hundred sockets per process
+# cost as many threads.
+#
+# eventlet: the standard library is monkey-patched before anything else is
+# imported (app.py calls patch() first) and Socket.IO runs on eventlet's
+# WSGI server, one green thread per connection. Once patched, socket I/O
+# cooperates: pymongo, `requests` in services/hf_client.py and the Firebase
+# key downloads yield to other green threads while they wait, and the
+# threading.Thread workers (move write-behind, key refresh, warmup) become
+# green threads. CPU-bound calls would still stall every connection, so
+# they go through offload(): eventlet's pool of real OS threads
+# (EVENTLET_THREADPOOL_SIZE, default 20) when patched, a plain call otherwise.
+# Production: gunicorn -k eventlet -w 1 app:app (one worker per process;
+# more processes need SOCKETIO_MESSAGE_QUEUE, see services/socket_queue.py).
+#
+#   SOCKETIO_ASYNC_MODE=threading   threading | eventlet
+# ---------------------------------------------------------------------
+MODE = os.getenv("SOCKETIO_ASYNC_MODE", "threading").strip().lower()
+MODES = ("threading", "eventlet")
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+stats = {"offloaded": 0, "inline": 0}
+
+
+def patch(mode: str = MODE) -> str:
+    """Monkey-patch the standard library for `mode`; call before other imports."""
+    if mode not in MODES:
+        raise ValueError(f"SOCKETIO_ASYNC_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    return mode
+
+
+def patched() -> bool:
+    """True when eventlet has patched the socket module in this process."""
+    if "eventlet" not in sys.modules:
+        return False
+    from eventlet import patcher
+    return patcher.is_monkey_patched("socket")
+
+
+def offload(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a CPU-bound / non-cooperative call without blocking the event loop:
+    in an OS thread when eventlet is patched in, inline otherwise.
+    """
+    if patched():
+        from eventlet import tpool
+        with _lock:
+            stats["offloaded"] += 1
+        return tpool.execute(fn, *args, **kwargs)
+    with _lock:
+        stats["inline"] += 1
+    return fn(*args, **kwargs)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {**stats, "mode": MODE, "patched": patched()}
+
+
+metrics.register("async_mode", snapshot)
+
+__all__ = ["patch", "patched", "offload", "snapshot", "MODE", "MODES"]
@@ -0,0 +1,184 @@
+# server/services/batch_tuner.py
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Configuration
+#   ADAPTIVE_BATCHING=0         -> always use the env caps (old behaviour)
+#   ADAPTIVE_TARGET_LATENCY_S   -> per-item latency above which we back off
+# BATCH_SA / BATCH_ZSC / BATCH_DELIGHT / HF_CONCURRENCY are the *caps*;
+# the controller never goes above them.
+# ---------------------------------------------------------------------
+ADAPTIVE_ENABLED = os.getenv("ADAPTIVE_BATCHING", "1") == "1"
+TARGET_ITEM_LATENCY_S = float(os.getenv("ADAPTIVE_TARGET_LATENCY_S", "5.0"))
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease tuner for one Space endpoint.
+
+    Every finished call reports (items, elapsed, error/timeout). Healthy calls
+    grow batch size by one step (then concurrency once batch hits its cap);
+    errors, timeouts or slow per-item latency cut the current settings in half.
+    Increases are held while throughput is worse than before the last increase.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_batch: int,
+        max_concurrency: int = 1,
+        min_batch: int = 1,
+        target_latency: float = TARGET_ITEM_LATENCY_S,
+        backoff: float = 0.5,
+        alpha: float = 0.3,
+        throughput_tolerance: float = 0.15,
+        enabled: bool = ADAPTIVE_ENABLED,
+    ):
+        self.name = name
+        self.max_batch = max(1, int(max_batch))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_batch = max(1, min(int(min_batch), self.max_batch))
+        self.target_latency = float(target_latency)
+        self.backoff = float(backoff)
+        self.alpha = float(alpha)
+        self.throughput_tolerance = float(throughput_tolerance)
+        self.enabled = enabled
+
+        # start from the configured batch size (known-good) and a single worker
+        self._batch = self.max_batch
+        self._concurrency = 1
+        self._lock = threading.Lock()
+
+        self._latency_ewma: float | None = None      # seconds per item
+        self._throughput_ewma: float | None = None   # items per second
+        self._throughput_before_increase: float | None = None
+        self.calls = 0
+        self.items = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.last_decision = "init"
+
+    def settings(self) -> Tuple[int, int]:
+        """Current (batch_size, concurrency)."""
+        if not self.enabled:
+            return self.max_batch, 1
+        with self._lock:
+            return self._batch, self._concurrency
+
+    def _ewma(self, prev: float | None, value: float) -> float:
+        return value if prev is None else (self.alpha * value + (1.0 - self.alpha) * prev)
+
+    def record(self, n_items: int, elapsed: float, *, error: bool = False, timeout: bool = False) -> None:
+        """Feed one finished call back into the controller."""
+        n_items = max(0, int(n_items))
+        elapsed = max(1e-6, float(elapsed))
+        with self._lock:
+            self.calls += 1
+            self.items += n_items
+            if timeout:
+                self.timeouts += 1
+            if error or timeout:
+                self.errors += 1
+                self._decrease(both=True)
+                self.last_decision = "decrease:timeout" if timeout else "decrease:error"
+                return
+
+            if n_items:
+                self._latency_ewma = self._ewma(self._latency_ewma, elapsed / n_items)
+                self._throughput_ewma = self._ewma(self._throughput_ewma, n_items / elapsed)
+
+            if not self.enabled:
+                self.last_decision = "fixed"
+                return
+
+            if self._latency_ewma is not None and self._latency_ewma > self.target_latency:
+                self._decrease(both=False)
+                self.last_decision = "decrease:latency"
+                return
+
+            before = self._throughput_before_increase
+            if (
+                before is not None
+                and self._throughput_ewma is not None
+                and self._throughput_ewma < before * (1.0 - self.throughput_tolerance)
+            ):
+                self.last_decision = "hold:throughput"
+                return
+            self._increase()
+
+    # -- caller holds self._lock --
+    def _decrease(self, *, both: bool) -> None:
+        # shed concurrency first (it is what overloads the Space), then batch
+        shrink_batch = both or self._concurrency == 1
+        self._concurrency = max(1, int(self._concurrency * self.backoff))
+        if shrink_batch:
+            self._batch = max(self.min_batch, int(self._batch * self.backoff))
+        self._throughput_before_increase = None
+
+    def _increase(self) -> None:
+        if self._batch < self.max_batch:
+            self._batch += 1
+        elif self._concurrency < self.max_concurrency:
+            self._concurrency += 1
+        else:
+            self.last_decision = "hold:cap"
+            return
+        self._throughput_before_increase = self._throughput_ewma
+        self.last_decision = "increase"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "batch_size": self._batch if self.enabled else self.max_batch,
+                "concurrency": self._concurrency if self.enabled else 1,
+                "max_batch": self.max_batch,
+                "max_concurrency": self.max_concurrency,
+                "latency_per_item_s": self._latency_ewma,
+                "throughput_items_s": self._throughput_ewma,
+                "calls": self.calls,
+                "items": self.items,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "last_decision": self.last_decision,
+            }
+
+
+# ---------------------------------------------------------------------
+# Process-wide registry (one controller per endpoint)
+# ---------------------------------------------------------------------
+_registry_lock = threading.Lock()
+_controllers: Dict[str, AIMDController] = {}
+
+
+def get_controller(name: str, *, max_batch: int, max_concurrency: int = 1) -> AIMDController:
+    """Return the shared controller for `name`, creating it with the given caps on first use."""
+    with _registry_lock:
+        ctrl = _controllers.get(name)
+        if ctrl is None:
+            ctrl = AIMDController(name, max_batch=max_batch, max_concurrency=max_concurrency)
+            _controllers[name] = ctrl
+        return ctrl
+
+
+def reset_controllers() -> None:
+    """Forget all learned settings (tests, or after redeploying the Space)."""
+    with _registry_lock:
+        _controllers.clear()
+
+
+def _metrics() -> Dict[str, Any]:
+    with _registry_lock:
+        ctrls = list(_controllers.values())
+    return {c.name: c.snapshot() for c in ctrls}
+
+
+metrics.register("batching", _metrics)
+
+__all__ = ["AIMDController", "get_controller", "reset_controllers"]
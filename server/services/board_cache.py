@@ -0,0 +1,350 @@
+# server/services/board_cache.py
+from __future__ import annotations
+import bisect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.spatial import BBox, GridIndex, contains, coord
+
+# ---------------------------------------------------------------------
+# Per-board note snapshots kept in memory.
+#
+# The first read of a board loads it from Mongo; after that note_service
+# applies every successful write (create / edit / move / delete, single
+# or bulk) to the cached copy in place, under the same per-board lock that
+# orders the Mongo writes, so joins and GET /api/notes never re-query a
+# board that is already cached. Concurrent misses on one board share a
+# single query (a class joining at once). Idle boards are evicted least recently
+# used once the estimated size of all snapshots passes BOARD_CACHE_MB.
+#
+# The cache only sees writes made by this process: with several server
+# processes writing the same boards, disable it (or share writes between
+# them) or snapshots go stale.
+#
+#   BOARD_CACHE_MB=64        memory budget for snapshots (0 disables the cache)
+#   BOARD_CACHE_VERIFY=0     1: also query Mongo on every hit and count/repair
+#                            mismatches (tests / debugging; no savings)
+# ---------------------------------------------------------------------
+CACHE_MB = float(os.getenv("BOARD_CACHE_MB", "64"))
+VERIFY = os.getenv("BOARD_CACHE_VERIFY", "0") == "1"
+
+log = logging.getLogger(__name__)
+
+Note = Dict[str, Any]
+
+
+def note_size(note: Note) -> int:
+    """Rough in-memory cost of one cached note (JSON length + dict overhead)."""
+    return len(json.dumps(note, default=str, separators=(",", ":"))) + 200
+
+
+def _copy(note: Note) -> Note:
+    # one level deeper than dict(): the caller may keep using note["user"]
+    return {k: (dict(v) if isinstance(v, dict) else v) for k, v in note.items()}
+
+
+def _by_id(notes: Iterable[Note]) -> Dict[Any, Note]:
+    return {n.get("id"): n for n in notes}
+
+
+class _Board:
+    # Notes are never mutated once stored (a write stores a new dict), so
+    # readers share `view` instead of copying every note per read. `ids`
+    # (sorted, for paging) only changes when a note is added or removed.
+    __slots__ = ("notes", "bytes", "_view", "_ids", "_grid")
+
+    def __init__(self, notes: Iterable[Note]):
+        self.notes: Dict[Any, Note] = {}
+        self.bytes = 0
+        self._view: Optional[List[Note]] = None
+        self._ids: Optional[List[Any]] = None
+        self._grid: Optional[GridIndex] = None        # built by the first bbox query
+        for n in notes:
+            self.put(n)
+
+    def view(self) -> List[Note]:
+        if self._view is None:
+            self._view = list(self.notes.values())
+        return self._view
+
+    def ids(self) -> List[Any]:
+        if self._ids is None:
+            self._ids = sorted(self.notes)
+        return self._ids
+
+    def page(self, after: Any, limit: int) -> List[Note]:
+        ids = self.ids()
+        start = 0 if after is None else bisect.bisect_right(ids, after)
+        return [self.notes[note_id] for note_id in ids[start:start + limit]]
+
+    def grid(self) -> GridIndex:
+        if self._grid is None:
+            self._grid = GridIndex()
+            for note_id, n in self.notes.items():
+                self._grid.put(note_id, n.get("x"), n.get("y"))
+        return self._grid
+
+    def put(self, note: Note) -> int:
+        old = self.notes.get(note.get("id"))
+        size = note_size(note)
+        self.notes[note.get("id")] = note
+        self._view = None
+        if old is None:
+            self._ids = None
+        if self._grid is not None:
+            self._grid.put(note.get("id"), note.get("x"), note.get("y"))
+        delta = size - (note_size(old) if old is not None else 0)
+        self.bytes += delta
+        return delta
+
+    def pop(self, note_id: Any) -> int:
+        old = self.notes.pop(note_id, None)
+        if old is None:
+            return 0
+        self._view = None
+        self._ids = None
+        if self._grid is not None:
+            self._grid.remove(note_id)
+        size = note_size(old)
+        self.bytes -= size
+        return -size
+
+
+class _Load:
+    """One in-flight board query; concurrent readers of the board wait on it."""
+    __slots__ = ("done", "writes", "stored")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.writes = 0          # writes to the board seen while the query ran
+        self.stored = False
+
+
+class BoardCache:
+    """Thread-safe LRU of board snapshots, bounded by estimated bytes."""
+
+    def __init__(self, loader: Callable[[str], List[Note]], max_bytes: int = int(CACHE_MB * 1024 * 1024),
+                 verify: bool = VERIFY):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._boards: "OrderedDict[str, _Board]" = OrderedDict()
+        self._bytes = 0
+        self._loading: Dict[str, _Load] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "loads_discarded": 0, "evictions": 0,
+                      "too_large": 0, "writes_applied": 0, "verify_mismatches": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    # ---- reads ----
+    def get(self, board_id: str) -> List[Note]:
+        """
+        Notes of a board, loading and caching the board on a miss. The note
+        dicts are shared with the cache and other readers: treat them as
+        read-only (serialize them, don't modify them).
+        """
+        if not self.enabled:
+            return self.loader(board_id)
+        while True:
+            with self._lock:
+                board = self._boards.get(board_id)
+                if board is not None:
+                    self._boards.move_to_end(board_id)
+                    self.stats["hits"] += 1
+                    notes = list(board.view())
+                    break
+                load = self._loading.get(board_id)
+                owner = load is None
+                if owner:
+                    load = self._loading[board_id] = _Load()
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+            if owner:
+                return self._load(board_id, load)
+            load.done.wait()
+            if not load.stored:
+                return self.loader(board_id)     # the shared query failed or raced a write
+        return self._verified(board_id, notes) if self.verify else notes
+
+    def _load(self, board_id: str, load: _Load) -> List[Note]:
+        notes = None
+        try:
+            notes = self.loader(board_id)
+        finally:
+            with self._lock:
+                self._loading.pop(board_id, None)
+                if notes is not None:
+                    if load.writes:
+                        # a write raced the query; the result may predate it
+                        self.stats["loads_discarded"] += 1
+                    else:
+                        load.stored = self._store(board_id, _Board(_copy(n) for n in notes))
+            load.done.set()
+        return notes
+
+    def query_bbox(self, board_id: str, bbox: BBox) -> List[Note]:
+        """Notes of a board inside `bbox` (grid lookup once the board is cached), ordered by id."""
+        notes = self.get(board_id)
+        with self._lock:
+            board = self._boards.get(board_id)
+            if board is not None and not self.verify:
+                grid = board.grid()
+                hits = [board.notes[nid] for nid in grid.query(bbox)]
+                return sorted(hits, key=lambda n: str(n.get("id")))
+        # not cacheable (too large / disabled / raced a write): filter what was loaded
+        return sorted((n for n in notes if contains(bbox, n.get("x"), n.get("y"))), key=lambda n: str(n.get("id")))
+
+    def page(self, board_id: str, after: Any = None, limit: int = 500) -> List[Note]:
+        """
+        Up to `limit` notes of a board with id > `after` (from the start when
+        None), ordered by id: a bisect into the cached board's sorted ids.
+        """
+        if self.enabled and not self.verify:
+            with self._lock:
+                board = self._boards.get(board_id)
+                if board is not None:
+                    self._boards.move_to_end(board_id)
+                    self.stats["hits"] += 1
+                    return board.page(after, limit)
+        notes = self.get(board_id)
+        with self._lock:
+            board = self._boards.get(board_id)
+            if board is not None and not self.verify:
+                return board.page(after, limit)
+        # not cacheable (too large / disabled / raced a write): page what was loaded
+        notes = sorted(notes, key=lambda n: n["id"])
+        if after is not None:
+            notes = [n for n in notes if n["id"] > after]
+        return notes[:limit]
+
+    def positions(self, board_id: str, note_ids: Iterable[Any]) -> Dict[Any, Tuple[float, float]]:
+        """Cached (x, y) of these notes; never loads the board."""
+        out: Dict[Any, Tuple[float, float]] = {}
+        with self._lock:
+            board = self._boards.get(board_id)
+            if board is None:
+                return out
+            for note_id in note_ids:
+                n = board.notes.get(note_id)
+                if n is not None:
+                    x, y = coord(n.get("x")), coord(n.get("y"))
+                    if x is not None and y is not None:
+                        out[note_id] = (x, y)
+        return out
+
+    def _verified(self, board_id: str, cached: List[Note]) -> List[Note]:
+        fresh = self.loader(board_id)
+        want = _by_id(fresh)
+        if _by_id(cached) == want:
+            return cached
+        log.warning("[board_cache] snapshot of %s differs from Mongo (%d cached / %d stored notes)",
+                    board_id, len(cached), len(fresh))
+        with self._lock:
+            self.stats["verify_mismatches"] += 1
+            self._store(board_id, _Board(_copy(n) for n in fresh))
+        return fresh
+
+    # ---- writes (called by note_service after Mongo accepted them) ----
+    def _touch(self, board_id: str) -> Optional[_Board]:
+        # caller holds self._lock
+        load = self._loading.get(board_id)
+        if load is not None:
+            load.writes += 1
+        return self._boards.get(board_id)
+
+    def upsert(self, board_id: str, notes: Iterable[Note]) -> None:
+        with self._lock:
+            board = self._touch(board_id)
+            if board is None:
+                return
+            for n in notes:
+                self._bytes += board.put(_copy(n))
+                self.stats["writes_applied"] += 1
+            self._trim()
+
+    def patch(self, board_id: str, changes: Dict[Any, Dict[str, Any]]) -> None:
+        """{note_id: fields} merged into notes that are cached (unknown ids are ignored)."""
+        with self._lock:
+            board = self._touch(board_id)
+            if board is None:
+                return
+            for note_id, fields in changes.items():
+                old = board.notes.get(note_id)
+                if old is not None:
+                    self._bytes += board.put(_copy({**old, **fields}))
+                    self.stats["writes_applied"] += 1
+            self._trim()
+
+    def remove(self, board_id: str, note_ids: Iterable[Any]) -> None:
+        with self._lock:
+            board = self._touch(board_id)
+            if board is None:
+                return
+            for note_id in note_ids:
+                self._bytes += board.pop(note_id)
+                self.stats["writes_applied"] += 1
+
+    def invalidate(self, board_id: str) -> None:
+        """Forget one board; the next read reloads it."""
+        with self._lock:
+            self._touch(board_id)
+            self._drop(board_id)
+
+    # ---- bookkeeping (caller holds self._lock) ----
+    def _store(self, board_id: str, board: _Board) -> bool:
+        if board.bytes > self.max_bytes:
+            self.stats["too_large"] += 1
+            return False
+        self._drop(board_id)
+        self._boards[board_id] = board
+        self._bytes += board.bytes
+        self._trim()
+        return board_id in self._boards
+
+    def _drop(self, board_id: str) -> None:
+        board = self._boards.pop(board_id, None)
+        if board is not None:
+            self._bytes -= board.bytes
+
+    def _trim(self) -> None:
+        while self._bytes > self.max_bytes and self._boards:
+            _, board = self._boards.popitem(last=False)
+            self._bytes -= board.bytes
+            self.stats["evictions"] += 1
+
+    def cached(self, board_id: str) -> bool:
+        with self._lock:
+            return board_id in self._boards
+
+    def clear(self) -> None:
+        with self._lock:
+            for load in self._loading.values():
+                load.writes += 1
+            self._boards.clear()
+            self._bytes = 0
+            for k in self.stats:
+                self.stats[k] = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            looked_up = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "boards": len(self._boards),
+                "notes": sum(len(b.notes) for b in self._boards.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self.stats["hits"] / looked_up) if looked_up else None,
+                "verify": self.verify,
+            }
+
+
+__all__ = ["BoardCache", "note_size", "CACHE_MB", "VERIFY"]
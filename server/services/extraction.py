@@ -0,0 +1,659 @@
+# server/services/extraction.py
+from __future__ import annotations
+import atexit
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
+from xml.etree import ElementTree
+
+from services import async_mode, metrics
+
+# optional deps (safe imports)
+try:
+    import pdfplumber
+except Exception:
+    pdfplumber = None  # type: ignore
+try:
+    import PyPDF2
+except Exception:
+    PyPDF2 = None  # type: ignore
+try:
+    from docx import Document
+except Exception:
+    Document = None  # type: ignore
+
+# ---------------------------------------------------------------------
+# Single extraction engine shared by models/preprocess (analyze_inputs)
+# and services/ux_report_service (route layer).
+#
+# Answers are found in ONE pass over the lines of the document:
+#   - "A:" / "Answer:" / "Ans:" starts an answer; following non-blank lines
+#     continue it until a blank line or the next Q:/A: marker
+#   - "Overall, ..." / "But overall: ..." / "On the positive side, ..." lines
+#     are answers too (closing remarks without an A: prefix)
+#   - when a document has no markers at all, it falls back to sentences
+# Answers are cleaned (hyphenated line breaks joined, whitespace collapsed,
+# surrounding quotes trimmed) and de-duplicated case-insensitively, and are
+# produced lazily so callers can stop early (e.g. the 500-item cap).
+# ---------------------------------------------------------------------
+# bump when a change here alters the answers produced for the same file
+# (invalidates services/extraction_cache entries)
+EXTRACTOR_VERSION = 3
+
+ANSWER_MARKER_RE = re.compile(r"\s*(?:A|Answer|Ans)\s*:\s*(.*)", re.IGNORECASE)
+QUESTION_MARKER_RE = re.compile(r"\s*(?:Q|Question)\s*:", re.IGNORECASE)
+OVERALL_RE = re.compile(r"\s*(?:But\s+overall|Overall|On the positive side)\s*[:,]\s*(.+?)\s*$", re.IGNORECASE)
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(“\"'])")
+_WS_RE = re.compile(r"\s+")
+_QUOTES = " \t\"“”'’"
+# first characters that can start a marker / overall line (cheap pre-check before regexes)
+_MARKER_START = frozenset("AaQqBbOo")
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of `text` (\\n, \\r\\n or \\r endings) without building a list."""
+    if not text:
+        return
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    pos, n = 0, len(text)
+    while pos < n:
+        nl = text.find("\n", pos)
+        if nl == -1:
+            yield text[pos:]
+            return
+        yield text[pos:nl]
+        pos = nl + 1
+
+
+def iter_page_lines(pages: Iterable[str]) -> Iterator[str]:
+    """Flatten page (or paragraph) texts into lines, page breaks acting like newlines."""
+    for page in pages:
+        yield from iter_lines(page or "")
+
+
+def clean_answer(parts: Iterable[str]) -> str:
+    """Join answer lines: 'dash-' + 'board' -> 'dashboard', collapse spaces, trim quotes."""
+    joined = ""
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if len(joined) > 1 and joined[-1] == "-" and joined[-2].isalnum() and part[0].isalnum():
+            joined = joined[:-1] + part
+        else:
+            joined = f"{joined} {part}" if joined else part
+    return _WS_RE.sub(" ", joined).strip(_QUOTES)
+
+
+def _scan(lines: Iterable[str]) -> Iterator[str]:
+    """One pass over lines -> raw (cleaned, not yet de-duplicated) answers."""
+    current: Optional[List[str]] = None      # lines of the answer being read
+    fallback: Optional[List[str]] = []       # kept only until the first marker is seen
+
+    for line in lines:
+        head = line.lstrip()[:1]
+        m = ANSWER_MARKER_RE.match(line) if head in _MARKER_START else None
+        if m:
+            if current is not None:
+                yield clean_answer(current)
+            current = [m.group(1)]
+            fallback = None
+            continue
+
+        if fallback is not None:
+            fallback.append(line)
+            continue
+
+        if not head or (head in _MARKER_START and QUESTION_MARKER_RE.match(line)):
+            if current is not None:
+                yield clean_answer(current)
+            current = None
+            continue
+
+        o = OVERALL_RE.match(line) if head in _MARKER_START else None
+        if o:
+            if current is not None:
+                yield clean_answer(current)
+            current = None
+            yield clean_answer([o.group(1)])
+            continue
+
+        if current is not None:
+            current.append(line)
+
+    if current is not None:
+        yield clean_answer(current)
+
+    if fallback:
+        # no markers anywhere: prefer sentence splits, fall back to lines
+        text = "\n".join(fallback).strip()
+        sentences = SENTENCE_SPLIT_RE.split(text)
+        if len(sentences) < 2:
+            sentences = text.split("\n")
+        for s in sentences:
+            yield clean_answer(iter_lines(s))
+
+
+def dedupe(items: Iterable[str], seen: Optional[Set[str]] = None) -> Iterator[str]:
+    """Drop empties and case-insensitive repeats, keeping first-seen order."""
+    seen = set() if seen is None else seen
+    for s in items:
+        key = s.lower()
+        if s and key not in seen:
+            seen.add(key)
+            yield s
+
+
+def iter_answers(lines: Iterable[str], *, limit: Optional[int] = None,
+                 seen: Optional[Set[str]] = None) -> Iterator[str]:
+    """Cleaned, de-duplicated answers from an iterable of lines (lazy)."""
+    out = dedupe(_scan(lines), seen)
+    return islice(out, limit) if limit is not None else out
+
+
+def iter_answers_from_text(text: str, *, limit: Optional[int] = None,
+                           seen: Optional[Set[str]] = None) -> Iterator[str]:
+    return iter_answers(iter_lines(text or ""), limit=limit, seen=seen)
+
+
+# ---------------------------------------------------------------------
+# Document -> text
+#
+# A document source is either the raw bytes or the path of a spooled
+# upload (services/uploads). Paths are memory-mapped, never read whole,
+# and pages / paragraphs / lines are produced lazily.
+# ---------------------------------------------------------------------
+Source = Union[bytes, bytearray, str, "os.PathLike[str]"]
+
+
+@contextmanager
+def open_source(source: Source, *, mapped: bool = True):
+    """
+    Seekable binary stream over `source`: BytesIO for bytes, a read-only mmap
+    for a path (or the plain file with mapped=False, e.g. for zipfile, which
+    wants a real file object and only reads the parts it needs anyway).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+        return
+    with open(source, "rb") as f:
+        if not mapped:
+            yield f
+            return
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+
+# PDF pages are extracted in a process pool for large documents:
+#   PDF_WORKERS=4              pool size (<=1 keeps everything in-process)
+#   PDF_PARALLEL_MIN_PAGES=24  below this page count, stay in-process (no pool overhead)
+#   PDF_PAGES_PER_TASK=8       contiguous pages handed to one worker task
+# At most 2 x PDF_WORKERS page ranges are in flight per document, so a
+# consumer that stops early (500-answer cap) leaves little work behind and
+# finished pages never pile up in memory.
+#
+# The workers are forked (spawn / forkserver would re-import app.py in each
+# of them) and forking a process that already runs threads, or that eventlet
+# has patched, can leave children stuck on inherited locks. start_pool()
+# therefore forks them all up front, and app.py calls it right after
+# async_mode.patch(), before any other thread starts. Under eventlet there is
+# no pool and PDFs are extracted in-process, as they are wherever the pool
+# could not be started in time.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def start_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """
+    Fork the PDF workers now, while this process is single-threaded. Returns
+    the pool, or None when it is disabled or can no longer be forked safely.
+    """
+    global _pool
+    workers = PDF_WORKERS if workers is None else workers
+    with _pool_lock:
+        if _pool is None:
+            if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+                return None
+            if async_mode.patched():
+                log.info("[extraction] eventlet mode: PDFs are extracted in-process")
+                return None
+            if threading.active_count() > 1:
+                log.warning("[extraction] not forking PDF workers from a threaded process; extracting in-process")
+                return None
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            # a fork-context pool launches every worker on its first task
+            _pool.submit(int).result()
+        return _pool
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    return _pool if _pool is not None else start_pool()
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Engine strategy. pdfplumber's layout analysis is several times slower than
+# PyPDF2's text extraction and plain Q/A transcripts do not need it, so a
+# cheap probe of the first pages with PyPDF2 decides per document:
+#   PDF_ENGINE=auto            auto | fast (PyPDF2) | layout (pdfplumber)
+#   PDF_PROBE_PAGES=2          pages read by the probe
+#   PDF_PROBE_MIN_MARKERS=2    answer markers the probe must find (capped at the pages probed)
+# Whichever engine is chosen, a page it fails on is retried with the other.
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto").strip().lower()
+PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", "2"))
+PDF_PROBE_MIN_MARKERS = int(os.getenv("PDF_PROBE_MIN_MARKERS", "2"))
+FAST_ENGINE = "pypdf2"
+LAYOUT_ENGINE = "pdfplumber"
+# PyPDF2 sometimes drops inter-word spacing ("Thedashboardwasslow"): escalate when words look glued
+_MAX_AVG_WORD_LEN = 15.0
+
+log = logging.getLogger(__name__)
+
+
+class _EngineReader:
+    """Lazily opened page reader for one engine over a shared seekable stream."""
+
+    def __init__(self, engine: str, stream):
+        self.engine = engine
+        self._stream = stream
+        self._doc = None
+        self._failed = (PyPDF2 if engine == FAST_ENGINE else pdfplumber) is None
+
+    @property
+    def opened(self) -> bool:
+        return self._doc is not None
+
+    def _open(self):
+        if self._doc is None and not self._failed:
+            try:
+                self._stream.seek(0)
+                if self.engine == FAST_ENGINE:
+                    self._doc = PyPDF2.PdfReader(self._stream)
+                else:
+                    self._doc = pdfplumber.open(self._stream)
+            except Exception:
+                self._failed = True
+        return self._doc
+
+    def page_text(self, i: int) -> Optional[str]:
+        doc = self._open()
+        if doc is None:
+            return None
+        try:
+            return doc.pages[i].extract_text() or ""
+        except Exception:
+            return None
+
+    def close(self) -> None:
+        if self._doc is not None and self.engine == LAYOUT_ENGINE:
+            self._doc.close()
+        self._doc = None
+
+
+def _other_engine(engine: str) -> str:
+    return LAYOUT_ENGINE if engine == FAST_ENGINE else FAST_ENGINE
+
+
+def _pdf_page_count(stream) -> int:
+    if PyPDF2 is not None:
+        try:
+            return len(PyPDF2.PdfReader(stream).pages)
+        except Exception:
+            stream.seek(0)
+    if pdfplumber is not None:
+        with pdfplumber.open(stream) as pdf:
+            return len(pdf.pages)
+    raise RuntimeError("Unable to extract text from PDF.")
+
+
+def _fast_engine_is_enough(stream, n_pages: int) -> bool:
+    """Probe the first pages with PyPDF2: enough answer markers and words that are not glued."""
+    pages = min(PDF_PROBE_PAGES, n_pages)
+    if pages <= 0:
+        return False
+    try:
+        stream.seek(0)
+        reader = PyPDF2.PdfReader(stream)
+        markers = words = chars = 0
+        for i in range(pages):
+            text = reader.pages[i].extract_text() or ""
+            markers += sum(1 for line in iter_lines(text) if ANSWER_MARKER_RE.match(line))
+            tokens = text.split()
+            words += len(tokens)
+            chars += sum(len(t) for t in tokens)
+    except Exception:
+        return False
+    if not words or chars / words > _MAX_AVG_WORD_LEN:
+        return False
+    return markers >= min(PDF_PROBE_MIN_MARKERS, pages)
+
+
+def choose_pdf_engine(stream, n_pages: int, mode: Optional[str] = None) -> str:
+    """FAST_ENGINE or LAYOUT_ENGINE for this document (mode: auto | fast | layout | engine name)."""
+    mode = (mode or PDF_ENGINE).lower()
+    if mode in ("fast", FAST_ENGINE):
+        return FAST_ENGINE if PyPDF2 is not None else LAYOUT_ENGINE
+    if mode in ("layout", LAYOUT_ENGINE):
+        return LAYOUT_ENGINE if pdfplumber is not None else FAST_ENGINE
+    if PyPDF2 is None:
+        return LAYOUT_ENGINE
+    if pdfplumber is None:
+        return FAST_ENGINE
+    return FAST_ENGINE if _fast_engine_is_enough(stream, n_pages) else LAYOUT_ENGINE
+
+
+def _iter_page_range(source: Source, start: int, end: int, engine: str = LAYOUT_ENGINE) -> Iterator[str]:
+    """Text of pages [start, end) with `engine`; a page it fails on is retried with the other engine."""
+    with open_source(source) as stream:
+        primary = _EngineReader(engine, stream)
+        backup = _EngineReader(_other_engine(engine), stream)
+        try:
+            for i in range(start, end):
+                text = primary.page_text(i)
+                if text is None:
+                    text = backup.page_text(i)
+                if text is None:
+                    if not (primary.opened or backup.opened):
+                        raise RuntimeError("Unable to extract text from PDF.")
+                    text = ""
+                yield text
+        finally:
+            primary.close()
+            backup.close()
+            del primary, backup
+
+
+def _extract_page_range(path: str, start: int, end: int, engine: str = LAYOUT_ENGINE) -> List[str]:
+    """Process-pool task: map the spooled PDF and extract a page range."""
+    return list(_iter_page_range(path, start, end, engine))
+
+
+def _iter_pages_parallel(pool: ProcessPoolExecutor, source: Source, n_pages: int, engine: str,
+                         window: Optional[int] = None) -> Iterator[str]:
+    path, tmp = source, None
+    if isinstance(source, (bytes, bytearray)):
+        fd, tmp = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        path = tmp
+    step = max(1, PDF_PAGES_PER_TASK)
+    window = max(1, window or 2 * PDF_WORKERS)
+    ranges = iter(range(0, n_pages, step))
+    in_flight: "deque[Any]" = deque()
+    def submit_next() -> None:
+        i = next(ranges, None)
+        if i is not None:
+            in_flight.append(pool.submit(_extract_page_range, os.fspath(path), i, min(i + step, n_pages), engine))
+
+    try:
+        for _ in range(window):
+            submit_next()
+        while in_flight:                 # in page order; the next range goes out as one comes back
+            # a blocking wait: in an OS thread under eventlet
+            pages = async_mode.offload(in_flight.popleft().result)
+            submit_next()
+            yield from pages
+    finally:
+        for fut in in_flight:            # the consumer stopped early: drop what has not started
+            fut.cancel()
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+class _PdfStats:
+    """Per-engine document/page/time counters plus the most recent uploads (for /metrics)."""
+
+    def __init__(self, recent: int = 20):
+        self._lock = threading.Lock()
+        self.recent: "deque[Dict[str, Any]]" = deque(maxlen=recent)
+        self._reset()
+
+    def _reset(self) -> None:
+        self.engines = {e: {"documents": 0, "pages": 0, "seconds": 0.0} for e in (FAST_ENGINE, LAYOUT_ENGINE)}
+        self.probes = 0
+        self.probe_seconds = 0.0
+        self.escalations = 0
+        self.recent.clear()
+
+    def record(self, info: Dict[str, Any]) -> None:
+        with self._lock:
+            e = self.engines[info["engine"]]
+            e["documents"] += 1
+            e["pages"] += info["pages_read"]
+            e["seconds"] += info["extract_s"]
+            if info["mode"] == "auto" and PyPDF2 is not None and pdfplumber is not None:
+                self.probes += 1
+                self.probe_seconds += info["probe_s"]
+                self.escalations += info["engine"] == LAYOUT_ENGINE
+            self.recent.append(dict(info))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": PDF_ENGINE,
+                "engines": {k: dict(v) for k, v in self.engines.items()},
+                "probes": self.probes,
+                "probe_seconds": round(self.probe_seconds, 4),
+                "escalations": self.escalations,
+                "recent": list(self.recent),
+            }
+
+
+_pdf_stats = _PdfStats()
+metrics.register("pdf_extraction", _pdf_stats.snapshot)
+
+
+def _timed_pages(pages: Iterator[str], info: Dict[str, Any]) -> Iterator[str]:
+    """Pass pages through, timing only the extraction (not the consumer) and recording it at the end."""
+    spent, n = 0.0, 0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                text = next(pages)
+            except StopIteration:
+                break
+            finally:
+                spent += time.perf_counter() - t0
+            n += 1
+            yield text
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
+        info.update(pages_read=n, extract_s=round(spent, 4))
+        _pdf_stats.record(info)
+        log.info("[extraction] pdf engine=%s pages=%d/%d probe=%.3fs extract=%.3fs",
+                 info["engine"], n, info["pages"], info["probe_s"], spent)
+
+
+def iter_pdf_pages(source: Source, *, workers: Optional[int] = None,
+                   engine: Optional[str] = None) -> Iterator[str]:
+    """
+    Page texts in order. The engine is picked per document (see PDF_ENGINE);
+    small documents are read in-process, large ones are split into page
+    ranges and extracted by the process pool. Opening, counting pages and
+    probing happen eagerly, so unreadable files fail here.
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    mode = (engine or PDF_ENGINE).lower()
+    with open_source(source) as stream:
+        n_pages = _pdf_page_count(stream)
+        t0 = time.perf_counter()
+        chosen = choose_pdf_engine(stream, n_pages, mode)
+        probe_s = time.perf_counter() - t0
+    info = {"engine": chosen, "mode": mode, "pages": n_pages, "probe_s": round(probe_s, 4)}
+    pool = _get_pool() if workers > 1 and n_pages >= PDF_PARALLEL_MIN_PAGES else None
+    if pool is not None:
+        return _timed_pages(_iter_pages_parallel(pool, source, n_pages, chosen, 2 * workers), info)
+    return _timed_pages(_iter_page_range(source, 0, n_pages, chosen), info)
+
+
+def extract_text_from_pdf_bytes(data: Source) -> str:
+    return "\n".join(iter_pdf_pages(data)).strip()
+
+
+def _require_docx() -> None:
+    if Document is None:
+        raise RuntimeError("python-docx not installed.")
+
+
+# DOCX: paragraphs are streamed out of word/document.xml with iterparse,
+# clearing each finished body element, instead of building python-docx's
+# full object tree. python-docx stays as the fallback for odd files.
+_DOCX_BODY_XML = "word/document.xml"
+
+
+def _xml_local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_docx_xml_paragraphs(xml_stream) -> Iterator[str]:
+    """Paragraph texts from a document.xml stream (body and table-cell paragraphs, in order)."""
+    ns = ""
+    body = None
+    depth = 0               # element depth: document=1, body=2, body children=3
+    p_open = 0              # nesting of w:p (text boxes can hold paragraphs)
+    for event, elem in ElementTree.iterparse(xml_stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                ns = elem.tag[:-len(_xml_local(elem.tag))]      # transitional or strict namespace
+            elif depth == 2 and elem.tag == ns + "body":
+                body = elem
+            if elem.tag == ns + "p":
+                p_open += 1
+            continue
+
+        depth -= 1
+        if elem.tag == ns + "p":
+            p_open -= 1
+            if p_open == 0:
+                parts = []
+                for node in elem.iter():
+                    tag = node.tag
+                    if tag == ns + "t":
+                        parts.append(node.text or "")
+                    elif tag == ns + "tab":
+                        parts.append("\t")
+                    elif tag in (ns + "br", ns + "cr"):
+                        parts.append("\n")
+                yield "".join(parts)
+        if depth == 2 and body is not None:
+            body.clear()    # finished top-level paragraph/table: drop it
+
+
+def iter_docx_paragraphs(source: Source) -> Iterator[str]:
+    with open_source(source, mapped=False) as stream:
+        try:
+            archive: Optional[zipfile.ZipFile] = zipfile.ZipFile(stream)
+        except (zipfile.BadZipFile, OSError):
+            archive = None
+        if archive is not None:
+            with archive:
+                if _DOCX_BODY_XML in archive.NameToInfo:
+                    produced = False
+                    try:
+                        with archive.open(_DOCX_BODY_XML) as xml:
+                            for text in _iter_docx_xml_paragraphs(xml):
+                                produced = True
+                                yield text
+                        return
+                    except ElementTree.ParseError:
+                        if produced:
+                            raise
+        # odd file (no document.xml, broken XML, not a plain zip): let python-docx try
+        _require_docx()
+        stream.seek(0)
+        doc = Document(stream)
+        for p in doc.paragraphs:
+            yield p.text
+
+
+def extract_text_from_docx_bytes(data: Source) -> str:
+    # join paragraphs with newlines so answer markers sit at line starts
+    return "\n".join(iter_docx_paragraphs(data)).strip()
+
+
+def decode_bytes(data: bytes) -> str:
+    for enc in ("utf-8", "latin-1"):
+        try:
+            return data.decode(enc)
+        except Exception:
+            continue
+    return ""
+
+
+def iter_text_lines(source: Source) -> Iterator[str]:
+    """Lines of a text document; a spooled file is decoded line by line (utf-8, else latin-1)."""
+    if isinstance(source, (bytes, bytearray)):
+        yield from iter_lines(decode_bytes(bytes(source)))
+        return
+    with open(source, "rb") as f:
+        for raw in f:
+            yield from iter_lines(decode_bytes(raw.rstrip(b"\r\n")))
+
+
+def iter_document_lines(source: Source, filename: str) -> Iterator[str]:
+    """Lines of an uploaded document, produced page by page / paragraph by paragraph."""
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        return iter_page_lines(iter_pdf_pages(source))
+    if name.endswith(".docx"):
+        return iter_page_lines(iter_docx_paragraphs(source))
+    if name.endswith(".txt"):
+        return iter_text_lines(source)
+    # heuristic fallback
+    try:
+        return iter_page_lines(iter_pdf_pages(source))
+    except Exception:
+        return iter_text_lines(source)
+
+
+def extract_text_from_bytes(file_bytes: Source, filename: str) -> str:
+    return "\n".join(iter_document_lines(file_bytes, filename)).strip()
+
+
+__all__ = [
+    "EXTRACTOR_VERSION",
+    "iter_lines", "iter_page_lines", "clean_answer", "dedupe",
+    "iter_answers", "iter_answers_from_text",
+    "open_source", "choose_pdf_engine", "FAST_ENGINE", "LAYOUT_ENGINE", "iter_pdf_pages", "iter_docx_paragraphs", "iter_text_lines", "iter_document_lines",
+    "extract_text_from_pdf_bytes", "extract_text_from_docx_bytes", "decode_bytes", "extract_text_from_bytes",
+]
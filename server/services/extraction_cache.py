@@ -0,0 +1,202 @@
+# server/services/extraction_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from services import metrics
+from services.extraction import EXTRACTOR_VERSION
+
+# ---------------------------------------------------------------------
+# Answers extracted from uploaded documents, keyed by the SHA-256 of the
+# upload (computed while it is spooled, see services/uploads) + the
+# extractor version + document type + item cap. A repeat upload of the
+# same PDF/DOCX skips parsing entirely.
+#
+#   EXTRACTION_CACHE_SIZE=64        in-memory LRU entries (0 disables the cache)
+#   EXTRACTION_CACHE_DIR=           also keep entries on disk here (unset: memory only)
+#   EXTRACTION_CACHE_DISK_MB=256    disk budget; least recently used files are removed
+# ---------------------------------------------------------------------
+CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "64"))
+CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR") or None
+CACHE_DISK_MB = float(os.getenv("EXTRACTION_CACHE_DISK_MB", "256"))
+
+log = logging.getLogger(__name__)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: "os.PathLike[str] | str", chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _doc_kind(filename: str) -> str:
+    name = (filename or "").lower()
+    for ext in (".pdf", ".docx", ".txt", ".csv", ".jsonl", ".ndjson"):
+        if name.endswith(ext):
+            return ext[1:]
+    return "other"
+
+
+def cache_key(sha256: str, filename: str, limit: Optional[int]) -> str:
+    return f"{sha256}-{_doc_kind(filename)}-x{EXTRACTOR_VERSION}-n{limit or 0}"
+
+
+class ExtractionCache:
+    """Thread-safe LRU of answer lists with an optional size-capped directory tier."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, disk_dir: Optional[str] = CACHE_DIR,
+                 disk_max_bytes: int = int(CACHE_DISK_MB * 1024 * 1024)):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_errors": 0, "disk_evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir or "", f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            items = self._data.get(key)
+            if items is not None:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return list(items)
+
+        if self.disk_dir:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+                os.utime(path)          # mtime doubles as last-used time for eviction
+            except FileNotFoundError:
+                items = None
+            except Exception as e:
+                log.warning("[extraction_cache] disk read failed: %s", e)
+                self._count("disk_errors")
+                items = None
+            if isinstance(items, list):
+                self._remember(key, items)
+                self._count("disk_hits")
+                return list(items)
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, items: List[str]) -> None:
+        self._remember(key, list(items))
+        self._count("stores")
+        if self.disk_dir:
+            try:
+                fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(items, f)
+                os.replace(tmp, self._path(key))
+                self._trim_disk()
+            except Exception as e:
+                log.warning("[extraction_cache] disk write failed: %s", e)
+                self._count("disk_errors")
+
+    def _remember(self, key: str, items: List[str]) -> None:
+        with self._lock:
+            self._data[key] = items
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _disk_entries(self) -> List[os.DirEntry]:
+        return [e for e in os.scandir(self.disk_dir) if e.name.endswith(".json") and e.is_file()]
+
+    def _trim_disk(self) -> None:
+        entries = sorted(self._disk_entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        for e in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                size = e.stat().st_size
+                os.unlink(e.path)
+                total -= size
+                self._count("disk_evictions")
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            for k in self.stats:
+                self.stats[k] = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            looked_up = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            snap = {
+                **self.stats,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hit_rate": ((self.stats["hits"] + self.stats["disk_hits"]) / looked_up) if looked_up else None,
+            }
+        if self.disk_dir:
+            try:
+                entries = self._disk_entries()
+                snap["disk"] = {"dir": self.disk_dir, "files": len(entries),
+                                "bytes": sum(e.stat().st_size for e in entries),
+                                "max_bytes": self.disk_max_bytes}
+            except OSError as e:
+                snap["disk"] = {"dir": self.disk_dir, "error": str(e)}
+        return snap
+
+
+_cache = ExtractionCache()
+
+
+def cached_answers(sha256: str, filename: str, limit: Optional[int],
+                   compute: Callable[[], List[str]]) -> List[str]:
+    """Answers for an upload with this content hash, extracting only on a miss."""
+    if not _cache.enabled:
+        return compute()
+    key = cache_key(sha256, filename, limit)
+    items = _cache.get(key)
+    if items is None:
+        items = compute()
+        _cache.put(key, items)
+    return items
+
+
+def get_cache() -> ExtractionCache:
+    return _cache
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+metrics.register("extraction_cache", lambda: _cache.snapshot())
+
+__all__ = [
+    "ExtractionCache", "cached_answers", "cache_key", "content_hash", "file_hash",
+    "get_cache", "clear",
+]
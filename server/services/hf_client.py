@@ -27,6 +27,10 @@ if _HF_TOKEN:
 _DEFAULT_TIMEOUT = int(os.getenv("HF_TIMEOUT", "120"))
 
 
+class SpaceTimeoutError(RuntimeError, TimeoutError):
+    """Raised when the Space did not answer in time (even after the retry)."""
+
+
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
@@ -42,6 +46,8 @@ def _post_json(path: str, payload: Dict[str, Any], *, timeout: int = _DEFAULT_TI
         # One retry on hard timeout with a longer window
         try:
             r = requests.post(url, headers=_HEADERS, json=payload, timeout=max(timeout, 180))
+        except requests.Timeout as ee:
+            raise SpaceTimeoutError(f"Hugging Face Space request timed out to {url}: {ee}") from ee
         except Exception as ee:
             raise RuntimeError(f"Hugging Face Space request failed to {url}: {ee}") from ee
     except requests.RequestException as e:
@@ -210,4 +216,4 @@ def health() -> Dict[str, Any]:
     return {"ok": False, "status": None}
 
 
-__all__ = ["zsc_single", "sa_single", "sum_single", "health"]
+__all__ = ["zsc_single", "sa_single", "sum_single", "health", "SpaceTimeoutError"]
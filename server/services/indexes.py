@@ -0,0 +1,127 @@
+# server/services/indexes.py
+from __future__ import annotations
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+# ---------------------------------------------------------------------
+# MongoDB indexes the app's queries rely on.
+#
+#   notes.find({boardId}, projection)         -> boardId_id (boardId prefix)
+#   notes.update_one / delete_one({id})       -> id_unique
+#   notes.delete_many({boardId: {$exists: 0}}) -> boardId_id (null bounds)
+#   notes.find({boardId, rev: {$gt}})          -> boardId_rev (delta sync)
+#   notes.find({boardId, x: range, y: range})  -> boardId_x_y (bbox queries)
+#   note_tombstones.find({boardId, rev: ...})  -> boardId_rev
+#   board_revisions by _id                     -> built-in _id index
+#   socket_presence.find({boardId[, uid]})     -> boardId_uid (PRESENCE_STORE=mongo)
+#   socket_presence.find / delete_many({sid})  -> sid
+#   socket_presence expiry (PRESENCE_TTL)      -> expires_ttl (TTL index on the
+#                                                 heartbeat-refreshed `expires` date)
+#
+# (boardId, id) serves every boardId query through its prefix and keeps
+# notes of a board in id order, so no separate single-field boardId index.
+# ensure_indexes() is idempotent (createIndexes is a no-op for an existing
+# identical index); the app runs it once in a daemon thread at startup so a
+# slow build never delays serving.
+#
+#   MONGO_ENSURE_INDEXES=1   create missing indexes at startup (0 to skip)
+# ---------------------------------------------------------------------
+ENSURE_ON_START = os.getenv("MONGO_ENSURE_INDEXES", "1") == "1"
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "notes": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("boardId", ASCENDING), ("id", ASCENDING)], name="boardId_id"),
+        IndexModel([("boardId", ASCENDING), ("rev", ASCENDING)], name="boardId_rev"),
+        IndexModel([("boardId", ASCENDING), ("x", ASCENDING), ("y", ASCENDING)], name="boardId_x_y"),
+    ],
+    "note_tombstones": [
+        IndexModel([("boardId", ASCENDING), ("rev", ASCENDING)], name="boardId_rev"),
+    ],
+    "socket_presence": [
+        IndexModel([("boardId", ASCENDING), ("uid", ASCENDING)], name="boardId_uid"),
+        IndexModel([("sid", ASCENDING)], name="sid"),
+        IndexModel([("expires", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),
+    ],
+}
+
+log = logging.getLogger(__name__)
+
+
+def _index_name(model: IndexModel) -> str:
+    return model.document["name"]
+
+
+def ensure_indexes(database: Any, indexes: Optional[Dict[str, List[IndexModel]]] = None) -> Dict[str, Any]:
+    """
+    Create the declared indexes on `database`. Each index is created on its
+    own so one failure (e.g. duplicate ids blocking id_unique) doesn't stop
+    the rest. Returns {"created": [names], "failed": {name: error}}.
+    """
+    created: List[str] = []
+    failed: Dict[str, str] = {}
+    for coll_name, models in (indexes or INDEXES).items():
+        coll = database[coll_name]
+        for model in models:
+            name = f"{coll_name}.{_index_name(model)}"
+            try:
+                coll.create_indexes([model])
+                created.append(name)
+            except PyMongoError as e:
+                log.error("[indexes] could not create %s: %s", name, e)
+                failed[name] = str(e)
+    if created:
+        log.info("[indexes] ensured %s", ", ".join(created))
+    return {"created": created, "failed": failed}
+
+
+def ensure_indexes_async(database: Any = None) -> threading.Thread:
+    """ensure_indexes() in a daemon thread (db.db when `database` is None)."""
+    def run():
+        try:
+            target = database
+            if target is None:
+                from db import db as target
+            ensure_indexes(target)
+        except Exception:
+            log.exception("[indexes] ensure failed")
+
+    t = threading.Thread(target=run, name="ensure-indexes", daemon=True)
+    t.start()
+    return t
+
+
+def plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """Stage names of the winning plan in an explain() result (any nesting / server version)."""
+    planner = explain.get("queryPlanner") or {}
+    plan = planner.get("winningPlan") or {}
+    if "queryPlan" in plan:                       # slot-based engine (6.0+)
+        plan = plan["queryPlan"]
+    stages: List[str] = []
+
+    def walk(node: Any) -> None:
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            for key in ("inputStage", "inputStages", "shards", "winningPlan", "queryPlan"):
+                if key in node:
+                    walk(node[key])
+        elif isinstance(node, list):
+            for child in node:
+                walk(child)
+
+    walk(plan)
+    return stages
+
+
+def uses_collscan(explain: Dict[str, Any]) -> bool:
+    return "COLLSCAN" in plan_stages(explain)
+
+
+__all__ = ["INDEXES", "ENSURE_ON_START", "ensure_indexes", "ensure_indexes_async",
+           "plan_stages", "uses_collscan"]
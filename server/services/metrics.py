@@ -0,0 +1,39 @@
+# server/services/metrics.py
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict
+
+# ---------------------------------------------------------------------
+# Tiny in-process metrics registry.
+# Components register a provider (a zero-arg callable returning a dict);
+# GET /metrics calls every provider and returns one JSON document.
+# ---------------------------------------------------------------------
+_lock = threading.Lock()
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) the provider published under `name`."""
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister(name: str) -> None:
+    with _lock:
+        _providers.pop(name, None)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Collect every provider; a failing provider reports its error instead of breaking the rest."""
+    with _lock:
+        items = list(_providers.items())
+    out: Dict[str, Any] = {}
+    for name, provider in items:
+        try:
+            out[name] = provider()
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    return out
+
+
+__all__ = ["register", "unregister", "snapshot"]
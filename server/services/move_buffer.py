@@ -0,0 +1,182 @@
+# server/services/move_buffer.py
+from __future__ import annotations
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Write-behind buffer for note moves.
+#
+# A drag sends dozens of move_note events per second. The socket handler
+# broadcasts each one at once but only records the position here; the
+# buffer keeps the latest (x, y) per note id and a background thread
+# persists everything pending with ONE bulk write every MOVE_FLUSH_MS, or
+# sooner once MOVE_FLUSH_MAX notes are pending.
+#
+# Pending moves are flushed early where a stale read or write could
+# happen: a board snapshot (join / GET /api/notes) flushes that board, a
+# socket leaving or disconnecting flushes the notes it moved, and shutdown
+# flushes everything. edit_note / delete_note drop the pending move for
+# their note (the edit carries its own x/y).
+#
+#   MOVE_WRITE_BEHIND=1   0 writes every move synchronously (previous behaviour)
+#   MOVE_FLUSH_MS=250     flush interval
+#   MOVE_FLUSH_MAX=200    pending notes that trigger an immediate flush
+# ---------------------------------------------------------------------
+WRITE_BEHIND = os.getenv("MOVE_WRITE_BEHIND", "1") == "1"
+FLUSH_MS = int(os.getenv("MOVE_FLUSH_MS", "250"))
+FLUSH_MAX = int(os.getenv("MOVE_FLUSH_MAX", "200"))
+
+log = logging.getLogger(__name__)
+
+# {note_id: (x, y, board_id)} -> persisted, scoped to that board; raises on failure
+Writer = Callable[[Dict[str, Tuple[Any, Any, Optional[str]]]], Any]
+
+
+class MoveBuffer:
+    """Latest position per note, persisted in bulk by a lazily started daemon thread."""
+
+    def __init__(self, writer: Writer, flush_ms: int = FLUSH_MS, max_pending: int = FLUSH_MAX):
+        self.writer = writer
+        self.interval = max(0.01, flush_ms / 1000.0)
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()       # one writer call at a time, in order
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        # note_id -> (x, y, board_id); insertion order = first pending move
+        self._pending: Dict[str, Tuple[Any, Any, Optional[str]]] = {}
+        self._by_sid: Dict[str, Set[str]] = {}
+        self.stats = {"moves": 0, "coalesced": 0, "flushes": 0, "written": 0, "dropped": 0, "errors": 0}
+
+    # ---- producers ----
+    def put(self, note_id: str, x: Any, y: Any, board_id: Optional[str] = None,
+            sid: Optional[str] = None) -> None:
+        with self._lock:
+            self.stats["moves"] += 1
+            if note_id in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[note_id] = (x, y, board_id)
+            if sid is not None:
+                self._by_sid.setdefault(sid, set()).add(note_id)
+            full = len(self._pending) >= self.max_pending
+            self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def discard(self, note_id: str) -> None:
+        """Forget a pending move (the note was edited with its own x/y, or deleted)."""
+        with self._flush_lock, self._lock:        # waits out an in-flight write of this note
+            if self._pending.pop(note_id, None) is not None:
+                self.stats["dropped"] += 1
+
+    # ---- flushing ----
+    def _take(self, match: Callable[[str, Tuple[Any, Any, Optional[str]]], bool]) -> Dict[str, Tuple[Any, Any, Optional[str]]]:
+        with self._lock:
+            taken = {nid: v for nid, v in self._pending.items() if match(nid, v)}
+            for nid in taken:
+                del self._pending[nid]
+            if not self._pending:
+                self._by_sid.clear()
+            return taken
+
+    def _flush(self, match: Callable[[str, Tuple[Any, Any, Optional[str]]], bool]) -> int:
+        # take + write under one lock so an older position can never land after a newer one
+        with self._flush_lock:
+            taken = self._take(match)
+            if not taken:
+                return 0
+            try:
+                self.writer(dict(taken))
+            except Exception:
+                log.exception("[moves] bulk write of %d notes failed; will retry", len(taken))
+                with self._lock:
+                    self.stats["errors"] += 1
+                    for nid, v in taken.items():
+                        self._pending.setdefault(nid, v)   # a newer move wins over the retry
+                return 0
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["written"] += len(taken)
+            return len(taken)
+
+    def flush(self) -> int:
+        """Persist everything pending now. Returns the number of notes written."""
+        return self._flush(lambda nid, v: True)
+
+    def flush_board(self, board_id: str) -> int:
+        return self._flush(lambda nid, v: v[2] == board_id)
+
+    def flush_sid(self, sid: str) -> int:
+        with self._lock:
+            notes = self._by_sid.pop(sid, set())
+        if not notes:
+            return 0
+        return self._flush(lambda nid, v: nid in notes)
+
+    def pending(self) -> Dict[str, Tuple[Any, Any]]:
+        with self._lock:
+            return {nid: (x, y) for nid, (x, y, _) in self._pending.items()}
+
+    # ---- background thread ----
+    def _ensure_thread(self) -> None:
+        # caller holds self._lock
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._run, name="move-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                self.flush()
+            except Exception:
+                log.exception("[moves] flush failed")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the thread and flush what is left (called at shutdown)."""
+        self._stopped = True
+        self._wake.set()
+        t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout)
+        self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self.stats)
+            out["pending"] = len(self._pending)
+        out["flush_ms"] = int(self.interval * 1000)
+        out["max_pending"] = self.max_pending
+        # moves that never became their own write
+        out["writes_saved"] = max(0, out["moves"] - out["written"] - out["pending"] - out["dropped"])
+        return out
+
+
+_buffer: Optional[MoveBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> Optional[MoveBuffer]:
+    """Process-wide buffer writing through note_service.bulk_move_notes (None when disabled)."""
+    global _buffer
+    if not WRITE_BEHIND:
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            from services.note_service import bulk_move_notes
+            _buffer = MoveBuffer(bulk_move_notes)
+            metrics.register("move_buffer", _buffer.snapshot)
+            atexit.register(_buffer.close)
+        return _buffer
+
+
+__all__ = ["MoveBuffer", "get_buffer", "WRITE_BEHIND"]
@@ -1,14 +1,202 @@
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pymongo import ASCENDING, DeleteOne, DESCENDING, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from db import notes_collection
+from services import metrics
+from services.board_cache import BoardCache
 
-def get_notes_by_board(board_id):
-    cursor = notes_collection.find({"boardId":board_id}, {"_id":0, "user.email": 0})
+# ---------------------------------------------------------------------
+# Board revisions (delta sync).
+# Every note write reserves the board's next revision in board_revisions
+# ({_id: boardId, rev, floor, pending}) and stamps it on the note; deletes
+# leave a tombstone {boardId, id, rev} in note_tombstones. A client that has
+# seen revision R asks for rev > R. Tombstones beyond the newest
+# NOTES_TOMBSTONE_KEEP per board are compacted away and the board's floor
+# raised; a client older than the floor gets a full snapshot.
+#
+# With several server processes writing one board, rev N+1 can be stored
+# while another process is still writing rev N. So a reservation is also
+# listed in `pending` until its write returns, and reads report the board's
+# committed revision: one below the oldest pending reservation, or `rev`
+# when none is pending. A client never gets a revision past a write it has
+# not seen; at worst a later delta repeats a few notes. A reservation left
+# pending longer than NOTES_REV_PENDING_TIMEOUT (a crashed process) stops
+# holding the committed revision back. Within a process, writes to a board
+# are also serialized by a per-board lock.
+#
+#   NOTES_TOMBSTONE_KEEP=1000         tombstones kept per board
+#   NOTES_REV_PENDING_TIMEOUT=30      seconds before a pending revision is abandoned
+# ---------------------------------------------------------------------
+REVISIONS_COLLECTION = "board_revisions"
+TOMBSTONES_COLLECTION = "note_tombstones"
+TOMBSTONE_KEEP = int(os.getenv("NOTES_TOMBSTONE_KEEP", "1000"))
+REV_PENDING_TIMEOUT = float(os.getenv("NOTES_REV_PENDING_TIMEOUT", "30"))
+
+_NOTE_PROJECTION = {"_id": 0, "user.email": 0}
+_board_locks = [threading.Lock() for _ in range(64)]
+
+
+def _revisions():
+    return notes_collection.database[REVISIONS_COLLECTION]
+
+def _tombstones():
+    return notes_collection.database[TOMBSTONES_COLLECTION]
+
+def _board_lock(board_id):
+    return _board_locks[hash(board_id) % len(_board_locks)]
+
+@contextmanager
+def _stamped(board_ids):
+    """Reserve the next revision of each board -> {board_id: rev}; write inside the block."""
+    boards = sorted({b for b in board_ids if b})
+    locks = sorted({id(_board_lock(b)): _board_lock(b) for b in boards}.items())
+    with ExitStack() as stack:
+        for _, lock in locks:
+            stack.enter_context(lock)
+        revs = {}
+        try:
+            for b in boards:
+                revs[b] = _reserve(b)
+            yield revs
+        finally:
+            for b, rev in revs.items():
+                _release(b, rev)
+
+def _reserve(board_id):
+    """Next revision of a board, listed as pending (compare-and-swap on `rev`)."""
+    while True:
+        doc = _revisions().find_one({"_id": board_id}, {"rev": 1}) or {}
+        current = doc.get("rev")
+        rev = int(current or 0) + 1
+        entry = {"rev": rev, "at": time.time()}
+        if not doc:
+            try:
+                _revisions().insert_one({"_id": board_id, "rev": rev, "pending": [entry]})
+                return rev
+            except DuplicateKeyError:
+                continue                      # another writer created the board first
+        if _revisions().update_one({"_id": board_id, "rev": current},
+                                   {"$set": {"rev": rev}, "$push": {"pending": entry}}).modified_count:
+            return rev
+
+def _release(board_id, rev):
+    """The write stamped `rev` returned (stored or failed): it no longer holds reads back."""
+    doc = _revisions().find_one_and_update({"_id": board_id}, {"$pull": {"pending": {"rev": rev}}},
+                                           return_document=ReturnDocument.AFTER) or {}
+    stale = time.time() - REV_PENDING_TIMEOUT
+    if any(p.get("at", 0) < stale for p in doc.get("pending") or []):
+        _revisions().update_one({"_id": board_id}, {"$pull": {"pending": {"at": {"$lt": stale}}}})
+
+def _committed(doc):
+    stale = time.time() - REV_PENDING_TIMEOUT
+    waiting = [p["rev"] for p in doc.get("pending") or [] if p.get("at", 0) >= stale]
+    return min(waiting) - 1 if waiting else int(doc.get("rev", 0))
+
+def _boards_of(note_ids):
+    """{note_id: boardId} for existing notes."""
+    ids = list(note_ids)
+    if not ids:
+        return {}
+    cursor = notes_collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "boardId": 1})
+    return {d["id"]: d.get("boardId") for d in cursor}
+
+def _add_tombstones(board_id, note_ids, rev):
+    if not note_ids:
+        return
+    _tombstones().insert_many([{"boardId": board_id, "id": nid, "rev": rev} for nid in note_ids])
+    # a board can't hold more tombstones than revisions, so young boards skip the count
+    if 0 < TOMBSTONE_KEEP < rev and _tombstones().count_documents({"boardId": board_id}) > TOMBSTONE_KEEP:
+        compact_tombstones(board_id)
+
+def compact_tombstones(board_id, keep=None):
+    """Drop all but the newest `keep` tombstones of a board and raise its floor to match."""
+    keep = TOMBSTONE_KEEP if keep is None else keep
+    cutoff = list(_tombstones().find({"boardId": board_id}, {"_id": 0, "rev": 1})
+                  .sort("rev", DESCENDING).skip(keep).limit(1))
+    if not cutoff:
+        return 0
+    floor = cutoff[0]["rev"]
+    removed = _tombstones().delete_many({"boardId": board_id, "rev": {"$lte": floor}}).deleted_count
+    _revisions().update_one({"_id": board_id}, {"$max": {"floor": floor}}, upsert=True)
+    return removed
+
+def board_revision(board_id):
+    """(committed revision, tombstone floor) of a board; see the header above."""
+    doc = _revisions().find_one({"_id": board_id}) or {}
+    return _committed(doc), int(doc.get("floor", 0))
+
+
+def _load_notes(board_id):
+    cursor = notes_collection.find({"boardId":board_id}, _NOTE_PROJECTION)
     return list(cursor)
 
-def create_note(note):
+# board snapshots served from memory, kept current by the writes below (services/board_cache)
+board_cache = BoardCache(_load_notes)
+metrics.register("board_cache", board_cache.snapshot)
+
+def _public(doc):
+    """A stored note (or $set fields) as reads return it: no _id, no user.email."""
+    out = {k: v for k, v in doc.items() if k != "_id"}
+    if isinstance(out.get("user"), dict):
+        out["user"] = {k: v for k, v in out["user"].items() if k != "email"}
+    return out
+
+def get_notes_by_board(board_id):
+    return board_cache.get(board_id)
+
+def get_notes_page(board_id, after=None, limit=500):
+    """
+    One page of a board ordered by id: {rev, notes, next}. `after` is the
+    previous page's `next` (an id); `next` is None on the last page.
+    """
+    rev, _ = board_revision(board_id)
+    if board_cache.enabled:
+        notes = board_cache.page(board_id, after, limit + 1)
+    else:
+        flt = {"boardId": board_id}
+        if after is not None:
+            flt["id"] = {"$gt": after}
+        notes = list(notes_collection.find(flt, _NOTE_PROJECTION).sort("id", ASCENDING).limit(limit + 1))
+    more = len(notes) > limit
+    notes = notes[:limit]
+    return {"rev": rev, "notes": notes, "next": notes[-1]["id"] if more else None}
+
+def get_notes_in_bbox(board_id, bbox):
+    """Notes of a board with x1 <= x <= x2 and y1 <= y <= y2, ordered by id."""
+    if board_cache.enabled:
+        return board_cache.query_bbox(board_id, bbox)
+    x1, y1, x2, y2 = bbox
+    flt = {"boardId": board_id, "x": {"$gte": x1, "$lte": x2}, "y": {"$gte": y1, "$lte": y2}}
+    return list(notes_collection.find(flt, _NOTE_PROJECTION).sort("id", ASCENDING))
+
+def note_positions(board_id, note_ids):
+    """{note_id: (x, y)} from the board cache only (services/spatial routes broadcasts by it)."""
+    return board_cache.positions(board_id, note_ids)
+
+def get_board_changes(board_id, since=None):
+    """
+    Notes changed and ids deleted after revision `since`:
+      {rev, full, notes, deleted}
+    `full` (a complete snapshot) when `since` is missing/0, older than the
+    tombstone floor, or ahead of the board (e.g. a reset database).
+    """
+    rev, floor = board_revision(board_id)
+    if since is None or since < 1 or since < floor or since > rev:
+        return {"rev": rev, "full": True, "notes": get_notes_by_board(board_id), "deleted": []}
+    notes = list(notes_collection.find({"boardId": board_id, "rev": {"$gt": since}}, _NOTE_PROJECTION))
+    live = {n["id"]: n.get("rev", 0) for n in notes}
+    tombs = _tombstones().find({"boardId": board_id, "rev": {"$gt": since}}, {"_id": 0, "id": 1, "rev": 1})
+    # an id deleted and then re-created is live, not deleted
+    deleted = sorted({t["id"] for t in tombs if t["rev"] > live.get(t["id"], -1)})
+    return {"rev": rev, "full": False, "notes": notes, "deleted": deleted}
+
+def _note_doc(note):
     if "boardId" not in note:
         raise ValueError("Missing boardId in note data")
-    
-    notes_collection.insert_one({
+    return {
         "id": note["id"],
         "text": note["text"],
         "x": note["x"],
@@ -16,11 +204,172 @@ def create_note(note):
         "user": note["user"],
         "boardId": note["boardId"],
         "type": note.get("type", "note")
-    })
+    }
+
+def create_note(note):
+    doc = _note_doc(note)
+    with _stamped([doc["boardId"]]) as revs:
+        stored = {**doc, "rev": revs[doc["boardId"]]}
+        notes_collection.insert_one(dict(stored))
+        board_cache.upsert(doc["boardId"], [_public(stored)])
+
+def update_note(note_id, fields, board_id=None):
+    board_id = board_id or _boards_of([note_id]).get(note_id)
+    if not board_id:
+        notes_collection.update_one({"id": note_id}, {"$set": fields})
+        return
+    with _stamped([board_id]) as revs:
+        changes = {**fields, "rev": revs[board_id]}
+        if notes_collection.update_one({"id": note_id, "boardId": board_id}, {"$set": changes}).matched_count:
+            board_cache.patch(board_id, {note_id: _public(changes)})
+
+def delete_note(note_id, board_id=None):
+    board_id = board_id or _boards_of([note_id]).get(note_id)
+    if not board_id:
+        notes_collection.delete_one({"id": note_id})
+        return
+    with _stamped([board_id]) as revs:
+        if notes_collection.delete_one({"id": note_id, "boardId": board_id}).deleted_count:
+            _add_tombstones(board_id, [note_id], revs[board_id])
+            board_cache.remove(board_id, [note_id])
+
+
+def bulk_move_notes(positions):
+    """
+    {note_id: (x, y, board_id)} -> one unordered bulk_write (services/move_buffer
+    flushes). Each update is limited to its board; only moves recorded without
+    one look their board up.
+    """
+    if not positions:
+        return 0
+    boards = {nid: board for nid, (_, _, board) in positions.items() if board}
+    unknown = [nid for nid in positions if nid not in boards]
+    if unknown:
+        boards.update(_boards_of(unknown))
+    with _stamped(set(boards.values())) as revs:
+        ops = []
+        for note_id, (x, y, _) in positions.items():
+            board_id = boards.get(note_id)
+            if board_id:
+                ops.append(UpdateOne({"id": note_id, "boardId": board_id},
+                                     {"$set": {"x": x, "y": y, "rev": revs[board_id]}}))
+        if not ops:
+            return 0
+        modified = notes_collection.bulk_write(ops, ordered=False).modified_count
+        for board_id, rev in revs.items():
+            board_cache.patch(board_id, {nid: {"x": x, "y": y, "rev": rev}
+                                         for nid, (x, y, _) in positions.items() if boards.get(nid) == board_id})
+        return modified
+
+
+def _bulk_error(op, index, item, error):
+    note_id = item.get("id") if isinstance(item, dict) else item
+    return {"op": op, "index": index, "id": note_id if isinstance(note_id, str) else None, "error": error}
+
+
+def split_moves(moves):
+    """-> ([(index, {"id", "x", "y"})], [errors]) for a list of move items."""
+    valid, errors = [], []
+    for i, move in enumerate(moves):
+        if not (isinstance(move, dict) and isinstance(move.get("id"), str) and "x" in move and "y" in move):
+            errors.append(_bulk_error("move", i, move, "move needs id, x and y"))
+            continue
+        valid.append((i, {"id": move["id"], "x": move["x"], "y": move["y"]}))
+    return valid, errors
+
+
+def bulk_notes(creates=(), moves=(), deletes=(), board_id=None):
+    """
+    Create / move / delete many notes with ONE unordered bulk_write.
+      creates: note dicts (as for create_note; with `board_id` their boardId must
+               be absent or equal to it, otherwise the item is rejected)
+      moves:   {"id", "x", "y"} dicts
+      deletes: note ids
+    Moves and deletes are limited to `board_id` (looked up per note without it).
+    Invalid items are skipped and reported; the rest are applied and stamped
+    with their board's next revision. Returns
+      {"created": [note docs], "moved": [{"id", "x", "y", "rev"}], "deleted": [ids],
+       "errors": [{"op", "index", "id", "error"}]}
+    """
+    items, errors = [], []     # (op, index, payload, board)
+
+    for i, note in enumerate(creates):
+        try:
+            if not isinstance(note, dict):
+                raise TypeError("note must be an object")
+            if board_id and note.get("boardId", board_id) != board_id:
+                raise ValueError("note belongs to another board")
+            doc = _note_doc({**note, "boardId": board_id} if board_id else note)
+        except KeyError as e:
+            errors.append(_bulk_error("create", i, note, f"Missing {e.args[0]} in note data"))
+            continue
+        except (TypeError, ValueError) as e:
+            errors.append(_bulk_error("create", i, note, str(e)))
+            continue
+        items.append(("create", i, doc, doc["boardId"]))
+
+    valid_moves, move_errors = split_moves(moves)
+    errors.extend(move_errors)
+    valid_deletes = []
+    for i, note_id in enumerate(deletes):
+        if not isinstance(note_id, str) or not note_id:
+            errors.append(_bulk_error("delete", i, note_id, "delete needs a note id"))
+            continue
+        valid_deletes.append((i, note_id))
+
+    boards = {} if board_id else _boards_of([m["id"] for _, m in valid_moves] + [n for _, n in valid_deletes])
+    for op, valid in (("move", valid_moves), ("delete", valid_deletes)):
+        for i, payload in valid:
+            board = board_id or boards.get(payload["id"] if op == "move" else payload)
+            if board:
+                items.append((op, i, payload, board))
+            else:
+                errors.append(_bulk_error(op, i, payload, "note not found"))
 
-def update_note(note_id, fields):
-    notes_collection.update_one({"id": note_id}, {"$set": fields})
+    failed = set()
+    with _stamped(b for *_, b in items) as revs:
+        ops = []
+        for op, _, payload, board in items:
+            rev = revs[board]
+            if op == "create":
+                payload["rev"] = rev
+                ops.append(InsertOne(dict(payload)))
+            elif op == "move":
+                payload["rev"] = rev
+                ops.append(UpdateOne({"id": payload["id"], "boardId": board},
+                                     {"$set": {"x": payload["x"], "y": payload["y"], "rev": rev}}))
+            else:
+                ops.append(DeleteOne({"id": payload, "boardId": board}))
+        if ops:
+            try:
+                notes_collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                for we in e.details.get("writeErrors", []):
+                    op, i, payload, _ = items[we["index"]]
+                    failed.add(we["index"])
+                    errors.append(_bulk_error(op, i, payload, we.get("errmsg") or "write failed"))
 
-def delete_note(note_id):
-    notes_collection.delete_one({"id": note_id})
+        created, moved, gone = {}, {}, {}
+        for n, (op, _, payload, board) in enumerate(items):
+            if n in failed:
+                continue
+            if op == "create":
+                created.setdefault(board, []).append(_public(payload))
+            elif op == "move":
+                moved.setdefault(board, {})[payload["id"]] = {"x": payload["x"], "y": payload["y"], "rev": payload["rev"]}
+            else:
+                gone.setdefault(board, []).append(payload)
+        for board, ids in gone.items():
+            _add_tombstones(board, ids, revs[board])
+            board_cache.remove(board, ids)
+        for board, notes in created.items():
+            board_cache.upsert(board, notes)
+        for board, changes in moved.items():
+            board_cache.patch(board, changes)
 
+    out = {"created": [], "moved": [], "deleted": [], "errors": errors}
+    for n, (op, _, payload, _) in enumerate(items):
+        if n not in failed:
+            out[{"create": "created", "move": "moved", "delete": "deleted"}[op]].append(payload)
+    errors.sort(key=lambda e: ({"create": 0, "move": 1, "delete": 2}[e["op"]], e["index"]))
+    return out
@@ -0,0 +1,346 @@
+# server/services/presence.py
+from __future__ import annotations
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Socket presence per board.
+#
+# board -> uid -> {name, email, sockets} plus the reverse index
+# sid -> {(board, uid)}, so join / leave / disconnect touch only the rooms
+# of that socket instead of scanning every board. A user stays online on a
+# board while any of their sockets is joined to it; leave / disconnect
+# report the users that went offline so only those get a user_left.
+# One lock guards both indexes (the threading async mode runs handlers
+# concurrently); callers emit outside it.
+#
+# With several server processes (SOCKETIO_MESSAGE_QUEUE) presence has to
+# be shared: PRESENCE_STORE=mongo keeps one document per (board, sid) in
+# the socket_presence collection, local://host:port uses the PresenceStore
+# served by the socket hub (services/socket_queue.py). Mongo documents
+# carry PRESENCE_HOST and an `expires` date that a heartbeat thread pushes
+# forward every PRESENCE_TTL / 3 for the process's live sockets; reads
+# ignore expired entries and a TTL index (services/indexes.py) deletes
+# them, so the sockets of a crashed process go offline after PRESENCE_TTL
+# even when it restarts under a new name. A restart under the same name
+# drops its previous entries at once.
+#
+# PresenceFeed turns those changes into room broadcasts: changes on a
+# board within PRESENCE_DEBOUNCE_MS are merged (a join and a leave of the
+# same user cancel out) and sent as one presence_delta { boardId, joined,
+# left, count } followed by the full user_list / online_users pair, both
+# carrying the same cached member list. A class of n people joining at
+# once costs a few broadcasts instead of n full lists to everyone.
+#
+#   PRESENCE_DEBOUNCE_MS=200    coalescing window per board (0: broadcast at once)
+#   PRESENCE_STORE=memory       memory | mongo | local://host:port
+#   PRESENCE_HOST=<hostname:pid>  name of this process in the shared store
+#   PRESENCE_TTL=90             seconds a mongo entry outlives its last heartbeat
+# ---------------------------------------------------------------------
+DEBOUNCE_MS = int(os.getenv("PRESENCE_DEBOUNCE_MS", "200"))
+STORE = os.getenv("PRESENCE_STORE", "memory")
+HOST = os.getenv("PRESENCE_HOST") or f"{socket.gethostname()}:{os.getpid()}"
+TTL = int(os.getenv("PRESENCE_TTL", "90"))
+COLLECTION = "socket_presence"
+
+User = Dict[str, Any]
+
+
+class PresenceStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards: Dict[str, Dict[str, Dict[str, Any]]] = {}     # board -> uid -> {name, email, sockets}
+        self._sids: Dict[str, Set[Tuple[str, str]]] = {}            # sid -> {(board, uid)}
+        self.stats = {"joins": 0, "leaves": 0, "disconnects": 0}
+
+    def join(self, sid: str, board_id: str, uid: str, name: str = "", email: str = "") -> Tuple[int, bool]:
+        """
+        Add `sid` as `uid` on `board_id`: (users online there before, whether
+        `uid` just came online).
+        """
+        with self._lock:
+            users = self._boards.setdefault(board_id, {})
+            before = len(users)
+            entry = users.setdefault(uid, {"name": name, "email": email, "sockets": set()})
+            added = not entry["sockets"]
+            entry["sockets"].add(sid)
+            self._sids.setdefault(sid, set()).add((board_id, uid))
+            self.stats["joins"] += 1
+            return before, added
+
+    def _remove(self, sid: str, board_id: str, uid: str) -> bool:
+        # caller holds self._lock; True when uid went offline on board_id
+        users = self._boards.get(board_id)
+        entry = users.get(uid) if users else None
+        if entry is None:
+            return False
+        entry["sockets"].discard(sid)
+        if entry["sockets"]:
+            return False
+        del users[uid]
+        if not users:
+            del self._boards[board_id]
+        return True
+
+    def leave(self, sid: str, board_id: str) -> Tuple[bool, List[str]]:
+        """`sid` left `board_id`: (was it joined there, uids now offline on it)."""
+        with self._lock:
+            rooms = self._sids.get(sid)
+            mine = [key for key in rooms if key[0] == board_id] if rooms else []
+            gone = []
+            for key in mine:
+                rooms.discard(key)
+                if self._remove(sid, *key):
+                    gone.append(key[1])
+            if rooms is not None and not rooms:
+                del self._sids[sid]
+            self.stats["leaves"] += 1
+            return bool(mine), gone
+
+    def disconnect(self, sid: str) -> Dict[str, List[str]]:
+        """`sid` is gone: {board it was on: uids now offline there}."""
+        with self._lock:
+            out: Dict[str, List[str]] = {}
+            for board_id, uid in self._sids.pop(sid, ()):
+                gone = out.setdefault(board_id, [])
+                if self._remove(sid, board_id, uid):
+                    gone.append(uid)
+            self.stats["disconnects"] += 1
+            return out
+
+    def users(self, board_id: str) -> List[User]:
+        with self._lock:
+            return [{"uid": uid, "name": u["name"], "email": u["email"]}
+                    for uid, u in self._boards.get(board_id, {}).items()]
+
+    def uids(self, board_id: str) -> Set[str]:
+        with self._lock:
+            return set(self._boards.get(board_id, {}))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._boards.clear()
+            self._sids.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "boards": len(self._boards), "sockets": len(self._sids),
+                    "users": sum(len(u) for u in self._boards.values())}
+
+
+class MongoPresenceStore:
+    """PresenceStore on a collection shared by every server process: one document per (board, sid)."""
+
+    def __init__(self, collection, host: str = HOST, ttl: int = TTL, clock: Callable[[], float] = time.time):
+        self._coll = collection
+        self.host = host
+        self.ttl = max(1, ttl)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"joins": 0, "leaves": 0, "disconnects": 0, "heartbeats": 0, "heartbeat_errors": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _date(self, offset: float = 0.0) -> datetime:
+        # naive UTC, as pymongo hands dates back; the TTL index needs a BSON date
+        return datetime.fromtimestamp(self.clock() + offset, timezone.utc).replace(tzinfo=None)
+
+    def _live(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        return {**query, "expires": {"$gt": self._date()}}
+
+    def _offline(self, board_id: str, uids: Iterable[str]) -> List[str]:
+        return sorted(uid for uid in set(uids)
+                      if not self._coll.count_documents(self._live({"boardId": board_id, "uid": uid}), limit=1))
+
+    def join(self, sid: str, board_id: str, uid: str, name: str = "", email: str = "") -> Tuple[int, bool]:
+        online = set(self._coll.distinct("uid", self._live({"boardId": board_id})))
+        self._coll.update_one({"_id": f"{board_id}\x00{sid}"},
+                              {"$set": {"boardId": board_id, "sid": sid, "uid": uid, "name": name,
+                                        "email": email, "host": self.host, "at": self.clock(),
+                                        "expires": self._date(self.ttl)}}, upsert=True)
+        self._count("joins")
+        return len(online), uid not in online
+
+    def leave(self, sid: str, board_id: str) -> Tuple[bool, List[str]]:
+        docs = list(self._coll.find({"boardId": board_id, "sid": sid}, {"uid": 1}))
+        if docs:
+            self._coll.delete_many({"boardId": board_id, "sid": sid})
+        self._count("leaves")
+        return bool(docs), self._offline(board_id, (d["uid"] for d in docs))
+
+    def disconnect(self, sid: str) -> Dict[str, List[str]]:
+        docs = list(self._coll.find({"sid": sid}, {"uid": 1, "boardId": 1}))
+        if docs:
+            self._coll.delete_many({"sid": sid})
+        by_board: Dict[str, List[str]] = {}
+        for d in docs:
+            by_board.setdefault(d["boardId"], []).append(d["uid"])
+        self._count("disconnects")
+        return {board_id: self._offline(board_id, uids) for board_id, uids in by_board.items()}
+
+    def users(self, board_id: str) -> List[User]:
+        out: Dict[str, User] = {}
+        for d in self._coll.find(self._live({"boardId": board_id}), {"uid": 1, "name": 1, "email": 1}).sort("at", 1):
+            out.setdefault(d["uid"], {"uid": d["uid"], "name": d.get("name", ""), "email": d.get("email", "")})
+        return list(out.values())
+
+    def uids(self, board_id: str) -> Set[str]:
+        return set(self._coll.distinct("uid", self._live({"boardId": board_id})))
+
+    def clear(self) -> int:
+        """Drop this host's entries (left over by a previous run under the same PRESENCE_HOST)."""
+        return self._coll.delete_many({"host": self.host}).deleted_count
+
+    # ---- heartbeat: keeps this process's entries from expiring ----
+    def heartbeat(self) -> int:
+        n = self._coll.update_many({"host": self.host}, {"$set": {"expires": self._date(self.ttl)}}).modified_count
+        self._count("heartbeats")
+        return n
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.ttl / 3.0):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                self._count("heartbeat_errors")
+                print("❌ presence heartbeat failed:", e)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="presence-heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, "backend": "mongo", "host": self.host, "ttl": self.ttl,
+                "sockets": self._coll.count_documents({"host": self.host})}
+
+
+class PresenceFeed:
+    """Per-board coalescing of presence changes into one broadcast per window."""
+
+    def __init__(self, store: PresenceStore, window_ms: int = DEBOUNCE_MS, cache: bool = True):
+        self.store = store
+        self.window = max(0, window_ms) / 1000.0
+        # a shared store also changes through other processes: no member list cache then
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}      # board -> {"joined": {uid: user}, "left": set}
+        self._users: Dict[str, List[User]] = {}            # board -> member list, until the next change
+        self._gen = 0                                      # changes seen (guards _users)
+        self._emit: Optional[Callable[..., Any]] = None
+        self._spawn: Optional[Callable[..., Any]] = None
+        self._sleep: Callable[[float], Any] = time.sleep
+        self.stats = {"changes": 0, "broadcasts": 0, "coalesced": 0, "cancelled": 0}
+
+    def attach(self, socketio) -> None:
+        """Broadcast through `socketio` (flushes run as its background tasks)."""
+        self._emit = socketio.emit
+        self._spawn = socketio.start_background_task
+        self._sleep = socketio.sleep
+
+    def users(self, board_id: str) -> List[User]:
+        """Current member list of `board_id`; shared, do not mutate."""
+        if not self.cache:
+            return self.store.users(board_id)
+        with self._lock:
+            users = self._users.get(board_id)
+            gen = self._gen
+        if users is None:
+            users = self.store.users(board_id)
+            with self._lock:
+                if users and self._gen == gen:             # no change while it was built
+                    self._users[board_id] = users
+        return users
+
+    def changed(self, board_id: str, joined: Iterable[User] = (), left: Iterable[str] = ()) -> None:
+        joined, left = list(joined), list(left)
+        if not joined and not left:
+            return
+        with self._lock:
+            self._users.pop(board_id, None)
+            self._gen += 1
+            self.stats["changes"] += len(joined) + len(left)
+            pending = self._pending.get(board_id)
+            first = pending is None
+            if first:
+                pending = self._pending[board_id] = {"joined": {}, "left": set()}
+            else:
+                self.stats["coalesced"] += 1
+            for user in joined:
+                if user["uid"] in pending["left"]:
+                    pending["left"].discard(user["uid"])        # left and came back: nothing to tell
+                    self.stats["cancelled"] += 1
+                else:
+                    pending["joined"][user["uid"]] = user
+            for uid in left:
+                if pending["joined"].pop(uid, None) is not None:
+                    self.stats["cancelled"] += 1                # came and went within the window
+                else:
+                    pending["left"].add(uid)
+        if not first:
+            return
+        if self.window <= 0 or self._spawn is None:
+            self.flush(board_id)
+        else:
+            self._spawn(self._flush_later, board_id)
+
+    def _flush_later(self, board_id: str) -> None:
+        self._sleep(self.window)
+        self.flush(board_id)
+
+    def flush(self, board_id: str) -> bool:
+        with self._lock:
+            pending = self._pending.pop(board_id, None)
+        if pending is None or self._emit is None or not (pending["joined"] or pending["left"]):
+            return False
+        users = self.users(board_id)
+        self._emit("presence_delta", {"boardId": board_id, "joined": list(pending["joined"].values()),
+                                      "left": sorted(pending["left"]), "count": len(users)}, room=board_id)
+        self._emit("user_list", {"boardId": board_id, "users": users}, room=board_id)
+        self._emit("online_users", users, room=board_id)
+        with self._lock:
+            self.stats["broadcasts"] += 1
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "pending": len(self._pending), "window_ms": int(self.window * 1000)}
+
+
+def make_store(spec: str = STORE):
+    """PRESENCE_STORE -> the store (memory, mongo or the socket hub's)."""
+    if spec.startswith("local://"):
+        from services.socket_queue import connect_hub
+        return connect_hub(spec).presence()
+    if spec == "mongo":
+        from db import db
+        store = MongoPresenceStore(db[COLLECTION])
+        store.clear()
+        store.start()
+        return store
+    if spec != "memory":
+        raise ValueError(f"PRESENCE_STORE must be memory, mongo or local://host:port, not {spec!r}")
+    return PresenceStore()
+
+
+presence = make_store()
+feed = PresenceFeed(presence, cache=STORE == "memory")
+metrics.register("presence", lambda: {**presence.snapshot(), "feed": feed.snapshot()})
+
+__all__ = ["PresenceStore", "MongoPresenceStore", "PresenceFeed", "make_store", "presence", "feed",
+           "DEBOUNCE_MS", "STORE", "TTL"]
@@ -0,0 +1,246 @@
+# server/services/report_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Whole-report cache for /api/ux/analyze.
+# Key = sha256(normalized items) + active model name + threshold fingerprint,
+# so changing CRITIQUE_NEG_PROB / ZSC_THRESHOLD / TOP_K / ZSC_HYPOTHESIS / ...
+# (or switching UX_MODEL) never serves a stale report.
+#
+#   REPORT_CACHE_SIZE=128       in-memory LRU entries (0 disables the cache)
+#   REPORT_CACHE_TTL_S=3600     lifetime of an entry (memory + Mongo TTL index)
+#   REPORT_CACHE_MONGO=1        also persist reports in Mongo (shared by workers)
+#   REPORT_CACHE_COLLECTION     Mongo collection name (default "report_cache")
+# ---------------------------------------------------------------------
+CACHE_VERSION = 1
+CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "128"))
+CACHE_TTL_S = int(os.getenv("REPORT_CACHE_TTL_S", "3600"))
+MONGO_ENABLED = os.getenv("REPORT_CACHE_MONGO", "0") == "1"
+MONGO_COLLECTION = os.getenv("REPORT_CACHE_COLLECTION", "report_cache")
+
+# cache status values (sent back as the X-Report-Cache header)
+HIT = "HIT"
+HIT_DB = "HIT-DB"
+MISS = "MISS"
+BYPASS = "BYPASS"
+
+# class attributes that change speed, not output
+_NON_SEMANTIC_PREFIXES = ("BATCH_", "HF_CONCURRENCY", "EMBED_BATCH")
+
+log = logging.getLogger(__name__)
+
+
+def model_fingerprint(model: Any) -> Dict[str, Any]:
+    """Model name + every UPPER_CASE scalar setting that can change the report."""
+    cls = type(model)
+    fp: Dict[str, Any] = {"model": getattr(model, "name", None) or cls.__name__}
+    for klass in reversed(cls.__mro__):
+        for attr, value in vars(klass).items():
+            if not attr.isupper() or attr.startswith(_NON_SEMANTIC_PREFIXES):
+                continue
+            if isinstance(value, (str, int, float, bool)):
+                fp[attr] = value
+    return fp
+
+
+def cache_key(items: List[str], model: Any, variant: str = "") -> str:
+    """`variant` separates other payload shapes over the same items (e.g. batch reports)."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}\n".encode())
+    h.update(json.dumps(model_fingerprint(model), sort_keys=True).encode())
+    if variant:
+        h.update(f"\n{variant}".encode("utf-8", "surrogatepass"))
+    for s in items:
+        h.update(b"\x1f")
+        h.update(s.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class ReportCache:
+    """Thread-safe LRU (+TTL) of serialized reports with an optional Mongo tier."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl_s: int = CACHE_TTL_S, collection: Any = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.stats = {"hits": 0, "db_hits": 0, "misses": 0, "bypass": 0, "stores": 0, "db_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if now - stored_at <= self.ttl_s:
+                    self._data.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return json.loads(payload), HIT
+                del self._data[key]
+
+        coll = self._collection()
+        if coll is not None:
+            try:
+                doc = coll.find_one({"_id": key}, {"report": 1, "createdAt": 1})
+            except Exception as e:
+                log.warning("[report_cache] mongo read failed: %s", e)
+                self._count("db_errors")
+                doc = None
+            if doc and "report" in doc:
+                report = doc["report"]
+                self._remember(key, json.dumps(report))
+                self._count("db_hits")
+                return report, HIT_DB
+
+        self._count("misses")
+        return None, None
+
+    def put(self, key: str, report: Dict[str, Any], *, model_name: str = "") -> None:
+        payload = json.dumps(report)
+        self._remember(key, payload)
+        self._count("stores")
+        coll = self._collection()
+        if coll is not None:
+            try:
+                coll.replace_one(
+                    {"_id": key},
+                    {"_id": key, "report": report, "model": model_name,
+                     "createdAt": datetime.now(timezone.utc)},
+                    upsert=True,
+                )
+            except Exception as e:
+                log.warning("[report_cache] mongo write failed: %s", e)
+                self._count("db_errors")
+
+    def _remember(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _collection(self) -> Any:
+        if self.collection is None and MONGO_ENABLED:
+            self.collection = _open_mongo_collection(self.ttl_s)
+        # pymongo collections refuse truth-testing: compare explicitly
+        return None if self.collection is None or self.collection is False else self.collection
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            for k in self.stats:
+                self.stats[k] = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            looked_up = self.stats["hits"] + self.stats["db_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "mongo": not (self.collection is None or self.collection is False),
+                "hit_rate": ((self.stats["hits"] + self.stats["db_hits"]) / looked_up) if looked_up else None,
+            }
+
+
+def _open_mongo_collection(ttl_s: int) -> Any:
+    """Collection with a TTL index on createdAt; False (not None) when unavailable so we do not retry."""
+    try:
+        from db import notes_collection  # lazy: db connects on import
+        coll = notes_collection.database[MONGO_COLLECTION]
+        coll.create_index("createdAt", expireAfterSeconds=int(ttl_s))
+        return coll
+    except Exception as e:
+        log.warning("[report_cache] mongo tier disabled: %s", e)
+        return False
+
+
+_cache = ReportCache()
+
+# ---------------------------------------------------------------------
+# Per-request scope: the route opens a scope (optionally bypassing the
+# cache) and reads the resulting status for the response header, without
+# changing the service function signatures.
+# ---------------------------------------------------------------------
+_local = threading.local()
+
+
+class CacheScope:
+    def __init__(self, bypass: bool):
+        self.bypass = bypass
+        self.status: Optional[str] = None
+
+
+@contextmanager
+def request_scope(*, bypass: bool = False) -> Iterator[CacheScope]:
+    prev = getattr(_local, "scope", None)
+    scope = CacheScope(bypass)
+    _local.scope = scope
+    try:
+        yield scope
+    finally:
+        _local.scope = prev
+
+
+def cached_report(items: List[str], model: Any, compute: Callable[[List[str]], Dict[str, Any]],
+                  variant: str = "") -> Dict[str, Any]:
+    """Return the cached report for (items, model settings[, variant]) or compute and store it."""
+    scope: Optional[CacheScope] = getattr(_local, "scope", None)
+    if not _cache.enabled:
+        return compute(items)
+
+    key = cache_key(items, model, variant)
+    if scope is not None and scope.bypass:
+        _cache._count("bypass")
+        status = BYPASS
+    else:
+        report, status = _cache.get(key)
+        if report is not None:
+            if scope is not None:
+                scope.status = status
+            return report
+        status = MISS
+
+    report = compute(items)
+    _cache.put(key, report, model_name=str(getattr(model, "name", "") or ""))
+    if scope is not None:
+        scope.status = status
+    return report
+
+
+def get_cache() -> ReportCache:
+    return _cache
+
+
+def clear() -> None:
+    _cache.clear()
+
+
+metrics.register("report_cache", lambda: _cache.snapshot())
+
+__all__ = [
+    "ReportCache", "cached_report", "cache_key", "model_fingerprint",
+    "request_scope", "get_cache", "clear", "HIT", "HIT_DB", "MISS", "BYPASS",
+]
@@ -0,0 +1,170 @@
+# server/services/snapshot_stream.py
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Chunked board snapshots for join_board.
+#
+# A client that joins with { stream: true } or a { viewport } receives the
+# board as notes_chunk messages instead of one load_existing_notes. Notes
+# inside / nearest the viewport come first, so the visible part of the
+# board paints before the rest arrives. At most SNAPSHOT_WINDOW chunks are
+# unacknowledged at a time; every notes_chunk_ack from the client releases
+# the next ones, so a large board never blocks the handler that joined it
+# and a slow client only holds what it has not read yet.
+#
+#   SNAPSHOT_CHUNK_SIZE=200    notes per chunk (clients may ask for fewer / more,
+#   SNAPSHOT_CHUNK_MAX=1000    up to this)
+#   SNAPSHOT_WINDOW=2          chunks in flight before an ack is needed
+# ---------------------------------------------------------------------
+CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", "200"))
+CHUNK_MAX = int(os.getenv("SNAPSHOT_CHUNK_MAX", "1000"))
+WINDOW = int(os.getenv("SNAPSHOT_WINDOW", "2"))
+
+Note = Dict[str, Any]
+
+
+def _num(v: Any) -> Optional[float]:
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return None
+    return float(v)
+
+
+def parse_viewport(viewport: Any) -> Optional[Tuple[float, float, float, float]]:
+    """{x, y, w, h} (w/h default 0: a point) -> (x, y, w, h), or None when unusable."""
+    if not isinstance(viewport, dict):
+        return None
+    x, y = _num(viewport.get("x")), _num(viewport.get("y"))
+    if x is None or y is None:
+        return None
+    w, h = _num(viewport.get("w")) or 0.0, _num(viewport.get("h")) or 0.0
+    return x, y, max(0.0, w), max(0.0, h)
+
+
+def order_for_viewport(notes: List[Note], viewport: Any = None) -> List[Note]:
+    """
+    Notes inside the viewport first, then by distance from its center; ties
+    (and everything without a viewport) by id so the order is stable.
+    Notes without numeric x/y go last.
+    """
+    box = parse_viewport(viewport)
+    if box is None:
+        return sorted(notes, key=lambda n: str(n.get("id")))
+    x0, y0, w, h = box
+    cx, cy = x0 + w / 2, y0 + h / 2
+
+    def key(n: Note):
+        x, y = _num(n.get("x")), _num(n.get("y"))
+        if x is None or y is None:
+            return (2, 0.0, str(n.get("id")))
+        inside = x0 <= x <= x0 + w and y0 <= y <= y0 + h
+        return (0 if inside else 1, (x - cx) ** 2 + (y - cy) ** 2, str(n.get("id")))
+
+    return sorted(notes, key=key)
+
+
+def chunk_size(requested: Any) -> int:
+    if isinstance(requested, int) and not isinstance(requested, bool) and requested > 0:
+        return min(requested, CHUNK_MAX)
+    return CHUNK_SIZE
+
+
+class _Stream:
+    __slots__ = ("board_id", "chunks", "rev", "sent", "acked")
+
+    def __init__(self, board_id: str, chunks: List[List[Note]], rev: Optional[int]):
+        self.board_id = board_id
+        self.chunks = chunks
+        self.rev = rev
+        self.sent = 0        # chunks handed out
+        self.acked = 0       # chunks the client confirmed
+
+
+class SnapshotStreams:
+    """Per-socket snapshot streams with a fixed window of unacknowledged chunks."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = max(1, window)
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _Stream] = {}
+        self.stats = {"streams": 0, "chunks": 0, "notes": 0, "completed": 0, "abandoned": 0}
+
+    def _message(self, s: _Stream, seq: int) -> Dict[str, Any]:
+        notes = s.chunks[seq]
+        msg = {"boardId": s.board_id, "seq": seq, "chunks": len(s.chunks),
+               "notes": notes, "done": seq == len(s.chunks) - 1}
+        if s.rev is not None:
+            msg["rev"] = s.rev
+        return msg
+
+    def _release(self, s: _Stream) -> List[Dict[str, Any]]:
+        # caller holds self._lock
+        out = []
+        while s.sent < len(s.chunks) and s.sent < s.acked + self.window:
+            out.append(self._message(s, s.sent))
+            self.stats["chunks"] += 1
+            self.stats["notes"] += len(s.chunks[s.sent])
+            s.sent += 1
+        return out
+
+    def start(self, sid: str, board_id: str, notes: List[Note], size: int = CHUNK_SIZE,
+              rev: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Begin streaming `notes` (already ordered) to `sid`; returns the first window of messages."""
+        size = max(1, size)
+        chunks = [notes[i:i + size] for i in range(0, len(notes), size)] or [[]]
+        s = _Stream(board_id, chunks, rev)
+        with self._lock:
+            if self._streams.pop(sid, None) is not None:
+                self.stats["abandoned"] += 1
+            self.stats["streams"] += 1
+            self._streams[sid] = s
+            out = self._release(s)
+            self._finish_if_done(sid, s)
+            return out
+
+    def ack(self, sid: str, board_id: Any, seq: Any) -> List[Dict[str, Any]]:
+        """Client confirmed chunk `seq` (and everything before it); returns what may be sent now."""
+        with self._lock:
+            s = self._streams.get(sid)
+            if s is None or s.board_id != board_id or not isinstance(seq, int) or isinstance(seq, bool):
+                return []
+            if seq < s.sent:
+                s.acked = max(s.acked, seq + 1)
+            out = self._release(s)
+            self._finish_if_done(sid, s)
+            return out
+
+    def _finish_if_done(self, sid: str, s: _Stream) -> None:
+        # caller holds self._lock
+        if s.acked >= len(s.chunks):
+            self._streams.pop(sid, None)
+            self.stats["completed"] += 1
+
+    def drop(self, sid: str) -> None:
+        """The socket left or disconnected; forget what it had not acknowledged."""
+        with self._lock:
+            if self._streams.pop(sid, None) is not None:
+                self.stats["abandoned"] += 1
+
+    def pending(self, sid: str) -> Optional[Dict[str, int]]:
+        with self._lock:
+            s = self._streams.get(sid)
+            if s is None:
+                return None
+            return {"chunks": len(s.chunks), "sent": s.sent, "acked": s.acked}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "active": len(self._streams), "window": self.window,
+                    "chunk_size": CHUNK_SIZE}
+
+
+streams = SnapshotStreams()
+metrics.register("snapshot_streams", streams.snapshot)
+
+__all__ = ["SnapshotStreams", "streams", "order_for_viewport", "parse_viewport", "chunk_size",
+           "CHUNK_SIZE", "CHUNK_MAX", "WINDOW"]
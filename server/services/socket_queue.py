@@ -0,0 +1,184 @@
+# server/services/socket_queue.py
+from __future__ import annotations
+import os
+import queue
+import sys
+import threading
+from multiprocessing.managers import BaseManager
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import socketio
+
+from services.async_mode import offload
+
+# ---------------------------------------------------------------------
+# Message queue between Socket.IO server processes.
+#
+# With SOCKETIO_MESSAGE_QUEUE set, every room broadcast goes through the
+# queue so clients connected to other processes / nodes receive it too:
+#
+#   redis://host:6379/0, rediss://…   Flask-SocketIO's Redis manager (pip install redis)
+#   amqp://…, kombu URLs              Flask-SocketIO's Kombu manager (pip install kombu)
+#   local://127.0.0.1:6390            the hub below: stdlib only, for development,
+#                                     tests and single-host multi-process setups
+#
+# The local hub is one process (python -m services.socket_queue
+# 127.0.0.1:6390) that relays published messages to every subscribed server
+# and also serves a shared PresenceStore (PRESENCE_STORE=local://…, see
+# services/presence.py). It speaks pickle over multiprocessing connections:
+# whoever holds the authkey can run code on the hub. SOCKETIO_HUB_KEY has no
+# default (the hub and its clients refuse to start without one); use a
+# long random secret and bind the hub to localhost / a private network.
+#
+#   SOCKETIO_MESSAGE_QUEUE=        queue URL ('' = single process, no queue)
+#   SOCKETIO_CHANNEL=flask-socketio
+#   SOCKETIO_HUB_KEY=              authkey shared by the hub and its clients (required)
+#   SOCKETIO_HUB_BACKLOG=10000     messages kept per subscriber that stopped reading
+# ---------------------------------------------------------------------
+QUEUE_URL = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")
+CHANNEL = os.getenv("SOCKETIO_CHANNEL", "flask-socketio")
+HUB_KEY = os.getenv("SOCKETIO_HUB_KEY", "").encode("utf-8")
+HUB_BACKLOG = int(os.getenv("SOCKETIO_HUB_BACKLOG", "10000"))
+
+
+def hub_address(url: str) -> Tuple[str, int]:
+    """local://host:port -> (host, port); ValueError for anything else."""
+    parsed = urlparse(url)
+    if parsed.scheme != "local" or not parsed.hostname or not parsed.port:
+        raise ValueError("hub URL must be local://host:port")
+    return parsed.hostname, parsed.port
+
+
+def _require_key(authkey: Optional[bytes]) -> bytes:
+    if not authkey:
+        raise RuntimeError("SOCKETIO_HUB_KEY is not set; the socket hub needs a shared secret "
+                           "(it accepts pickled calls from anyone holding it)")
+    return authkey
+
+
+class _Channel:
+    """Fan-out of published messages to one bounded queue per subscriber."""
+
+    def __init__(self, backlog: int = HUB_BACKLOG):
+        self.backlog = max(1, backlog)
+        self._lock = threading.Lock()
+        self._queues: Dict[str, "queue.Queue[Any]"] = {}
+
+    def subscribe(self, subscriber: str) -> None:
+        with self._lock:
+            self._queues.setdefault(subscriber, queue.Queue(self.backlog))
+
+    def unsubscribe(self, subscriber: str) -> None:
+        with self._lock:
+            self._queues.pop(subscriber, None)
+
+    def publish(self, message: Any) -> int:
+        with self._lock:
+            targets = list(self._queues.values())
+        for q in targets:
+            while True:
+                try:
+                    q.put_nowait(message)
+                    break
+                except queue.Full:           # a subscriber that stopped reading loses its oldest
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+        return len(targets)
+
+    def get(self, subscriber: str, timeout: float = 1.0) -> Any:
+        """Next message for `subscriber`; None after `timeout` seconds without one."""
+        with self._lock:
+            q = self._queues.get(subscriber)
+        if q is None:
+            raise KeyError(subscriber)
+        try:
+            return q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._queues)
+
+
+class LocalHub(BaseManager):
+    """Client / server for the hub; `channel()` and `presence()` return proxies to its shared objects."""
+
+
+LocalHub.register("channel")
+LocalHub.register("presence")
+
+
+def serve_hub(host: str = "127.0.0.1", port: int = 6390, authkey: Optional[bytes] = None) -> None:
+    """Run the hub in this process until it is killed."""
+    authkey = _require_key(HUB_KEY if authkey is None else authkey)
+    from services.presence import PresenceStore
+
+    channel, presence = _Channel(), PresenceStore()
+
+    class _Server(BaseManager):
+        pass
+
+    _Server.register("channel", callable=lambda: channel)
+    _Server.register("presence", callable=lambda: presence)
+    server = _Server(address=(host, port), authkey=authkey).get_server()
+    print(f"socket hub listening on local://{host}:{server.address[1]}", flush=True)
+    server.serve_forever()
+
+
+def connect_hub(url: str, authkey: Optional[bytes] = None) -> LocalHub:
+    authkey = _require_key(HUB_KEY if authkey is None else authkey)
+    hub = LocalHub(address=hub_address(url), authkey=authkey)
+    hub.connect()
+    return hub
+
+
+class LocalQueueManager(socketio.PubSubManager):
+    """python-socketio client manager publishing through the local hub."""
+
+    name = "local"
+
+    def __init__(self, url: str, channel: str = CHANNEL, write_only: bool = False, logger=None,
+                 authkey: Optional[bytes] = None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self._hub = connect_hub(url, authkey)
+        self._channel = self._hub.channel()     # proxies keep one connection per thread
+
+    def _publish(self, data):
+        self._channel.publish(data)
+
+    def _listen(self):
+        subscriber = f"{self.channel}:{self.host_id}"
+        self._channel.subscribe(subscriber)
+        try:
+            while True:
+                # a blocking pipe read: in an OS thread under eventlet
+                message = offload(self._channel.get, subscriber, 1.0)
+                if message is not None:
+                    yield message
+        finally:
+            self._channel.unsubscribe(subscriber)
+
+
+def socketio_options(url: Optional[str] = None, channel: str = CHANNEL) -> Dict[str, Any]:
+    """Extra SocketIO(...) keyword arguments for the configured message queue."""
+    url = QUEUE_URL if url is None else url
+    if not url:
+        return {}
+    if url.startswith("local://"):
+        return {"client_manager": LocalQueueManager(url, channel=channel)}
+    return {"message_queue": url, "channel": channel}
+
+
+__all__ = ["LocalHub", "LocalQueueManager", "connect_hub", "serve_hub", "socketio_options", "hub_address",
+           "QUEUE_URL", "CHANNEL"]
+
+
+if __name__ == "__main__":
+    address = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:6390"
+    host, _, port = address.rpartition(":")
+    serve_hub(host or "127.0.0.1", int(port))
@@ -0,0 +1,92 @@
+# server/services/socket_sessions.py
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Authenticated Socket.IO sessions.
+#
+# The Firebase ID token is verified once per socket (connect auth payload
+# or join_board) and the decoded claims are bound to the sid until the
+# token's `exp`. Note events are then authorized by a dictionary lookup
+# instead of a signature check per event. Clients send refresh_token
+# { token } before the ID token expires (Firebase tokens live an hour); an
+# event arriving on an expired session is verified against the token it
+# carries once and the session rebound, so older clients keep working.
+# A sid stays bound to one uid: tokens of another user are refused.
+#
+#   SOCKET_SESSION_TTL=3600    session lifetime for claims without `exp`
+# ---------------------------------------------------------------------
+TTL = int(os.getenv("SOCKET_SESSION_TTL", "3600"))
+
+Claims = Dict[str, Any]
+
+
+class SocketSessions:
+    """sid -> (claims, expiry); thread-safe."""
+
+    def __init__(self, ttl: int = TTL, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Tuple[Claims, float]] = {}
+        self.stats = {"bound": 0, "refreshed": 0, "rejected": 0, "lookups": 0, "expired": 0}
+
+    def _expiry(self, claims: Claims) -> float:
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and not isinstance(exp, bool):
+            return float(exp)
+        return self.clock() + self.ttl
+
+    def bind(self, sid: str, claims: Optional[Claims]) -> Optional[Claims]:
+        """
+        Bind verified `claims` to `sid` (replacing an older session of the
+        same uid). None when there are no claims or they belong to another
+        user than the one already bound to this sid.
+        """
+        if not claims or not claims.get("uid"):
+            return None
+        exp = self._expiry(claims)
+        with self._lock:
+            current = self._sessions.get(sid)
+            if current is not None and current[0].get("uid") != claims["uid"]:
+                self.stats["rejected"] += 1
+                return None
+            self.stats["refreshed" if current is not None else "bound"] += 1
+            self._sessions[sid] = (claims, exp)
+        return claims
+
+    def get(self, sid: str) -> Optional[Claims]:
+        """Claims bound to `sid`, or None when unbound or expired."""
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                self.stats["expired"] += 1
+                return None              # kept (uid pinned) until rebound or dropped
+            return entry[0]
+
+    def expires(self, sid: str) -> Optional[float]:
+        with self._lock:
+            entry = self._sessions.get(sid)
+            return entry[1] if entry else None
+
+    def drop(self, sid: str) -> None:
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "active": len(self._sessions), "ttl": self.ttl}
+
+
+sessions = SocketSessions()
+metrics.register("socket_sessions", sessions.snapshot)
+
+__all__ = ["SocketSessions", "sessions", "TTL"]
@@ -0,0 +1,262 @@
+# server/services/spatial.py
+from __future__ import annotations
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services import metrics
+
+# ---------------------------------------------------------------------
+# Spatial lookups on a board's canvas.
+#
+# GridIndex buckets note ids into SPATIAL_CELL x SPATIAL_CELL cells so a
+# bounding-box query only visits the cells it overlaps (board_cache keeps
+# one per cached board for GET /api/notes?bbox=). ViewportRegistry holds
+# the viewport each socket subscribed with (subscribe_viewport) and
+# decides who receives a create / move broadcast: clients without a
+# viewport get everything, subscribers only notes whose new or previous
+# position falls inside their viewport grown by VIEWPORT_MARGIN (notes
+# have a size; x/y is their corner).
+#
+#   SPATIAL_CELL=512       grid cell size in canvas units
+#   VIEWPORT_MARGIN=300    added around each subscribed viewport
+# ---------------------------------------------------------------------
+CELL = float(os.getenv("SPATIAL_CELL", "512"))
+MARGIN = float(os.getenv("VIEWPORT_MARGIN", "300"))
+
+BBox = Tuple[float, float, float, float]       # x1, y1, x2, y2 with x1 <= x2, y1 <= y2
+
+
+def coord(v: Any) -> Optional[float]:
+    """A finite number as float (bools and strings are not coordinates)."""
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return None
+    v = float(v)
+    return v if math.isfinite(v) else None
+
+
+def parse_bbox(text: str) -> BBox:
+    """"x1,y1,x2,y2" -> normalized bbox; ValueError when malformed."""
+    parts = [p.strip() for p in (text or "").split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be x1,y1,x2,y2")
+    try:
+        x1, y1, x2, y2 = (float(p) for p in parts)
+    except ValueError:
+        raise ValueError("bbox must be x1,y1,x2,y2") from None
+    if not all(math.isfinite(v) for v in (x1, y1, x2, y2)):
+        raise ValueError("bbox coordinates must be finite")
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def viewport_bbox(viewport: Any, margin: float = 0.0) -> Optional[BBox]:
+    """{x, y, w, h} -> bbox grown by `margin`, or None when unusable."""
+    if not isinstance(viewport, dict):
+        return None
+    x, y = coord(viewport.get("x")), coord(viewport.get("y"))
+    if x is None or y is None:
+        return None
+    w, h = max(0.0, coord(viewport.get("w")) or 0.0), max(0.0, coord(viewport.get("h")) or 0.0)
+    return x - margin, y - margin, x + w + margin, y + h + margin
+
+
+def contains(bbox: BBox, x: Any, y: Any) -> bool:
+    x, y = coord(x), coord(y)
+    if x is None or y is None:
+        return False
+    return bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
+
+
+class GridIndex:
+    """note id -> cell buckets; not thread-safe (board_cache calls it under its lock)."""
+
+    def __init__(self, cell: float = CELL):
+        self.cell = max(1.0, cell)
+        self._cells: Dict[Tuple[int, int], Set[Any]] = {}
+        self._pos: Dict[Any, Tuple[float, float]] = {}
+
+    def _key(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell)), int(math.floor(y / self.cell))
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def put(self, note_id: Any, x: Any, y: Any) -> None:
+        self.remove(note_id)
+        x, y = coord(x), coord(y)
+        if x is None or y is None:
+            return                       # not placed on the canvas: never in a bbox
+        self._pos[note_id] = (x, y)
+        self._cells.setdefault(self._key(x, y), set()).add(note_id)
+
+    def remove(self, note_id: Any) -> None:
+        pos = self._pos.pop(note_id, None)
+        if pos is None:
+            return
+        key = self._key(*pos)
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.discard(note_id)
+            if not bucket:
+                del self._cells[key]
+
+    def query(self, bbox: BBox) -> Set[Any]:
+        x1, y1, x2, y2 = bbox
+        kx1, ky1 = self._key(x1, y1)
+        kx2, ky2 = self._key(x2, y2)
+        out: Set[Any] = set()
+        if (kx2 - kx1 + 1) * (ky2 - ky1 + 1) > len(self._cells):
+            # box covers more cells than are occupied: walk the occupied ones
+            keys: Iterable[Tuple[int, int]] = [k for k in self._cells
+                                                if kx1 <= k[0] <= kx2 and ky1 <= k[1] <= ky2]
+        else:
+            keys = ((kx, ky) for kx in range(kx1, kx2 + 1) for ky in range(ky1, ky2 + 1))
+        for key in keys:
+            for note_id in self._cells.get(key, ()):
+                x, y = self._pos[note_id]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    out.add(note_id)
+        return out
+
+
+# {note_id: (x, y)} for notes of a board whose position is known elsewhere (board_cache)
+Locator = Callable[[str, List[Any]], Dict[Any, Tuple[float, float]]]
+# flask_socketio.emit / SocketIO.emit: (event, payload, room=..., skip_sid=...)
+Emit = Callable[..., Any]
+
+
+class ViewportRegistry:
+    """Subscribed viewports per board and the last broadcast position of their notes."""
+
+    def __init__(self, margin: float = MARGIN, locate: Optional[Locator] = None):
+        self.margin = margin
+        self.locate = locate
+        self._lock = threading.Lock()
+        self._boards: Dict[str, Dict[str, BBox]] = {}          # board -> {sid: bbox}
+        self._sid_board: Dict[str, str] = {}
+        # last position sent per note, kept only while its board has subscribers
+        self._last: Dict[str, Dict[Any, Tuple[float, float]]] = {}
+        self.stats = {"broadcasts": 0, "filtered": 0, "deliveries_skipped": 0}
+
+    def subscribe(self, sid: str, board_id: str, viewport: Any) -> Optional[BBox]:
+        """Set (or with viewport None, clear) the viewport of `sid` on `board_id`."""
+        bbox = viewport_bbox(viewport, self.margin)
+        with self._lock:
+            if bbox is None or self._sid_board.get(sid, board_id) != board_id:
+                self._drop(sid)
+            if bbox is None:
+                return None
+            self._boards.setdefault(board_id, {})[sid] = bbox
+            self._sid_board[sid] = board_id
+            self._last.setdefault(board_id, {})
+        return bbox
+
+    def drop(self, sid: str) -> None:
+        with self._lock:
+            self._drop(sid)
+
+    def _drop(self, sid: str) -> None:
+        # caller holds self._lock
+        board_id = self._sid_board.pop(sid, None)
+        if board_id is None:
+            return
+        subs = self._boards.get(board_id, {})
+        subs.pop(sid, None)
+        if not subs:
+            self._boards.pop(board_id, None)
+            self._last.pop(board_id, None)
+
+    def forget(self, board_id: str, note_ids: Iterable[Any]) -> None:
+        """Deleted notes: no previous position to route by any more."""
+        with self._lock:
+            last = self._last.get(board_id)
+            if last:
+                for note_id in note_ids:
+                    last.pop(note_id, None)
+
+    def viewport(self, sid: str) -> Optional[BBox]:
+        with self._lock:
+            board_id = self._sid_board.get(sid)
+            return self._boards.get(board_id, {}).get(sid) if board_id else None
+
+    def plan(self, board_id: str, notes: List[Dict[str, Any]], moved: bool = True):
+        """
+        None when nobody on the board subscribed (send to the room), else
+        (subscriber sids, {sid: [notes in its viewport]}). For moves the
+        previous position counts too (a note leaving a viewport must reach
+        it); a moved note whose previous position is unknown goes to every
+        subscriber.
+        """
+        with self._lock:
+            subs = dict(self._boards.get(board_id) or {})
+            if not subs:
+                return None
+            last = self._last.get(board_id, {})
+            previous = {n.get("id"): last.get(n.get("id")) for n in notes} if moved else {}
+        missing = [nid for nid, pos in previous.items() if pos is None]
+        if missing and self.locate is not None:
+            try:
+                previous.update(self.locate(board_id, missing))
+            except Exception:
+                pass
+        per_sid: Dict[str, List[Dict[str, Any]]] = {sid: [] for sid in subs}
+        for n in notes:
+            old = previous.get(n.get("id"))
+            unknown = moved and old is None
+            for sid, bbox in subs.items():
+                if contains(bbox, n.get("x"), n.get("y")) or unknown or (old and contains(bbox, *old)):
+                    per_sid[sid].append(n)
+        with self._lock:
+            last = self._last.get(board_id)
+            if last is not None:
+                for n in notes:
+                    x, y = coord(n.get("x")), coord(n.get("y"))
+                    if x is not None and y is not None:
+                        last[n.get("id")] = (x, y)
+        return list(subs), per_sid
+
+    def broadcast(self, emit: Emit, event: str, board_id: str, notes: List[Dict[str, Any]],
+                  payload: Callable[[List[Dict[str, Any]]], Any], moved: bool = True) -> None:
+        """Emit payload(notes) to the room, narrowed per subscriber to the notes it can see."""
+        plan = self.plan(board_id, notes, moved)
+        with self._lock:
+            self.stats["broadcasts"] += 1
+        if plan is None:
+            emit(event, payload(notes), room=board_id)
+            return
+        subs, per_sid = plan
+        emit(event, payload(notes), room=board_id, skip_sid=subs)   # clients without a viewport
+        skipped = 0
+        for sid, mine in per_sid.items():
+            if mine:
+                emit(event, payload(mine), room=sid)
+            else:
+                skipped += 1
+        with self._lock:
+            self.stats["filtered"] += 1
+            self.stats["deliveries_skipped"] += skipped
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "boards": len(self._boards), "subscribers": len(self._sid_board),
+                    "tracked_notes": sum(len(v) for v in self._last.values()), "margin": self.margin}
+
+
+_registry: Optional[ViewportRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ViewportRegistry:
+    """Process-wide registry; previous positions fall back to the board cache."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from services.note_service import note_positions
+            _registry = ViewportRegistry(locate=note_positions)
+            metrics.register("viewports", _registry.snapshot)
+        return _registry
+
+
+__all__ = ["GridIndex", "ViewportRegistry", "get_registry", "parse_bbox", "viewport_bbox", "contains", "coord",
+           "CELL", "MARGIN"]
@@ -0,0 +1,198 @@
+# server/services/tabular.py
+from __future__ import annotations
+import csv
+import io
+import json
+import os
+from contextlib import closing
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.extraction import Source, clean_answer
+
+# ---------------------------------------------------------------------
+# Survey exports (CSV / JSONL) -> answer records.
+#
+# One row is one response. The answer column (or JSONL field) is picked
+# explicitly or detected from the headers (same idea as
+# scripts/evaluate_model._detect_headers); optional segment / respondent
+# columns ride along with every record. Rows are read one at a time from
+# the spooled upload, never joined into a single string.
+#
+#   TABLE_MAX_ROWS=100000    rows read per upload (the rest are counted as truncated)
+# ---------------------------------------------------------------------
+TABLE_EXT = (".csv", ".jsonl", ".ndjson")
+TABLE_MAX_ROWS = int(os.getenv("TABLE_MAX_ROWS", "100000"))
+
+ANSWER_HEADER_CANDIDATES = ["answer", "response", "text", "feedback", "comment", "review",
+                            "utterance", "message"]
+SEGMENT_HEADER_CANDIDATES = ["segment", "group", "cohort", "persona", "plan", "tier", "region"]
+RESPONDENT_HEADER_CANDIDATES = ["respondent_id", "respondent", "participant_id", "participant",
+                                "user_id", "response_id", "id"]
+
+_SAMPLE_ROWS = 50          # rows looked at when no header names the answer column
+_SNIFF_BYTES = 64 * 1024
+
+
+class ColumnNotFound(ValueError):
+    """The requested (or any detectable) answer column is missing."""
+
+    def __init__(self, message: str, headers: List[str]):
+        super().__init__(message)
+        self.headers = headers
+
+
+def is_table(filename: str) -> bool:
+    return (filename or "").lower().endswith(TABLE_EXT)
+
+
+def _match(headers: List[str], wanted: Optional[str], candidates: List[str]) -> Optional[str]:
+    if wanted:
+        w = wanted.strip().lower()
+        return next((h for h in headers if h.strip().lower() == w), None)
+    # candidates are in preference order
+    by_name = {h.strip().lower(): h for h in headers}
+    return next((by_name[c] for c in candidates if c in by_name), None)
+
+
+def _guess_answer_column(headers: List[str], sample: List[Dict[str, Any]]) -> Optional[str]:
+    """Headerless guess: the column with the longest non-numeric values in the first rows."""
+    best, best_len = None, 0.0
+    for h in headers:
+        values = [v for v in (_cell(r.get(h)) for r in sample) if v]
+        values = [v for v in values if not v.replace(".", "", 1).isdigit()]
+        if not values:
+            continue
+        avg = sum(len(v) for v in values) / len(values)
+        if avg > best_len:
+            best, best_len = h, avg
+    return best
+
+
+def detect_columns(headers: List[str], sample: List[Dict[str, Any]] = (), *,
+                   answer: Optional[str] = None, segment: Optional[str] = None,
+                   respondent: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    {answer, segment, respondent} column names. Explicit names must exist
+    (case-insensitive); otherwise header candidates are tried, and for the
+    answer column the sampled rows as a last resort.
+    """
+    cols = {
+        "answer": _match(headers, answer, ANSWER_HEADER_CANDIDATES),
+        "segment": _match(headers, segment, SEGMENT_HEADER_CANDIDATES),
+        "respondent": _match(headers, respondent, RESPONDENT_HEADER_CANDIDATES),
+    }
+    for key, wanted in (("answer", answer), ("segment", segment), ("respondent", respondent)):
+        if wanted and cols[key] is None:
+            raise ColumnNotFound(f"Column '{wanted}' not found. Headers present: {headers}", headers)
+    if cols["answer"] is None:
+        taken = {cols["segment"], cols["respondent"]}
+        cols["answer"] = _guess_answer_column([h for h in headers if h not in taken], list(sample))
+    if cols["answer"] is None:
+        raise ColumnNotFound(f"Could not detect the answer column. Headers present: {headers}", headers)
+    return cols
+
+
+def _cell(value: Any) -> str:
+    if value is None or isinstance(value, (dict, list)):
+        return ""
+    return str(value).strip()
+
+
+# ---- readers: (headers, row iterator) ----
+def _text_stream(source: Source):
+    if isinstance(source, (bytes, bytearray)):
+        raw = io.BytesIO(bytes(source))
+    else:
+        raw = open(source, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _csv_rows(f) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    sample = f.read(_SNIFF_BYTES)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    rd = csv.DictReader(f, dialect=dialect)
+    return [h for h in (rd.fieldnames or []) if h is not None], iter(rd)
+
+
+def _jsonl_rows(f) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    def rows() -> Iterator[Dict[str, Any]]:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                yield obj
+
+    it = rows()
+    first = next(it, None)
+    if first is None:
+        return [], iter(())
+
+    def chained() -> Iterator[Dict[str, Any]]:
+        yield first
+        yield from it
+    return list(first.keys()), chained()
+
+
+def iter_records(source: Source, filename: str, *, answer: Optional[str] = None,
+                 segment: Optional[str] = None, respondent: Optional[str] = None,
+                 max_rows: Optional[int] = None, stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, str]]:
+    """
+    {"text", "segment", "respondent"} per row with a non-empty answer, lazily.
+    Column detection happens before the first record is produced (so a
+    ColumnNotFound surfaces on the first next()). `stats`, when given, is
+    filled with {columns, headers, rows, skipped, truncated} as rows are read.
+    """
+    max_rows = TABLE_MAX_ROWS if max_rows is None else max_rows
+    stats = {} if stats is None else stats
+    stats.update(rows=0, skipped=0, truncated=0)
+    with _text_stream(source) as f:
+        reader = _jsonl_rows if (filename or "").lower().endswith((".jsonl", ".ndjson")) else _csv_rows
+        headers, rows = reader(f)
+        sample: List[Dict[str, Any]] = []
+        for row in rows:
+            sample.append(row)
+            if len(sample) >= _SAMPLE_ROWS:
+                break
+        cols = detect_columns(headers, sample, answer=answer, segment=segment, respondent=respondent)
+        stats.update(columns=cols, headers=headers)
+
+        def all_rows() -> Iterable[Dict[str, Any]]:
+            yield from sample
+            yield from rows
+
+        for row in all_rows():
+            if stats["rows"] >= max_rows:
+                stats["truncated"] += 1
+                continue
+            stats["rows"] += 1
+            text = clean_answer([_cell(row.get(cols["answer"]))])
+            if not text:
+                stats["skipped"] += 1
+                continue
+            yield {
+                "text": text,
+                "segment": _cell(row.get(cols["segment"])) if cols["segment"] else "",
+                "respondent": _cell(row.get(cols["respondent"])) if cols["respondent"] else "",
+            }
+
+
+def iter_table_answers(source: Source, filename: str, **columns: Optional[str]) -> Iterator[str]:
+    """Just the answer texts (batch analysis treats a table like any other document)."""
+    with closing(iter_records(source, filename, **columns)) as records:
+        for rec in records:
+            yield rec["text"]
+
+
+__all__ = [
+    "TABLE_EXT", "ColumnNotFound", "is_table", "detect_columns",
+    "iter_records", "iter_table_answers",
+]
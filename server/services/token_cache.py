@@ -0,0 +1,174 @@
+# server/services/token_cache.py
+from __future__ import annotations
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+# ---------------------------------------------------------------------
+# Verified ID token cache.
+#
+# Verifying a Firebase ID token is a signature check (plus a public key
+# fetch whenever Google's key set expired from the HTTP cache), and
+# authenticate_request ran it on every request, polling included. The
+# cache keeps decoded claims keyed by a SHA-256 of the token until the
+# token's `exp` minus TOKEN_CACHE_SKEW; tokens without a numeric `exp`
+# are never cached. Definitive rejections (invalid / expired / revoked
+# tokens) are remembered for TOKEN_CACHE_NEGATIVE_TTL seconds so a client
+# retrying a bad token does not cost a verification each time; transient
+# failures (key fetch errors) are not cached. Least recently used entries
+# go first past TOKEN_CACHE_SIZE.
+#
+# KeyRefresher re-fetches the public keys on a timer (bypassing the HTTP
+# cache, which then serves the fresh copy) so a key rotation or an expired
+# key set is picked up off the request path.
+#
+#   TOKEN_CACHE_SIZE=10000          entries (0 disables the cache)
+#   TOKEN_CACHE_SKEW=30             seconds before `exp` an entry stops being served
+#   TOKEN_CACHE_NEGATIVE_TTL=10     seconds a rejected token stays rejected
+#   TOKEN_KEYS_REFRESH=600          seconds between public key refreshes (0 disables)
+# ---------------------------------------------------------------------
+SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+SKEW = float(os.getenv("TOKEN_CACHE_SKEW", "30"))
+NEGATIVE_TTL = float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL", "10"))
+KEY_REFRESH = float(os.getenv("TOKEN_KEYS_REFRESH", "600"))
+
+Claims = Dict[str, Any]
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    Bounded, thread-safe cache in front of `verify(token) -> claims` (which
+    raises on rejection). Cached claims are shared: callers must not mutate them.
+    """
+
+    def __init__(self, verify: Callable[[str], Claims], size: int = SIZE, skew: float = SKEW,
+                 negative_ttl: float = NEGATIVE_TTL, definitive: Tuple[Type[BaseException], ...] = (ValueError,),
+                 clock: Callable[[], float] = time.time):
+        self._verify = verify
+        self.size = max(0, size)
+        self.skew = skew
+        self.negative_ttl = negative_ttl
+        self.definitive = definitive
+        self.clock = clock
+        self._lock = threading.Lock()
+        # key -> (claims or None, exception or None, valid until)
+        self._entries: "OrderedDict[str, Tuple[Optional[Claims], Optional[BaseException], float]]" = OrderedDict()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "verify_errors": 0, "evictions": 0,
+                      "uncacheable": 0}
+
+    def verify(self, token: str) -> Claims:
+        """Decoded claims for `token`; raises like `verify` for rejected tokens."""
+        if not token:
+            raise ValueError("Missing token")
+        if self.size == 0:
+            return self._verify(token)
+        key = token_key(token)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                if entry[1] is not None:
+                    self.stats["negative_hits"] += 1
+                    raise entry[1].with_traceback(None)
+                self.stats["hits"] += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+        try:
+            claims = self._verify(token)
+        except self.definitive as e:
+            self._put(key, None, e, now + self.negative_ttl)
+            raise
+        except Exception:
+            with self._lock:
+                self.stats["verify_errors"] += 1
+            raise
+        exp = claims.get("exp") if isinstance(claims, dict) else None
+        if isinstance(exp, (int, float)) and not isinstance(exp, bool) and exp - self.skew > now:
+            self._put(key, claims, None, exp - self.skew)
+        else:
+            with self._lock:
+                self.stats["uncacheable"] += 1
+        return claims
+
+    def _put(self, key: str, claims: Optional[Claims], error: Optional[BaseException], until: float) -> None:
+        with self._lock:
+            self._entries[key] = (claims, error, until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def forget(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_key(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.stats["hits"] + self.stats["negative_hits"]
+            lookups = served + self.stats["misses"]
+            return {**self.stats, "entries": len(self._entries), "size": self.size,
+                    "hit_rate": round(served / lookups, 4) if lookups else None}
+
+
+class KeyRefresher:
+    """Calls `fetch` every `interval` seconds on a daemon thread; failures are counted, not raised."""
+
+    def __init__(self, fetch: Callable[[], Any], interval: float = KEY_REFRESH):
+        self.fetch = fetch
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"refreshes": 0, "errors": 0, "last_error": None, "last_refresh": None}
+
+    def start(self) -> bool:
+        with self._lock:
+            if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="token-key-refresh", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def refresh(self) -> bool:
+        try:
+            self.fetch()
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+            return False
+        with self._lock:
+            self.stats["refreshes"] += 1
+            self.stats["last_refresh"] = time.time()
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            return {**self.stats, "interval": self.interval, "running": running}
+
+
+__all__ = ["TokenCache", "KeyRefresher", "token_key", "SIZE", "SKEW", "NEGATIVE_TTL", "KEY_REFRESH"]
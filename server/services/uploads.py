@@ -0,0 +1,148 @@
+# server/services/uploads.py
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+from flask import Flask, Request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# ---------------------------------------------------------------------
+# Uploads are copied chunk by chunk into a temp file instead of being
+# read() into memory; the extractors then mmap that file. Peak memory per
+# request is one chunk, whatever the file size. The SHA-256 of the content
+# is computed during the copy (key of services/extraction_cache).
+#
+# With configure(app) the multipart parser itself writes each file part
+# into such a temp file (SpoolingRequest), hashing it and enforcing the cap
+# as the body arrives; spool_upload() then adopts that file instead of
+# copying it a second time. MAX_CONTENT_LENGTH caps the whole request
+# before any of it is parsed.
+#   UPLOAD_MAX_BYTES=52428800   hard cap per file, enforced while streaming (413)
+#   UPLOAD_REQUEST_MAX_BYTES=   cap per request, all parts (default 4 x UPLOAD_MAX_BYTES)
+#   UPLOAD_CHUNK_BYTES=1048576  copy chunk size
+#   UPLOAD_SPOOL_DIR=           temp directory (default: system temp)
+# ---------------------------------------------------------------------
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_REQUEST_MAX_BYTES = int(os.getenv("UPLOAD_REQUEST_MAX_BYTES") or 4 * UPLOAD_MAX_BYTES)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    description = "Uploaded file exceeds size limit."
+
+
+class SpooledUpload:
+    """A temp file holding one upload; removed when the context exits."""
+
+    def __init__(self, path: str, size: int, filename: str = "", sha256: str = "", file=None):
+        self.path = path
+        self.size = size
+        self.filename = filename
+        self.sha256 = sha256
+        self._file = file           # an adopted UploadSpool: closing it removes the file
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            return
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class UploadSpool:
+    """
+    Temp file the multipart parser writes one file part into: hashed and
+    capped as the data arrives, removed when closed (or collected).
+    """
+
+    def __init__(self, filename: str = "", max_bytes: Optional[int] = None):
+        self.max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+        suffix = os.path.splitext(filename or "")[1].lower()
+        self._file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+        self._digest = hashlib.sha256()
+        self.name = self._file.name
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self._file.close()
+            raise UploadTooLarge()
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read / readline / seek / flush / close ... of the temp file
+        return getattr(self._file, name)
+
+
+class SpoolingRequest(Request):
+    """Flask request whose file parts are parsed straight into UploadSpool temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(filename or "")
+
+
+def configure(app: Flask) -> None:
+    """Spool uploads while the body is parsed, cap the request size and answer 413 as JSON."""
+    app.request_class = SpoolingRequest
+    app.config["MAX_CONTENT_LENGTH"] = UPLOAD_REQUEST_MAX_BYTES
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def _too_large(e):
+        return jsonify({"error": "file_too_large", "message": "Uploaded file exceeds size limit."}), 413
+
+
+def spool_upload(stream: BinaryIO, filename: str = "", *,
+                 max_bytes: Optional[int] = None,
+                 chunk_size: Optional[int] = None) -> SpooledUpload:
+    """Copy + hash `stream` into a temp file, raising UploadTooLarge as soon as it passes max_bytes."""
+    max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    if isinstance(stream, UploadSpool):
+        # already spooled by the parser (SpoolingRequest): adopt it, no second copy
+        if max_bytes and stream.size > max_bytes:
+            stream.close()
+            raise UploadTooLarge()
+        stream.flush()
+        return SpooledUpload(stream.name, stream.size, filename, stream.hexdigest(), file=stream)
+    chunk_size = chunk_size or UPLOAD_CHUNK_BYTES
+    suffix = os.path.splitext(filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        raise
+    return SpooledUpload(path, size, filename, digest.hexdigest())
+
+
+__all__ = ["UPLOAD_MAX_BYTES", "UPLOAD_REQUEST_MAX_BYTES", "UploadTooLarge", "SpooledUpload", "UploadSpool",
+           "SpoolingRequest", "configure", "spool_upload"]
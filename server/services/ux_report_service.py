@@ -1,110 +1,48 @@
 # services/ux_report_service.py
 from __future__ import annotations
-from typing import List, Dict, Any
-import io, re
-from models.registry import get_active_model
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from itertools import islice
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from models.chunked import CHUNK_SIZE, FileCheckpoint, analyze_in_chunks
+from services.report_cache import cached_report
+from services import extraction
+from services import extraction_cache
+from services import tabular
 
 
 try:
     from models.registry import get_active_model  # your existing local pipeline
 except Exception:
     get_active_model = None  # type: ignore
-# optional deps (safe imports)
-try:
-    import pdfplumber
-except Exception:
-    pdfplumber = None  # type: ignore
-try:
-    import PyPDF2
-except Exception:
-    PyPDF2 = None  # type: ignore
-try:
-    from docx import Document
-except Exception:
-    Document = None  # type: ignore
 
-# ---------- NEW: answer-only regex (multiline) ----------
-ANSWER_LINE_RE = re.compile(r"(?m)^\s*A:\s*(.+)\s*$")
+# cap on answers sent to the model per request
+MAX_ITEMS = 500
+# batch analysis: answers per batch (after cross-file dedupe) and parallel file extractions
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_EXTRACT_WORKERS = int(os.getenv("BATCH_EXTRACT_WORKERS", "4"))
+
+# chunked mode: no MAX_ITEMS cap, answers stream through models/chunked in
+# ANALYZE_CHUNK_SIZE chunks; partials are checkpointed under ANALYZE_CHECKPOINT_DIR
+# so a crashed analysis of the same upload/text resumes where it stopped
+CHUNKED = os.getenv("ANALYZE_CHUNKED", "0") == "1"
+CHECKPOINT_DIR = os.getenv("ANALYZE_CHECKPOINT_DIR") or None
+# CSV/JSONL exports: distinct segments reported (the rest are counted under "(other)")
+TABLE_MAX_SEGMENTS = int(os.getenv("TABLE_MAX_SEGMENTS", "50"))
 
-def _norm(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").strip())
+log = logging.getLogger(__name__)
 
 def _answers_only_from_text(text: str) -> List[str]:
-    """Return ONLY answers: lines that start with 'A:'"""
-    if not text:
-        return []
-
-    items = [_norm(m.group(1)) for m in ANSWER_LINE_RE.finditer(text)]
-
-    if not items:
-        sentences = re.split(r"(?<=[.!?])\s+(?=[A-Z0-9(“\"'])", text.strip())
-        if len(sentences) < 2:
-            sentences = [ln.strip() for ln in text.splitlines()]
-        items = [_norm(s) for s in sentences if s.strip()]
-
-
-    # dedupe (keep order) + drop empties
-    seen, out = set(), []
-    for s in items:
-        if s and s.lower() not in seen:
-            seen.add(s.lower())
-            out.append(s)
-    return out[:500]
-
-# ---------- your existing extractors (unchanged except minor guards) ----------
-def _extract_text_from_pdf_bytes(data: bytes) -> str:
-    if pdfplumber is not None:
-        try:
-            chunks = []
-            with pdfplumber.open(io.BytesIO(data)) as pdf:
-                for p in pdf.pages:
-                    chunks.append(p.extract_text() or "")
-            return "\n".join(chunks).strip()
-        except Exception:
-            pass
-    if PyPDF2 is not None:
-        try:
-            reader = PyPDF2.PdfReader(io.BytesIO(data))
-            pages = []
-            for p in reader.pages:
-                try:
-                    pages.append(p.extract_text() or "")
-                except Exception:
-                    pages.append("")
-            return "\n".join(pages).strip()
-        except Exception:
-            pass
-    raise RuntimeError("Unable to extract text from PDF.")
-
-def _extract_text_from_docx_bytes(data: bytes) -> str:
-    if Document is None:
-        raise RuntimeError("python-docx not installed.")
-    doc = Document(io.BytesIO(data))
-    # join paragraphs with newlines so ANSWER_LINE_RE can see line starts
-    return "\n".join(p.text for p in doc.paragraphs).strip()
-
-def _decode_bytes(data: bytes) -> str:
-    for enc in ("utf-8", "latin-1"):
-        try:
-            return data.decode(enc)
-        except Exception:
-            continue
-    return ""
-
-def _extract_text_from_bytes(file_bytes: bytes, filename: str) -> str:
-    name = (filename or "").lower()
-    if name.endswith(".pdf"):
-        return _extract_text_from_pdf_bytes(file_bytes)
-    if name.endswith(".docx"):
-        return _extract_text_from_docx_bytes(file_bytes)
-    if name.endswith(".txt"):
-        return _decode_bytes(file_bytes)
-    # heuristic fallback
-    try:
-        return _extract_text_from_pdf_bytes(file_bytes)
-    except Exception:
-        return _decode_bytes(file_bytes)
-    
+    """Answers ('A:' blocks, or sentences when there are none), de-duplicated, capped."""
+    return list(extraction.iter_answers_from_text(text or "", limit=MAX_ITEMS))
+
+def _extract_text_from_bytes(file_bytes: extraction.Source, filename: str) -> str:
+    return extraction.extract_text_from_bytes(file_bytes, filename)
+
 
 def _require_model():
     """Resolve the active model and raise clear errors when missing."""
@@ -116,14 +54,287 @@ def _require_model():
     return model
 
 
+def _source_hash(source: extraction.Source) -> str:
+    if isinstance(source, (bytes, bytearray)):
+        return extraction_cache.content_hash(bytes(source))
+    return extraction_cache.file_hash(source)
+
+
+def _chunked(model: Any) -> bool:
+    return CHUNKED and callable(getattr(model, "classify_items", None))
+
+
+def _chunked_report(model: Any, job_key: str, open_answers) -> Dict[str, Any]:
+    """
+    Chunked analysis of `open_answers()` (a fresh answer iterator per call),
+    cached by `job_key` (content hash) instead of the full item list.
+    """
+    def compute(_items: List[str]) -> Dict[str, Any]:
+        checkpoint = FileCheckpoint(CHECKPOINT_DIR, job_key) if CHECKPOINT_DIR else None
+        answers = open_answers()
+        try:
+            return analyze_in_chunks(model, answers, chunk_size=CHUNK_SIZE, checkpoint=checkpoint)
+        finally:
+            close = getattr(answers, "close", None)
+            if close is not None:
+                close()
+    variant = f"chunked:{job_key}:x{extraction.EXTRACTOR_VERSION}:c{CHUNK_SIZE}"
+    return cached_report([], model, compute, variant=variant)
+
+
 # ---------- public functions (unchanged signatures) ----------
+# Reports are cached by (items, model, thresholds); see services/report_cache.
 def analyze_text_blob(text: str) -> Dict[str, Any]:
+    model = _require_model()
+    if _chunked(model):
+        key = "text:" + extraction_cache.content_hash((text or "").encode("utf-8", "surrogatepass"))
+        return _chunked_report(model, key, lambda: extraction.iter_answers_from_text(text or ""))
     items = _answers_only_from_text(text or "")
+    return cached_report(items, model, model.analyze_feedback_items)
+
+def _answers_from_document(source: extraction.Source, filename: str) -> List[str]:
+    # Pages stream in order (large PDFs come from the extraction process pool);
+    # the scan stops pulling pages once MAX_ITEMS answers are found.
+    if tabular.is_table(filename):
+        with closing(tabular.iter_table_answers(source, filename)) as answers:
+            return list(islice(extraction.dedupe(answers), MAX_ITEMS))
+    with closing(extraction.iter_document_lines(source, filename)) as lines:
+        return list(extraction.iter_answers(lines, limit=MAX_ITEMS))
+
+def analyze_uploaded_file(file_bytes: extraction.Source, filename: str,
+                          content_hash: Optional[str] = None) -> Dict[str, Any]:
+    # `file_bytes` may also be the path of a spooled upload (mmapped, never read whole);
+    # `content_hash` is its SHA-256 when the caller already computed it while reading.
+    if tabular.is_table(filename):
+        return analyze_table(file_bytes, filename, content_hash=content_hash)
+    if content_hash is None:
+        content_hash = _source_hash(file_bytes)
     model = _require_model()
-    return model.analyze_feedback_items(items)
+    if _chunked(model):
+        def open_answers():
+            return extraction.iter_answers(extraction.iter_document_lines(file_bytes, filename))
+        key = f"file:{content_hash}:{os.path.splitext(filename or '')[1].lower()}"
+        return _chunked_report(model, key, open_answers)
+    items = extraction_cache.cached_answers(
+        content_hash, filename, MAX_ITEMS, lambda: _answers_from_document(file_bytes, filename))
+    return cached_report(items, model, model.analyze_feedback_items)
+
+
+# ---------- survey exports (CSV / JSONL) ----------
+class _SegmentCounts:
+    """Per-segment tallies of classified rows; at most `max_segments` names are kept."""
+
+    OTHER = "(other)"
+    NONE = "(none)"
+
+    def __init__(self, max_segments: int = TABLE_MAX_SEGMENTS):
+        self.max_segments = max_segments
+        self.classified = False
+        self.answers = 0
+        self._segments: Dict[str, Dict[str, Any]] = {}
+        self._respondents: Dict[str, set] = {}
+
+    def _segment(self, name: str) -> Dict[str, Any]:
+        name = name or self.NONE
+        if name not in self._segments and len(self._segments) >= self.max_segments:
+            name = self.OTHER
+        seg = self._segments.get(name)
+        if seg is None:
+            seg = self._segments[name] = {"name": name, "rows": 0, "critiques": 0, "positives": 0,
+                                          "categories": {}, "delight": {}}
+        return seg
+
+    def add(self, record: Dict[str, str], result: Optional[Dict[str, Any]] = None) -> None:
+        self.answers += 1
+        seg = self._segment(record.get("segment", ""))
+        seg["rows"] += 1
+        if record.get("respondent"):
+            self._respondents.setdefault(seg["name"], set()).add(record["respondent"])
+        if result is None:
+            return
+        self.classified = True
+        if result.get("critique"):
+            seg["critiques"] += 1
+            for cat in result.get("categories") or ():
+                seg["categories"][cat] = seg["categories"].get(cat, 0) + 1
+        else:
+            seg["positives"] += 1
+            for lab in result.get("delight") or ():
+                seg["delight"][lab] = seg["delight"].get(lab, 0) + 1
+
+    def to_list(self, with_respondents: bool) -> List[Dict[str, Any]]:
+        out = []
+        for seg in sorted(self._segments.values(), key=lambda s: (-s["rows"], s["name"])):
+            row = {"name": seg["name"], "rows": seg["rows"]}
+            if with_respondents:
+                row["respondents"] = len(self._respondents.get(seg["name"], ()))
+            if self.classified:
+                row.update(critiques=seg["critiques"], positives=seg["positives"],
+                           categories=seg["categories"], delight=seg["delight"])
+            out.append(row)
+        return out
+
+
+def _table_report(model: Any, source: extraction.Source, filename: str,
+                  columns: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    counts = _SegmentCounts()
+    records = tabular.iter_records(source, filename, stats=stats, **columns)
+    with closing(records):
+        if callable(getattr(model, "classify_items", None)):
+            # rows stream through the model CHUNK_SIZE at a time; each chunk's
+            # records wait here only until its per-item results come back
+            waiting: deque = deque()
+
+            def texts():
+                for rec in records:
+                    waiting.append(rec)
+                    yield rec["text"]
+
+            def on_chunk(chunk: List[str], results: List[Dict[str, Any]]) -> None:
+                for _, result in zip(chunk, results):
+                    counts.add(waiting.popleft(), result)
+
+            report = analyze_in_chunks(model, texts(), chunk_size=CHUNK_SIZE, on_chunk=on_chunk)
+        else:
+            items: List[str] = []
+            for rec in records:
+                if len(items) >= MAX_ITEMS:
+                    stats["truncated"] += 1
+                    continue
+                items.append(rec["text"])
+                counts.add(rec)
+            report = model.analyze_feedback_items(items)
+
+    cols = stats.get("columns") or {}
+    return {
+        **report,
+        "table": {
+            "columns": cols,
+            "rows": stats.get("rows", 0),
+            "answers": counts.answers,
+            "skipped": stats.get("skipped", 0),
+            "truncated": stats.get("truncated", 0),
+        },
+        "segments": counts.to_list(with_respondents=bool(cols.get("respondent"))),
+    }
+
+
+def analyze_table(source: extraction.Source, filename: str, *,
+                  answer_column: Optional[str] = None, segment_column: Optional[str] = None,
+                  respondent_column: Optional[str] = None,
+                  content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    UXReport for a CSV/JSONL survey export, one answer per row, plus
+    `table` ({columns, rows, answers, skipped, truncated}) and `segments`
+    (per-segment row / critique / category / delight counts). Columns not
+    given are detected from the headers; tabular.ColumnNotFound when the
+    answer column can't be found.
+    """
+    if content_hash is None:
+        content_hash = _source_hash(source)
+    model = _require_model()
+    columns = {"answer": answer_column, "segment": segment_column, "respondent": respondent_column}
+    variant = (f"table:{content_hash}:{os.path.splitext(filename or '')[1].lower()}:"
+               f"{json.dumps(columns, sort_keys=True)}:c{CHUNK_SIZE}:r{tabular.TABLE_MAX_ROWS}")
+    return cached_report([], model, lambda _items: _table_report(model, source, filename, columns),
+                         variant=variant)
+
+
+# ---------- batch analysis (many files + texts, one model pass) ----------
+# A batch source is (source, filename, content_hash): `source` is bytes or a
+# spooled upload path, `content_hash` may be None.
+BatchFile = Tuple[extraction.Source, str, Optional[str]]
+
+
+def _answers_for_file(source: extraction.Source, filename: str, content_hash: Optional[str]) -> List[str]:
+    if content_hash is None:
+        content_hash = _source_hash(source)
+    return extraction_cache.cached_answers(
+        content_hash, filename, MAX_ITEMS, lambda: _answers_from_document(source, filename))
+
+
+def _extract_batch(files: Sequence[BatchFile], texts: Sequence[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Per-source answer lists (files extracted concurrently, in input order) and per-file errors."""
+    sources: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    if files:
+        workers = max(1, min(BATCH_EXTRACT_WORKERS, len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_answers_for_file, src, name, h) for src, name, h in files]
+            for (_, name, _), fut in zip(files, futures):
+                try:
+                    sources.append({"name": name, "type": "file", "answers": fut.result()})
+                except Exception as e:
+                    log.warning("[batch] extraction failed for %s: %s", name, e)
+                    errors.append({"name": name, "error": str(e)})
+    for i, text in enumerate(texts):
+        sources.append({"name": f"text[{i}]", "type": "text", "answers": _answers_only_from_text(text)})
+    return sources, errors
+
+
+def _batch_payload(model: Any, items: List[str], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combined report + per-source reports. Models exposing per-item results are run once."""
+    classify = getattr(model, "classify_items", None)
+    build = getattr(model, "build_report", None)
+    results = classify(items) if callable(classify) and callable(build) else None
+    if results is not None and len(results) != len(items):
+        results = None        # model dropped items: fall back to separate runs
+
+    if results is not None:
+        combined = build(results)
+        per_source = [build([results[i] for i in src["index"]], summarize=False) for src in sources]
+    else:
+        combined = model.analyze_feedback_items(items)
+        per_source = [model.analyze_feedback_items([items[i] for i in src["index"]]) for src in sources]
+
+    return {
+        "report": combined,
+        "sources": [
+            {"name": src["name"], "type": src["type"], "items": len(src["index"]), "report": rep}
+            for src, rep in zip(sources, per_source)
+        ],
+    }
+
+
+def analyze_batch(files: Sequence[BatchFile] = (), texts: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Analyze many files and/or text blobs together:
+      - files are extracted concurrently (extraction cache applies per file)
+      - answers are de-duplicated across all sources (first occurrence wins the order)
+      - ONE model pass over the unique answers; per-source reports are built
+        from the same per-item results (no summarizer calls for them)
+    Returns { report, sources: [{name, type, items, report}], items, duplicates, truncated, errors }
+    where `truncated` counts answers dropped past BATCH_MAX_ITEMS.
+    """
+    sources, errors = _extract_batch(files, texts)
+
+    items: List[str] = []
+    index_of: Dict[str, int] = {}
+    total = dropped = 0
+    for src in sources:
+        idx: Dict[int, None] = {}           # ordered set of this source's answer indexes
+        for s in src.pop("answers"):
+            total += 1
+            key = s.lower()
+            i = index_of.get(key)
+            if i is None:
+                if len(items) >= BATCH_MAX_ITEMS:
+                    dropped += 1
+                    continue
+                i = index_of[key] = len(items)
+                items.append(s)
+            idx[i] = None
+        src["index"] = list(idx)
 
-def analyze_uploaded_file(file_bytes: bytes, filename: str) -> Dict[str, Any]:
-    text = _extract_text_from_bytes(file_bytes, filename)
-    items = _answers_only_from_text(text)
     model = _require_model()
-    return model.analyze_feedback_items(items)
+    # the cached payload depends on which answers each source contributed
+    variant = "batch:" + json.dumps([[src["name"], src["type"], src["index"]] for src in sources])
+    payload = cached_report(items, model, lambda its: _batch_payload(model, its, sources), variant=variant)
+    return {
+        **payload,
+        "items": len(items),
+        "duplicates": total - len(items) - dropped,
+        "truncated": dropped,
+        "errors": errors,
+    }
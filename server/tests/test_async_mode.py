@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from services import async_mode
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_offload_runs_inline_without_eventlet():
+    assert not async_mode.patched()
+    before = async_mode.snapshot()["inline"]
+    assert async_mode.offload(threading.get_ident) == threading.get_ident()
+    snap = async_mode.snapshot()
+    assert snap["inline"] == before + 1 and snap["mode"] == async_mode.MODE and snap["patched"] is False
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        async_mode.patch("gevnet")
+
+
+# In a fresh interpreter: patch, then check that a blocking call through offload()
+# runs in an OS thread while green threads keep being scheduled
+EVENTLET_CHECK = r"""
+import time
+from services import async_mode
+async_mode.patch("eventlet")
+import eventlet, threading
+assert async_mode.patched()
+
+ticks = []
+def ticker():
+    while len(ticks) < 5:
+        ticks.append(time.monotonic())
+        eventlet.sleep(0.01)
+
+def cpu(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+    return threading.get_ident()
+
+g = eventlet.spawn(ticker)
+eventlet.sleep(0)
+main = threading.get_ident()
+worker = async_mode.offload(cpu, 0.3)
+assert worker != main, "not offloaded"
+assert len(ticks) == 5, f"event loop stalled: {len(ticks)} ticks"
+print("ok", async_mode.snapshot()["offloaded"])
+"""
+
+
+def test_offload_keeps_eventlet_loop_running():
+    pytest.importorskip("eventlet")
+    out = subprocess.run([sys.executable, "-c", EVENTLET_CHECK], cwd=SERVER_DIR, capture_output=True,
+                         text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["ok", "1"]
@@ -130,3 +130,32 @@ def test_verify_firebase_token_exception_returns_none(monkeypatch):
 
     monkeypatch.setattr(fv.firebase_auth, "verify_id_token", boom)
     assert fv.verify_firebase_token("tok") is None
+
+
+def test_verify_firebase_token_caches_claims_until_exp(monkeypatch):
+    import time
+    _ensure_real_auth_package()
+    sys.modules.setdefault("auth", importlib.import_module("auth"))
+    sys.modules.setdefault("auth.firebase_config", types.ModuleType("auth.firebase_config"))
+    import firebase_admin
+    monkeypatch.setenv("FIREBASE_CREDENTIAL_JSON", "{}")
+    monkeypatch.setattr(firebase_admin, "_apps", [], raising=False)
+    monkeypatch.setattr("firebase_admin.credentials.Certificate", lambda d: object(), raising=False)
+    monkeypatch.setattr("firebase_admin.initialize_app", lambda cred: None, raising=False)
+
+    fv = importlib.import_module("auth.firebase_verify")
+    calls = []
+
+    def fake_verify(token):
+        calls.append(token)
+        if token == "bad":
+            raise fv.firebase_auth.InvalidIdTokenError("bad token")
+        return {"uid": "uX", "exp": time.time() + 3600}
+
+    monkeypatch.setattr(fv.firebase_auth, "verify_id_token", fake_verify)
+    assert fv.verify_firebase_token("tok")["uid"] == "uX"
+    assert fv.verify_firebase_token("tok")["uid"] == "uX"
+    assert fv.verify_firebase_token("bad") is None
+    assert fv.verify_firebase_token("bad") is None
+    assert calls == ["tok", "bad"]
+    assert fv.token_cache.snapshot()["hits"] == 1
@@ -0,0 +1,124 @@
+import io
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+import services.ux_report_service as svc
+import services.report_cache as report_cache
+import services.extraction_cache as extraction_cache
+from models.hf_zero_shot import HFZeroShotModel
+
+
+def _stub_pipes(calls):
+    def classifier(seqs, *, candidate_labels, multi_label=True, batch_size=None, truncation=True,
+                   hypothesis_template=None):
+        calls.append(("zsc", len(seqs)))
+        out = []
+        for s in seqs:
+            low = s.lower()
+            top = "Performance" if "slow" in low else "Visual Design" if "design" in low else "Usability"
+            labels = [top] + [c for c in candidate_labels if c != top]
+            out.append({"labels": labels, "scores": [0.9] + [0.1] * (len(labels) - 1)})
+        return out
+
+    def sentiment(seqs, batch_size=None, truncation=True):
+        calls.append(("sa", len(seqs)))
+        return [{"label": "NEGATIVE" if "slow" in s.lower() or "confus" in s.lower() else "POSITIVE",
+                 "score": 0.95} for s in seqs]
+
+    def summarizer(text, max_length=60, min_length=20, do_sample=False):
+        calls.append(("sum", 1))
+        return [{"summary_text": "summary: " + text[:30]}]
+
+    return classifier, sentiment, summarizer
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    pipes = _stub_pipes(calls)
+    monkeypatch.setattr(HFZeroShotModel, "_get_pipes", classmethod(lambda cls: pipes))
+    monkeypatch.setattr(HFZeroShotModel, "HF_CONCURRENCY", 1)
+    m = HFZeroShotModel()
+    m.calls = calls
+    monkeypatch.setattr(svc, "get_active_model", lambda: m, raising=False)
+    report_cache.clear()
+    extraction_cache.clear()
+    return m
+
+
+def test_build_report_matches_single_pass(model):
+    items = ["Search is slow", "Love the clean design", "Menus are confusing", "Great app"]
+    assert model.build_report(model.classify_items(items)) == model.analyze_feedback_items(items)
+
+
+def test_batch_dedupes_across_sources_and_runs_model_once(model):
+    files = [
+        (b"A: Search is slow\nA: Love the clean design", "a.txt", None),
+        (b"A: search is slow\nA: Menus are confusing", "b.txt", None),
+    ]
+    out = svc.analyze_batch(files, ["A: Great app\nA: Love the clean design"])
+
+    assert out["items"] == 4 and out["duplicates"] == 2 and out["errors"] == []
+    assert [c[0] for c in model.calls].count("sa") == 1          # one sentiment pass for everything
+    assert ("sa", 4) in model.calls
+
+    by_name = {s["name"]: s for s in out["sources"]}
+    assert [s["name"] for s in out["sources"]] == ["a.txt", "b.txt", "text[0]"]
+    assert by_name["b.txt"]["items"] == 2
+    assert by_name["b.txt"]["report"]["insights"].keys() == {"Performance", "Usability"}
+    assert by_name["text[0]"]["report"]["pie_data"] == []
+    assert out["report"]["insights"]["Performance"] == ["Search is slow"]
+
+    n_sum = [c[0] for c in model.calls].count("sum")
+    assert n_sum == 2                                             # summaries only for the combined report
+
+
+def test_batch_reports_extraction_errors_per_file(model, monkeypatch):
+    real = svc._answers_from_document
+
+    def flaky(source, filename):
+        if filename == "broken.pdf":
+            raise RuntimeError("Unable to extract text from PDF.")
+        return real(source, filename)
+
+    monkeypatch.setattr(svc, "_answers_from_document", flaky)
+    out = svc.analyze_batch([(b"%PDF-nope", "broken.pdf", None), (b"A: Great app", "ok.txt", None)])
+    assert out["errors"] == [{"name": "broken.pdf", "error": "Unable to extract text from PDF."}]
+    assert [s["name"] for s in out["sources"]] == ["ok.txt"]
+
+
+def test_batch_route_accepts_many_files(model, monkeypatch):
+    if "auth.auth_decorator" not in sys.modules:
+        # avoid real Firebase init when this file runs on its own
+        fake_verify = types.ModuleType("auth.firebase_verify")
+        fake_verify.verify_firebase_token = lambda token: None
+        monkeypatch.setitem(sys.modules, "auth.firebase_verify", fake_verify)
+    import auth.auth_decorator as adec
+    monkeypatch.setattr(adec, "verify_firebase_token", lambda tok: {"uid": "u1"}, raising=True)
+    import routes.ux_report_routes as uxmod
+
+    app = Flask(__name__)
+    app.register_blueprint(uxmod.ux_bp)
+    c = app.test_client()
+    h = {"Authorization": "Bearer good"}
+
+    def post():
+        return c.post("/api/ux/analyze/batch", headers=h, content_type="multipart/form-data", data={
+            "files": [(io.BytesIO(b"A: Search is slow"), "one.txt"), (io.BytesIO(b"A: Great app"), "two.txt")],
+            "text": "A: Menus are confusing",
+        })
+
+    r1, r2 = post(), post()
+    assert r1.status_code == 200
+    body = r1.get_json()
+    assert [s["name"] for s in body["sources"]] == ["one.txt", "two.txt", "text[0]"]
+    assert body["items"] == 3
+    assert [r.headers["X-Report-Cache"] for r in (r1, r2)] == ["MISS", "HIT"]
+
+    bad = c.post("/api/ux/analyze/batch", headers=h, content_type="multipart/form-data",
+                 data={"files": [(io.BytesIO(b"x"), "notes.rtf")]})
+    assert bad.status_code == 400 and bad.get_json()["error"] == "unsupported_type"
+    assert c.post("/api/ux/analyze/batch", headers=h, json={}).status_code == 400
@@ -0,0 +1,118 @@
+import pytest
+
+from services.batch_tuner import AIMDController, get_controller, reset_controllers
+from services import metrics
+
+
+def _ctrl(**kw):
+    kw.setdefault("max_batch", 8)
+    kw.setdefault("max_concurrency", 4)
+    kw.setdefault("target_latency", 1.0)
+    kw.setdefault("enabled", True)
+    return AIMDController("t", **kw)
+
+
+def test_starts_at_batch_cap_with_single_worker():
+    c = _ctrl()
+    assert c.settings() == (8, 1)
+
+
+def test_healthy_calls_grow_concurrency_up_to_cap():
+    c = _ctrl()
+    for _ in range(10):
+        c.record(8, 0.8)  # 0.1 s/item, well under target
+    assert c.settings() == (8, 4)
+    assert c.snapshot()["last_decision"] == "hold:cap"
+
+
+def test_timeout_halves_batch_and_concurrency():
+    c = _ctrl()
+    for _ in range(3):
+        c.record(8, 0.8)
+    assert c.settings() == (8, 4)
+    c.record(8, 30.0, timeout=True)
+    assert c.settings() == (4, 2)
+    snap = c.snapshot()
+    assert snap["timeouts"] == 1 and snap["errors"] == 1
+
+
+def test_slow_latency_sheds_concurrency_before_batch():
+    c = _ctrl()
+    c.record(8, 0.8)
+    c.record(8, 0.8)
+    assert c.settings() == (8, 3)
+    c.record(8, 80.0)   # 10 s/item pushes the EWMA over target
+    assert c.settings() == (8, 1)
+    c.record(8, 80.0)
+    assert c.settings() == (4, 1)
+
+
+def test_additive_increase_after_backoff_respects_cap():
+    c = _ctrl()
+    c.record(2, 1.0, error=True)
+    assert c.settings() == (4, 1)
+    for _ in range(4):
+        c.record(4, 0.4)
+    assert c.settings() == (8, 1)
+
+
+def test_throughput_drop_holds_increase():
+    c = _ctrl(alpha=1.0)
+    c.record(8, 0.8)          # 10 items/s -> concurrency 2
+    assert c.settings() == (8, 2)
+    c.record(8, 4.0)          # 2 items/s, latency still under target
+    assert c.settings() == (8, 2)
+    assert c.snapshot()["last_decision"] == "hold:throughput"
+
+
+def test_disabled_controller_pins_caps():
+    c = _ctrl(enabled=False)
+    c.record(8, 0.1)
+    c.record(8, 100.0)
+    assert c.settings() == (8, 1)
+
+
+def test_registry_and_metrics_report_current_settings():
+    reset_controllers()
+    ctrl = get_controller("sa", max_batch=16, max_concurrency=2)
+    assert get_controller("sa", max_batch=99) is ctrl
+    ctrl.record(16, 1.0)
+    snap = metrics.snapshot()["batching"]["sa"]
+    assert snap["max_batch"] == 16
+    assert snap["batch_size"] == ctrl.settings()[0]
+    assert snap["calls"] == 1
+    reset_controllers()
+
+
+def test_model_uses_adaptive_chunks_and_keeps_order(monkeypatch):
+    from models.hf_zero_shot import HFZeroShotModel
+    reset_controllers()
+    m = HFZeroShotModel()
+    monkeypatch.setattr(m, "HF_CONCURRENCY", 3)
+
+    sizes = []
+    def call(chunk, size):
+        sizes.append(len(chunk))
+        return [{"text": t} for t in chunk]
+
+    items = [f"item {i}" for i in range(50)]
+    out = m._run_batched("unit", items, 4, call)
+    assert [o["text"] for o in out] == items
+    assert max(sizes) <= 4
+    assert get_controller("unit", max_batch=4).calls == len(sizes)
+    reset_controllers()
+
+
+def test_model_records_error_and_reraises():
+    from models.hf_zero_shot import HFZeroShotModel
+    reset_controllers()
+    m = HFZeroShotModel()
+
+    def call(chunk, size):
+        raise RuntimeError("Hugging Face Space request timed out")
+
+    with pytest.raises(RuntimeError):
+        m._run_batched("unit", ["a", "b"], 4, call)
+    snap = get_controller("unit", max_batch=4).snapshot()
+    assert snap["timeouts"] == 1
+    reset_controllers()
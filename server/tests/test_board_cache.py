@@ -0,0 +1,204 @@
+import sys
+import threading
+import time
+import types
+
+import mongomock
+import pytest
+
+from services.board_cache import BoardCache, note_size
+
+
+def _note(nid, board="b1", **kw):
+    return {"id": nid, "boardId": board, "text": nid, "x": 0, "y": 0, **kw}
+
+
+class Loader:
+    def __init__(self, boards):
+        self.boards = boards
+        self.calls = []
+
+    def __call__(self, board_id):
+        self.calls.append(board_id)
+        return [dict(n) for n in self.boards.get(board_id, [])]
+
+
+def test_first_read_loads_then_hits_and_writes_apply_in_place():
+    loader = Loader({"b1": [_note("n1"), _note("n2")]})
+    cache = BoardCache(loader, max_bytes=1 << 20)
+    assert [n["id"] for n in cache.get("b1")] == ["n1", "n2"]
+    cache.upsert("b1", [_note("n3")])
+    cache.patch("b1", {"n1": {"x": 5, "rev": 7}, "missing": {"x": 1}})
+    cache.remove("b1", ["n2"])
+    notes = cache.get("b1")
+    assert loader.calls == ["b1"]
+    assert [(n["id"], n["x"]) for n in notes] == [("n1", 5), ("n3", 0)]
+    cache.patch("b1", {"n1": {"x": 6}})
+    assert notes[0]["x"] == 5                            # a write never changes notes already handed out
+    assert cache.get("b1")[0]["x"] == 6
+    snap = cache.snapshot()
+    assert (snap["hits"], snap["misses"], snap["boards"], snap["notes"]) == (2, 1, 1, 2)
+    assert snap["bytes"] == sum(note_size(n) for n in cache.get("b1"))
+
+
+def test_writes_to_uncached_boards_are_ignored():
+    loader = Loader({"b1": [_note("n1")]})
+    cache = BoardCache(loader, max_bytes=1 << 20)
+    cache.upsert("b1", [_note("n2")])
+    assert [n["id"] for n in cache.get("b1")] == ["n1"]   # loaded from the source, not the write
+
+
+def test_concurrent_misses_share_one_query():
+    release = threading.Event()
+    calls = []
+
+    def slow_loader(board_id):
+        calls.append(board_id)
+        release.wait(5)
+        return [_note("n1")]
+
+    cache = BoardCache(slow_loader, max_bytes=1 << 20)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("b1"))) for _ in range(8)]
+    for t in threads: t.start()
+    while cache.snapshot()["coalesced"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for t in threads: t.join(5)
+    assert calls == ["b1"]
+    assert [[n["id"] for n in r] for r in results] == [["n1"]] * 8
+
+
+def test_evicts_least_recently_used_boards_by_size():
+    boards = {f"b{i}": [_note(f"n{i}-{j}", f"b{i}") for j in range(10)] for i in range(3)}
+    per_board = sum(note_size(n) for n in boards["b0"])
+    cache = BoardCache(Loader(boards), max_bytes=int(per_board * 2.5))
+    cache.get("b0"); cache.get("b1")
+    cache.get("b0")                                     # b1 is now least recently used
+    cache.get("b2")
+    assert (cache.cached("b0"), cache.cached("b1"), cache.cached("b2")) == (True, False, True)
+    assert cache.snapshot()["evictions"] == 1
+    assert cache.snapshot()["bytes"] <= cache.max_bytes
+
+
+def test_board_larger_than_budget_is_not_cached():
+    loader = Loader({"b1": [_note(f"n{i}") for i in range(20)]})
+    cache = BoardCache(loader, max_bytes=500)
+    assert len(cache.get("b1")) == 20
+    assert not cache.cached("b1") and cache.snapshot()["too_large"] == 1
+
+
+def test_disabled_cache_always_loads():
+    loader = Loader({"b1": [_note("n1")]})
+    cache = BoardCache(loader, max_bytes=0)
+    cache.get("b1"); cache.get("b1")
+    assert loader.calls == ["b1", "b1"]
+
+
+def test_load_racing_a_write_is_not_cached():
+    started, release = threading.Event(), threading.Event()
+    boards = {"b1": [_note("n1")]}
+
+    def slow_loader(board_id):
+        snapshot = [dict(n) for n in boards[board_id]]
+        started.set()
+        release.wait(5)
+        return snapshot
+
+    cache = BoardCache(slow_loader, max_bytes=1 << 20)
+    t = threading.Thread(target=cache.get, args=("b1",))
+    t.start()
+    started.wait(5)
+    boards["b1"].append(_note("n2"))                   # written to the store while the query runs
+    cache.upsert("b1", [_note("n2")])
+    release.set()
+    t.join(5)
+    assert not cache.cached("b1")
+    assert cache.snapshot()["loads_discarded"] == 1
+    assert [n["id"] for n in cache.get("b1")] == ["n1", "n2"]
+
+
+def test_verify_mode_counts_and_repairs_mismatches():
+    boards = {"b1": [_note("n1")]}
+    cache = BoardCache(Loader(boards), max_bytes=1 << 20, verify=True)
+    cache.get("b1")
+    boards["b1"] = [_note("n1", text="changed elsewhere")]
+    assert cache.get("b1")[0]["text"] == "changed elsewhere"
+    assert cache.get("b1")[0]["text"] == "changed elsewhere"
+    assert cache.snapshot()["verify_mismatches"] == 1
+
+
+# ---- kept current by note_service ----
+@pytest.fixture
+def repo(monkeypatch):
+    if "services.note_service" not in sys.modules:
+        # avoid a real Mongo connection when this file runs on its own
+        fake_db = types.ModuleType("db")
+        fake_db.notes_collection = None
+        monkeypatch.setitem(sys.modules, "db", fake_db)
+    import services.note_service as repo
+    coll = mongomock.MongoClient().get_database("testdb").get_collection("notes")
+    monkeypatch.setattr(repo, "notes_collection", coll)
+    cache = BoardCache(repo._load_notes, max_bytes=1 << 20, verify=True)
+    monkeypatch.setattr(repo, "board_cache", cache)
+    return repo
+
+
+def test_note_service_writes_keep_snapshot_in_sync(repo):
+    user = {"uid": "u1", "name": "Ann", "email": "a@example.com"}
+    repo.create_note({**_note("n1"), "user": user})
+    assert repo.get_notes_by_board("b1")[0]["user"] == {"uid": "u1", "name": "Ann"}
+
+    repo.create_note({**_note("n2"), "user": user})
+    repo.update_note("n1", {"text": "edited", "user": user}, board_id="b1")
+    repo.bulk_notes(creates=[{**_note("n3"), "user": user}], deletes=["n2"], board_id="b1")
+    repo.delete_note("n3")
+    repo.create_note({**_note("n4", board="b2"), "user": user})
+    for board in ("b1", "b2", "b1"):
+        repo.get_notes_by_board(board)                   # verify mode compares with Mongo
+
+    snap = repo.board_cache.snapshot()
+    assert snap["verify_mismatches"] == 0
+    assert (snap["hits"], snap["misses"]) == (2, 2)
+    assert snap["writes_applied"] == 5                    # n2, n1 edit, n3, n2 delete, n3 delete
+    assert [(n["id"], n["text"]) for n in repo.get_notes_by_board("b1")] == [("n1", "edited")]
+
+
+def test_bbox_queries_use_a_grid_kept_current_by_writes():
+    loader = Loader({"b1": [_note("a", x=10, y=10), _note("b", x=500, y=500), _note("c", x=20, y=900)]})
+    cache = BoardCache(loader, max_bytes=1 << 20)
+    assert [n["id"] for n in cache.query_bbox("b1", (0, 0, 100, 100))] == ["a"]
+    cache.patch("b1", {"b": {"x": 50, "y": 50}})
+    cache.upsert("b1", [_note("d", x=99, y=0)])
+    cache.remove("b1", ["a"])
+    assert [n["id"] for n in cache.query_bbox("b1", (0, 0, 100, 100))] == ["b", "d"]
+    assert cache.positions("b1", ["b", "zz"]) == {"b": (50.0, 50.0)}
+    assert cache.positions("b2", ["b"]) == {}             # never loads a board
+    assert loader.calls == ["b1"]
+
+
+def test_bbox_query_without_cache_filters_loaded_notes():
+    loader = Loader({"b1": [_note("a", x=10, y=10), _note("b", x=500, y=500)]})
+    cache = BoardCache(loader, max_bytes=0)
+    assert [n["id"] for n in cache.query_bbox("b1", (0, 0, 100, 100))] == ["a"]
+
+
+def test_pages_bisect_sorted_ids_kept_current_by_writes():
+    loader = Loader({"b1": [_note(n) for n in ("d", "b", "a", "c")]})
+    cache = BoardCache(loader, max_bytes=1 << 20)
+    assert [n["id"] for n in cache.page("b1", limit=2)] == ["a", "b"]
+    ids = cache._boards["b1"].ids()
+    cache.patch("b1", {"a": {"x": 5}})                    # a move keeps the sorted ids
+    assert cache._boards["b1"].ids() is ids
+    cache.upsert("b1", [_note("bb")])
+    cache.remove("b1", ["c"])
+    assert [n["id"] for n in cache.page("b1", after="b", limit=2)] == ["bb", "d"]
+    assert cache.page("b1", after="d") == []
+    assert cache.page("b1", limit=1)[0]["x"] == 5
+    assert loader.calls == ["b1"]
+
+
+def test_page_without_cache_sorts_loaded_notes():
+    loader = Loader({"b1": [_note("b"), _note("a"), _note("c")]})
+    cache = BoardCache(loader, max_bytes=0)
+    assert [n["id"] for n in cache.page("b1", after="a", limit=1)] == ["b"]
@@ -25,21 +25,37 @@ def app_socket(monkeypatch):
     from events import board_events as be
 
     # Reset in-memory presence between tests
-    be.online_users.clear()
-    be.sid_to_uid.clear()
-    be.latest_sid_by_uid.clear()
-
-    # Stub Firebase admin token verification used by join_board
-    class _AuthStub:
-        @staticmethod
-        def verify_id_token(token):
-            if token == "good-u1":
-                return {"uid": "u1", "name": "User One", "email": "u1@example.com"}
-            if token == "good-u2":
-                return {"uid": "u2", "name": "User Two", "email": "u2@example.com"}
-            raise ValueError("bad token")
-
-    monkeypatch.setattr(be, "fb_auth", _AuthStub)
+    from services.presence import PresenceFeed, PresenceStore
+    store = PresenceStore()
+    monkeypatch.setattr(be, "presence", store)
+    monkeypatch.setattr(be, "presence_feed", PresenceFeed(store, window_ms=0))   # broadcast at once
+
+    # Stub Firebase token verification used by join_board / socket sessions
+    def _verify(token):
+        if token == "good-u1":
+            return {"uid": "u1", "name": "User One", "email": "u1@example.com"}
+        if token == "good-u2":
+            return {"uid": "u2", "name": "User Two", "email": "u2@example.com"}
+        return None
+
+    monkeypatch.setattr(be, "verify_firebase_token", _verify)
+
+    # Fresh socket sessions on a clock the tests can move
+    from services.socket_sessions import SocketSessions
+    clock = [1000.0]
+    monkeypatch.setattr(be, "sessions", SocketSessions(ttl=3600, clock=lambda: clock[0]))
+    be.clock = clock
+
+    # Write-behind buffer that records bulk writes instead of hitting Mongo
+    from services.move_buffer import MoveBuffer
+    writes = []
+    buf = MoveBuffer(lambda positions: writes.append(dict(positions)), flush_ms=60_000)
+    buf.writes = writes
+    monkeypatch.setattr(be, "move_buffer", buf)
+
+    # Fresh viewport subscriptions; no board cache to fall back on
+    from services.spatial import ViewportRegistry
+    monkeypatch.setattr(be, "viewports", ViewportRegistry(margin=0, locate=lambda board_id, ids: {}))
 
     # Minimal Flask app + SocketIO, register handlers
     app = Flask(__name__)
@@ -118,7 +134,72 @@ def test_join_granted_loads_notes_and_no_demo_wait_for_first_user(app_socket, mo
     assert take_event(c1, "demo_wait") is None
 
     # Presence updated
-    assert be.online_users.get("b1", {}).get("u1") is not None
+    assert be.presence.uids("b1") == {"u1"}
+
+
+def test_rejoin_with_since_loads_only_changes(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    seen = []
+
+    def changes(board_id, since=None):
+        seen.append((board_id, since))
+        return {"rev": 9, "full": False, "notes": [{"id": "n2", "rev": 9}], "deleted": ["n1"]}
+
+    monkeypatch.setattr(be, "get_board_changes", changes)
+    monkeypatch.setattr(be, "get_notes_by_board", lambda board_id: pytest.fail("full snapshot on rejoin"))
+
+    c1 = make_client(sio, app)
+    c1.emit("join_board", {"boardId": "b1", "token": "good-u1", "since": 7})
+    load = find_event(received_events(c1), "load_existing_notes")
+    assert seen == [("b1", 7)]
+    assert load["args"][0] == {"boardId": "b1", "rev": 9, "full": False,
+                               "notes": [{"id": "n2", "rev": 9}], "deleted": ["n1"]}
+
+
+def test_join_with_viewport_streams_snapshot_in_acked_chunks(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    notes = [{"id": f"n{i}", "boardId": "b1", "x": i * 100, "y": 0} for i in range(5)]
+    monkeypatch.setattr(be, "get_board_changes",
+                        lambda board_id, since=None: {"rev": 5, "full": True, "notes": notes, "deleted": []})
+
+    c1 = make_client(sio, app)
+    c1.emit("join_board", {"boardId": "b1", "token": "good-u1", "chunkSize": 2,
+                           "viewport": {"x": 350, "y": -10, "w": 100, "h": 20}})
+    evs = received_events(c1)
+    assert find_event(evs, "load_existing_notes") is None
+    chunks = [e["args"][0] for e in evs if e["name"] == "notes_chunk"]
+    assert [c["seq"] for c in chunks] == [0, 1]                      # first window only
+    assert [n["id"] for n in chunks[0]["notes"]] == ["n4", "n3"]     # viewport first
+    assert chunks[0]["rev"] == 5
+
+    c1.emit("notes_chunk_ack", {"boardId": "b1", "seq": 0})
+    last = [e["args"][0] for e in received_events(c1) if e["name"] == "notes_chunk"]
+    assert [(c["seq"], c["done"], [n["id"] for n in c["notes"]]) for c in last] == [(2, True, ["n0"])]
+
+
+def test_viewport_subscribers_only_get_moves_they_can_see(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    monkeypatch.setattr(be, "get_notes_in_bbox", lambda board_id, bbox: [{"id": "n1", "x": 50, "y": 50}])
+    mover, watcher = make_client(sio, app), make_client(sio, app)
+    watcher.emit("subscribe_viewport", {"boardId": "b1", "viewport": {"x": 0, "y": 0, "w": 100, "h": 100}})
+    assert take_event(watcher, "viewport_denied") is not None       # not joined yet
+
+    mover.emit("join_board", {"boardId": "b1", "token": "good-u1"})
+    watcher.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+    received_events(mover)
+    watcher.emit("subscribe_viewport", {"boardId": "b1", "viewport": {"x": 0, "y": 0, "w": 100, "h": 100}})
+    vp = take_event(watcher, "viewport_notes")
+    assert vp["args"][0] == {"boardId": "b1", "viewport": [0, 0, 100, 100], "notes": [{"id": "n1", "x": 50, "y": 50}]}
+
+    for x in (60, 5000, 5100):                          # inside, leaving, far away
+        mover.emit("move_note", {"id": "n1", "boardId": "b1", "x": x, "y": 50, "token": "t"})
+    seen = [e["args"][0]["x"] for e in received_events(watcher) if e["name"] == "note_moved"]
+    assert seen == [60, 5000]
+    assert [e["args"][0]["x"] for e in received_events(mover) if e["name"] == "note_moved"] == [60, 5000, 5100]
+
+    watcher.emit("subscribe_viewport", {"boardId": "b1", "viewport": None})
+    mover.emit("move_note", {"id": "n1", "boardId": "b1", "x": 5200, "y": 50, "token": "t"})
+    assert [e["args"][0]["x"] for e in received_events(watcher) if e["name"] == "note_moved"] == [5200]
 
 
 def test_second_joiner_receives_demo_wait_and_first_receives_user_joined(app_socket):
@@ -135,10 +216,10 @@ def test_second_joiner_receives_demo_wait_and_first_receives_user_joined(app_soc
     # Second user sees a brief waiting instruction
     assert take_event(c2, "demo_wait") is not None
     # First user is notified that someone joined
-    joined = take_event(c1, "user_joined")
+    joined = take_event(c1, "presence_delta")
     assert joined is not None
     payload = joined["args"][0]
-    assert payload["uid"] == "u2"
+    assert [u["uid"] for u in payload["joined"]] == ["u2"] and payload["count"] == 2
 
 
 def test_get_online_users_returns_list_and_user_list(app_socket):
@@ -168,12 +249,12 @@ def test_leave_board_updates_presence_and_notifies_others(app_socket):
     received_events(c1); received_events(c2)
 
     c2.emit("leave_board", {"boardId": "b1"})
-    # First user should see user_left
-    left = take_event(c1, "user_left")
+    # First user should see u2 leave
+    left = take_event(c1, "presence_delta")
     assert left is not None
-    assert left["args"][0]["uid"] == "u2"
+    assert left["args"][0]["left"] == ["u2"]
     # Presence pruned
-    assert "u2" not in be.online_users.get("b1", {})
+    assert be.presence.uids("b1") == {"u1"}
 
 
 def test_disconnect_behaves_like_leave_board(app_socket):
@@ -185,20 +266,38 @@ def test_disconnect_behaves_like_leave_board(app_socket):
     received_events(c1); received_events(c2)
 
     c2.disconnect()
-    left = take_event(c1, "user_left")
+    left = take_event(c1, "presence_delta")
     assert left is not None
-    assert left["args"][0]["uid"] == "u2"
-    assert "u2" not in be.online_users.get("b1", {})
+    assert left["args"][0] == {"boardId": "b1", "joined": [], "left": ["u2"], "count": 1}
+    assert be.presence.uids("b1") == {"u1"}
 
 
-def test_note_events_authorization_guard(app_socket, monkeypatch):
+def test_disconnect_updates_every_board_of_the_socket_only(app_socket):
     app, sio, be = app_socket
-    c = make_client(sio, app)
-    c.emit("join_board", {"boardId": "b1", "token": "good-u1"})
-    received_events(c)
+    roamer, tab1, tab2 = make_client(sio, app), make_client(sio, app), make_client(sio, app)
+    for board in ("b1", "b2"):
+        roamer.emit("join_board", {"boardId": board, "token": "good-u1"})
+    tab1.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+    tab2.emit("join_board", {"boardId": "b2", "token": "good-u2"})
+    other = make_client(sio, app)
+    other.emit("join_board", {"boardId": "b1", "token": "good-u1"})   # u1 has a second socket on b1
+    for c in (roamer, tab1, tab2, other):
+        received_events(c)
 
-    # Reject tokens via verify_firebase_token
-    monkeypatch.setattr(be, "verify_firebase_token", lambda tok: None)
+    roamer.disconnect()
+    on_b1, on_b2 = received_events(tab1), received_events(tab2)
+    assert on_b1 == []                                                 # u1 still online on b1
+    assert find_event(on_b2, "presence_delta")["args"][0]["left"] == ["u1"]
+    assert [u["uid"] for u in find_event(on_b2, "user_list")["args"][0]["users"]] == ["u2"]
+    assert be.presence.uids("b2") == {"u2"}
+
+
+def test_note_events_authorization_guard(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    joined, stranger = make_client(sio, app), make_client(sio, app)
+    joined.emit("join_board", {"boardId": "b1", "token": "good-u1"})
+    received_events(joined)
+    be.clock[0] += 3600                    # session expired; the bad token cannot renew it
 
     for name, payload in [
         ("create_note", {"id": "n1", "boardId": "b1", "text": "A", "token": "bad"}),
@@ -206,11 +305,50 @@ def test_note_events_authorization_guard(app_socket, monkeypatch):
         ("move_note",   {"id": "n1", "boardId": "b1", "x": 2, "y": 3, "token": "bad"}),
         ("delete_note", {"id": "n1", "boardId": "b1", "token": "bad"}),
     ]:
-        c.emit(name, payload)
-        evt = take_event(c, "Unauthorized")
-        assert evt is not None, f"expected Unauthorized for {name}"
-        # drain any remaining
-        received_events(c)
+        for c in (joined, stranger):
+            c.emit(name, payload)
+            evt = take_event(c, "Unauthorized")
+            assert evt is not None, f"expected Unauthorized for {name}"
+            # drain any remaining
+            received_events(c)
+
+    # a valid token on a socket that never joined the board is not enough
+    stranger.emit("move_note", {"id": "n1", "boardId": "b1", "x": 2, "y": 3, "token": "good-u2"})
+    assert take_event(stranger, "Unauthorized")["args"][0]["message"] == "Join the board first"
+
+
+def test_session_verifies_token_once_and_refreshes(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    verified = []
+    stub = be.verify_firebase_token
+    monkeypatch.setattr(be, "verify_firebase_token", lambda tok: verified.append(tok) or stub(tok))
+
+    # authenticated on connect: join_board needs no token
+    c = sio.test_client(app, flask_test_client=app.test_client(), auth={"token": "good-u1"})
+    other = make_client(sio, app)
+    c.emit("join_board", {"boardId": "b1"})
+    other.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+    assert take_event(c, "join_granted")["args"][0] == {"boardId": "b1", "exp": 4600.0}
+    received_events(other)
+
+    for x in range(20):
+        c.emit("move_note", {"id": "n1", "boardId": "b1", "x": x, "y": 0, "token": "stale"})
+    moved = [e["args"][0] for e in received_events(other) if e["name"] == "note_moved"]
+    assert len(moved) == 20 and all("token" not in m for m in moved)
+    assert verified == ["good-u1", "good-u2"]             # no per-event verification
+
+    c.emit("refresh_token", {"token": "good-u2"})         # another user's token
+    assert take_event(c, "Unauthorized")["args"][0]["message"] == "Token belongs to another user"
+
+    be.clock[0] += 3000
+    c.emit("refresh_token", {"token": "good-u1"})
+    assert take_event(c, "token_refreshed")["args"][0] == {"exp": 7600.0}
+    be.clock[0] += 3000                                   # past the first token's expiry
+    c.emit("move_note", {"id": "n1", "boardId": "b1", "x": 1, "y": 1})
+    assert take_event(c, "Unauthorized") is None
+
+    c.disconnect()
+    assert be.sessions.snapshot()["active"] == 1
 
 
 def test_create_edit_move_delete_note_happy_paths(app_socket, monkeypatch):
@@ -219,18 +357,17 @@ def test_create_edit_move_delete_note_happy_paths(app_socket, monkeypatch):
     c.emit("join_board", {"boardId": "b1", "token": "good-u1"})
     received_events(c)
 
-    monkeypatch.setattr(be, "verify_firebase_token", lambda tok: {"uid": "u1"})
-
     called = {"create": None, "update": [], "delete": None}
 
     def _create(data):
         called["create"] = data.copy()
 
-    def _update(note_id, patch):
+    def _update(note_id, patch, board_id=None):
         called["update"].append((note_id, patch.copy()))
+        assert board_id == "b1"
 
-    def _delete(note_id):
-        called["delete"] = note_id
+    def _delete(note_id, board_id=None):
+        called["delete"] = (note_id, board_id)
 
     monkeypatch.setattr(be, "create_note", _create)
     monkeypatch.setattr(be, "update_note", _update)
@@ -250,16 +387,91 @@ def test_create_edit_move_delete_note_happy_paths(app_socket, monkeypatch):
     assert evt and evt["args"][0]["text"] == "B"
     assert ("n1", {"text": "B", "x": 1, "y": 1, "user": {"uid": "u1"}}) in called["update"]
 
-    # move
+    # move: broadcast at once, persisted write-behind (latest position per note)
     move = {"id": "n1", "boardId": "b1", "x": 5, "y": 6, "token": "t"}
+    c.emit("move_note", {**move, "x": 4})
     c.emit("move_note", move.copy())
-    evt = take_event(c, "note_moved")
-    assert evt and evt["args"][0]["x"] == 5
-    assert ("n1", {"x": 5, "y": 6}) in called["update"]
+    evs = received_events(c)
+    assert [e["args"][0]["x"] for e in evs if e["name"] == "note_moved"] == [4, 5]
+    assert ("n1", {"x": 5, "y": 6}) not in called["update"]
+    assert be.move_buffer.pending() == {"n1": (5, 6)}
+    be.move_buffer.flush()
+    assert be.move_buffer.writes == [{"n1": (5, 6, "b1")}]
 
     # delete
     dele = {"id": "n1", "boardId": "b1", "token": "t"}
     c.emit("delete_note", dele.copy())
     evt = take_event(c, "note_deleted")
     assert evt and evt["args"][0]["id"] == "n1"
-    assert called["delete"] == "n1"
+    assert called["delete"] == ("n1", "b1")
+
+
+def test_pending_moves_flush_on_leave_disconnect_and_join(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    c1 = make_client(sio, app)
+    c2 = make_client(sio, app)
+    c1.emit("join_board", {"boardId": "b1", "token": "good-u1"})
+    c2.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+
+    c1.emit("move_note", {"id": "n1", "boardId": "b1", "x": 1, "y": 1, "token": "t"})
+    c2.emit("move_note", {"id": "n2", "boardId": "b1", "x": 2, "y": 2, "token": "t"})
+    c1.emit("leave_board", {"boardId": "b1"})
+    assert be.move_buffer.writes == [{"n1": (1, 1, "b1")}]          # only the leaver's notes
+
+    c2.disconnect()
+    assert be.move_buffer.writes[-1] == {"n2": (2, 2, "b1")}
+
+    c1.emit("join_board", {"boardId": "b1", "token": "good-u1"})      # moves need a joined board
+    c1.emit("move_note", {"id": "n3", "boardId": "b1", "x": 3, "y": 3, "token": "t"})
+    seen = []
+    monkeypatch.setattr(be, "get_notes_by_board", lambda b: seen.append(be.move_buffer.pending()) or [])
+    c3 = make_client(sio, app)
+    c3.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+    assert seen == [{}]                                         # snapshot read after the flush
+    assert be.move_buffer.writes[-1] == {"n3": (3, 3, "b1")}
+
+
+def test_batched_note_events_authenticate_once_and_broadcast_once(app_socket, monkeypatch):
+    app, sio, be = app_socket
+    c1 = make_client(sio, app)
+    c2 = make_client(sio, app)
+    c1.emit("join_board", {"boardId": "b1", "token": "good-u1"})
+    c2.emit("join_board", {"boardId": "b1", "token": "good-u2"})
+    received_events(c1); received_events(c2)
+
+    bulk_calls = []
+
+    def fake_bulk(creates=(), moves=(), deletes=(), board_id=None):
+        bulk_calls.append((list(creates), list(moves), list(deletes)))
+        return {"created": [{"id": n["id"], "boardId": board_id} for n in creates if "x" in n],
+                "moved": [], "deleted": list(deletes),
+                "errors": [{"op": "create", "index": i, "id": n["id"], "error": "Missing x in note data"}
+                           for i, n in enumerate(creates) if "x" not in n]}
+
+    monkeypatch.setattr(be, "bulk_notes", fake_bulk)
+
+    notes = [{"id": f"n{i}", "text": "t", "x": i, "y": 0, "user": {"uid": "u1"}} for i in range(50)]
+    c1.emit("create_notes", {"boardId": "b1", "token": "t", "notes": notes + [{"id": "bad"}]})
+    created = [e for e in received_events(c2) if e["name"] == "notes_created"]
+    assert len(created) == 1 and len(created[0]["args"][0]["notes"]) == 50
+    result = take_event(c1, "notes_batch_result")["args"][0]
+    assert result["applied"] == 50 and result["errors"][0]["index"] == 50
+    assert len(bulk_calls) == 1
+
+    moves = [{"id": f"n{i}", "x": i, "y": 9} for i in range(50)] + [{"id": "n0"}]
+    c1.emit("move_notes", {"boardId": "b1", "token": "t", "moves": moves})
+    moved = [e for e in received_events(c2) if e["name"] == "notes_moved"]
+    assert len(moved) == 1 and len(moved[0]["args"][0]["moves"]) == 50
+    assert take_event(c1, "notes_batch_result")["args"][0]["errors"][0]["index"] == 50
+    assert len(be.move_buffer.pending()) == 50                 # persisted write-behind
+    be.move_buffer.flush()
+    assert len(be.move_buffer.writes) == 1
+
+    c1.emit("delete_notes", {"boardId": "b1", "token": "t", "ids": ["n1", "n2"]})
+    deleted = take_event(c2, "notes_deleted")
+    assert deleted["args"][0] == {"boardId": "b1", "ids": ["n1", "n2"]}
+
+    c3 = make_client(sio, app)                 # never joined
+    for name in ("create_notes", "move_notes", "delete_notes"):
+        c3.emit(name, {"boardId": "b1", "token": "bad"})
+        assert take_event(c3, "Unauthorized") is not None
@@ -0,0 +1,99 @@
+import pytest
+
+import services.ux_report_service as svc
+import services.report_cache as report_cache
+import services.extraction_cache as extraction_cache
+from models.aggregate import UI_EXAMPLES, ReportAggregator
+from models.chunked import FileCheckpoint, analyze_in_chunks
+from models.hf_zero_shot import HFZeroShotModel
+from tests.test_batch_analysis import _stub_pipes
+
+ITEMS = [
+    "Search is slow", "Love the clean design", "Menus are confusing", "Great app",
+    "Checkout is slow on mobile", "The design feels modern", "Settings are confusing",
+    "Fast and friendly", "Export is slow", "Nice colours",
+]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    pipes = _stub_pipes(calls)
+    monkeypatch.setattr(HFZeroShotModel, "_get_pipes", classmethod(lambda cls: pipes))
+    monkeypatch.setattr(HFZeroShotModel, "HF_CONCURRENCY", 1)
+    m = HFZeroShotModel()
+    m.calls = calls
+    report_cache.clear()
+    extraction_cache.clear()
+    return m
+
+
+@pytest.mark.parametrize("size", [1, 3, 4, 100])
+def test_chunked_matches_single_pass(model, size):
+    expected = model.analyze_feedback_items(ITEMS)
+    assert analyze_in_chunks(model, iter(ITEMS), chunk_size=size, max_theme_examples=None) == expected
+
+
+def test_merge_of_partials_equals_one_aggregate(model):
+    results = model.classify_items(ITEMS)
+    whole = ReportAggregator().extend(results).settle()
+    merged = ReportAggregator()
+    for i in range(0, len(results), 3):
+        merged.merge(ReportAggregator().extend(results[i:i + 3])).settle()
+    assert merged.to_dict() == whole.to_dict()
+
+
+def test_resume_after_crash_skips_finished_chunks(model, tmp_path, monkeypatch):
+    expected = analyze_in_chunks(model, ITEMS, chunk_size=3)
+    checkpoint = FileCheckpoint(str(tmp_path), "job-1")
+
+    real = HFZeroShotModel.classify_items
+    seen = []
+
+    def crash_on_third(self, chunk):
+        seen.append(list(chunk))
+        if len(seen) == 3:
+            raise RuntimeError("worker died")
+        return real(self, chunk)
+
+    monkeypatch.setattr(HFZeroShotModel, "classify_items", crash_on_third)
+    with pytest.raises(RuntimeError):
+        analyze_in_chunks(model, ITEMS, chunk_size=3, checkpoint=checkpoint)
+    assert checkpoint.load()["chunks"] == 2
+
+    seen.clear()
+    monkeypatch.setattr(HFZeroShotModel, "classify_items", lambda self, chunk: seen.append(list(chunk)) or real(self, chunk))
+    assert analyze_in_chunks(model, ITEMS, chunk_size=3, checkpoint=checkpoint) == expected
+    assert seen == [ITEMS[6:9], ITEMS[9:]]            # only the chunks after the checkpoint
+    assert checkpoint.load() is None
+
+
+def test_partials_stay_bounded():
+    agg = ReportAggregator(max_theme_examples=5)
+    for i in range(5000):
+        agg.add({"text": f"t{i}", "critique": True, "critique_text": f"slow page {i}",
+                 "categories": ["Performance"]})
+        agg.add({"text": f"p{i}", "critique": False, "praise": f"great {i}",
+                 "delight_text": f"great {i}", "delight": ["Visual Design"]})
+    assert agg.items == 10000
+    assert len(agg.examples["Performance"]) == UI_EXAMPLES
+    assert sum(len(t) + 1 for t in agg.summary_texts["Performance"]) < 4100
+    assert len(agg.delight_by_theme["Visual Design"]) == 5
+    assert agg.delight_counts["Visual Design"] == 5000
+
+
+def test_service_chunked_mode_is_uncapped(model, monkeypatch, tmp_path):
+    monkeypatch.setattr(svc, "get_active_model", lambda: model, raising=False)
+    monkeypatch.setattr(svc, "CHUNKED", True)
+    monkeypatch.setattr(svc, "CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(svc, "MAX_ITEMS", 2)
+    text = "\n".join(f"A: Search is slow {i}" for i in range(7))
+
+    report = svc.analyze_uploaded_file(text.encode(), "notes.txt")
+    assert report["pie_data"] == [{"name": "Performance", "value": UI_EXAMPLES}]
+    assert sum(n for k, n in model.calls if k == "sa") == 7   # every answer, not MAX_ITEMS
+    assert list(tmp_path.iterdir()) == []             # checkpoint removed once finished
+
+    n_calls = len(model.calls)
+    assert svc.analyze_uploaded_file(text.encode(), "notes.txt") == report
+    assert len(model.calls) == n_calls                # cached by content hash
@@ -0,0 +1,93 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from models.base import CATEGORIES, CATEGORY_DESCRIPTIONS
+import models.embed_centroid as ec
+
+
+class HashEncoder:
+    """Deterministic bag-of-words encoder (no model download)."""
+    dim = 128
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=64):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for w in re.findall(r"[a-z]+", t.lower()):
+                out[i, zlib.crc32(w.encode()) % self.dim] += 1.0
+        return out
+
+
+@pytest.fixture()
+def model(monkeypatch):
+    enc = HashEncoder()
+    monkeypatch.setattr(ec.EmbeddingCentroidModel, "_encoder", enc)
+    for attr in ("_index", "_classifier", "_sentiment", "_summarizer"):
+        monkeypatch.setattr(ec.EmbeddingCentroidModel, attr, None)
+    return ec.EmbeddingCentroidModel(), enc
+
+
+def test_registry_selects_embed_model(monkeypatch):
+    from models.registry import get_active_model
+    monkeypatch.setenv("UX_MODEL", "embed")
+    get_active_model.cache_clear()
+    try:
+        assert get_active_model().name == "embed"
+    finally:
+        get_active_model.cache_clear()
+
+
+def test_seed_examples_come_from_labeled_csv():
+    rows = ec.load_seed_examples()
+    assert len(rows) >= 60
+    assert {y for _, y in rows} == set(CATEGORIES)
+
+
+def test_zero_shot_pipeline_scores_all_labels_sorted(model):
+    m, _ = model
+    clf, _, _ = m._get_pipes()
+    desc = CATEGORY_DESCRIPTIONS["Navigation"]
+    out = clf([desc, "anything else"], candidate_labels=CATEGORIES, multi_label=False)
+    assert len(out) == 2
+    assert sorted(out[0]["labels"]) == sorted(CATEGORIES)
+    assert out[0]["scores"] == sorted(out[0]["scores"], reverse=True)
+    assert abs(sum(out[0]["scores"]) - 1.0) < 1e-5
+    assert out[0]["labels"][0] == "Navigation"
+
+
+def test_each_distinct_text_is_embedded_once(model):
+    m, enc = model
+    clf, sa, _ = m._get_pipes()
+    _ = clf.index.centroids, clf.index.polarity   # build centroids first
+    enc.calls.clear()
+    sa(["a slow page", "a slow page", "nice"])
+    clf(["a slow page", "nice"], candidate_labels=CATEGORIES, multi_label=True)
+    embedded = [t for call in enc.calls for t in call]
+    assert sorted(embedded) == ["a slow page", "nice"]
+
+
+def test_report_shape_matches_hf_model(model):
+    m, _ = model
+    out = m.analyze_feedback_items([
+        "The settings menu is confusing and hard to find.",
+        "Pages are slow to load and the app lags.",
+        "I love the clean, modern design.",
+    ])
+    for key in ("top_insight", "pie_data", "insights", "positive_highlights",
+                "delight_distribution", "delight_by_theme"):
+        assert key in out
+    assert isinstance(out["insights"], dict)
+    assert [d["name"] for d in out["delight_distribution"]] == CATEGORIES
+    assert sum(p["value"] for p in out["pie_data"]) == sum(len(v) for v in out["insights"].values())
+
+
+def test_empty_input_returns_defaults(model):
+    m, _ = model
+    out = m.analyze_feedback_items([])
+    assert out["pie_data"] == [] and out["insights"] == {}
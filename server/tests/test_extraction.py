@@ -0,0 +1,309 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+import types
+
+import pytest
+
+from services import extraction
+from models import preprocess
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_pdf(page_texts):
+    """Minimal multi-page PDF with one Helvetica text line per page."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def answers(text, **kw):
+    return list(extraction.iter_answers_from_text(text, **kw))
+
+
+def test_multiline_answer_blocks_end_at_markers_and_blank_lines():
+    text = (
+        "Q: How was onboarding?\n"
+        "A: The first screen was\n"
+        "confusing for new users.\n"
+        "Q: Anything else?\n"
+        "A: Search is fast.\n"
+        "\n"
+        "Interviewer note: ignore this line\n"
+        "Answer: Dark mode please\n"
+    )
+    assert answers(text) == [
+        "The first screen was confusing for new users.",
+        "Search is fast.",
+        "Dark mode please",
+    ]
+
+
+def test_hyphenated_line_breaks_quotes_and_crlf():
+    text = 'A: "The dash-\r\nboard loads slowly"\r\nA: ok'
+    assert answers(text) == ["The dashboard loads slowly", "ok"]
+
+
+def test_overall_lines_are_answers_after_markers():
+    text = "A: Checkout is slow.\n\nOverall, I like the product."
+    assert answers(text) == ["Checkout is slow.", "I like the product."]
+
+
+def test_sentence_fallback_without_markers():
+    assert answers("Great performance! Dark mode is nice. But checkout is slow...") == [
+        "Great performance!", "Dark mode is nice.", "But checkout is slow...",
+    ]
+    assert answers("one line\nanother line") == ["one line", "another line"]
+
+
+def test_dedupe_and_limit_are_lazy():
+    text = "\n".join(f"A: item {i % 5}" for i in range(20))
+    gen = extraction.iter_answers_from_text(text, limit=3)
+    assert isinstance(gen, types.GeneratorType) or hasattr(gen, "__next__")
+    assert list(gen) == ["item 0", "item 1", "item 2"]
+    assert answers("A: Same\nA: same\nA: SAME") == ["Same"]
+
+
+def test_iter_answers_accepts_page_stream():
+    pages = iter(["A: first page answer\ncontinues", "here\nA: second"])
+    out = list(extraction.iter_answers(extraction.iter_page_lines(pages)))
+    assert out == ["first page answer continues here", "second"]
+
+
+def test_preprocess_uses_engine_and_dedupes_across_inputs(tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-fake")
+    monkeypatch.setattr(extraction, "extract_text_from_pdf_bytes", lambda b: "A: From PDF\nA: shared")
+    out = preprocess.get_feedback_list(
+        pdf_paths=[pdf, tmp_path / "missing.pdf"],
+        text_inputs=["A: Shared\nA: from text"],
+    )
+    assert out == ["From PDF", "shared", "from text"]
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None and extraction.pdfplumber is None, reason="no PDF library")
+def test_pdf_pages_parallel_match_in_process_order(monkeypatch):
+    data = make_pdf([f"A: answer {i}" for i in range(12)])
+    serial = list(extraction.iter_pdf_pages(data, workers=1))
+    assert serial == [f"A: answer {i}" for i in range(12)]
+
+    monkeypatch.setattr(extraction, "PDF_PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(extraction, "PDF_PAGES_PER_TASK", 5)
+    assert list(extraction.iter_pdf_pages(data, workers=2)) == serial
+
+
+class CountingPool:
+    """Runs page ranges inline; records how many were submitted / cancelled."""
+
+    def __init__(self):
+        self.submitted, self.cancelled = [], 0
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        fut, pool = Future(), self
+        fut.set_result(fn(*args))
+        self.submitted.append(args[1])
+        real_cancel = fut.cancel
+        def cancel():
+            pool.cancelled += 1
+            return real_cancel()
+        fut.cancel = cancel
+        return fut
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None and extraction.pdfplumber is None, reason="no PDF library")
+def test_parallel_pages_keep_a_bounded_window(monkeypatch):
+    monkeypatch.setattr(extraction, "PDF_PAGES_PER_TASK", 1)
+    data = make_pdf([f"A: answer {i}" for i in range(10)])
+    pool = CountingPool()
+    pages = extraction._iter_pages_parallel(pool, data, 10, extraction.FAST_ENGINE, window=3)
+    assert next(pages) == "A: answer 0"
+    assert pool.submitted == [0, 1, 2, 3]            # one range out per range consumed
+    assert next(pages) == "A: answer 1"
+    pages.close()                                    # consumer stops: the rest is dropped
+    assert pool.submitted == [0, 1, 2, 3, 4] and pool.cancelled == 3
+
+
+def test_pool_is_not_forked_from_a_threaded_process(monkeypatch):
+    monkeypatch.setattr(extraction, "_pool", None)
+    stop = threading.Event()
+    t = threading.Thread(target=stop.wait, daemon=True)
+    t.start()
+    try:
+        assert extraction.start_pool(2) is None
+        assert extraction._pool is None
+    finally:
+        stop.set()
+        t.join()
+
+
+# In a fresh interpreter, the way app.py starts: fork the pool first, then run
+# threads; requests still extract through the pool
+POOL_CHECK = r"""
+import sys, threading
+from services import extraction
+pool = extraction.start_pool(2)
+assert pool is not None
+threading.Thread(target=threading.Event().wait, daemon=True).start()
+extraction.PDF_PARALLEL_MIN_PAGES, extraction.PDF_PAGES_PER_TASK = 4, 5
+data = open(sys.argv[1], "rb").read()
+pages = list(extraction.iter_pdf_pages(data, workers=2))
+assert extraction._get_pool() is pool
+print(len(pages), pages[-1])
+"""
+
+
+def test_no_pool_under_eventlet():
+    pytest.importorskip("eventlet")
+    check = ("from services import async_mode; async_mode.patch('eventlet')\n"
+             "from services import extraction\n"
+             "print(extraction.start_pool(2), extraction._get_pool())")
+    out = subprocess.run([sys.executable, "-c", check], cwd=SERVER_DIR, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["None", "None"]
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None and extraction.pdfplumber is None, reason="no PDF library")
+def test_pool_forked_at_startup_serves_later_threads(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(make_pdf([f"A: answer {i}" for i in range(12)]))
+    out = subprocess.run([sys.executable, "-c", POOL_CHECK, str(pdf)], cwd=SERVER_DIR, capture_output=True,
+                         text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == "12 A: answer 11"
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None or extraction.pdfplumber is None, reason="needs both PDF libraries")
+def test_pypdf2_fallback_is_per_page(monkeypatch):
+    real_open = extraction.pdfplumber.open
+
+    class FlakyPdf:
+        def __init__(self, src):
+            self._pdf = real_open(src)
+            self.pages = [FlakyPage(p, i) for i, p in enumerate(self._pdf.pages)]
+        def close(self):
+            self._pdf.close()
+
+    class FlakyPage:
+        def __init__(self, page, i):
+            self._page, self._i = page, i
+        def extract_text(self):
+            if self._i == 1:
+                raise ValueError("broken page")
+            return "plumber: " + self._page.extract_text()
+
+    monkeypatch.setattr(extraction.pdfplumber, "open", FlakyPdf)
+    data = make_pdf(["A: one", "A: two", "A: three"])
+    assert list(extraction.iter_pdf_pages(data, workers=1, engine="layout")) == [
+        "plumber: A: one", "A: two", "plumber: A: three",
+    ]
+
+
+def test_unreadable_pdf_fails_before_iteration():
+    with pytest.raises(Exception):
+        extraction.iter_pdf_pages(b"not a pdf")
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None and extraction.pdfplumber is None, reason="no PDF library")
+def test_spooled_path_is_read_like_bytes(tmp_path):
+    data = make_pdf(["A: mapped one", "A: mapped two"])
+    path = tmp_path / "u.pdf"
+    path.write_bytes(data)
+    assert list(extraction.iter_pdf_pages(path)) == list(extraction.iter_pdf_pages(data))
+
+    txt = tmp_path / "u.txt"
+    txt.write_bytes("A: café\r\nA: b\xe9".encode("utf-8")[:-2] + b"\xe9")   # latin-1 tail
+    assert list(extraction.iter_document_lines(txt, "u.txt")) == ["A: café", "A: bé"]
+
+
+def make_docx(paragraphs, body_extra=""):
+    """Bare .docx zip holding only word/document.xml."""
+    import zipfile
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{t}</w:t></w:r></w:p>" for t in paragraphs)
+    xml = f'<?xml version="1.0"?><w:document xmlns:w="{w}"><w:body>{body}{body_extra}</w:body></w:document>'
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("word/document.xml", xml)
+    return buf.getvalue()
+
+
+def test_docx_paragraphs_stream_from_document_xml(monkeypatch):
+    monkeypatch.setattr(extraction, "Document", None)     # python-docx not needed
+    table = ("<w:tbl><w:tr><w:tc><w:p><w:r><w:t>A: in a cell</w:t></w:r></w:p></w:tc></w:tr></w:tbl>"
+             "<w:p><w:r><w:t>A: split</w:t></w:r><w:r><w:tab/><w:t>run</w:t><w:br/><w:t>next</w:t></w:r></w:p>")
+    data = make_docx(["Q: How was it?", "A: Fine"], body_extra=table)
+    assert list(extraction.iter_docx_paragraphs(data)) == [
+        "Q: How was it?", "A: Fine", "A: in a cell", "A: split\trun\nnext",
+    ]
+    lines = extraction.iter_document_lines(data, "t.docx")
+    assert list(extraction.iter_answers(lines)) == ["Fine", "in a cell", "split run next"]
+
+
+def test_docx_from_spooled_path(tmp_path):
+    path = tmp_path / "u.docx"
+    path.write_bytes(make_docx(["A: from disk"]))
+    assert list(extraction.iter_docx_paragraphs(path)) == ["A: from disk"]
+
+
+def test_docx_falls_back_to_python_docx_for_odd_files(monkeypatch):
+    class FakeDoc:
+        def __init__(self, f):
+            self.paragraphs = [types.SimpleNamespace(text="A: via python-docx")]
+
+    monkeypatch.setattr(extraction, "Document", FakeDoc)
+    import zipfile
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("word/other.xml", "<x/>")
+    assert list(extraction.iter_docx_paragraphs(buf.getvalue())) == ["A: via python-docx"]
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None or extraction.pdfplumber is None, reason="needs both PDF libraries")
+def test_probe_picks_fast_engine_for_transcripts_and_records_it(monkeypatch):
+    stats = extraction._PdfStats()
+    monkeypatch.setattr(extraction, "_pdf_stats", stats)
+    opened = []
+    real_open = extraction.pdfplumber.open
+    monkeypatch.setattr(extraction.pdfplumber, "open", lambda src: opened.append(1) or real_open(src))
+
+    transcript = make_pdf([f"A: answer {i}" for i in range(4)])
+    assert list(extraction.iter_pdf_pages(transcript, workers=1)) == [f"A: answer {i}" for i in range(4)]
+    assert opened == []                       # pdfplumber never touched
+
+    prose = make_pdf(["Some report text", "without any markers"])
+    assert list(extraction.iter_pdf_pages(prose, workers=1)) == ["Some report text", "without any markers"]
+    assert opened                             # escalated
+
+    snap = stats.snapshot()
+    assert [r["engine"] for r in snap["recent"]] == [extraction.FAST_ENGINE, extraction.LAYOUT_ENGINE]
+    assert snap["recent"][0]["pages_read"] == 4
+    assert snap["probes"] == 2 and snap["escalations"] == 1
+    assert snap["engines"][extraction.FAST_ENGINE]["documents"] == 1
+
+
+@pytest.mark.skipif(extraction.PyPDF2 is None or extraction.pdfplumber is None, reason="needs both PDF libraries")
+def test_glued_words_escalate_to_layout_engine():
+    glued = make_pdf(["A: Thedashboardwasslowtoloadeverysingletime", "A: Menulabelswereconfusingtoeveryone"])
+    with extraction.open_source(glued) as stream:
+        assert extraction.choose_pdf_engine(stream, 2, "auto") == extraction.LAYOUT_ENGINE
+        assert extraction.choose_pdf_engine(stream, 2, "fast") == extraction.FAST_ENGINE
@@ -0,0 +1,58 @@
+import pytest
+
+import services.extraction_cache as ec
+from services import extraction
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(ec, "_cache", ec.ExtractionCache(max_entries=2, disk_dir=None))
+    yield ec._cache
+
+
+def counting(items):
+    calls = []
+    def compute():
+        calls.append(1)
+        return list(items)
+    return compute, calls
+
+
+def test_repeat_hash_is_served_from_memory():
+    compute, calls = counting(["a", "b"])
+    sha = ec.content_hash(b"doc")
+    assert ec.cached_answers(sha, "x.pdf", 500, compute) == ["a", "b"]
+    assert ec.cached_answers(sha, "x.pdf", 500, compute) == ["a", "b"]
+    assert len(calls) == 1
+    # other type, cap or extractor version -> separate entries
+    ec.cached_answers(sha, "x.docx", 500, compute)
+    ec.cached_answers(sha, "x.pdf", 10, compute)
+    assert len(calls) == 3
+
+
+def test_extractor_version_is_part_of_key(monkeypatch):
+    k = ec.cache_key("abc", "a.pdf", 500)
+    monkeypatch.setattr(ec, "EXTRACTOR_VERSION", extraction.EXTRACTOR_VERSION + 1)
+    assert ec.cache_key("abc", "a.pdf", 500) != k
+
+
+def test_cached_lists_are_copies():
+    compute, _ = counting(["a"])
+    ec.cached_answers("h", "f.txt", 5, compute).append("mutated")
+    assert ec.cached_answers("h", "f.txt", 5, compute) == ["a"]
+
+
+def test_disk_tier_survives_restart_and_respects_cap(tmp_path):
+    first = ec.ExtractionCache(max_entries=4, disk_dir=str(tmp_path), disk_max_bytes=10_000)
+    first.put("k1", ["from disk"])
+    restarted = ec.ExtractionCache(max_entries=4, disk_dir=str(tmp_path), disk_max_bytes=10_000)
+    assert restarted.get("k1") == ["from disk"]
+    assert restarted.snapshot()["disk_hits"] == 1
+
+    small = ec.ExtractionCache(max_entries=4, disk_dir=str(tmp_path), disk_max_bytes=300)
+    for i in range(10):
+        small.put(f"big{i}", ["x" * 50])
+    files = list(tmp_path.glob("*.json"))
+    assert sum(f.stat().st_size for f in files) <= 300
+    assert (tmp_path / "big9.json").exists()
+    assert small.snapshot()["disk_evictions"] > 0
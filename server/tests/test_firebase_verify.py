@@ -0,0 +1,51 @@
+import importlib
+import sys
+
+import pytest
+
+firebase_admin = pytest.importorskip("firebase_admin")
+requests_mock = pytest.importorskip("requests_mock")
+
+from firebase_admin import credentials
+
+
+class _AnonymousCert(credentials.Base):
+    def get_credential(self):
+        from google.auth.credentials import AnonymousCredentials
+        return AnonymousCredentials()
+
+
+@pytest.fixture()
+def firebase_verify(monkeypatch):
+    created = None
+    if firebase_admin._DEFAULT_APP_NAME not in firebase_admin._apps:
+        created = firebase_admin.initialize_app(_AnonymousCert(), options={"projectId": "demo"})
+    monkeypatch.setenv("FIREBASE_CREDENTIAL_JSON", "{}")
+    monkeypatch.delitem(sys.modules, "auth.firebase_verify", raising=False)
+    try:
+        yield importlib.import_module("auth.firebase_verify")
+    finally:
+        sys.modules.pop("auth.firebase_verify", None)
+        if created is not None:
+            firebase_admin.delete_app(created)
+
+
+def test_fetch_keys_goes_through_the_sdk_verifier(firebase_verify):
+    # _fetch_keys reaches into firebase_admin internals: this shows when an SDK
+    # upgrade turns the pre-warm into a no-op
+    from firebase_admin import _token_gen
+    with requests_mock.Mocker() as m:
+        m.get(_token_gen.ID_TOKEN_CERT_URI, json={"key1": "-----BEGIN CERTIFICATE-----"})
+        firebase_verify._fetch_keys()
+        assert firebase_verify.key_refresher.refresh() is True
+    assert m.call_count == 2
+    assert m.last_request.headers["Cache-Control"] == "no-cache"
+
+
+def test_fetch_keys_is_best_effort_without_sdk_internals(firebase_verify, monkeypatch):
+    monkeypatch.delattr(firebase_verify.firebase_auth, "_get_client")
+    firebase_verify.key_refresher._stop.clear()
+    with requests_mock.Mocker() as m:
+        firebase_verify._fetch_keys()
+    assert m.call_count == 0
+    assert firebase_verify.key_refresher._stop.is_set()
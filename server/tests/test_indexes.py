@@ -0,0 +1,78 @@
+import os
+import uuid
+
+import mongomock
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from services import indexes
+
+
+def test_ensure_indexes_creates_declared_indexes():
+    db = mongomock.MongoClient().get_database("testdb")
+    out = indexes.ensure_indexes(db)
+    assert out == {"created": ["notes.id_unique", "notes.boardId_id", "notes.boardId_rev", "notes.boardId_x_y",
+                               "note_tombstones.boardId_rev", "socket_presence.boardId_uid",
+                               "socket_presence.sid", "socket_presence.expires_ttl"], "failed": {}}
+    info = db.notes.index_information()
+    assert info["id_unique"]["unique"] is True
+    assert list(info["boardId_id"]["key"]) == [("boardId", 1), ("id", 1)]
+    assert indexes.ensure_indexes(db)["failed"] == {}          # idempotent
+
+
+def test_ensure_indexes_reports_failures_and_continues():
+    db = mongomock.MongoClient().get_database("testdb")
+    db.notes.insert_many([{"id": "n1", "boardId": "b"}, {"id": "n1", "boardId": "b"}])
+    out = indexes.ensure_indexes(db)
+    assert list(out["failed"]) == ["notes.id_unique"]
+    assert out["created"] == ["notes.boardId_id", "notes.boardId_rev", "notes.boardId_x_y",
+                              "note_tombstones.boardId_rev", "socket_presence.boardId_uid", "socket_presence.sid",
+                              "socket_presence.expires_ttl"]
+
+
+def test_plan_stages_walks_nested_plans():
+    classic = {"queryPlanner": {"winningPlan": {
+        "stage": "PROJECTION_DEFAULT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}}
+    sbe = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}
+    assert indexes.plan_stages(classic) == ["PROJECTION_DEFAULT", "FETCH", "IXSCAN"]
+    assert indexes.uses_collscan(sbe) and not indexes.uses_collscan(classic)
+
+
+# ---- query plans on a real server (mongomock has no planner) ----
+@pytest.fixture
+def mongo_db():
+    uri = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017/")
+    client = MongoClient(uri, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB not reachable (set MONGO_TEST_URI)")
+    name = f"idx_test_{uuid.uuid4().hex[:8]}"
+    db = client[name]
+    db.notes.insert_many([{"id": f"n{i}", "boardId": f"b{i % 20}", "text": "t", "x": 0, "y": 0, "rev": i,
+                           "user": {"uid": "u", "email": "e"}} for i in range(500)])
+    db.note_tombstones.insert_many([{"boardId": f"b{i % 20}", "id": f"d{i}", "rev": i} for i in range(500)])
+    assert indexes.ensure_indexes(db)["failed"] == {}
+    yield db
+    client.drop_database(name)
+    client.close()
+
+
+def test_note_queries_use_indexes(mongo_db):
+    # the queries issued by services/note_service and routes/note_routes
+    plans = {
+        "get_notes_by_board": mongo_db.notes.find({"boardId": "b3"}, {"_id": 0, "user.email": 0}).explain(),
+        "update_note": mongo_db.command("explain", {"update": "notes", "updates": [
+            {"q": {"id": "n7", "boardId": "b7"}, "u": {"$set": {"x": 1, "y": 2, "rev": 501}}}]}),
+        "delete_note": mongo_db.command("explain", {"delete": "notes", "deletes": [
+            {"q": {"id": "n7", "boardId": "b7"}, "limit": 1}]}),
+        "changes": mongo_db.notes.find({"boardId": "b3", "rev": {"$gt": 400}}).explain(),
+        "bbox": mongo_db.notes.find({"boardId": "b3", "x": {"$gte": 0, "$lte": 10},
+                                     "y": {"$gte": 0, "$lte": 10}}).sort("id", 1).explain(),
+        "tombstones": mongo_db.note_tombstones.find({"boardId": "b3", "rev": {"$gt": 400}}).explain(),
+        "cleanup": mongo_db.command("explain", {"delete": "notes", "deletes": [
+            {"q": {"boardId": {"$exists": False}}, "limit": 0}]}),
+    }
+    scans = {name: indexes.plan_stages(p) for name, p in plans.items() if indexes.uses_collscan(p)}
+    assert scans == {}
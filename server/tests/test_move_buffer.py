@@ -0,0 +1,114 @@
+import sys
+import threading
+import time
+import types
+
+import mongomock
+from pymongo import UpdateOne
+
+from services.move_buffer import MoveBuffer
+
+
+def test_keeps_latest_position_per_note():
+    writes = []
+    buf = MoveBuffer(writes.append, flush_ms=60_000)
+    for i in range(50):
+        buf.put("n1", i, i * 2, board_id="b1")
+    buf.put("n2", 7, 8, board_id="b2")
+    assert buf.flush() == 2
+    assert writes == [{"n1": (49, 98, "b1"), "n2": (7, 8, "b2")}]
+    snap = buf.snapshot()
+    assert snap["moves"] == 51 and snap["coalesced"] == 49 and snap["writes_saved"] == 49
+    assert buf.flush() == 0
+
+
+def test_background_flush_on_interval_and_size():
+    writes = []
+    done = threading.Event()
+    buf = MoveBuffer(lambda p: writes.append(dict(p)) or done.set(), flush_ms=60_000, max_pending=3)
+    buf.put("a", 1, 1)
+    buf.put("b", 1, 1)
+    time.sleep(0.05)
+    assert writes == []                         # below the size, interval not reached
+    buf.put("c", 1, 1)
+    assert done.wait(2)
+    assert writes == [{"a": (1, 1, None), "b": (1, 1, None), "c": (1, 1, None)}]
+    buf.close()
+
+    ticks = threading.Event()
+    fast = MoveBuffer(lambda p: ticks.set(), flush_ms=20)
+    fast.put("a", 1, 1)
+    assert ticks.wait(2)
+    fast.close()
+
+
+def test_flush_by_board_and_sid_and_discard():
+    writes = []
+    buf = MoveBuffer(writes.append, flush_ms=60_000)
+    buf.put("n1", 1, 1, board_id="b1", sid="s1")
+    buf.put("n2", 2, 2, board_id="b2", sid="s2")
+    buf.put("n3", 3, 3, board_id="b2", sid="s1")
+    buf.put("n4", 4, 4, board_id="b2", sid="s2")
+    buf.discard("n4")
+    assert buf.flush_board("b2") == 2 and writes[-1] == {"n2": (2, 2, "b2"), "n3": (3, 3, "b2")}
+    assert buf.flush_sid("s1") == 1 and writes[-1] == {"n1": (1, 1, "b1")}
+    assert buf.pending() == {}
+
+
+def test_failed_write_is_retried_without_overwriting_newer_moves():
+    calls = []
+
+    def flaky(positions):
+        calls.append(dict(positions))
+        if len(calls) == 1:
+            raise RuntimeError("mongo down")
+
+    buf = MoveBuffer(flaky, flush_ms=60_000)
+    buf.put("n1", 1, 1)
+    buf.put("n2", 2, 2)
+    assert buf.flush() == 0
+    buf.put("n1", 9, 9)                          # newer move while the write was failing
+    assert buf.flush() == 2
+    assert calls[-1] == {"n1": (9, 9, None), "n2": (2, 2, None)}
+    assert buf.snapshot()["errors"] == 1
+
+
+def test_close_flushes_pending():
+    writes = []
+    buf = MoveBuffer(writes.append, flush_ms=60_000)
+    buf.put("n1", 1, 1)
+    buf.close()
+    assert writes == [{"n1": (1, 1, None)}]
+
+
+def test_bulk_move_notes_issues_one_unordered_bulk_write(monkeypatch):
+    if "services.note_service" not in sys.modules:
+        # avoid a real Mongo connection when this file runs on its own
+        fake_db = types.ModuleType("db")
+        fake_db.notes_collection = None
+        monkeypatch.setitem(sys.modules, "db", fake_db)
+    import services.note_service as repo
+
+    class Coll:
+        database = mongomock.MongoClient().get_database("testdb")
+
+        def __init__(self):
+            self.calls, self.finds = [], []
+
+        def find(self, flt, projection=None):
+            self.finds.append(flt["id"]["$in"])
+            return [{"id": nid, "boardId": "b1"} for nid in flt["id"]["$in"]]
+
+        def bulk_write(self, ops, ordered=True):
+            self.calls.append((ops, ordered))
+            return type("R", (), {"modified_count": len(ops)})()
+
+    coll = Coll()
+    monkeypatch.setattr(repo, "notes_collection", coll)
+    assert repo.bulk_move_notes({"n1": (1, 2, "b1"), "n2": (3, 4, "b2")}) == 2
+    assert coll.calls == [([UpdateOne({"id": "n1", "boardId": "b1"}, {"$set": {"x": 1, "y": 2, "rev": 1}}),
+                            UpdateOne({"id": "n2", "boardId": "b2"}, {"$set": {"x": 3, "y": 4, "rev": 1}})], False)]
+    assert coll.finds == []                                    # boards recorded by the buffer: no lookup
+    assert repo.bulk_move_notes({"n3": (5, 6, None)}) == 1 and coll.finds == [["n3"]]
+    assert coll.calls[-1][0] == [UpdateOne({"id": "n3", "boardId": "b1"}, {"$set": {"x": 5, "y": 6, "rev": 2}})]
+    assert repo.bulk_move_notes({}) == 0 and len(coll.calls) == 2
@@ -100,6 +100,46 @@ def test_get_notes_returns_list(client, auth_header, monkeypatch):
     assert r.status_code == 200
     assert r.get_json() == fake_notes
 
+def test_get_notes_since_returns_changes(client, auth_header, monkeypatch):
+    seen = []
+
+    def changes(board_id, since=None):
+        seen.append((board_id, since))
+        return {"rev": 3, "full": False, "notes": [], "deleted": ["n1"]}
+
+    monkeypatch.setattr(routes_mod, "get_board_changes", changes)
+    r = client.get("/api/notes?boardId=b1&since=2", headers=auth_header)
+    assert r.status_code == 200
+    assert r.get_json() == {"rev": 3, "full": False, "notes": [], "deleted": ["n1"]}
+    assert seen == [("b1", 2)]
+    assert client.get("/api/notes?boardId=b1&since=x", headers=auth_header).status_code == 400
+
+def test_get_notes_pages_with_cursor(client, auth_header, monkeypatch):
+    seen = []
+
+    def page(board_id, after=None, limit=500):
+        seen.append((board_id, after, limit))
+        return {"rev": 1, "notes": [{"id": "n3"}], "next": "n3"}
+
+    monkeypatch.setattr(routes_mod, "get_notes_page", page)
+    r = client.get("/api/notes?boardId=b1&limit=1&after=n2", headers=auth_header)
+    assert r.status_code == 200
+    assert r.get_json() == {"rev": 1, "notes": [{"id": "n3"}], "next": "n3"}
+    assert client.get("/api/notes?boardId=b1&after=", headers=auth_header).status_code == 200
+    assert seen == [("b1", "n2", 1), ("b1", None, routes_mod.NOTES_PAGE_SIZE)]
+    for bad in ("limit=0", "limit=x", f"limit={routes_mod.NOTES_PAGE_MAX + 1}", "limit=5&since=1"):
+        assert client.get(f"/api/notes?boardId=b1&{bad}", headers=auth_header).status_code == 400
+
+def test_get_notes_in_bbox(client, auth_header, monkeypatch):
+    seen = []
+    monkeypatch.setattr(routes_mod, "get_notes_in_bbox",
+                        lambda board_id, bbox: seen.append((board_id, bbox)) or [{"id": "n1"}])
+    r = client.get("/api/notes?boardId=b1&bbox=100,0,0,50", headers=auth_header)
+    assert r.status_code == 200 and r.get_json() == [{"id": "n1"}]
+    assert seen == [("b1", (0.0, 0.0, 100.0, 50.0))]
+    for bad in ("bbox=1,2,3", "bbox=0,0,1,1&limit=5", "bbox=0,0,1,1&since=2"):
+        assert client.get(f"/api/notes?boardId=b1&{bad}", headers=auth_header).status_code == 400
+
 def test_get_notes_missing_boardid_shape(client, auth_header):
     r = client.get("/api/notes", headers=auth_header)
     # Your original code returned [] for missing boardId; if you changed to 400, adjust here.
@@ -136,3 +176,27 @@ def test_logged_users_reads_from_same_db(client, auth_header):
     data = r.get_json()
     got = {(u["uid"], u["email"]) for u in data}
     assert got == {("u1", "a@example.com"), ("u2", "b@example.com")}
+
+def test_bulk_notes_endpoint(client, auth_header, monkeypatch):
+    import services.note_service as note_service
+    coll = _fake_db.notes_collection
+    monkeypatch.setattr(note_service, "notes_collection", coll)   # may be bound to another fake db
+    coll.insert_one({"id": "gone", "boardId": "b9"})
+    note = {"id": "bulk1", "text": "A", "x": 1, "y": 2, "user": {"uid": "u1"}}
+    r = client.post("/api/notes/bulk", headers=auth_header, json={
+        "boardId": "b9", "create": [note, {"id": "bad"}], "delete": ["gone"],
+    })
+    assert r.status_code == 200
+    body = r.get_json()
+    assert (body["created"], body["moved"], body["deleted"]) == (1, 0, 1)
+    assert [(e["op"], e["index"]) for e in body["errors"]] == [("create", 1)]
+    assert coll.find_one({"id": "bulk1"})["boardId"] == "b9"
+    assert coll.find_one({"id": "gone"}) is None
+
+def test_bulk_notes_endpoint_validation(client, auth_header, monkeypatch):
+    assert client.post("/api/notes/bulk", headers=auth_header, json={"create": []}).status_code == 400
+    assert client.post("/api/notes/bulk", headers=auth_header, json={"boardId": "b"}).status_code == 400
+    assert client.post("/api/notes/bulk", headers=auth_header, json={"boardId": "b", "move": {}}).status_code == 400
+    monkeypatch.setattr(routes_mod, "NOTES_BULK_MAX", 2)
+    r = client.post("/api/notes/bulk", headers=auth_header, json={"boardId": "b", "delete": ["a", "b", "c"]})
+    assert r.status_code == 400
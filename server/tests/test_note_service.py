@@ -28,6 +28,7 @@ def fake_collection():
 @pytest.fixture(autouse=True)
 def patch_collection(monkeypatch, fake_collection):
     monkeypatch.setattr(repo, "notes_collection", fake_collection)
+    repo.board_cache.clear()            # snapshots of another test's collection
     return fake_collection
 
 
@@ -105,3 +106,127 @@ def test_delete_note_removes_document(fake_collection):
     assert fake_collection.count_documents({"id": "n5"}) == 1
     repo.delete_note("n5")
     assert fake_collection.count_documents({"id": "n5"}) == 0
+
+def _note(nid, **kw):
+    return {"id": nid, "text": nid.upper(), "x": 0, "y": 0, "user": {"uid": "u1", "name": "Ann"}, **kw}
+
+def test_bulk_notes_applies_valid_items_and_reports_errors(fake_collection):
+    fake_collection.create_index("id", unique=True)
+    fake_collection.insert_many([{"id": "old1", "boardId": "b1"}, {"id": "old2", "boardId": "b1"}])
+
+    out = repo.bulk_notes(
+        creates=[_note("n1"), {"id": "n2", "text": "no coords"}, _note("n1"), _note("n3", boardId="b2")],
+        deletes=["old1", "", "old2"],
+        board_id="b1",
+    )
+
+    assert [d["id"] for d in out["created"]] == ["n1"]
+    assert "_id" not in out["created"][0] and out["created"][0]["boardId"] == "b1"
+    assert out["deleted"] == ["old1", "old2"]
+    assert [(e["op"], e["index"]) for e in out["errors"]] == [("create", 1), ("create", 2), ("create", 3),
+                                                              ("delete", 1)]
+    assert out["errors"][0]["error"] == "Missing x in note data"
+    assert "E11000" in out["errors"][1]["error"]
+    assert out["errors"][2]["error"] == "note belongs to another board"   # never outside the batch board
+    assert sorted(d["id"] for d in fake_collection.find()) == ["n1"]
+
+def test_bulk_notes_sends_one_bulk_write(monkeypatch):
+    calls = []
+
+    class Coll:
+        database = mongomock.MongoClient().get_database("testdb")
+
+        def bulk_write(self, ops, ordered=True):
+            calls.append((len(ops), ordered))
+
+    monkeypatch.setattr(repo, "notes_collection", Coll())
+    out = repo.bulk_notes(creates=[_note(f"c{i}") for i in range(3)],
+                          moves=[{"id": "m1", "x": 1, "y": 2}, {"id": "m2"}],
+                          deletes=["d1"], board_id="b1")
+    assert calls == [(5, False)]
+    assert out["moved"] == [{"id": "m1", "x": 1, "y": 2, "rev": 1}]
+    assert out["errors"] == [{"op": "move", "index": 1, "id": "m2", "error": "move needs id, x and y"}]
+
+def test_board_changes_returns_notes_and_deletes_after_since(fake_collection):
+    repo.create_note({**_note("n1"), "boardId": "b1"})
+    repo.create_note({**_note("n2"), "boardId": "b1"})
+    repo.create_note({**_note("other"), "boardId": "b2"})
+    rev, _ = repo.board_revision("b1")
+    assert rev == 2
+
+    repo.update_note("n1", {"text": "moved"})
+    repo.delete_note("n2", board_id="b1")
+    out = repo.get_board_changes("b1", since=rev)
+    assert (out["rev"], out["full"]) == (4, False)
+    assert [(n["id"], n["text"], n["rev"]) for n in out["notes"]] == [("n1", "moved", 3)]
+    assert out["deleted"] == ["n2"]
+    assert repo.get_board_changes("b1", since=4) == {"rev": 4, "full": False, "notes": [], "deleted": []}
+
+def test_board_changes_recreated_note_is_not_deleted(fake_collection):
+    repo.create_note({**_note("n1"), "boardId": "b1"})
+    repo.delete_note("n1")
+    repo.create_note({**_note("n1"), "boardId": "b1"})
+    out = repo.get_board_changes("b1", since=1)
+    assert [n["id"] for n in out["notes"]] == ["n1"]
+    assert out["deleted"] == []
+
+def test_revision_waits_for_writes_still_pending_in_another_process(fake_collection, monkeypatch):
+    repo.create_note({**_note("n1"), "boardId": "b1"})
+    held = repo._reserve("b1")                            # rev 2: another process is still writing it
+    repo.create_note({**_note("n2"), "boardId": "b1"})    # rev 3 lands first
+    assert held == 2 and repo.board_revision("b1") == (1, 0)
+    out = repo.get_board_changes("b1", since=1)
+    assert out["rev"] == 1 and [n["id"] for n in out["notes"]] == ["n2"]
+
+    repo._release("b1", held)
+    assert repo.board_revision("b1") == (3, 0)
+
+    repo._reserve("b1")                                   # rev 4, then the writer dies
+    assert repo.board_revision("b1") == (3, 0)
+    monkeypatch.setattr(repo, "REV_PENDING_TIMEOUT", -1)
+    assert repo.board_revision("b1") == (4, 0)
+    repo.create_note({**_note("n3"), "boardId": "b1"})    # releasing prunes the abandoned entry
+    assert repo._revisions().find_one({"_id": "b1"})["pending"] == []
+
+def test_board_changes_falls_back_to_full_snapshot(fake_collection, monkeypatch):
+    monkeypatch.setattr(repo, "TOMBSTONE_KEEP", 2)
+    for i in range(4):
+        repo.create_note({**_note(f"n{i}"), "boardId": "b1"})
+    for i in range(3):
+        repo.delete_note(f"n{i}", board_id="b1")           # revs 5..7; the oldest is compacted
+    assert repo.board_revision("b1") == (7, 5)
+    assert repo.get_board_changes("b1", since=5)["deleted"] == ["n1", "n2"]
+    for since in (None, 0, 4, 99):                           # missing, below the floor, ahead of the board
+        out = repo.get_board_changes("b1", since=since)
+        assert out["full"] and [n["id"] for n in out["notes"]] == ["n3"]
+
+def test_delete_note_is_scoped_to_board(fake_collection):
+    fake_collection.insert_one({"id": "n6", "boardId": "b1"})
+    repo.delete_note("n6", board_id="b2")
+    assert fake_collection.count_documents({"id": "n6"}) == 1
+    assert repo.get_board_changes("b2", since=1)["deleted"] == []
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_get_notes_page_walks_board_in_id_order(fake_collection, monkeypatch, cached):
+    if not cached:
+        monkeypatch.setattr(repo, "board_cache", repo.BoardCache(repo._load_notes, max_bytes=0))
+    for i in (3, 1, 4, 0, 2):
+        repo.create_note({**_note(f"n{i}"), "boardId": "b1"})
+    repo.create_note({**_note("x"), "boardId": "b2"})
+
+    pages, after = [], None
+    while True:
+        page = repo.get_notes_page("b1", after=after, limit=2)
+        pages.append([n["id"] for n in page["notes"]])
+        after = page["next"]
+        if after is None:
+            break
+    assert pages == [["n0", "n1"], ["n2", "n3"], ["n4"]]
+    assert page["rev"] == 5
+    assert repo.get_notes_page("b1", limit=5)["next"] is None
+
+def test_get_notes_in_bbox_without_cache_queries_ranges(fake_collection, monkeypatch):
+    monkeypatch.setattr(repo, "board_cache", repo.BoardCache(repo._load_notes, max_bytes=0))
+    for nid, x, y in (("n2", 10, 10), ("n1", 90, 100), ("out", 150, 10)):
+        repo.create_note({**_note(nid), "x": x, "y": y, "boardId": "b1"})
+    assert [n["id"] for n in repo.get_notes_in_bbox("b1", (0, 0, 100, 100))] == ["n1", "n2"]
@@ -0,0 +1,119 @@
+import threading
+
+import time
+
+import pytest
+
+from services.presence import MongoPresenceStore, PresenceFeed, PresenceStore
+
+
+def test_join_leave_disconnect_track_sockets_per_board():
+    p = PresenceStore()
+    assert p.join("s1", "b1", "u1", "Ann", "a@x") == (0, True)
+    assert p.join("s2", "b1", "u1", "Ann", "a@x") == (1, False)   # same user, second tab
+    assert p.join("s1", "b2", "u1", "Ann", "a@x") == (0, True)
+    assert p.join("s3", "b1", "u2", "Bob") == (1, True)
+    assert p.users("b1") == [{"uid": "u1", "name": "Ann", "email": "a@x"}, {"uid": "u2", "name": "Bob", "email": ""}]
+
+    assert p.leave("s1", "b1") == (True, [])                       # u1 still there on s2
+    assert p.leave("s1", "b1") == (False, [])
+    assert p.disconnect("s2") == {"b1": ["u1"]}
+    assert p.uids("b1") == {"u2"}
+    assert p.disconnect("s1") == {"b2": ["u1"]}
+    assert p.disconnect("s1") == {}
+    assert p.snapshot() == {"joins": 4, "leaves": 2, "disconnects": 3, "boards": 1, "sockets": 1, "users": 1}
+
+
+def test_concurrent_joins_and_disconnects_leave_no_residue():
+    p = PresenceStore()
+
+    def worker(n):
+        for i in range(200):
+            sid = f"s{n}-{i}"
+            p.join(sid, f"b{i % 7}", f"u{i % 5}")
+            p.join(sid, f"b{(i + 1) % 7}", f"u{i % 5}")
+            p.disconnect(sid)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    snap = p.snapshot()
+    assert (snap["boards"], snap["sockets"], snap["users"]) == (0, 0, 0)
+
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.sent = []
+        self.tasks = []
+
+    def emit(self, event, payload, room=None):
+        self.sent.append((event, room, payload))
+
+    def start_background_task(self, fn, *args):
+        t = threading.Thread(target=fn, args=args)
+        t.start()
+        self.tasks.append(t)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def test_feed_coalesces_a_burst_into_one_broadcast_per_board():
+    store, sio = PresenceStore(), RecordingSocketIO()
+    feed = PresenceFeed(store, window_ms=50)
+    feed.attach(sio)
+    for i in range(20):
+        store.join(f"s{i}", "b1", f"u{i}")
+        feed.changed("b1", joined=[{"uid": f"u{i}", "name": "", "email": ""}])
+    store.join("sx", "b1", "ux")
+    feed.changed("b1", joined=[{"uid": "ux", "name": "", "email": ""}])
+    store.disconnect("sx")
+    feed.changed("b1", left=["ux"])                        # came and went inside the window
+    assert sio.sent == []
+    for t in sio.tasks: t.join()
+
+    assert [e for e, _, _ in sio.sent] == ["presence_delta", "user_list", "online_users"]
+    delta, user_list, online = (p for _, _, p in sio.sent)
+    assert len(delta["joined"]) == 20 and delta["left"] == [] and delta["count"] == 20
+    assert user_list["users"] is online is feed.users("b1")       # one member list for the pair
+    assert feed.snapshot()["broadcasts"] == 1 and feed.snapshot()["cancelled"] == 1
+
+    store.leave("s0", "b1")
+    assert feed.users("b1") is online                      # cached until the feed hears of a change
+    feed.changed("b1", left=["u0"])
+    assert len(feed.users("b1")) == 19
+
+
+def test_mongo_store_shares_presence_between_processes():
+    mongomock = pytest.importorskip("mongomock")
+    coll = mongomock.MongoClient().get_database("testdb")["socket_presence"]
+    a, b = MongoPresenceStore(coll, host="a"), MongoPresenceStore(coll, host="b")
+    assert a.join("s1", "b1", "u1", "Ann") == (0, True)
+    assert b.join("s2", "b1", "u1", "Ann") == (1, False)           # same user through the other process
+    assert b.join("s3", "b1", "u2", "Bob") == (1, True)
+    assert [u["uid"] for u in a.users("b1")] == ["u1", "u2"]
+
+    assert a.leave("s1", "b1") == (True, [])                        # still online through b
+    assert b.disconnect("s2") == {"b1": ["u1"]}
+    assert a.uids("b1") == {"u2"}
+
+    a.join("s4", "b2", "u3")
+    assert MongoPresenceStore(coll, host="a").clear() == 1          # restart of a drops its leftovers
+    assert b.uids("b2") == set() and b.uids("b1") == {"u2"}
+
+
+def test_mongo_entries_of_a_dead_process_expire_unless_refreshed():
+    mongomock = pytest.importorskip("mongomock")
+    coll = mongomock.MongoClient().get_database("testdb")["socket_presence"]
+    clock = [1000.0]
+    crashed = MongoPresenceStore(coll, host="h:1", ttl=90, clock=lambda: clock[0])
+    alive = MongoPresenceStore(coll, host="h:2", ttl=90, clock=lambda: clock[0])
+    crashed.join("s1", "b1", "u1")
+    alive.join("s2", "b1", "u2")
+
+    clock[0] += 60
+    assert alive.heartbeat() == 1                                  # only its own entries
+    clock[0] += 60                                                 # u1's entry is 120 s old
+    assert alive.uids("b1") == {"u2"}
+    assert [u["uid"] for u in alive.users("b1")] == ["u2"]
+    assert alive.join("s3", "b1", "u1") == (1, True)               # u1 back through a live socket
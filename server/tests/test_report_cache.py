@@ -0,0 +1,129 @@
+import sys
+import types
+
+import mongomock
+import pytest
+from flask import Flask
+
+import services.report_cache as rc
+
+
+class Model:
+    name = "m1"
+    ZSC_THRESHOLD = 0.6
+    BATCH_SA = 32
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_feedback_items(self, items):
+        self.calls += 1
+        return {"top_insight": items[0] if items else "", "pie_data": [], "insights": {},
+                "positive_highlights": [], "delight_distribution": []}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(rc, "_cache", rc.ReportCache(max_entries=4, ttl_s=60))
+    yield rc._cache
+
+
+def test_key_depends_on_items_model_and_thresholds(monkeypatch):
+    m = Model()
+    k = rc.cache_key(["a", "b"], m)
+    assert rc.cache_key(["a", "b"], m) == k
+    assert rc.cache_key(["b", "a"], m) != k
+
+    other = Model()
+    other.name = "m2"
+    assert rc.cache_key(["a", "b"], other) != k
+
+    monkeypatch.setattr(Model, "ZSC_THRESHOLD", 0.7)
+    assert rc.cache_key(["a", "b"], m) != k
+
+
+def test_batch_settings_do_not_change_key(monkeypatch):
+    m = Model()
+    k = rc.cache_key(["a"], m)
+    monkeypatch.setattr(Model, "BATCH_SA", 4)
+    assert rc.cache_key(["a"], m) == k
+
+
+def test_second_call_is_served_from_memory():
+    m = Model()
+    with rc.request_scope() as s1:
+        r1 = rc.cached_report(["x"], m, m.analyze_feedback_items)
+    with rc.request_scope() as s2:
+        r2 = rc.cached_report(["x"], m, m.analyze_feedback_items)
+    assert m.calls == 1
+    assert r1 == r2
+    assert (s1.status, s2.status) == (rc.MISS, rc.HIT)
+
+
+def test_bypass_recomputes_and_refreshes_entry():
+    m = Model()
+    rc.cached_report(["x"], m, m.analyze_feedback_items)
+    with rc.request_scope(bypass=True) as s:
+        rc.cached_report(["x"], m, m.analyze_feedback_items)
+    assert s.status == rc.BYPASS and m.calls == 2
+    rc.cached_report(["x"], m, m.analyze_feedback_items)
+    assert m.calls == 2
+
+
+def test_lru_eviction_and_ttl(fresh_cache, monkeypatch):
+    m = Model()
+    for i in range(5):
+        rc.cached_report([f"i{i}"], m, m.analyze_feedback_items)
+    assert fresh_cache.snapshot()["entries"] == 4
+    rc.cached_report(["i0"], m, m.analyze_feedback_items)   # evicted -> recompute
+    assert m.calls == 6
+
+    clock = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: clock[0])
+    rc.cached_report(["fresh"], m, m.analyze_feedback_items)
+    clock[0] += 61
+    rc.cached_report(["fresh"], m, m.analyze_feedback_items)
+    assert m.calls == 8
+
+
+def test_mongo_tier_serves_other_workers(monkeypatch):
+    coll = mongomock.MongoClient().db.report_cache
+    coll.create_index("createdAt", expireAfterSeconds=60)
+    worker_a = rc.ReportCache(max_entries=4, ttl_s=60, collection=coll)
+    worker_b = rc.ReportCache(max_entries=4, ttl_s=60, collection=coll)
+    m = Model()
+
+    monkeypatch.setattr(rc, "_cache", worker_a)
+    rc.cached_report(["shared"], m, m.analyze_feedback_items)
+    assert coll.count_documents({}) == 1
+
+    monkeypatch.setattr(rc, "_cache", worker_b)
+    with rc.request_scope() as s:
+        rc.cached_report(["shared"], m, m.analyze_feedback_items)
+    assert s.status == rc.HIT_DB and m.calls == 1
+
+
+def test_route_sets_cache_header_and_honours_refresh(monkeypatch):
+    if "auth.auth_decorator" not in sys.modules:
+        # avoid real Firebase init when this file runs on its own
+        fake_verify = types.ModuleType("auth.firebase_verify")
+        fake_verify.verify_firebase_token = lambda token: None
+        monkeypatch.setitem(sys.modules, "auth.firebase_verify", fake_verify)
+    import auth.auth_decorator as adec
+    monkeypatch.setattr(adec, "verify_firebase_token", lambda tok: {"uid": "u1"}, raising=True)
+    import routes.ux_report_routes as uxmod
+    import services.ux_report_service as svc
+    m = Model()
+    monkeypatch.setattr(svc, "get_active_model", lambda: m, raising=False)
+
+    app = Flask(__name__)
+    app.register_blueprint(uxmod.ux_bp)
+    c = app.test_client()
+    h = {"Authorization": "Bearer good"}
+
+    r1 = c.post("/api/ux/analyze", json={"text": "A: one\nA: two"}, headers=h)
+    r2 = c.post("/api/ux/analyze", json={"text": "A: one\nA: two"}, headers=h)
+    r3 = c.post("/api/ux/analyze?refresh=1", json={"text": "A: one\nA: two"}, headers=h)
+    assert [r.headers["X-Report-Cache"] for r in (r1, r2, r3)] == ["MISS", "HIT", "BYPASS"]
+    assert r1.get_json() == r2.get_json()
+    assert m.calls == 2
@@ -0,0 +1,144 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+socketio = pytest.importorskip("socketio")
+pytest.importorskip("requests")          # socketio.Client polling transport
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One board server process: real handlers, fake `db` / Firebase, presence and
+# broadcasts through the hub given on the command line, in the given async mode
+NODE = r"""
+import sys, types
+mode, port, hub = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+from services import async_mode
+async_mode.patch(mode)
+sys.modules["db"] = types.ModuleType("db")
+sys.modules["db"].notes_collection = None
+verify = types.ModuleType("auth.firebase_verify")
+verify.verify_firebase_token = lambda token: {"uid": token, "name": token} if token else None
+sys.modules["auth.firebase_verify"] = verify
+
+from flask import Flask
+from flask_socketio import SocketIO
+from services.socket_queue import socketio_options
+from events import board_events as be
+
+be.move_buffer = None
+be.update_note = lambda *a, **k: None
+app = Flask(__name__)
+sio = SocketIO(app, async_mode=mode, **socketio_options(hub))
+be.register_socket_events(sio)
+extra = {"allow_unsafe_werkzeug": True} if mode == "threading" else {"log_output": False}
+sio.run(app, host="127.0.0.1", port=port, **extra)
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, proc, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(proc.stdout.read())
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"port {port} not listening")
+
+
+class Inbox:
+    def __init__(self, client, *events):
+        self.events = {e: [] for e in events}
+        self.cond = threading.Condition()
+        for name in events:
+            client.on(name, self._recorder(name))
+
+    def _recorder(self, name):
+        def record(*args):
+            with self.cond:
+                self.events[name].append(args[0] if args else None)
+                self.cond.notify_all()
+        return record
+
+    def wait(self, name, predicate, timeout=10):
+        with self.cond:
+            ok = self.cond.wait_for(lambda: any(predicate(p) for p in self.events[name]), timeout)
+        assert ok, f"no matching {name}: {self.events[name]}"
+
+
+@pytest.fixture(params=["threading", "eventlet"])
+def cluster(request):
+    if request.param == "eventlet":
+        pytest.importorskip("eventlet")
+    procs = []
+    env = {**os.environ, "PRESENCE_DEBOUNCE_MS": "0", "BOARD_CACHE_MB": "0", "PYTHONUNBUFFERED": "1",
+           "SOCKETIO_HUB_KEY": os.urandom(16).hex()}
+    try:
+        hub_port = _free_port()
+        hub = subprocess.Popen([sys.executable, "-m", "services.socket_queue", f"127.0.0.1:{hub_port}"],
+                               cwd=SERVER_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        procs.append(hub)
+        _wait_for_port(hub_port, hub)
+        url = f"local://127.0.0.1:{hub_port}"
+        ports = []
+        for _ in range(2):
+            port = _free_port()
+            node = subprocess.Popen([sys.executable, "-c", NODE, request.param, str(port), url], cwd=SERVER_DIR,
+                                    env={**env, "PRESENCE_STORE": url},
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            procs.append(node)
+            ports.append(port)
+        for port, node in zip(ports, procs[1:]):
+            _wait_for_port(port, node)
+        yield ports
+    finally:
+        for p in procs:
+            p.kill()
+            p.wait()
+
+
+def test_two_processes_share_broadcasts_and_presence(cluster):
+    port1, port2 = cluster
+    a, b = socketio.Client(), socketio.Client()
+    inbox_a = Inbox(a, "presence_delta", "note_moved", "user_list")
+    inbox_b = Inbox(b, "presence_delta", "note_moved", "user_list")
+    try:
+        a.connect(f"http://127.0.0.1:{port1}", transports=["polling"])
+        b.connect(f"http://127.0.0.1:{port2}", transports=["polling"])
+        a.call("join_board", {"boardId": "b1", "token": "u1"}, timeout=10)
+        b.call("join_board", {"boardId": "b1", "token": "u2"}, timeout=10)
+
+        # b's process sees a's presence; a hears about b through the queue
+        inbox_b.wait("user_list", lambda p: {u["uid"] for u in p["users"]} == {"u1", "u2"})
+        inbox_a.wait("presence_delta", lambda p: [u["uid"] for u in p["joined"]] == ["u2"])
+
+        a.call("move_note", {"id": "n1", "boardId": "b1", "x": 7, "y": 8}, timeout=10)
+        inbox_b.wait("note_moved", lambda p: p["id"] == "n1" and p["x"] == 7)
+
+        b.disconnect()
+        inbox_a.wait("presence_delta", lambda p: p["left"] == ["u2"] and p["count"] == 1)
+    finally:
+        for c in (a, b):
+            if c.connected:
+                c.disconnect()
+
+
+def test_hub_refuses_to_run_without_a_key():
+    from services import socket_queue
+    with pytest.raises(RuntimeError):
+        socket_queue.serve_hub("127.0.0.1", 0, authkey=b"")
+    with pytest.raises(RuntimeError):
+        socket_queue.connect_hub("local://127.0.0.1:6390", authkey=b"")
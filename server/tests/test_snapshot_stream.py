@@ -0,0 +1,45 @@
+from services.snapshot_stream import SnapshotStreams, chunk_size, order_for_viewport, CHUNK_MAX, CHUNK_SIZE
+
+
+def _notes(n):
+    return [{"id": f"n{i:02d}", "x": i * 10, "y": 0} for i in range(n)]
+
+
+def test_viewport_notes_come_first_then_by_distance():
+    notes = _notes(10) + [{"id": "nox", "x": None, "y": 1}]
+    ordered = order_for_viewport(notes, {"x": 40, "y": -5, "w": 20, "h": 10})
+    assert [n["id"] for n in ordered[:3]] == ["n05", "n04", "n06"]     # inside, nearest the center first
+    assert [n["id"] for n in ordered[3:5]] == ["n03", "n07"]           # then outside by distance
+    assert ordered[-1]["id"] == "nox"
+    assert [n["id"] for n in order_for_viewport(notes[::-1], None)][:2] == ["n00", "n01"]   # no viewport: by id
+    assert order_for_viewport(notes, {"x": "a"}) == order_for_viewport(notes)
+
+
+def test_chunk_size_bounds():
+    assert chunk_size(None) == CHUNK_SIZE
+    assert chunk_size(10) == 10
+    assert chunk_size(10 ** 9) == CHUNK_MAX
+    assert chunk_size(0) == chunk_size(True) == CHUNK_SIZE
+
+
+def test_window_of_unacked_chunks_advances_on_ack():
+    streams = SnapshotStreams(window=2)
+    first = streams.start("s1", "b1", _notes(7), size=2, rev=9)
+    assert [(m["seq"], len(m["notes"]), m["done"]) for m in first] == [(0, 2, False), (1, 2, False)]
+    assert first[0]["chunks"] == 4 and first[0]["rev"] == 9
+    assert streams.ack("s1", "b2", 0) == []                            # another board's ack
+    assert streams.ack("s1", "b1", 3) == []                            # not sent yet
+    assert [m["seq"] for m in streams.ack("s1", "b1", 0)] == [2]
+    assert [m["seq"] for m in streams.ack("s1", "b1", 2)] == [3]       # acks are cumulative
+    assert streams.pending("s1") == {"chunks": 4, "sent": 4, "acked": 3}
+    assert streams.ack("s1", "b1", 3) == []
+    assert streams.pending("s1") is None
+    assert streams.snapshot()["completed"] == 1
+
+
+def test_empty_board_sends_one_done_chunk_and_drop_forgets_stream():
+    streams = SnapshotStreams()
+    assert streams.start("s1", "b1", [], size=5) == [
+        {"boardId": "b1", "seq": 0, "chunks": 1, "notes": [], "done": True}]
+    streams.drop("s1")
+    assert streams.pending("s1") is None and streams.snapshot()["abandoned"] == 1
@@ -0,0 +1,86 @@
+import pytest
+
+from services.spatial import GridIndex, ViewportRegistry, parse_bbox, viewport_bbox
+
+
+def test_grid_index_tracks_moves_and_answers_bbox_queries():
+    grid = GridIndex(cell=100)
+    grid.put("a", 10, 10)
+    grid.put("b", 250, -40)
+    grid.put("c", 5000, 5000)
+    grid.put("nopos", None, 3)
+    assert grid.query((0, -50, 300, 50)) == {"a", "b"}
+    grid.put("a", 900, 900)                              # moved out
+    assert grid.query((0, -50, 300, 50)) == {"b"}
+    grid.remove("b")
+    assert grid.query((-1e9, -1e9, 1e9, 1e9)) == {"a", "c"}   # huge box walks occupied cells only
+    assert len(grid) == 2
+
+
+def test_parse_bbox_normalizes_and_rejects_garbage():
+    assert parse_bbox("10, 20, -5, 0") == (-5.0, 0.0, 10.0, 20.0)
+    for bad in ("", "1,2,3", "a,b,c,d", "0,0,inf,1"):
+        with pytest.raises(ValueError):
+            parse_bbox(bad)
+    assert viewport_bbox({"x": 0, "y": 0, "w": 100, "h": 50}, margin=10) == (-10, -10, 110, 60)
+    assert viewport_bbox({"x": "0", "y": 0}) is None
+
+
+class Emits:
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, event, payload, room=None, skip_sid=None):
+        self.sent.append((event, room, sorted(skip_sid) if skip_sid else None, payload))
+
+
+def test_broadcast_without_subscribers_goes_to_the_room():
+    emits = Emits()
+    ViewportRegistry(margin=0).broadcast(emits, "note_moved", "b1", [{"id": "n1", "x": 1, "y": 1}],
+                                         lambda notes: notes[0])
+    assert emits.sent == [("note_moved", "b1", None, {"id": "n1", "x": 1, "y": 1})]
+
+
+def test_subscribers_get_notes_entering_or_leaving_their_viewport():
+    reg = ViewportRegistry(margin=0)
+    reg.subscribe("left", "b1", {"x": 0, "y": 0, "w": 100, "h": 100})
+    reg.subscribe("right", "b1", {"x": 1000, "y": 0, "w": 100, "h": 100})
+
+    emits = Emits()
+    reg.broadcast(emits, "new_note", "b1", [{"id": "n1", "x": 50, "y": 50}], lambda n: n[0], moved=False)
+    assert emits.sent == [("new_note", "b1", ["left", "right"], {"id": "n1", "x": 50, "y": 50}),
+                          ("new_note", "left", None, {"id": "n1", "x": 50, "y": 50})]
+
+    emits.sent.clear()
+    reg.broadcast(emits, "note_moved", "b1", [{"id": "n1", "x": 1050, "y": 50}], lambda n: n[0])
+    assert [room for _, room, _, _ in emits.sent] == ["b1", "left", "right"]   # left sees it go
+
+    emits.sent.clear()
+    reg.broadcast(emits, "note_moved", "b1", [{"id": "n1", "x": 1060, "y": 50}], lambda n: n[0])
+    assert [room for _, room, _, _ in emits.sent] == ["b1", "right"]
+    assert reg.snapshot()["deliveries_skipped"] == 2
+
+
+def test_unknown_previous_position_falls_back_to_locator_then_everyone():
+    located = []
+
+    def locate(board_id, ids):
+        located.append(ids)
+        return {"n1": (5000.0, 5000.0)}
+
+    reg = ViewportRegistry(margin=0, locate=locate)
+    reg.subscribe("s1", "b1", {"x": 0, "y": 0, "w": 10, "h": 10})
+    plan = reg.plan("b1", [{"id": "n1", "x": 900, "y": 900}, {"id": "n2", "x": 900, "y": 900}])
+    assert located == [["n1", "n2"]]
+    assert plan == (["s1"], {"s1": [{"id": "n2", "x": 900, "y": 900}]})   # n1 known far away; n2 unknown
+
+
+def test_subscription_lifecycle():
+    reg = ViewportRegistry(margin=0)
+    reg.subscribe("s1", "b1", {"x": 0, "y": 0})
+    reg.plan("b1", [{"id": "n1", "x": 1, "y": 1}])
+    reg.subscribe("s1", "b1", {"x": 5, "y": 5})          # pan keeps the tracked positions
+    assert reg.snapshot()["tracked_notes"] == 1 and reg.viewport("s1") == (5, 5, 5, 5)
+    reg.subscribe("s1", "b1", None)
+    assert reg.plan("b1", [{"id": "n1", "x": 1, "y": 1}]) is None
+    assert reg.snapshot()["subscribers"] == 0 and reg.snapshot()["tracked_notes"] == 0
@@ -0,0 +1,116 @@
+import io
+import json
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+import services.ux_report_service as svc
+import services.report_cache as report_cache
+import services.extraction_cache as extraction_cache
+from services import tabular
+from models.hf_zero_shot import HFZeroShotModel
+from tests.test_batch_analysis import _stub_pipes
+
+CSV = (
+    "respondent_id,Plan,Response\n"
+    "r1,pro,Search is slow\n"
+    "r2,free,Love the clean design\n"
+    "r3,pro,\n"
+    "r1,pro,\"Menus are confusing,\n and cluttered\"\n"
+    "r4,,Great app\n"
+).encode()
+
+
+def test_detects_columns_from_headers():
+    stats = {}
+    recs = list(tabular.iter_records(CSV, "export.csv", stats=stats))
+    assert stats["columns"] == {"answer": "Response", "segment": "Plan", "respondent": "respondent_id"}
+    assert [r["text"] for r in recs] == ["Search is slow", "Love the clean design",
+                                         "Menus are confusing, and cluttered", "Great app"]
+    assert recs[0] == {"text": "Search is slow", "segment": "pro", "respondent": "r1"}
+    assert (stats["rows"], stats["skipped"]) == (5, 1)
+
+
+def test_explicit_columns_and_missing_column():
+    data = "id;notes;score\n1;Checkout keeps failing;2\n2;Nice onboarding;5\n".encode()
+    recs = list(tabular.iter_records(data, "x.csv", answer="NOTES"))
+    assert [r["text"] for r in recs] == ["Checkout keeps failing", "Nice onboarding"]
+    with pytest.raises(tabular.ColumnNotFound) as ei:
+        list(tabular.iter_records(data, "x.csv", answer="answer_text"))
+    assert ei.value.headers == ["id", "notes", "score"]
+
+
+def test_guesses_answer_column_without_known_header():
+    data = "id,q7,score\n1,The export button is hard to find,3\n2,Works well on mobile,4\n".encode()
+    stats = {}
+    assert next(tabular.iter_records(data, "x.csv", stats=stats))["text"] == "The export button is hard to find"
+    assert stats["columns"]["answer"] == "q7"
+
+
+def test_jsonl_streams_rows_and_skips_bad_lines(tmp_path):
+    path = tmp_path / "export.jsonl"
+    lines = [json.dumps({"feedback": "Search is slow", "segment": "pro"}), "not json", "",
+             json.dumps({"feedback": None, "segment": "pro"}), json.dumps({"feedback": "Great app"})]
+    path.write_text("\n".join(lines))
+    stats = {}
+    recs = list(tabular.iter_records(str(path), "export.jsonl", stats=stats, max_rows=2))
+    assert [(r["text"], r["segment"]) for r in recs] == [("Search is slow", "pro")]
+    assert (stats["rows"], stats["skipped"], stats["truncated"]) == (2, 1, 1)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    pipes = _stub_pipes(calls)
+    monkeypatch.setattr(HFZeroShotModel, "_get_pipes", classmethod(lambda cls: pipes))
+    monkeypatch.setattr(HFZeroShotModel, "HF_CONCURRENCY", 1)
+    m = HFZeroShotModel()
+    m.calls = calls
+    monkeypatch.setattr(svc, "get_active_model", lambda: m, raising=False)
+    report_cache.clear()
+    extraction_cache.clear()
+    return m
+
+
+def test_analyze_table_streams_in_chunks_with_segment_counts(model, monkeypatch):
+    monkeypatch.setattr(svc, "CHUNK_SIZE", 2)
+    out = svc.analyze_table(CSV, "export.csv")
+
+    assert max(n for k, n in model.calls if k == "sa") <= 2           # rows reach the model in chunks
+    assert out["table"] == {"columns": {"answer": "Response", "segment": "Plan", "respondent": "respondent_id"},
+                            "rows": 5, "answers": 4, "skipped": 1, "truncated": 0}
+    pro = out["segments"][0]
+    assert pro["name"] == "pro" and pro["rows"] == 2 and pro["respondents"] == 1
+    assert pro["critiques"] == 2 and pro["categories"] == {"Performance": 1, "Usability": 1}
+    assert [s["name"] for s in out["segments"]] == ["pro", "(none)", "free"]
+    assert out["insights"]["Performance"] == ["Search is slow"]
+
+
+def test_table_route_with_answer_column(model, monkeypatch):
+    if "auth.auth_decorator" not in sys.modules:
+        # avoid real Firebase init when this file runs on its own
+        fake_verify = types.ModuleType("auth.firebase_verify")
+        fake_verify.verify_firebase_token = lambda token: None
+        monkeypatch.setitem(sys.modules, "auth.firebase_verify", fake_verify)
+    import auth.auth_decorator as adec
+    monkeypatch.setattr(adec, "verify_firebase_token", lambda tok: {"uid": "u1"}, raising=True)
+    import routes.ux_report_routes as uxmod
+
+    app = Flask(__name__)
+    app.register_blueprint(uxmod.ux_bp)
+    c = app.test_client()
+    h = {"Authorization": "Bearer good"}
+    data = b"who,said\nr1,Search is slow\nr2,Great app\n"
+
+    r = c.post("/api/ux/analyze?answer_column=said&segment_column=who", headers=h,
+               content_type="multipart/form-data", data={"file": (io.BytesIO(data), "s.csv")})
+    assert r.status_code == 200
+    assert r.get_json()["table"]["answers"] == 2
+    assert [s["name"] for s in r.get_json()["segments"]] == ["r1", "r2"]
+
+    bad = c.post("/api/ux/analyze?answer_column=nope", headers=h,
+                 content_type="multipart/form-data", data={"file": (io.BytesIO(data), "s.csv")})
+    assert bad.status_code == 400
+    assert bad.get_json()["error"] == "invalid_column" and bad.get_json()["headers"] == ["who", "said"]
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from services.token_cache import KeyRefresher, TokenCache
+
+
+class Verifier:
+    def __init__(self):
+        self.calls = []
+        self.fail = None
+
+    def __call__(self, token):
+        self.calls.append(token)
+        if self.fail is not None:
+            raise self.fail
+        if token.startswith("bad"):
+            raise ValueError("invalid token")
+        uid, _, exp = token.partition(":")
+        return {"uid": uid, "exp": int(exp)} if exp else {"uid": uid}
+
+
+def _cache(**kw):
+    clock = [1000.0]
+    verify = Verifier()
+    cache = TokenCache(verify, clock=lambda: clock[0], **kw)
+    return cache, verify, clock
+
+
+def test_claims_cached_until_exp_minus_skew():
+    cache, verify, clock = _cache(skew=30)
+    assert cache.verify("u1:1100") == {"uid": "u1", "exp": 1100}
+    assert cache.verify("u1:1100") is cache.verify("u1:1100")
+    assert verify.calls == ["u1:1100"]
+    clock[0] = 1070                                   # inside the skew margin
+    cache.verify("u1:1100")
+    assert verify.calls == ["u1:1100"] * 2
+    cache.verify("u2")                                # no exp: never cached
+    cache.verify("u2")
+    assert verify.calls[-2:] == ["u2", "u2"]
+    snap = cache.snapshot()
+    assert snap["hits"] == 2 and snap["uncacheable"] == 3 and snap["hit_rate"] == 0.3333
+
+
+def test_rejections_cached_briefly_transient_errors_not_at_all():
+    cache, verify, clock = _cache(negative_ttl=10)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            cache.verify("bad-1")
+    assert verify.calls == ["bad-1"]
+    clock[0] += 11
+    with pytest.raises(ValueError):
+        cache.verify("bad-1")
+    assert verify.calls == ["bad-1"] * 2
+
+    verify.fail = ConnectionError("key fetch failed")
+    with pytest.raises(ConnectionError):
+        cache.verify("u1:5000")
+    verify.fail = None
+    assert cache.verify("u1:5000")["uid"] == "u1"
+    assert cache.snapshot()["verify_errors"] == 1
+    with pytest.raises(ValueError):
+        cache.verify("")
+
+
+def test_least_recently_used_tokens_evicted_past_size():
+    cache, verify, _ = _cache(size=2)
+    cache.verify("a:5000"); cache.verify("b:5000")
+    cache.verify("a:5000")                            # a is now the most recent
+    cache.verify("c:5000")
+    cache.verify("a:5000")
+    cache.verify("b:5000")
+    assert verify.calls == ["a:5000", "b:5000", "c:5000", "b:5000"]
+    assert cache.snapshot()["evictions"] == 2
+    off, verify, _ = _cache(size=0)
+    off.verify("a:5000"); off.verify("a:5000")
+    assert len(verify.calls) == 2
+
+
+def test_key_refresher_runs_off_thread_and_counts_failures():
+    fetched = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("offline")
+        fetched.set()
+
+    refresher = KeyRefresher(fetch, interval=0.01)
+    assert refresher.start() and not refresher.start()
+    assert fetched.wait(2)
+    refresher.stop()
+    snap = refresher.snapshot()
+    assert snap["errors"] == 1 and snap["refreshes"] >= 1 and snap["last_error"] == "offline"
+    assert KeyRefresher(fetch, interval=0).start() is False
@@ -0,0 +1,164 @@
+import hashlib
+import io
+import os
+import sys
+import types
+
+import pytest
+from flask import Flask
+
+from services import uploads
+import services.report_cache as report_cache
+import services.extraction_cache as extraction_cache
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, n=-1):
+        self.reads += 1
+        return super().read(n)
+
+
+def test_spool_copies_in_chunks_and_removes_file():
+    stream = CountingStream(b"A: one\n" * 100)
+    with uploads.spool_upload(stream, "notes.TXT", chunk_size=64) as spooled:
+        assert spooled.size == 700
+        assert spooled.sha256 == hashlib.sha256(b"A: one\n" * 100).hexdigest()
+        assert spooled.path.endswith(".txt")
+        with open(spooled.path, "rb") as f:
+            assert f.read() == b"A: one\n" * 100
+    assert stream.reads > 10
+    assert not os.path.exists(spooled.path)
+
+
+def test_max_size_is_enforced_while_streaming(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    stream = CountingStream(b"x" * 10_000)
+    with pytest.raises(uploads.UploadTooLarge):
+        uploads.spool_upload(stream, "big.pdf", max_bytes=1_000, chunk_size=256)
+    assert stream.reads == 4          # stopped at the first chunk past the cap
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    if "auth.auth_decorator" not in sys.modules:
+        # avoid real Firebase init when this file runs on its own
+        fake_verify = types.ModuleType("auth.firebase_verify")
+        fake_verify.verify_firebase_token = lambda token: None
+        monkeypatch.setitem(sys.modules, "auth.firebase_verify", fake_verify)
+    import auth.auth_decorator as adec
+    monkeypatch.setattr(adec, "verify_firebase_token", lambda tok: {"uid": "u1"}, raising=True)
+    import routes.ux_report_routes as uxmod
+    import services.ux_report_service as svc
+
+    seen = {}
+
+    class Model:
+        name = "m"
+
+        def analyze_feedback_items(self, items):
+            seen["items"] = list(items)
+            return {"top_insight": "", "pie_data": [], "insights": {},
+                    "positive_highlights": [], "delight_distribution": []}
+
+    monkeypatch.setattr(svc, "get_active_model", lambda: Model(), raising=False)
+    report_cache.clear()
+    extraction_cache.clear()
+    app = Flask(__name__)
+    app.register_blueprint(uxmod.ux_bp)
+    c = app.test_client()
+    c.seen = seen
+    return c
+
+
+@pytest.fixture
+def spooling_client(client, monkeypatch):
+    uploads.configure(client.application)
+    adopted = []
+    real = uploads.spool_upload
+
+    def spy(stream, *a, **k):
+        spooled = real(stream, *a, **k)
+        adopted.append((isinstance(stream, uploads.UploadSpool), spooled.path))
+        return spooled
+
+    monkeypatch.setattr(uploads, "spool_upload", spy)
+    client.adopted = adopted
+    return client
+
+
+def test_route_analyzes_spooled_file(client):
+    r = client.post("/api/ux/analyze", headers={"Authorization": "Bearer good"},
+                    data={"file": (io.BytesIO(b"A: Fast\nA: Friendly"), "f.txt")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 200
+    assert client.seen["items"] == ["Fast", "Friendly"]
+
+
+def test_route_rejects_oversized_upload(client, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 8)
+    r = client.post("/api/ux/analyze", headers={"Authorization": "Bearer good"},
+                    data={"file": (io.BytesIO(b"A: far too long"), "f.txt")},
+                    content_type="multipart/form-data")
+    assert r.status_code == 413
+    assert r.get_json()["error"] == "file_too_large"
+
+
+def test_repeat_upload_skips_extraction(client, monkeypatch):
+    import services.ux_report_service as svc
+    calls = []
+    real = svc._answers_from_document
+    monkeypatch.setattr(svc, "_answers_from_document", lambda *a: calls.append(a) or real(*a))
+    for _ in range(2):
+        r = client.post("/api/ux/analyze?refresh=1", headers={"Authorization": "Bearer good"},
+                        data={"file": (io.BytesIO(b"A: Same file"), "f.txt")},
+                        content_type="multipart/form-data")
+        assert r.status_code == 200
+    assert len(calls) == 1
+    assert client.seen["items"] == ["Same file"]
+
+
+def test_parser_spools_upload_once(spooling_client):
+    r = spooling_client.post("/api/ux/analyze", headers={"Authorization": "Bearer good"},
+                             data={"file": (io.BytesIO(b"A: Fast\nA: Friendly"), "f.txt")},
+                             content_type="multipart/form-data")
+    assert r.status_code == 200
+    assert spooling_client.seen["items"] == ["Fast", "Friendly"]
+    [(was_spool, path)] = spooling_client.adopted
+    assert was_spool and path.endswith(".txt")                 # the parser's file, not a copy
+    assert not os.path.exists(path)
+
+
+def test_parser_enforces_caps_while_receiving(spooling_client, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 8)
+    r = spooling_client.post("/api/ux/analyze", headers={"Authorization": "Bearer good"},
+                             data={"file": (io.BytesIO(b"A: far too long"), "f.txt")},
+                             content_type="multipart/form-data")
+    assert r.status_code == 413 and r.get_json()["error"] == "file_too_large"
+    assert spooling_client.adopted == []                       # rejected inside the parser
+
+    spooling_client.application.config["MAX_CONTENT_LENGTH"] = 100
+    r = spooling_client.post("/api/ux/analyze", headers={"Authorization": "Bearer good"},
+                             data={"file": (io.BytesIO(b"A: x" * 100), "f.txt")},
+                             content_type="multipart/form-data")
+    assert r.status_code == 413
+
+
+def test_upload_spool_hashes_and_caps_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_SPOOL_DIR", str(tmp_path))
+    spool = uploads.UploadSpool("a.PDF", max_bytes=10)
+    spool.write(b"12345")
+    spool.seek(0)
+    with uploads.spool_upload(spool, "a.PDF") as spooled:
+        assert (spooled.size, spooled.sha256) == (5, hashlib.sha256(b"12345").hexdigest())
+        assert spooled.path == spool.name and spooled.path.endswith(".pdf")
+    assert list(tmp_path.iterdir()) == []
+
+    spool = uploads.UploadSpool("b.pdf", max_bytes=10)
+    with pytest.raises(uploads.UploadTooLarge):
+        spool.write(b"x" * 11)
+    assert list(tmp_path.iterdir()) == []
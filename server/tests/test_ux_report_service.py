@@ -3,6 +3,9 @@ import types
 import pytest
 
 import services.ux_report_service as svc
+import services.extraction as extraction
+import services.report_cache as report_cache
+import services.extraction_cache as extraction_cache
 
 class FakeModel:
     def __init__(self):
@@ -23,6 +26,8 @@ class FakeModel:
 def fake_model(monkeypatch):
     fm = FakeModel()
     monkeypatch.setattr(svc, "get_active_model", lambda: fm, raising=False)
+    report_cache.clear()
+    extraction_cache.clear()
     return fm
 
 
@@ -74,7 +79,7 @@ def test_analyze_uploaded_file_txt_calls_model(fake_model):
 
 def test_pdf_extraction_via_pypdf2(monkeypatch, fake_model):
     # Force pdfplumber path to be unavailable to hit PyPDF2 branch
-    monkeypatch.setattr(svc, "pdfplumber", None, raising=False)
+    monkeypatch.setattr(extraction, "pdfplumber", None, raising=False)
 
     class FakePage:
         def __init__(self, text): self._t = text
@@ -87,7 +92,7 @@ def test_pdf_extraction_via_pypdf2(monkeypatch, fake_model):
             return [FakePage("A: Alpha"), FakePage("A: Beta")]
 
     fake_pypdf2 = types.SimpleNamespace(PdfReader=FakeReader)
-    monkeypatch.setattr(svc, "PyPDF2", fake_pypdf2, raising=False)
+    monkeypatch.setattr(extraction, "PyPDF2", fake_pypdf2, raising=False)
 
     res = svc.analyze_uploaded_file(b"%PDF-1.4 ...", "file.pdf")
     assert fake_model.last_items == ["Alpha", "Beta"]
@@ -103,7 +108,7 @@ def test_docx_extraction(monkeypatch, fake_model):
         def paragraphs(self):
             return [P("A: Docx One"), P("A: Docx Two")]
 
-    monkeypatch.setattr(svc, "Document", FakeDoc, raising=False)
+    monkeypatch.setattr(extraction, "Document", FakeDoc, raising=False)
 
     res = svc.analyze_uploaded_file(b"PK\x03\x04...", "file.docx")
     assert fake_model.last_items == ["Docx One", "Docx Two"]
@@ -111,7 +116,7 @@ def test_docx_extraction(monkeypatch, fake_model):
 
 def test_unknown_extension_tries_pdf_then_decodes(monkeypatch, fake_model):
     # Make PDF path raise to force decode fallback
-    monkeypatch.setattr(svc, "_extract_text_from_pdf_bytes", lambda b: (_ for _ in ()).throw(RuntimeError("nope")))
+    monkeypatch.setattr(extraction, "iter_pdf_pages", lambda b: (_ for _ in ()).throw(RuntimeError("nope")))
     data = "A: X\nA: Y".encode("utf-8")
     res = svc.analyze_uploaded_file(data, "file.bin")
     assert fake_model.last_items == ["X", "Y"]